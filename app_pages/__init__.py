@@ -0,0 +1,75 @@
+# ================= PAGE REGISTRY =================
+# One module per menu page, each exposing render(ctx: DataContext).
+# A page module is imported the first time it is selected (then stays in
+# sys.modules), so a rerun only compiles/executes the shell in sales.py and
+# the page on screen. Import and render times are kept per page for the
+# admin view and benchmarks/bench_startup.py.
+#
+# (Named app_pages, not pages: Streamlit would turn a pages/ folder next to
+# sales.py into its own multipage navigation.)
+
+import importlib
+import threading
+import time
+from dataclasses import dataclass
+
+from app_pages.context import DataContext
+
+
+@dataclass(frozen=True)
+class PageSpec:
+    key: str                  # texts[lang] key of the menu label
+    module: str               # app_pages.<module>
+    label: str | None = None  # fixed label for pages without a texts entry
+
+    def menu_label(self, texts: dict, lang: str) -> str:
+        return self.label or texts[lang][self.key]
+
+
+PAGES = (
+    PageSpec("home", "home"),
+    PageSpec("sales_tracking", "sales_tracking"),
+    PageSpec("ytd_comparison", "ytd_comparison"),
+    PageSpec("custom_analysis", "custom_analysis"),
+    PageSpec("target_allocation", "target_allocation"),
+    PageSpec("ai_insights", "ai_insights"),
+    PageSpec("customer_insights", "customer_insights"),
+    PageSpec("material_forecast", "material_forecast"),
+    PageSpec("profit_margin", "profit_margin", label="💰 Profit & Margin"),
+    PageSpec("command_center", "command_center", label="🧭 Management Command Center"),
+)
+
+_page_timings = {}
+_timings_lock = threading.Lock()
+
+
+def menu_items(texts: dict, lang: str) -> dict:
+    """{menu label: PageSpec} in menu order."""
+    return {spec.menu_label(texts, lang): spec for spec in PAGES}
+
+
+def load_page(spec: PageSpec):
+    """The page module (imported on first use)."""
+    name = f"app_pages.{spec.module}"
+    t0 = time.perf_counter()
+    module = importlib.import_module(name)
+    elapsed = time.perf_counter() - t0
+    with _timings_lock:
+        _page_timings.setdefault(spec.key, {"import": elapsed, "render": None})
+    return module
+
+
+def render_page(spec: PageSpec, ctx: DataContext):
+    module = load_page(spec)
+    t0 = time.perf_counter()
+    try:
+        module.render(ctx)
+    finally:
+        with _timings_lock:
+            _page_timings[spec.key]["render"] = time.perf_counter() - t0
+
+
+def page_timings() -> dict:
+    """{page key: {"import": s, "render": s}} for pages shown in this process."""
+    with _timings_lock:
+        return {k: dict(v) for k, v in _page_timings.items()}
@@ -0,0 +1,427 @@
+# ================= MANAGEMENT COMMAND CENTER PAGE =================
+
+import urllib.parse
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from app_pages.common import build_daily_email_summary
+from app_pages.context import DataContext
+from cube import filter_cube
+from date_index import date_slice
+
+
+def render(ctx: DataContext):
+    sales_df, target_df, channels_df, cube_df = ctx.sales_df, ctx.target_df, ctx.channels_df, ctx.cube_df
+
+
+    st.title("🧭 Management Command Center")
+
+    # ================= SAFETY CHECK =================
+    if sales_df is None or sales_df.empty:
+        st.warning("Please load sales data first")
+        st.stop()
+
+    df = sales_df.copy()
+
+    required_cols = ["Billing Date", "Net Value"]
+    missing_cols = [c for c in required_cols if c not in df.columns]
+    if missing_cols:
+        st.error(f"Missing required columns in sales data: {missing_cols}")
+        st.stop()
+
+    df["Billing Date"] = pd.to_datetime(df["Billing Date"], errors="coerce")
+    df["Net Value"] = pd.to_numeric(df["Net Value"], errors="coerce").fillna(0.0)
+    df = df.dropna(subset=["Billing Date"])
+
+    if df.empty:
+        st.warning("No valid sales records found after date cleaning.")
+        st.stop()
+
+    # ================= USE LATEST AVAILABLE MONTH =================
+    latest_data_date = df["Billing Date"].max()
+
+    if pd.isna(latest_data_date):
+        st.warning("No valid Billing Date found in sales data.")
+        st.stop()
+
+    today = pd.to_datetime(latest_data_date).normalize()
+    month_start = today.replace(day=1)
+    month_end = month_start + pd.offsets.MonthEnd(1)
+
+    all_days = pd.date_range(month_start, month_end, freq="D")
+    working_days = all_days[all_days.weekday != 4]   # Exclude Friday only
+
+    total_working_days = max(1, len(working_days))
+    days_completed = max(1, len(working_days[working_days <= today]))
+
+    # ================= FILTER LATEST AVAILABLE MONTH =================
+    df_mtd = date_slice(df, month_start, today, ctx.data_version, "command_center:sales")
+
+    if df_mtd.empty:
+        st.warning("No sales data found for latest available month.")
+        st.stop()
+
+    st.caption(f"Showing latest available data month: {today.strftime('%B %Y')}")
+
+    # Daily cube slice for the same month (salesman / customer / channel aggregates)
+    cube_all = cube_df if isinstance(cube_df, pd.DataFrame) and not cube_df.empty else df
+    cube_mtd = filter_cube(cube_all, month_start, today, data_version=ctx.data_version if cube_all is cube_df else None)
+
+    # ================= TARGET DATA =================
+    ka_target_map = pd.Series(dtype=float)
+
+    if "target_df" in locals() and isinstance(target_df, pd.DataFrame) and not target_df.empty:
+        if "Driver Name EN" in target_df.columns and "KA Target" in target_df.columns:
+            tdf = target_df.copy()
+            tdf["KA Target"] = pd.to_numeric(tdf["KA Target"], errors="coerce").fillna(0.0)
+            ka_target_map = tdf.groupby("Driver Name EN", observed=True)["KA Target"].sum()
+
+    # ================= OVERALL SALES =================
+    total_sales = float(df_mtd["Net Value"].sum())
+    total_ka_target = float(ka_target_map.sum()) if not ka_target_map.empty else 0.0
+
+    # ================= DAILY PACE =================
+    ka_target_per_day = round(total_ka_target / total_working_days, 0) if total_working_days > 0 else 0
+    ka_actual_per_day = round(total_sales / days_completed, 0) if days_completed > 0 else 0
+
+    def pace_status(actual_day, target_day):
+        if target_day <= 0:
+            return "🟢 GREEN"
+        ratio = actual_day / target_day
+        if ratio >= 1.0:
+            return "🟢 GREEN"
+        elif ratio >= 0.95:
+            return "🟠 AMBER"
+        else:
+            return "🔴 RED"
+
+    overall_ka_status = pace_status(ka_actual_per_day, ka_target_per_day)
+
+    # ================= EXECUTIVE KPI DASHBOARD =================
+    st.subheader("1️⃣ Executive RAG Dashboard")
+
+    from_dt = df_mtd["Billing Date"].min()
+    to_dt = df_mtd["Billing Date"].max()
+
+    from_txt = from_dt.strftime("%d %b %Y") if pd.notna(from_dt) else "-"
+    to_txt = to_dt.strftime("%d %b %Y") if pd.notna(to_dt) else "-"
+
+    c1, c2, c3, c4, c5 = st.columns(5)
+
+    c1.metric("Total Sales", f"KD {total_sales:,.0f}")
+    c1.markdown(
+        f"""
+        <div style="display:flex;justify-content:space-between;
+                    font-size:12px;margin-top:-8px;color:#334155;">
+            <span><b>From:</b> {from_txt}</span>
+            <span><b>To:</b> {to_txt}</span>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+    c2.metric("Total KA Target", f"KD {total_ka_target:,.0f}")
+    c3.metric("KA Target / Day", f"KD {ka_target_per_day:,.0f}")
+    c4.metric("KA Actual / Day", f"KD {ka_actual_per_day:,.0f}")
+    c5.metric("Overall KA Status", overall_ka_status)
+
+    # ================= SALESMAN PERFORMANCE =================
+    st.subheader("2️⃣ Salesman Performance")
+
+    if "Driver Name EN" not in df_mtd.columns:
+        st.warning("Column 'Driver Name EN' not found in sales data.")
+        salesman_df = pd.DataFrame(columns=["Driver Name EN", "Target", "Achieved", "Balance", "Ach %"])
+    else:
+        salesman_df = (
+            cube_mtd.groupby("Driver Name EN", dropna=False, observed=True)["Net Value"]
+            .sum()
+            .reset_index(name="Achieved")
+        )
+        salesman_df["Driver Name EN"] = salesman_df["Driver Name EN"].astype(object).fillna("Unknown")
+        salesman_df["Target"] = salesman_df["Driver Name EN"].map(ka_target_map).fillna(0.0)
+        salesman_df["Balance"] = salesman_df["Target"] - salesman_df["Achieved"]
+        salesman_df["Ach %"] = np.where(
+            salesman_df["Target"] > 0,
+            (salesman_df["Achieved"] / salesman_df["Target"]) * 100,
+            0.0
+        )
+        salesman_df = salesman_df.sort_values("Achieved", ascending=False)
+
+    st.dataframe(
+        salesman_df[["Driver Name EN", "Target", "Achieved", "Balance", "Ach %"]].style.format({
+            "Target": "{:,.0f}",
+            "Achieved": "{:,.0f}",
+            "Balance": "{:,.0f}",
+            "Ach %": "{:,.1f}%"
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+
+    # ================= TOP SALESMEN =================
+    st.subheader("3️⃣ Top Salesmen")
+
+    top_salesmen_df = salesman_df.sort_values("Achieved", ascending=False).head(5).copy()
+
+    st.dataframe(
+        top_salesmen_df[["Driver Name EN", "Target", "Achieved", "Balance", "Ach %"]].style.format({
+            "Target": "{:,.0f}",
+            "Achieved": "{:,.0f}",
+            "Balance": "{:,.0f}",
+            "Ach %": "{:,.1f}%"
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+
+    # ================= TOP CUSTOMERS =================
+    st.subheader("4️⃣ Top Customers")
+
+    if "PY Name 1" in df_mtd.columns:
+        customer_sales_df = (
+            cube_mtd.groupby("PY Name 1", dropna=False, observed=True)["Net Value"]
+            .sum()
+            .reset_index(name="Sales")
+            .sort_values("Sales", ascending=False)
+            .head(10)
+        )
+        customer_sales_df["PY Name 1"] = customer_sales_df["PY Name 1"].astype(object).fillna("Unknown")
+    else:
+        customer_sales_df = pd.DataFrame(columns=["PY Name 1", "Sales"])
+
+    st.dataframe(
+        customer_sales_df.style.format({"Sales": "{:,.0f}"}),
+        use_container_width=True,
+        hide_index=True
+    )
+
+    # ================= TARGET GAP CALCULATION =================
+    balance_to_target = total_ka_target - total_sales
+    remaining_days = max(0, total_working_days - days_completed)
+    required_daily_sales = (balance_to_target / remaining_days) if remaining_days > 0 else balance_to_target
+
+    st.subheader("5️⃣ Target Gap Calculation")
+    g1, g2, g3 = st.columns(3)
+    g1.metric("Remaining Target", f"KD {balance_to_target:,.0f}")
+    g2.metric("Remaining Working Days", f"{remaining_days}")
+    g3.metric("Required Daily Sales", f"KD {required_daily_sales:,.0f}")
+
+        # ================= RETAIL VS E-COM MIX (USE APP LOGIC) =================
+    def _normalize_channel(x):
+        s = str(x).strip().lower()
+        if s in ("", "nan", "none", "market"):
+            return "retail"
+        if any(k in s for k in ["e-com", "ecom", "ecommerce", "online", "talabat"]):
+            return "e-com"
+        return "retail"
+
+    retail_sales = 0.0
+    ecom_sales = 0.0
+
+    if "channels_df" in locals() and isinstance(channels_df, pd.DataFrame) and not channels_df.empty:
+        if {"PY Name 1", "Channels"}.issubset(channels_df.columns) and "PY Name 1" in df_mtd.columns:
+            ch_map = channels_df[["PY Name 1", "Channels"]].copy()
+            ch_map["PY Name 1"] = ch_map["PY Name 1"].astype(str).str.strip()
+            ch_map["Channels"] = ch_map["Channels"].apply(_normalize_channel)
+
+            tx = cube_mtd.copy()
+            tx["PY Name 1"] = tx["PY Name 1"].astype(str).str.strip()
+
+            tx = tx.merge(ch_map, on="PY Name 1", how="left")
+            tx["Channels"] = tx["Channels"].fillna("retail")
+            tx["Ch2"] = np.where(tx["Channels"] == "e-com", "E-com", "Retail")
+
+            retail_sales = float(tx.loc[tx["Ch2"] == "Retail", "Net Value"].sum())
+            ecom_sales = float(tx.loc[tx["Ch2"] == "E-com", "Net Value"].sum())
+        else:
+            retail_sales = total_sales
+            ecom_sales = 0.0
+    else:
+        retail_sales = total_sales
+        ecom_sales = 0.0
+
+    retail_mix_pct = (retail_sales / total_sales * 100) if total_sales > 0 else 0.0
+    ecom_mix_pct = (ecom_sales / total_sales * 100) if total_sales > 0 else 0.0
+
+    st.subheader("6️⃣ Retail vs E-Com Mix")
+    m1, m2 = st.columns(2)
+    m1.metric("Retail Sales", f"KD {retail_sales:,.0f}", f"{retail_mix_pct:.1f}%")
+    m2.metric("E-Commerce Sales", f"KD {ecom_sales:,.0f}", f"{ecom_mix_pct:.1f}%")
+
+    # ================= PROFIT MARGIN ALERT =================
+    gross_profit = 0.0
+    gross_margin_pct = 0.0
+
+    qty_col = None
+    for qc in ["Qty", "Billed Qty", "Sales Qty", "Quantity"]:
+        if qc in df_mtd.columns:
+            qty_col = qc
+            break
+
+    if all(col in df_mtd.columns for col in ["Cost Price", "Net Value"]) and qty_col is not None:
+        pm = df_mtd.copy()
+        pm["Cost Price"] = pd.to_numeric(pm["Cost Price"], errors="coerce").fillna(0.0)
+        pm[qty_col] = pd.to_numeric(pm[qty_col], errors="coerce").fillna(0.0)
+        pm["Net Value"] = pd.to_numeric(pm["Net Value"], errors="coerce").fillna(0.0)
+
+        pm["Cost Value"] = pm["Cost Price"] * pm[qty_col]
+        gross_profit = float((pm["Net Value"] - pm["Cost Value"]).sum())
+        gross_margin_pct = (gross_profit / total_sales * 100) if total_sales > 0 else 0.0
+
+    if gross_margin_pct >= 18:
+        margin_alert = "🟢 Healthy"
+    elif gross_margin_pct >= 12:
+        margin_alert = "🟠 Watch"
+    else:
+        margin_alert = "🔴 Low Margin"
+
+    st.subheader("7️⃣ Profit Margin Alert")
+    p1, p2, p3 = st.columns(3)
+    p1.metric("Gross Profit", f"KD {gross_profit:,.0f}")
+    p2.metric("Gross Margin %", f"{gross_margin_pct:.1f}%")
+    p3.metric("Margin Alert", margin_alert)
+
+    # ================= AI INSIGHTS =================
+    st.subheader("8️⃣ AI Insights")
+
+    ai_points = []
+
+    if ka_actual_per_day >= ka_target_per_day:
+        ai_points.append("Sales pace is above required daily target.")
+    else:
+        ai_points.append("Sales pace is below required daily target and needs push.")
+
+    if not top_salesmen_df.empty:
+        ai_points.append(f"Top salesman: {top_salesmen_df.iloc[0]['Driver Name EN']}.")
+
+    if not customer_sales_df.empty:
+        ai_points.append(f"Top customer: {customer_sales_df.iloc[0]['PY Name 1']}.")
+
+    if gross_margin_pct < 12:
+        ai_points.append("Profitability is weak and low-margin business should be reviewed.")
+    elif gross_margin_pct < 18:
+        ai_points.append("Profit margin is moderate; tighter discount control is recommended.")
+    else:
+        ai_points.append("Profit margin is healthy.")
+
+    if balance_to_target > 0 and remaining_days > 0:
+        ai_points.append(f"Need KD {required_daily_sales:,.0f} per day to close the target gap.")
+
+    for point in ai_points:
+        st.write(f"- {point}")
+
+    # ================= MANAGEMENT STATUS =================
+    st.subheader("9️⃣ Action-based Management Insights")
+
+    if overall_ka_status == "🟢 GREEN":
+        st.success("🟢 Overall KA pace ON TRACK")
+    elif overall_ka_status == "🟠 AMBER":
+        st.warning("🟠 Overall KA pace NEEDS PUSH")
+    else:
+        st.error("🚨 Overall KA pace CRITICAL")
+        
+        # ================= TWO WEEKS NOT VISITED CUSTOMERS =================
+    two_week_not_visited_df = pd.DataFrame(columns=["Customer", "Last Visit", "Last Visit Text", "Days Since Visit", "Sales"])
+
+    if "PY Name 1" in df.columns and "Billing Date" in df.columns:
+        visit_base = cube_all.copy()
+        visit_base["PY Name 1"] = visit_base["PY Name 1"].astype(str).str.strip()
+        visit_base["Billing Date"] = pd.to_datetime(visit_base["Billing Date"], errors="coerce")
+        visit_base["Net Value"] = pd.to_numeric(visit_base["Net Value"], errors="coerce").fillna(0.0)
+        visit_base = visit_base.dropna(subset=["Billing Date"])
+
+        if not visit_base.empty:
+            latest_visit_ref = visit_base["Billing Date"].max()
+
+            last_visit_df = (
+                visit_base.groupby("PY Name 1", dropna=False, observed=True)
+                .agg(
+                    Last_Visit=("Billing Date", "max"),
+                    Sales=("Net Value", "sum")
+                )
+                .reset_index()
+                .rename(columns={"PY Name 1": "Customer"})
+            )
+
+            last_visit_df["Days Since Visit"] = (
+                latest_visit_ref - last_visit_df["Last_Visit"]
+            ).dt.days
+
+            two_week_not_visited_df = (
+                last_visit_df[last_visit_df["Days Since Visit"] > 14]
+                .sort_values(["Days Since Visit", "Sales"], ascending=[False, False])
+                .copy()
+            )
+
+            two_week_not_visited_df["Last Visit Text"] = two_week_not_visited_df["Last_Visit"].dt.strftime("%d-%b-%Y")
+
+    st.subheader("8️⃣ Two Weeks Not Visited Customers")
+
+    if not two_week_not_visited_df.empty:
+        st.dataframe(
+            two_week_not_visited_df[["Customer", "Last Visit Text", "Days Since Visit", "Sales"]]
+            .rename(columns={"Last Visit Text": "Last Visit"})
+            .style.format({"Sales": "{:,.0f}"}),
+            use_container_width=True,
+            hide_index=True
+        )
+    else:
+        st.info("No customers found with more than 14 days since last visit.")    
+
+    # ================= EMAIL SUMMARY =================
+    st.subheader("📧 Daily Email Summary")
+
+    # ---- Customer Sales ----
+    if "PY Name 1" in df_mtd.columns:
+        customer_sales = (
+            cube_mtd.groupby("PY Name 1", observed=True)["Net Value"]
+            .sum()
+            .sort_values(ascending=False)
+        )
+    else:
+        customer_sales = pd.Series(dtype=float)
+
+    # ---- Generate Email ----
+    subject, body = build_daily_email_summary(
+        total_ka_target=total_ka_target,
+        total_sales=total_sales,
+        salesman_df=salesman_df,
+        customer_sales=customer_sales,
+        retail_sales=retail_sales,
+        ecom_sales=ecom_sales,
+        days_completed=days_completed,
+        total_working_days=total_working_days,
+        two_week_not_visited_df=two_week_not_visited_df
+    )
+
+    # ---- Email Preview ----
+    st.text_area(
+        "📄 Email Preview",
+        value=f"Subject: {subject}\n\n{body}",
+        height=420
+    )
+
+    # ---- Mail Button ----
+    mailto_link = (
+        f"mailto:?subject={urllib.parse.quote(subject)}"
+        f"&body={urllib.parse.quote(body)}"
+    )
+
+    st.markdown(
+        f"""
+        <a href="{mailto_link}">
+            <button style="
+                background-color:#2563eb;
+                color:white;
+                padding:10px 18px;
+                border:none;
+                border-radius:6px;
+                font-size:16px;
+                cursor:pointer;">
+                📧 Send Daily Summary Email
+            </button>
+        </a>
+        """,
+        unsafe_allow_html=True
+    )
@@ -0,0 +1,686 @@
+# ================= SHARED PAGE HELPERS =================
+# Display renames, table rendering, Excel / PPTX exports and other helpers
+# used by more than one page. Imported once per process, not per rerun.
+
+import io
+from contextlib import nullcontext
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from app_pages.texts import texts
+from chart_render import get_chart_renderer
+from costing import add_profit_columns, get_price_index, line_cost, normalize_material
+from deferred_exports import get_deferred_exports
+from excel_export import export_excel, export_token
+from pptx_charts import add_native_chart, native_chart
+
+
+# ================= SAFE SESSION ACCESSORS =================
+def get_price_df():
+    return st.session_state.get("price_df", pd.DataFrame())
+
+
+# ================= PROFIT & MARGIN HELPER =================
+def calculate_cost_profit(df, price_df):
+    df = df.copy()
+
+    df["_mat_norm"] = normalize_material(df["Material Description"])
+
+    # Exact match first, fuzzy fallback for unmatched descriptions (cached per price-list version)
+    matched = get_price_index(price_df).lookup(df["Material Description"], ["Cost Price", "Pack Size"])
+    df["Cost Price"] = matched["Cost Price"]
+    df["Pack Size"] = matched["Pack Size"]
+
+    df["Calculated Cost"] = line_cost(
+        df["Quantity"], df["Cost Price"], df.get("UOM"), df["Pack Size"], require_positive_pack=False,
+        missing_qty_as_zero=False, exact_uom=True,
+    )
+    add_profit_columns(df, "Calculated Cost")
+    df["⚠ Cost Missing"] = df["Cost Price"].isna()
+
+    return df
+
+
+# ================= GLOBAL DISPLAY COLUMN RENAME MAP =================
+# NOTE: This is ONLY for table headers (display). Do NOT change calculation logic.
+COLUMN_RENAME_MAP = {
+    # Market -> Retail everywhere
+    "Market Target": "Retail Target",
+    "Market Sales": "Retail Sales",
+    "Market Balance": "Retail Balance",
+    "Market % Achieved": "Retail % Achieved",
+    "Market": "Retail",
+
+    # Billing Type codes -> Friendly names
+    "YKS1": "HHTCancel",
+    "YKS2": "WH1 Cancel",
+    "ZCAN": "WH2 Cancel",
+    "Cancel Total": "Total Cancel",
+    "YKRE": "Salesman Return",
+    "ZRE": "Presales Return",
+}
+
+def rename_col_key(col_name: str) -> str:
+    """Convert one column header to display label."""
+    try:
+        c = str(col_name).strip()
+    except Exception:
+        c = col_name
+    c = COLUMN_RENAME_MAP.get(c, c)
+    # Also replace word Market -> Retail inside longer headers (safe)
+    try:
+        c = c.replace("Market", "Retail")
+    except Exception:
+        pass
+    return c
+
+def apply_header_renames(df: pd.DataFrame) -> pd.DataFrame:
+    """Return a copy with display header names applied (safe, no logic change)."""
+    if df is None or not isinstance(df, pd.DataFrame) or df.empty:
+        return df
+    out = df.copy()
+    out.columns = [rename_col_key(c) for c in out.columns]
+    return out
+
+def rename_format_keys(formats: dict | None) -> dict | None:
+    """Rename format dict keys to match renamed display columns."""
+    if not formats:
+        return formats
+    out = {}
+    for k, v in formats.items():
+        nk = rename_col_key(k)
+        # Fix common typo: '{:,0f}' -> '{:,.0f}'
+        if isinstance(v, str) and "{:,0f}" in v:
+            v = v.replace("{:,0f}", "{:,.0f}")
+        out[nk] = v
+    return out
+
+
+# --- Helpers: Downloads ---
+def fillna_keep_categories(df: pd.DataFrame, value) -> pd.DataFrame:
+    """df.fillna(value) that leaves categorical dimension columns untouched
+    (pandas refuses a fill value that is not one of the categories)."""
+    is_cat = [isinstance(dt, pd.CategoricalDtype) for dt in df.dtypes]
+    if not any(is_cat):
+        return df.fillna(value)
+    out = df.copy()
+    for i, cat in enumerate(is_cat):
+        if not cat:
+            out.isetitem(i, out.iloc[:, i].fillna(value))
+    return out
+
+
+def to_excel_bytes(df: pd.DataFrame, sheet_name: str = "Sheet1", index: bool = False, token=None) -> bytes:
+    """Single-sheet workbook, rows streamed (excel_export); cached on disk per token, e.g.
+    (ctx.data_version, filter state, table name) -- the frame itself is never hashed."""
+    return export_excel([(sheet_name, df, index)], export_token(*token) if token else None)
+
+def to_multi_sheet_excel_bytes(dfs, sheet_names, token=None) -> bytes:
+    return export_excel([(sn, df, True) for df, sn in zip(dfs, sheet_names)], export_token(*token) if token else None)
+
+# --- Deferred downloads ---
+PREFETCH_QUEUE_KEY = "_export_prefetch"
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def export_payload(generate, token=None) -> bytes:
+    """generate() (bytes / BytesIO) as bytes; with a token, built once and shared through deferred_exports."""
+    key = export_token(*token) if token else None
+    if key is None:
+        payload = generate()
+        return payload.getvalue() if hasattr(payload, "getvalue") else payload
+    return get_deferred_exports().get(key, generate)
+
+
+def lazy_download_button(label, generate, token=None, prefetch=False, **kwargs) -> bool:
+    """st.download_button whose payload is generate(), built only when clicked (no Streamlit calls in it).
+
+    token, e.g. (ctx.data_version, filter state, artifact), caches the payload
+    across reruns and sessions; prefetch=True also queues it for a background
+    build once the page has rendered. Returns what st.download_button returns
+    (True on the rerun after a click).
+    """
+    key = export_token(*token) if token else None
+    if prefetch and key is not None:
+        st.session_state.setdefault(PREFETCH_QUEUE_KEY, {})[key] = generate
+    return st.download_button(label, data=lambda: export_payload(generate, token), **kwargs)
+
+
+def start_export_prefetch():
+    """Hand the downloads queued during this script run to the background builders (call after render)."""
+    queued = st.session_state.pop(PREFETCH_QUEUE_KEY, None)
+    if queued:
+        exports = get_deferred_exports()
+        for key, generate in queued.items():
+            exports.prefetch(key, generate)
+
+# --- Background jobs ---
+JOB_POLL_SECONDS = 2
+
+
+def fill_when_done(job, draw, pending=None, poll_seconds: float = JOB_POLL_SECONDS):
+    """Render draw() here once job (anything with done(), e.g. a Future) has finished, without waiting for it.
+
+    While the job runs, pending() renders instead and this spot re-runs on its
+    own every poll_seconds (st.fragment); the poll that sees the job finish
+    triggers one app rerun, which draws the result and stops the polling.
+    """
+    polling = not job.done()
+
+    @st.fragment(run_every=poll_seconds if polling else None)
+    def _fill():
+        if not job.done():
+            if pending is not None:
+                pending()
+            return
+        if polling:
+            st.rerun()
+        draw()
+
+    _fill()
+
+# --- PPTX Export ---
+def create_pptx(
+    report_df,
+    billing_df,
+    py_table,
+    figs_dict,
+    kpi_data,
+    talabat_tables=None,
+    selected_slide_keys=None,
+    slide_catalog=None,
+    extra_context=None,
+    lang="en",
+    chart_mode="native",
+    show_spinner=True,
+):
+    """PPTX deck of the selected slides.
+
+    chart_mode="native" draws line / area, bar and pie figures as editable
+    PowerPoint charts (other figures fall back to PNG); "image" embeds PNGs
+    for every chart. show_spinner=False when built off the script thread
+    (deferred download): no Streamlit calls are made then.
+    """
+    extra_context = extra_context or {}
+    if selected_slide_keys is None:
+        selected_slide_keys = [
+            "TITLE", "KPI", "TREND", "CHANNEL", "CHANNEL_TREND",
+            "SALESMAN", "CUSTOMERS", "SKUS", "TALABAT", "INSIGHTS"
+        ]
+
+    selected_slide_keys = [str(x).strip().upper() for x in selected_slide_keys]
+    selected_set = set(selected_slide_keys)
+
+    from pptx import Presentation
+    from pptx.util import Inches, Pt
+    from pptx.enum.text import PP_ALIGN
+    from pptx.dml.color import RGBColor
+
+    with st.spinner(texts[lang]["generating_pptx"]) if show_spinner else nullcontext():
+        prs = Presentation()
+
+        def _safe_title(slide, title_text):
+            try:
+                slide.shapes.title.text = str(title_text)
+                slide.shapes.title.text_frame.paragraphs[0].font.size = Pt(24)
+                slide.shapes.title.text_frame.paragraphs[0].font.name = 'Roboto'
+                slide.shapes.title.text_frame.paragraphs[0].font.color.rgb = RGBColor(30, 58, 138)
+            except Exception:
+                pass
+
+        def add_title_slide():
+            slide_layout = prs.slide_layouts[0]
+            slide = prs.slides.add_slide(slide_layout)
+            title = slide.shapes.title
+            title.text = extra_context.get('report_title', texts[lang]["pptx_title"])
+            title.text_frame.paragraphs[0].font.size = Pt(30)
+            title.text_frame.paragraphs[0].font.name = 'Roboto'
+            title.text_frame.paragraphs[0].font.color.rgb = RGBColor(30, 58, 138)
+            try:
+                subtitle = slide.placeholders[1]
+                period_txt = extra_context.get('period_text', datetime.now().strftime('%Y-%m-%d'))
+                prepared_by = extra_context.get('prepared_by') or st.session_state.get('name', 'Mohamed Haneef')
+                subtitle.text = f"MTD Management Report\n{period_txt}\nPrepared by: {prepared_by}"
+                subtitle.text_frame.paragraphs[0].font.size = Pt(18)
+                subtitle.text_frame.paragraphs[0].font.name = 'Roboto'
+                subtitle.text_frame.paragraphs[0].font.color.rgb = RGBColor(55, 65, 81)
+            except Exception:
+                pass
+
+        def add_kpi_slide():
+            slide_layout = prs.slide_layouts[5]
+            slide = prs.slides.add_slide(slide_layout)
+            _safe_title(slide, '📈 KPI Summary')
+            rows = 4
+            cols = 3
+            table = slide.shapes.add_table(rows, cols, Inches(0.7), Inches(1.4), Inches(8.9), Inches(4.3)).table
+            kpi_list = list(kpi_data.items()) if isinstance(kpi_data, dict) else []
+            idx = 0
+            for i in range(rows):
+                for j in range(cols):
+                    if idx >= len(kpi_list):
+                        continue
+                    label, value = kpi_list[idx]
+                    cell = table.cell(i, j)
+                    cell.text = f"{label}\n{value}"
+                    try:
+                        cell.text_frame.paragraphs[0].font.size = Pt(11)
+                        cell.text_frame.paragraphs[0].font.name = 'Roboto'
+                        cell.text_frame.paragraphs[0].font.bold = True
+                        cell.fill.solid()
+                        cell.fill.fore_color.rgb = RGBColor(243, 244, 246)
+                    except Exception:
+                        pass
+                    idx += 1
+
+        def add_table_slide(df, title_text, max_rows=28):
+            if df is None or not hasattr(df, 'empty') or df.empty:
+                return
+            df2 = df.copy().reset_index(drop=True)
+            if len(df2) > max_rows:
+                df2 = df2.head(max_rows)
+            slide_layout = prs.slide_layouts[5]
+            slide = prs.slides.add_slide(slide_layout)
+            _safe_title(slide, title_text)
+            rows, cols = df2.shape
+            table = slide.shapes.add_table(rows + 1, cols, Inches(0.3), Inches(1.2), Inches(9.2), Inches(5.3)).table
+            for j, col in enumerate(df2.columns):
+                c = table.cell(0, j)
+                c.text = str(col)
+                try:
+                    c.text_frame.paragraphs[0].font.size = Pt(11)
+                    c.text_frame.paragraphs[0].font.name = 'Roboto'
+                    c.text_frame.paragraphs[0].font.bold = True
+                    c.text_frame.paragraphs[0].font.color.rgb = RGBColor(255, 255, 255)
+                    c.fill.solid()
+                    c.fill.fore_color.rgb = RGBColor(30, 58, 138)
+                except Exception:
+                    pass
+            for i, row in enumerate(df2.itertuples(index=False), start=1):
+                for j, val in enumerate(row):
+                    c = table.cell(i, j)
+                    if isinstance(val, (int, float, np.integer, np.floating)):
+                        c.text = f"{val:,.0f}"
+                    else:
+                        c.text = str(val)
+                    try:
+                        c.text_frame.paragraphs[0].font.size = Pt(10)
+                        c.text_frame.paragraphs[0].font.name = 'Roboto'
+                        c.fill.solid()
+                        c.fill.fore_color.rgb = RGBColor(243, 244, 246) if i % 2 == 0 else RGBColor(255, 255, 255)
+                    except Exception:
+                        pass
+
+        def add_chart_slide(fig, title_text, png=None, native=None):
+            if fig is None:
+                return
+            slide_layout = prs.slide_layouts[5]
+            slide = prs.slides.add_slide(slide_layout)
+            _safe_title(slide, title_text)
+            if native is not None:
+                try:
+                    add_native_chart(slide, native, Inches(0.4), Inches(1.1), Inches(9.0), Inches(5.25))
+                    return
+                except Exception:
+                    pass   # add_native_chart took its chart off the slide; falls back to the PNG below
+            img_stream = io.BytesIO()
+            try:
+                if isinstance(png, Exception):
+                    raise png
+                if png is not None:
+                    img_stream.write(png)
+                elif hasattr(fig, 'to_image'):
+                    img_stream.write(fig.to_image(format='png', width=1200, height=700, scale=2))
+                else:
+                    fig.write_image(img_stream, format='png', width=1200, height=700, scale=2)
+                img_stream.seek(0)
+                slide.shapes.add_picture(img_stream, Inches(0.4), Inches(1.1), width=Inches(9.0))
+            except Exception as e:
+                box = slide.shapes.add_textbox(Inches(0.6), Inches(1.5), Inches(8.5), Inches(3.0))
+                box.text_frame.text = texts[lang].get('pptx_embed_error', 'Chart export error: {0}').format(e)
+
+        def add_insights_slide():
+            slide_layout = prs.slide_layouts[5]
+            slide = prs.slides.add_slide(slide_layout)
+            _safe_title(slide, '🧠 Executive Insights')
+            box = slide.shapes.add_textbox(Inches(0.7), Inches(1.3), Inches(8.7), Inches(4.8))
+            tf = box.text_frame
+            insights = []
+            try:
+                total_sales_text = next((str(v) for k, v in kpi_data.items() if 'Total KA Sales' in str(k) or 'Total Sales' in str(k)), None)
+                if total_sales_text:
+                    insights.append(f"• Total sales achieved: {total_sales_text}")
+            except Exception:
+                pass
+            try:
+                top_customer_share = extra_context.get('top_customer_share', 0)
+                if top_customer_share:
+                    insights.append(f"• Top 5 customers contribute {top_customer_share:.1f}% of total sales.")
+            except Exception:
+                pass
+            try:
+                top_sku_share = extra_context.get('top_sku_share', 0)
+                if top_sku_share:
+                    insights.append(f"• Top 5 SKU dependency is {top_sku_share:.1f}% of total sales.")
+            except Exception:
+                pass
+            try:
+                retail_share = extra_context.get('retail_share', 0)
+                ecom_share = extra_context.get('ecom_share', 0)
+                if retail_share or ecom_share:
+                    insights.append(f"• Channel mix: Retail {retail_share:.1f}% vs E-com {ecom_share:.1f}%.")
+            except Exception:
+                pass
+            try:
+                mtd_ach = extra_context.get('mtd_achievement', 0)
+                if mtd_ach:
+                    insights.append(f"• MTD achievement is {mtd_ach:.1f}% against target.")
+            except Exception:
+                pass
+            if not insights:
+                insights = [
+                    '• Review top customers, top SKUs, and channel mix.',
+                    '• Monitor returns and cancels closely.',
+                    '• Use trend and run-rate slides for weekly actions.'
+                ]
+            tf.text = insights[0]
+            for line in insights[1:]:
+                p = tf.add_paragraph()
+                p.text = line
+                p.level = 0
+
+        if 'TITLE' in selected_set:
+            add_title_slide()
+        if 'KPI' in selected_set:
+            add_kpi_slide()
+
+        slide_map = {
+            'TREND': ('Daily Sales Trend', figs_dict.get('TREND')),
+            'CHANNEL': ('Retail vs E-com', figs_dict.get('CHANNEL')),
+            'CHANNEL_TREND': ('Channel Trend Over Time', figs_dict.get('CHANNEL_TREND')),
+            'SALESMAN': ('Salesman Performance', figs_dict.get('SALESMAN')),
+            'CUSTOMERS': ('Top 10 Customers by Sales', figs_dict.get('CUSTOMERS')),
+            'SKUS': ('Top 10 SKU by Sales', figs_dict.get('SKUS')),
+        }
+        # Native charts where the figure maps onto one; the rest are rasterized at once
+        # (warm worker pool, PNGs cached by figure spec)
+        natives = {}
+        if chart_mode == "native":
+            for key in selected_slide_keys:
+                if key in slide_map and slide_map[key][1] is not None:
+                    natives[key] = native_chart(slide_map[key][1])
+        chart_figs = {
+            key: slide_map[key][1] for key in selected_slide_keys
+            if key in slide_map and natives.get(key) is None and hasattr(slide_map[key][1], 'to_json')
+        }
+        pngs = get_chart_renderer().render_many(chart_figs, width=1200, height=700, scale=2) if chart_figs else {}
+
+        for key in selected_slide_keys:
+            if key in slide_map and slide_map[key][1] is not None:
+                add_chart_slide(slide_map[key][1], slide_map[key][0], pngs.get(key), natives.get(key))
+            elif key == 'TALABAT' and isinstance(talabat_tables, dict):
+                tb = talabat_tables.get('billing_split')
+                tc = talabat_tables.get('customers')
+                if tb is not None and hasattr(tb, 'empty') and not tb.empty:
+                    add_table_slide(tb, '🛵 Talabat – Billing Split', max_rows=18)
+                if tc is not None and hasattr(tc, 'empty') and not tc.empty:
+                    add_table_slide(tc, '🛵 Talabat – Customer Summary', max_rows=20)
+            elif key == 'INSIGHTS':
+                add_insights_slide()
+            elif key == 'APPENDIX':
+                add_table_slide(report_df.reset_index(), texts[lang]["pptx_summary_title"])
+                add_table_slide(billing_df.reset_index(), texts[lang]["pptx_billing_title"])
+                add_table_slide(py_table.reset_index(), texts[lang]["pptx_py_title"])
+
+        pptx_stream = io.BytesIO()
+        prs.save(pptx_stream)
+        pptx_stream.seek(0)
+        return pptx_stream
+
+# --- Table Rendering Helpers (consistent headers & full-row highlights) ---
+def clean_columns(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    # Remove axis names that can create blank header cells
+    try:
+        df.rename_axis(None, axis=0, inplace=True)
+        df.rename_axis(None, axis=1, inplace=True)
+    except Exception:
+        pass
+    # Ensure all column names are strings (avoid missing/blank headers)
+    try:
+        df.columns = [("" if c is None else str(c)) for c in df.columns]
+    except Exception:
+        pass
+    return df
+
+def render_table(df, *, formats: dict | None = None, total_row_match=None, hide_index: bool = True):
+    '''
+    df can be a DataFrame or a pandas Styler.
+    formats: dict like {"Sales":"{:,.0f}", "%":"{:.0f}%"}
+    total_row_match: function(row)->bool, highlights full row (e.g. lambda r: r.get("Salesman Name")=="Total")
+    '''
+    try:
+        from pandas.io.formats.style import Styler as _Styler
+        is_styler = isinstance(df, _Styler)
+    except Exception:
+        is_styler = False
+
+    if (not is_styler) and isinstance(df, pd.DataFrame):
+        df = clean_columns(df)
+        df = apply_header_renames(df)
+
+        sty = df.style.set_table_styles([
+            {'selector': 'th', 'props': [
+                ('background', '#1E3A8A'),
+                ('color', '#FFFFFF'),
+                ('font-weight', '800'),
+                ('border', '1px solid #E5E7EB'),
+                ('text-align', 'center')
+            ]}
+        ])
+
+        if total_row_match:
+            def _hl(row):
+                try:
+                    if total_row_match(row):
+                        return ['background-color: #BFDBFE; color: #1E3A8A; font-weight: 900' for _ in row]
+                except Exception:
+                    pass
+                return ['' for _ in row]
+            sty = sty.apply(_hl, axis=1)
+
+        if formats:
+            formats = rename_format_keys(formats)
+            sty = sty.format(formats)
+
+        st.dataframe(sty, use_container_width=True, hide_index=hide_index)
+        return
+
+    # If it's already a Styler, just display (best effort)
+    st.dataframe(df, use_container_width=True, hide_index=hide_index)
+
+# --- Positive/Negative Coloring ---
+def color_positive_negative(val):
+    try:
+        v = float(val)
+        color = "#15803D" if v > 0 else "#B91C1C" if v < 0 else ""
+        return f"color: {color}; font-weight: bold"
+    except:
+        return ""
+
+def create_progress_bar_html(percentage):
+    safe_pct = max(0, min(100, percentage))
+    fill_color = "#4CAF50" if safe_pct >= 100 else "#2196F3"
+    html = f"""
+    <div style="background-color: #f0f0f0; border-radius: 5px; height: 10px; margin-top: 5px;">
+        <div style="background-color: {fill_color}; height: 100%; width: {safe_pct}%; border-radius: 5px; text-align: right; font-size: 8px; color: white;">
+        </div>
+    </div>
+    """
+    return html
+
+
+# ================= DAILY EMAIL SUMMARY HELPER =================
+def build_daily_email_summary(
+    total_ka_target,
+    total_sales,
+    salesman_df,
+    customer_sales,
+    retail_sales=0.0,
+    ecom_sales=0.0,
+    days_completed=1,
+    total_working_days=1,
+    two_week_not_visited_df=None
+):
+    import pandas as pd
+    import numpy as np
+
+    total_ka_target = float(total_ka_target or 0)
+    total_sales = float(total_sales or 0)
+    retail_sales = float(retail_sales or 0)
+    ecom_sales = float(ecom_sales or 0)
+    days_completed = max(1, int(days_completed or 1))
+    total_working_days = max(1, int(total_working_days or 1))
+
+    achieved_pct = (total_sales / total_ka_target * 100) if total_ka_target > 0 else 0.0
+    balance = total_ka_target - total_sales
+    remaining_days = max(0, total_working_days - days_completed)
+    required_daily_sales = (balance / remaining_days) if remaining_days > 0 else 0.0
+
+    retail_mix_pct = (retail_sales / total_sales * 100) if total_sales > 0 else 0.0
+    ecom_mix_pct = (ecom_sales / total_sales * 100) if total_sales > 0 else 0.0
+
+    daily_target = (total_ka_target / total_working_days) if total_working_days > 0 else 0.0
+    actual_daily = (total_sales / days_completed) if days_completed > 0 else 0.0
+
+    # ---------- Salesman summary ----------
+    sm = salesman_df.copy() if isinstance(salesman_df, pd.DataFrame) else pd.DataFrame()
+
+    if not sm.empty:
+        for col in ["Target", "Achieved", "Balance"]:
+            if col in sm.columns:
+                sm[col] = pd.to_numeric(sm[col], errors="coerce").fillna(0.0)
+
+        if "Target" in sm.columns and "Achieved" in sm.columns:
+            sm["Ach %"] = np.where(sm["Target"] > 0, (sm["Achieved"] / sm["Target"]) * 100, 0.0)
+        else:
+            sm["Ach %"] = 0.0
+
+        if "Driver Name EN" not in sm.columns:
+            sm["Driver Name EN"] = "Unknown"
+
+        sm_top = sm.sort_values("Achieved", ascending=False).head(3)
+        sm_risk = sm.sort_values("Ach %", ascending=True).head(3)
+
+        top_salesmen_txt = "\n".join([
+            f"- {row.get('Driver Name EN', 'Unknown')}: KD {float(row.get('Achieved', 0)):,.0f} ({float(row.get('Ach %', 0)):.1f}%)"
+            for _, row in sm_top.iterrows()
+        ]) if not sm_top.empty else "No salesman data available."
+
+        risk_salesmen_txt = "\n".join([
+            f"- {row.get('Driver Name EN', 'Unknown')}: KD {float(row.get('Achieved', 0)):,.0f} ({float(row.get('Ach %', 0)):.1f}%)"
+            for _, row in sm_risk.iterrows()
+        ]) if not sm_risk.empty else "No underperformers identified."
+    else:
+        top_salesmen_txt = "No salesman data available."
+        risk_salesmen_txt = "No underperformers identified."
+
+    # ---------- Customer summary ----------
+    if isinstance(customer_sales, pd.Series) and not customer_sales.empty:
+        cust_top = customer_sales.sort_values(ascending=False).head(5)
+        top_customers_txt = "\n".join([
+            f"- {str(name)}: KD {float(val):,.0f}"
+            for name, val in cust_top.items()
+        ])
+        top_customer_name = str(cust_top.index[0])
+    else:
+        top_customers_txt = "No customer data available."
+        top_customer_name = "N/A"
+
+    # ---------- Two-week not visited ----------
+    nv = two_week_not_visited_df.copy() if isinstance(two_week_not_visited_df, pd.DataFrame) else pd.DataFrame()
+    if not nv.empty:
+        nv = nv.head(10).copy()
+        not_visited_txt = "\n".join([
+            f"- {row.get('Customer', 'Unknown')}: last visit {row.get('Last Visit Text', '-')}, {int(row.get('Days Since Visit', 0))} days ago"
+            for _, row in nv.iterrows()
+        ])
+    else:
+        not_visited_txt = "No customers pending visit for more than 2 weeks."
+
+    # ---------- AI Insight ----------
+    ai_lines = []
+
+    if actual_daily >= daily_target:
+        ai_lines.append("Sales pace is above required daily target.")
+    else:
+        ai_lines.append("Sales pace is below required daily target and needs push.")
+
+    if top_customer_name != "N/A":
+        ai_lines.append(f"Top revenue driver is {top_customer_name}.")
+
+    if balance > 0 and remaining_days > 0:
+        ai_lines.append(f"Required daily sales for the rest of the month: KD {required_daily_sales:,.0f}.")
+    elif balance <= 0:
+        ai_lines.append("Target already achieved for the month.")
+
+    if not nv.empty:
+        ai_lines.append(f"{len(nv)} customers have not been visited for more than 2 weeks and need follow-up.")
+
+    ai_insight_txt = "\n".join([f"- {x}" for x in ai_lines])
+
+    subject = (
+        f"Daily Sales Summary | "
+        f"Sales KD {total_sales:,.0f} / Target KD {total_ka_target:,.0f} "
+        f"({achieved_pct:.1f}%)"
+    )
+
+    body = f"""Dear Team,
+
+Executive Summary
+-----------------
+MTD Sales: KD {total_sales:,.0f}
+KA Target: KD {total_ka_target:,.0f}
+Achievement: {achieved_pct:.1f}%
+Balance to Target: KD {balance:,.0f}
+
+Target Gap Calculation
+----------------------
+Remaining Target: KD {balance:,.0f}
+Days Completed: {days_completed}
+Remaining Working Days: {remaining_days}
+Required Daily Sales: KD {required_daily_sales:,.0f}
+
+Retail vs E-Com Mix
+-------------------
+Retail Sales: KD {retail_sales:,.0f} ({retail_mix_pct:.1f}%)
+E-Commerce Sales: KD {ecom_sales:,.0f} ({ecom_mix_pct:.1f}%)
+
+Top Salesmen
+------------
+{top_salesmen_txt}
+
+Attention Required
+------------------
+{risk_salesmen_txt}
+
+Top Customers
+-------------
+{top_customers_txt}
+
+Two Weeks Not Visited Customers
+-------------------------------
+{not_visited_txt}
+
+AI Insights
+-----------
+{ai_insight_txt}
+
+Regards,
+Management Dashboard
+"""
+
+    return subject, body
@@ -0,0 +1,30 @@
+# ================= PAGE DATA CONTEXT =================
+# Everything a page needs from the app shell, built once per rerun in sales.py
+# after login and role filtering. Frames are already restricted to the
+# salesman's rows for salesman users; empty until a workbook is loaded.
+
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+
+@dataclass
+class DataContext:
+    """Shared per-rerun state handed to every page's render(ctx)."""
+
+    lang: str
+    texts: dict
+    username: str | None = None
+    user_role: str | None = None
+    salesman_name: str | None = None
+    data_loaded: bool = False
+    data_version: str | None = None   # upload hash + row scope; memo key for derived results
+    sales_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+    target_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+    ytd_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+    channels_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+    rr_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+    price_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+    extra_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+    cube_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+
@@ -0,0 +1,146 @@
+# ================= CUSTOM ANALYSIS PAGE =================
+
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from app_pages.common import XLSX_MIME, fillna_keep_categories, lazy_download_button, to_excel_bytes
+from app_pages.context import DataContext
+from date_index import date_slice
+from lazy_imports import lazy_module
+
+px = lazy_module("plotly.express")
+
+
+def render(ctx: DataContext):
+    lang, texts, username = ctx.lang, ctx.texts, ctx.username
+
+    st.title(texts[lang]["custom_title"])
+    if "data_loaded" not in st.session_state:
+        st.warning(texts[lang]["no_data_warning"])
+    else:
+        # ✅ Extra sheet is parsed with the rest of the workbook (see load_data)
+        if "Extra_sheet_df" not in st.session_state:
+            st.session_state["Extra_sheet_df"] = pd.DataFrame()
+
+        # Available sheet options
+        sheet_options = {
+            "Sales Data": st.session_state.get("sales_df", pd.DataFrame()),
+            "YTD": st.session_state.get("ytd_df", pd.DataFrame()),
+            "Target": st.session_state.get("target_df", pd.DataFrame()),
+            "Sales Channels": st.session_state.get("channels_df", pd.DataFrame()),
+            "Extra sheet": st.session_state.get("Extra_sheet_df", pd.DataFrame())
+        }
+
+        selected_sheet_name = st.selectbox(texts[lang]["custom_select_sheet"], list(sheet_options.keys()))
+        df = sheet_options[selected_sheet_name]
+
+        if df.empty:
+            st.warning(texts[lang]["custom_sheet_empty"].format(selected_sheet_name))
+        else:
+            st.subheader(texts[lang]["custom_explore"])
+
+            available_cols = list(df.columns)
+            group_cols = st.multiselect(texts[lang]["custom_group_cols"], available_cols)
+            value_col = st.selectbox(texts[lang]["custom_value_col"], available_cols)
+
+            if "Billing Date" in df.columns:
+                st.subheader(texts[lang]["custom_periods_sub"])
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.write(texts[lang]["custom_period1"])
+                    period1_range = st.date_input(
+                        texts[lang]["custom_select_p1"],
+                        [df["Billing Date"].min(), df["Billing Date"].max()],
+                        key="ca_p1_range"
+                    )
+                with col2:
+                    st.write(texts[lang]["custom_period2"])
+                    period2_range = st.date_input(
+                        texts[lang]["custom_select_p2"],
+                        [df["Billing Date"].min(), df["Billing Date"].max()],
+                        key="ca_p2_range"
+                    )
+            else:
+                period1_range = period2_range = None
+                st.info("⚠️ No 'Billing Date' column found. Period comparison disabled.")
+
+            if group_cols and value_col and period1_range and period2_range and len(period1_range) == 2 and len(period2_range) == 2:
+                # --- Period 1 ---
+                p1_start, p1_end = pd.to_datetime(period1_range[0]), pd.to_datetime(period1_range[1])
+                df_p1 = date_slice(df, p1_start, p1_end, ctx.data_version, f"custom:{selected_sheet_name}")
+                summary_p1 = df_p1.groupby(group_cols, observed=True)[value_col].sum().reset_index()
+                summary_p1.rename(columns={value_col: "Period 1"}, inplace=True)
+
+                # --- Period 2 ---
+                p2_start, p2_end = pd.to_datetime(period2_range[0]), pd.to_datetime(period2_range[1])
+                df_p2 = date_slice(df, p2_start, p2_end, ctx.data_version, f"custom:{selected_sheet_name}")
+                summary_p2 = df_p2.groupby(group_cols, observed=True)[value_col].sum().reset_index()
+                summary_p2.rename(columns={value_col: "Period 2"}, inplace=True)
+
+                # --- Merge & Compare ---
+                comparison_df = fillna_keep_categories(pd.merge(summary_p1, summary_p2, on=group_cols, how="outer"), 0)
+                comparison_df["Difference"] = comparison_df["Period 2"] - comparison_df["Period 1"]
+
+                st.subheader(texts[lang]["custom_comparison_sub"].format(value_col, ", ".join(group_cols)))
+                styled_custom = (
+                    comparison_df.style
+                    .set_table_styles([
+                        {'selector': 'th', 'props': [('background', '#1E3A8A'), ('color', 'white'),
+                                                    ('font-weight', '800'), ('height', '40px'),
+                                                    ('line-height', '40px'), ('border', '1px solid #E5E7EB')]}
+                    ])
+                    .format({
+                        "Period 1": "{:,.0f}",
+                        "Period 2": "{:,.0f}",
+                        "Difference": "{:,.0f}"
+                    })
+                )
+                st.dataframe(styled_custom, use_container_width=True, hide_index=True)
+
+                # --- Plotly Chart Fix ---
+                df_plot = comparison_df.sort_values(by="Period 2", ascending=False).copy()
+
+                if len(group_cols) == 1:
+                    df_plot["Group"] = df_plot[group_cols[0]].astype(str)
+                elif len(group_cols) > 1:
+                    df_plot["Group"] = df_plot[group_cols].astype(str).agg(" | ".join, axis=1)
+                else:
+                    df_plot["Group"] = "All Data"
+
+                df_plot_melted = df_plot.melt(
+                    id_vars=["Group"],
+                    value_vars=["Period 1", "Period 2"],
+                    var_name="Period",
+                    value_name="Value"
+                )
+
+                fig = px.bar(
+                    df_plot_melted,
+                    x="Group",
+                    y="Value",
+                    color="Period",
+                    barmode="group",
+                    title=f"Comparison of {value_col} by {', '.join(group_cols) if group_cols else 'All'}",
+                    color_discrete_sequence=px.colors.qualitative.Set2
+                )
+                st.plotly_chart(fig, use_container_width=True)
+
+                # --- Download ---
+                if lazy_download_button(
+                    texts[lang]["custom_download"],
+                    lambda df=comparison_df: to_excel_bytes(df, sheet_name="Custom_Comparison", index=False),
+                    token=(ctx.data_version, selected_sheet_name, tuple(group_cols), value_col,
+                           tuple(period1_range), tuple(period2_range), "custom_comparison"),
+                    file_name=f"Custom_Comparison_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx",
+                    mime=XLSX_MIME
+                ):
+                    st.session_state["audit_log"].append({
+                        "user": username,
+                        "action": "download",
+                        "details": "Custom Comparison Excel",
+                        "timestamp": datetime.now()
+                    })
+            else:
+                st.info(texts[lang]["custom_select_prompt"])
@@ -0,0 +1,656 @@
+# ================= CUSTOMER INSIGHTS PAGE =================
+
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from app_pages.common import XLSX_MIME, lazy_download_button, to_excel_bytes
+from app_pages.context import DataContext
+from date_index import date_slice
+from lazy_imports import lazy_module
+
+px = lazy_module("plotly.express")
+
+
+def render(ctx: DataContext):
+    lang, texts, username = ctx.lang, ctx.texts, ctx.username
+
+    st.title(texts[lang]["customer_insights_title"])
+
+    # Pre-checks
+    if "data_loaded" not in st.session_state:
+        st.warning(texts[lang]["no_data_warning"])
+        st.stop()
+
+    # ctx.sales_df is already restricted to the salesman's partition for salesman users
+    df_rfm = ctx.sales_df.copy()
+    if df_rfm.empty:
+        st.warning(texts[lang]["rfm_no_data"])
+        st.stop()
+
+    # Detect columns robustly
+    def find_col(df, candidates):
+        for n in candidates:
+            if n in df.columns:
+                return n
+        for c in df.columns:
+            lc = c.lower()
+            for n in candidates:
+                if n.lower() in lc:
+                    return c
+        return None
+
+    cust_col = find_col(df_rfm, ["SP Name1", "SP Name 1", "SP_Name1", "Customer", "PY Name1", "PY Name 1"])
+    date_col = find_col(df_rfm, ["Billing Date", "billing date", "Date"])
+    amount_col = find_col(df_rfm, ["Net Value", "NetAmount", "Net Amount", "Amount", "Sales Amount"])
+    material_col = find_col(df_rfm, ["Material Description", "Item", "Product", "Material"])
+
+    if None in [cust_col, date_col, amount_col]:
+        st.warning(texts[lang]["rfm_no_data"])
+        st.stop()
+
+    # Normalize date col
+    df_rfm[date_col] = pd.to_datetime(df_rfm[date_col], errors="coerce")
+    today = pd.Timestamp.today().normalize()
+
+    # --- Fixed robust RFM aggregation ---
+    rfm_group = df_rfm.groupby(cust_col, observed=True)
+
+    rfm_agg = pd.DataFrame({
+        "Customer": rfm_group.apply(lambda g: g.name),
+        "Recency": rfm_group[date_col].max().apply(lambda d: (today - d).days),
+        "Frequency": rfm_group[date_col].count(),
+        "Monetary": rfm_group[amount_col].sum()
+    }).reset_index(drop=True)
+
+    rfm_agg = rfm_agg[rfm_agg["Monetary"] > 0].set_index("Customer")
+
+    if rfm_agg.empty:
+        st.warning(texts[lang]["rfm_no_data"])
+        st.stop()
+
+    # Safe qcut as before
+    def safe_qcut(series, q=4, reverse=False):
+        s = series.copy().fillna(series.max() + 1)
+        unique_vals = pd.unique(s)
+        n_unique = len(unique_vals)
+        if n_unique == 1:
+            return pd.Series([1]*len(s), index=s.index)
+        if n_unique < q:
+            ranks = s.rank(method='dense', ascending=not reverse)
+            return ranks.astype(int)
+        labels = list(range(q, 0, -1)) if reverse else list(range(1, q+1))
+        try:
+            return pd.qcut(s, q=q, labels=labels, duplicates='drop')
+        except Exception:
+            ranks = s.rank(method='dense', ascending=not reverse)
+            return ranks.astype(int)
+
+    rfm_agg["R_Score"] = safe_qcut(rfm_agg["Recency"], q=4, reverse=True).astype(int)
+    rfm_agg["F_Score"] = safe_qcut(rfm_agg["Frequency"], q=4).astype(int)
+    rfm_agg["M_Score"] = safe_qcut(rfm_agg["Monetary"], q=4).astype(int)
+    rfm_agg["RFM_Score"] = rfm_agg["R_Score"].astype(str) + rfm_agg["F_Score"].astype(str) + rfm_agg["M_Score"].astype(str)
+
+    # Segmentation
+    def rfm_segment(row):
+        if row["RFM_Score"] in ["444", "443", "434", "433"]:
+            return "Champions"
+        if row["R_Score"] >= 3 and row["F_Score"] >= 3:
+            return "Loyal Customers"
+        if row["R_Score"] >= 3 and row["M_Score"] >= 3:
+            return "Potential Loyalists"
+        if row["R_Score"] >= 3:
+            return "New Customers"
+        if row["R_Score"] <= 2 and row["F_Score"] >= 2 and row["M_Score"] >= 2:
+            return "At Risk"
+        if row["R_Score"] <= 1 and row["F_Score"] >= 2 and row["M_Score"] >= 2:
+            return "Hibernating"
+        return "Others"
+
+    rfm_agg["Segment"] = rfm_agg.apply(rfm_segment, axis=1)
+
+    # --- Layout Tabs: RFM, Cohort, Weekly CRM ---
+    tab_weekly, tab_360 = st.tabs([
+    # texts[lang]["rfm_analysis_sub"], 
+    # texts[lang]["rfm_cohort_sub"], 
+    "CRM & Weekly Operations",
+    "Customer 360°"  # ← NEW TAB
+])
+
+    # # ---------------- RFM Tab ----------------
+    # with tab_rfm:
+    #     st.subheader(texts[lang]["rfm_table_sub"])
+    #     display_rfm = rfm_agg.copy()
+    #     display_rfm[["Recency","Frequency","Monetary"]] = display_rfm[["Recency","Frequency","Monetary"]].astype(int)
+    #     st.dataframe(display_rfm.sort_values("Monetary", ascending=False), use_container_width=True, hide_index=True)
+
+    #     # Download with safe sheet name
+    #     ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    #     safe_sheet = "RFM_Analysis"[:31]
+    #     if st.download_button(
+    #         texts[lang]["rfm_download"],
+    #         data=to_excel_bytes(display_rfm.reset_index(), sheet_name=safe_sheet),
+    #         file_name=f"rfm_analysis_{ts}.xlsx"
+    #     ):
+    #         st.session_state["audit_log"].append({"user": username, "action":"download","details":f"rfm_analysis_{ts}.xlsx","timestamp":datetime.now().isoformat()})
+
+    #     # Segment Pie + metrics
+    #     st.subheader("RFM Segment Distribution")
+    #     seg_counts = display_rfm["Segment"].value_counts().reset_index()
+    #     seg_counts.columns = ["Segment", "Count"]
+    #     seg_counts["Percentage"] = (seg_counts["Count"]/seg_counts["Count"].sum()*100).round(1)
+    #     seg_avg = display_rfm.groupby("Segment")["Monetary"].mean().round(2).reset_index().rename(columns={"Monetary":"Avg Monetary"})
+    #     seg_counts = seg_counts.merge(seg_avg, on="Segment", how="left")
+    #     fig_seg = px.pie(seg_counts, names="Segment", values="Count", hole=0.35, hover_data=["Percentage","Avg Monetary"], title="RFM Segment Distribution")
+    #     fig_seg.update_traces(textinfo='percent+label')
+    #     st.plotly_chart(fig_seg, use_container_width=True)
+
+    #     st.subheader("Key Metrics per Segment")
+    #     seg_metrics = display_rfm.groupby("Segment").agg(
+    #         mean_recency=("Recency","mean"),
+    #         mean_frequency=("Frequency","mean"),
+    #         mean_monetary=("Monetary","mean"),
+    #         count=("R_Score","count")
+    #     ).round(2).rename(columns={"count":"Count"})
+    #     st.dataframe(seg_metrics, use_container_width=True, hide_index=True)
+
+    #     st.subheader("Prescriptive Actions per Segment")
+    #     recs = {
+    #         "Champions":"Reward with exclusive offers & loyalty programs.",
+    #         "Loyal Customers":"Upsell & referrals.",
+    #         "Potential Loyalists":"Nurture with targeted campaigns.",
+    #         "New Customers":"Onboard & incentivize repeat purchase.",
+    #         "At Risk":"Win-back campaigns and surveys.",
+    #         "Hibernating":"Reactivate with promotions.",
+    #         "Others":"Investigate further."
+    #     }
+    #     for s in seg_metrics.index:
+    #         st.write(f"- **{s}**: {recs.get(s,'General engagement strategies recommended.')}")
+
+    #     st.subheader(texts[lang]["rfm_chart_sub"])
+    #     fig_rfm = px.scatter(display_rfm.reset_index(), x="Recency", y="Monetary", size="Frequency", color="Segment",
+    #                          hover_name=display_rfm.reset_index()["Customer"], title="RFM Scatter (Recency vs Monetary; size=Frequency)")
+    #     st.plotly_chart(fig_rfm, use_container_width=True)
+
+    # # ---------------- Cohort Tab (Fixed) ----------------
+    # with tab_cohort:
+    #     st.subheader(texts[lang]["rfm_cohort_sub"])
+    #     st.info(texts[lang]["rfm_cohort_info"])
+
+    #     df_cohort = df_rfm[[cust_col, date_col, amount_col]].dropna().copy().rename(columns={cust_col:"Customer", date_col:"Billing Date"})
+
+    #     # Convert periods to strings
+    #     df_cohort["Cohort_Month_Str"] = df_cohort.groupby("Customer")["Billing Date"].transform("min").dt.to_period("M").astype(str)
+    #     df_cohort["Period_Month_Str"] = df_cohort["Billing Date"].dt.to_period("M").astype(str)
+    #     df_cohort["Cohort_Index"] = (pd.to_datetime(df_cohort["Period_Month_Str"]) - pd.to_datetime(df_cohort["Cohort_Month_Str"])).dt.days // 30
+
+    #     cohort_summary = df_cohort.groupby(["Cohort_Month_Str","Cohort_Index"]).agg(
+    #         Customer=("Customer","nunique"),
+    #         Monetary=(amount_col,"mean")
+    #     ).reset_index()
+
+    #     if not cohort_summary.empty:
+    #         cohort_pivot = cohort_summary.pivot(index="Cohort_Month_Str", columns="Cohort_Index", values="Monetary").fillna(0)
+    #         fig_cohort = px.imshow(cohort_pivot, labels=dict(x="Months after acquisition", y="Cohort", color="Avg Monetary"),
+    #                                title="Cohort Monetary Heatmap", text_auto=True, aspect="auto")
+    #         st.plotly_chart(fig_cohort, use_container_width=True)
+
+    #         st.subheader(texts[lang]["rfm_cohort_table_sub"])
+    #         cohort_table = cohort_summary.pivot(index="Cohort_Month_Str", columns="Cohort_Index", values="Customer").fillna(0).astype(int)
+    #         st.dataframe(cohort_table, use_container_width=True, hide_index=True)
+    #     else:
+    #         st.warning(texts[lang]["rfm_cohort_no_data"])
+
+    # ---------------- CRM & Weekly Operations Tab ----------------
+    with tab_weekly:
+        st.subheader("CRM Operations — Weekly Tracker, Products & Manager Dashboard")
+
+        # Date selector
+        col_left, col_right = st.columns([3,1])
+        with col_left:
+            auto_date = st.toggle("Use current date automatically", value=True)
+            selected_date = datetime.now().date() if auto_date else st.date_input("Select visit date manually", datetime.now().date())
+            st.session_state["visit_date"] = selected_date
+
+        with col_right:
+            show_manager = st.checkbox("Show Manager KPIs", value=True)
+            st.button("🔄 Refresh")  # triggers rerun
+
+        # Prepare commonly used variables
+        ytd_df = st.session_state.get("ytd_df", pd.DataFrame())
+        sales_df = st.session_state.get("sales_df", pd.DataFrame()).copy()
+
+        # Ensure date cols (the loaded YTD is already parsed and date-sorted: no copy)
+        if date_col in ytd_df.columns and not pd.api.types.is_datetime64_any_dtype(ytd_df[date_col]):
+            ytd_df = ytd_df.copy()
+            ytd_df[date_col] = pd.to_datetime(ytd_df[date_col], errors="coerce")
+        if date_col in sales_df.columns:
+            sales_df[date_col] = pd.to_datetime(sales_df[date_col], errors="coerce")
+
+        # ---------------- Weekly Visit Tracker (robust) ----------------
+        st.markdown("### Weekly Visit Tracker")
+        last_3_months = pd.Timestamp(selected_date) - pd.DateOffset(months=3)
+        recent_ytd = (
+            date_slice(ytd_df, last_3_months, None, ctx.data_version, "session:ytd", date_col)
+            if not ytd_df.empty and date_col in ytd_df.columns else pd.DataFrame()
+        )
+        customer_list = pd.Series(recent_ytd.get(cust_col, pd.Series()).dropna().unique()).astype(str) if not recent_ytd.empty else pd.Series(sales_df.get(cust_col, pd.Series()).dropna().unique()).astype(str)
+
+        if customer_list.empty:
+            st.info("No customers found in YTD or Sales for the last 3 months.")
+        else:
+            # last 7-day window
+            days_dt = [pd.Timestamp(selected_date) - pd.Timedelta(days=i) for i in range(6, -1, -1)]
+            days_str = [d.strftime("%Y-%m-%d") for d in days_dt]
+            sales_window_start = days_dt[0]
+            sales_window_end = pd.Timestamp(selected_date) + pd.Timedelta(days=1)
+
+            sales_last7 = sales_df[(sales_df[date_col] >= sales_window_start) & (sales_df[date_col] < sales_window_end)].copy()
+            sales_last7[cust_col] = sales_last7[cust_col].astype(str)
+            sales_last7[amount_col] = pd.to_numeric(sales_last7[amount_col], errors="coerce").fillna(0.0)
+            sales_last7["__date_str"] = sales_last7[date_col].dt.strftime("%Y-%m-%d")
+
+            pivot7 = (sales_last7.groupby([cust_col, "__date_str"], observed=True)[amount_col].sum().reset_index()
+                      .pivot(index=cust_col, columns="__date_str", values=amount_col).reindex(columns=days_str, fill_value=0.0).reset_index())
+            pivot7 = pivot7.rename(columns={cust_col: "Customer"})
+            base = pd.DataFrame({"Customer": customer_list})
+            visit_df = base.merge(pivot7, on="Customer", how="left").fillna(0.0)
+            visit_df.insert(1, "Visit Date", selected_date)
+
+            existing_days = [c for c in days_str if c in visit_df.columns]
+            visit_df["Weekly Total"] = visit_df[existing_days].sum(axis=1) if existing_days else 0
+
+            # 4-week totals
+            end_date = pd.Timestamp(selected_date)
+            start_date = end_date - pd.Timedelta(weeks=4)
+            recent_sales = sales_df[(sales_df[date_col] >= start_date) & (sales_df[date_col] <= end_date)].copy()
+            recent_sales[cust_col] = recent_sales[cust_col].astype(str)
+            recent_sales[amount_col] = pd.to_numeric(recent_sales[amount_col], errors="coerce").fillna(0.0)
+            recent_sales["Week_Number"] = ((recent_sales[date_col] - start_date).dt.days // 7) + 1
+            recent_sales.loc[recent_sales["Week_Number"] > 4, "Week_Number"] = 4
+            week_totals = (recent_sales.groupby([cust_col, "Week_Number"], observed=True)[amount_col].sum().unstack(fill_value=0).reset_index().rename(columns={cust_col:"Customer"}))
+            week_cols = [c for c in week_totals.columns if c != "Customer"]
+            if not week_cols:
+                for i in range(1,5):
+                    week_totals[i] = 0
+                week_cols = [1,2,3,4]
+            ordered_week_cols = sorted(week_cols, key=lambda x:int(x))
+            week_totals = week_totals[["Customer"] + ordered_week_cols]
+            week_headers = []
+            for i in range(len(ordered_week_cols)):
+                wstart = (start_date + pd.Timedelta(days=i*7)).strftime("%b %d")
+                wend = (start_date + pd.Timedelta(days=(i+1)*7-1)).strftime("%b %d")
+                week_headers.append(f"Week {i+1} ({wstart}-{wend})")
+            new_cols = ["Customer"] + week_headers
+            if len(new_cols) != len(week_totals.columns):
+                new_cols = ["Customer"] + [f"Week {i+1}" for i in range(len(week_totals.columns)-1)]
+            week_totals.columns = new_cols
+            visit_df = visit_df.merge(week_totals, on="Customer", how="left").fillna(0.0)
+
+            # Total Sales (3 months)
+            total_sales_3m = sales_df[sales_df[date_col] >= last_3_months].groupby(cust_col, observed=True)[amount_col].sum().reset_index().rename(columns={cust_col:"Customer", amount_col:"Total Sales"})
+            visit_df = visit_df.merge(total_sales_3m, on="Customer", how="left").fillna(0.0)
+
+            # Alerts & recommended action
+            def compute_alert(row):
+                q80 = visit_df["Total Sales"].quantile(0.8) if "Total Sales" in visit_df.columns else 0
+                q50 = visit_df["Total Sales"].quantile(0.5) if "Total Sales" in visit_df.columns else 0
+                if row.get("Weekly Total",0) == 0:
+                    if row.get("Total Sales",0) >= q80:
+                        return "🔴 High", "Visit immediately"
+                    if row.get("Total Sales",0) >= q50:
+                        return "🟠 Medium", "Call / Email"
+                    return "🟢 Low", "Monitor"
+                return "✅ Visited", "No action"
+            visit_df[["Alert Level","Recommended Action"]] = visit_df.apply(lambda r: pd.Series(compute_alert(r)), axis=1)
+
+            # numeric formatting
+            numeric_cols = [c for c in existing_days + ["Weekly Total","Total Sales"] + week_headers if c in visit_df.columns]
+            if numeric_cols:
+                visit_df[numeric_cols] = visit_df[numeric_cols].fillna(0).round(0).astype(int)
+
+            # show table
+            with st.expander("Show Weekly Visit Table", expanded=True):
+                st.dataframe(visit_df.sort_values(["Total Sales","Weekly Total"], ascending=[False,False]), use_container_width=True, hide_index=True)
+
+            # manager KPIs
+            if show_manager:
+                st.markdown("### Manager Dashboard")
+                col1, col2, col3, col4 = st.columns(4)
+                last7_revenue = sales_last7[amount_col].sum() if not sales_last7.empty else 0
+                col1.metric("Revenue (Last 7 days)", f"KD {last7_revenue:,.0f}")
+                col2.metric("Customers Visited (7d)", int((visit_df["Weekly Total"]>0).sum()))
+                col3.metric("High-Value Missed", int((visit_df["Alert Level"]=="🔴 High").sum()))
+                col4.metric("Avg Weekly Sales per Customer", f"KD {visit_df['Weekly Total'].mean():,.0f}")
+
+                top_missed = visit_df[visit_df["Alert Level"]=="🔴 High"].sort_values("Total Sales", ascending=False).head(10)
+                if not top_missed.empty:
+                    st.subheader("Top High-Value Missed Customers")
+                    st.bar_chart(top_missed.set_index("Customer")["Total Sales"])
+
+            # Save Visit as record (mini CRM)
+            st.markdown("### Visit Planner / Notes")
+            planner_customer = st.selectbox("Select Customer to plan visit", options=sorted(visit_df["Customer"].astype(str).unique()))
+            note = st.text_area("Note / Follow-up", key=f"note_{planner_customer}")
+            next_visit = st.date_input("Next Visit Date", value=(pd.Timestamp(selected_date)+pd.Timedelta(days=7)).date(), key=f"nextvisit_{planner_customer}")
+            if st.button("💾 Save Visit Plan"):
+                if "visit_plans" not in st.session_state:
+                    st.session_state["visit_plans"] = []
+                st.session_state["visit_plans"].append({
+                    "Customer": planner_customer,
+                    "Next Visit": next_visit.isoformat() if hasattr(next_visit, "isoformat") else str(next_visit),
+                    "Note": note,
+                    "Created By": username,
+                    "Created At": datetime.now().isoformat()
+                })
+                st.success(f"Saved visit plan for {planner_customer}")
+
+            if "visit_plans" in st.session_state and st.session_state["visit_plans"]:
+                st.subheader("Saved Visit Plans")
+                st.dataframe(pd.DataFrame(st.session_state["visit_plans"]), use_container_width=True, hide_index=True)
+                # Download visit plans
+                safe_file_name = f"visit_plans_{selected_date}.csv"
+                st.download_button("⬇️ Download Visit Plans", data=pd.DataFrame(st.session_state["visit_plans"]).to_csv(index=False).encode('utf-8'), file_name=safe_file_name, mime="text/csv")
+
+        # ---------------- 15-Day Product Analysis ----------------
+        st.markdown("### Customer Product Activity (Last 15 Days)")
+        product_start_date = pd.Timestamp(selected_date) - pd.Timedelta(days=15)
+        prod_sales = sales_df[(sales_df[date_col] >= product_start_date) & (sales_df[date_col] <= pd.Timestamp(selected_date))].copy()
+
+        if prod_sales.empty or material_col is None:
+            st.info("No product-sales data available for the last 15 days.")
+        else:
+            prod_sales[cust_col] = prod_sales[cust_col].astype(str)
+            prod_sales[amount_col] = pd.to_numeric(prod_sales[amount_col], errors="coerce").fillna(0.0)
+            all_products = sorted(sales_df[material_col].dropna().unique())
+
+            prod_summary = prod_sales.groupby([cust_col, material_col], observed=True)[amount_col].sum().reset_index().rename(columns={cust_col:"Customer", material_col:"Product", amount_col:"Sales Amount"})
+            customers_prod = sorted(prod_summary["Customer"].unique())
+
+            if customers_prod:
+                sel_cust = st.selectbox("Select a Customer to inspect products", options=customers_prod)
+                sold_by_cust = prod_summary[prod_summary["Customer"]==sel_cust].sort_values("Sales Amount", ascending=False)
+                sold_set = set(sold_by_cust["Product"].dropna())
+                not_sold = [p for p in all_products if p not in sold_set]
+                df_not_sold = pd.DataFrame({"Product": not_sold, "Status":"❌ Not Purchased"})
+
+                with st.expander(f"{sel_cust} - Purchased (Last 15 Days)", expanded=True):
+                    if not sold_by_cust.empty:
+                        st.dataframe(sold_by_cust, use_container_width=True, hide_index=True)
+                    else:
+                        st.info("No purchases by this customer in last 15 days.")
+
+
+                with st.expander(f"{sel_cust} - Not Purchased (Last 15 Days)", expanded=False):
+                    if not df_not_sold.empty:
+                        st.dataframe(df_not_sold, use_container_width=True, hide_index=True)
+                    else:
+                        st.info("All products purchased!")
+
+
+                # Safe sheet name
+                safe_sheet_name = (sel_cust+"_Purchased")[:31]
+                if lazy_download_button(f"⬇️ Download {sel_cust} Purchased (15d)",
+                                        lambda df=sold_by_cust, sn=safe_sheet_name: to_excel_bytes(df, sheet_name=sn),
+                                        token=(ctx.data_version, sel_cust, selected_date, "purchased_15d"),
+                                        file_name=f"{sel_cust}_purchased_15days_{selected_date}.xlsx", mime=XLSX_MIME):
+                    st.success("Download ready!")
+
+    # ──────────────────────── TAB 4: Customer 360° (FIXED) ────────────────────────
+    with tab_360:
+        st.markdown("### **Customer 360° – One-Click Profile**")
+        
+        # === 1. COLUMN DETECTION (Safe & Reusable) ===
+        def find_col(df, candidates):
+            for c in candidates:
+                if c in df.columns:
+                    return c
+            return None
+
+        cust_col = find_col(df_rfm, ["SP Name1", "SP Name 1", "Customer", "PY Name 1", "Customer Name"])
+        date_col = find_col(df_rfm, ["Billing Date", "Date", "Invoice Date"])
+        amount_col = find_col(df_rfm, ["Net Value", "Amount", "Sales"])
+        driver_col = find_col(df_rfm, ["Driver Name EN", "Salesman", "Driver", "Rep"])
+        material_col = find_col(df_rfm, ["Material", "Material Description", "Item", "SKU"])
+
+        if not all([cust_col, date_col, amount_col]):
+            st.error("Missing required columns. Check your Excel file.")
+            st.stop()
+
+        # === 2. CUSTOMER SELECTOR ===
+        all_customers = sorted(df_rfm[cust_col].dropna().unique())
+        selected_cust = st.selectbox("**Select Customer**", all_customers, key="cust360_select")
+
+        # === 3. FILTER DATA ===
+        cust_sales = df_rfm[df_rfm[cust_col] == selected_cust].copy()
+        cust_sales[date_col] = pd.to_datetime(cust_sales[date_col], errors='coerce')
+        cust_sales = cust_sales.dropna(subset=[date_col])  # Remove invalid dates
+        today = pd.Timestamp.today()
+
+        if cust_sales.empty:
+            st.warning(f"No sales data for **{selected_cust}**")
+        else:
+            # ========================================
+            # KPI CARDS – CUSTOMER 360°
+            # ========================================
+            col1, col2, col3, col4 = st.columns(4)
+            
+            # --- 1. ENSURE amount_col is numeric ---
+            cust_sales[amount_col] = pd.to_numeric(cust_sales[amount_col], errors='coerce').fillna(0)
+
+            # --- 2. NORMALIZE Billing Type ---
+            if "Billing Type" in cust_sales.columns:
+                cust_sales["Billing Type"] = cust_sales["Billing Type"].astype(str).str.strip().str.upper()
+
+            # --- 3. TOTAL SALES & ORDERS ---
+            total_sales = cust_sales[amount_col].sum()
+            order_count = len(cust_sales)
+            last_visit = cust_sales[date_col].max()
+            days_since = (today - last_visit).days if pd.notna(last_visit) else 999
+
+            # --- 4. RETURNS ONLY (YKRE, ZRE) – CANCELLATIONS EXCLUDED ---
+            return_codes = ["YKRE", "ZRE"]  # Only Returns
+            if "Billing Type" in cust_sales.columns:
+                returns_mask = cust_sales["Billing Type"].isin(return_codes)
+            else:
+                returns_mask = cust_sales[date_col].notna() & False  # no returns if column missing
+            returns_df = cust_sales[returns_mask]
+
+            # --- 5. RETURN VALUE = ABSOLUTE SUM (handles negative values) ---
+            returns_value = returns_df[amount_col].abs().sum()
+            return_rate = (returns_value / total_sales * 100) if total_sales > 0 else 0
+
+            # === KPI CARD 1: Total Sales ===
+            col1.metric(
+                label="**Total Sales**",
+                value=f"KD {total_sales:,.0f}",
+                delta=None
+            )
+
+            # === KPI CARD 2: Orders ===
+            col2.metric(
+                label="**Orders**",
+                value=f"{order_count:,}",
+                delta=None
+            )
+
+            # === KPI CARD 3: Last Visit ===
+            if pd.notna(last_visit):
+                col3.metric(
+                    label="**Last Visit**",
+                    value=last_visit.strftime("%b %d, %Y"),
+                    delta=f"{days_since} days ago" if days_since <= 365 else "Over 1 year",
+                    delta_color="inverse" if days_since > 30 else "normal"
+                )
+            else:
+                col3.metric(
+                    label="**Last Visit**",
+                    value="Never",
+                    delta="No data"
+                )
+
+            # === KPI CARD 4: Return Rate + Value (COMBINED) ===
+            if returns_value > 0:
+                col4.metric(
+                    label="**Return Rate**",
+                    value=f"{return_rate:.2f}%",
+                    delta=f"KD {returns_value:,.0f} returned",
+                    delta_color="inverse"  # Red = high return
+                )
+            else:
+                col4.metric(
+                    label="**Return Rate**",
+                    value="0.00%",
+                    delta="No returns",
+                    delta_color="normal"  # Green = good
+                )
+            
+            # === MINI TABS ===
+            mini_tab1, mini_tab2, mini_tab3, mini_tab4, mini_tab5 = st.tabs([
+                "Sales Trend", "RFM", "Visits", "Issues", "Actions"
+            ])
+
+            # ───────── Mini Tab 1: Sales Trend ─────────
+            with mini_tab1:
+                daily = cust_sales.groupby(cust_sales[date_col].dt.date, observed=True)[amount_col].sum().reset_index()
+                daily.columns = ["Date", "Sales"]
+                fig = px.line(daily, x="Date", y="Sales", title="Sales Trend", markers=True)
+                fig.update_layout(height=300)
+                st.plotly_chart(fig, use_container_width=True)
+
+            # ───────── Mini Tab 2: RFM ─────────
+            with mini_tab2:
+                if selected_cust in rfm_agg.index:
+                    r = rfm_agg.loc[selected_cust]
+                    c1, c2, c3 = st.columns(3)
+                    c1.metric("**Recency**", f"{int(r['Recency'])} days")
+                    c2.metric("**Frequency**", f"{int(r['Frequency'])}")
+                    c3.metric("**Monetary**", f"KD {r['Monetary']:,.0f}")
+                    st.success(f"**Segment:** {r['Segment']}")
+                else:
+                    st.info("RFM not calculated yet")
+
+            # ───────── Mini Tab 3: Visits ─────────
+            with mini_tab3:
+                if driver_col and driver_col in cust_sales.columns:
+                    visits = cust_sales[[date_col, driver_col]].drop_duplicates()
+                    visits = visits.sort_values(date_col, ascending=False).head(20)
+                    visits["Date"] = visits[date_col].dt.strftime("%Y-%m-%d")
+                    visits["Salesman"] = visits[driver_col]
+                    st.dataframe(visits[["Date", "Salesman"]], use_container_width=True, hide_index=True)
+                else:
+                    st.info("No salesman data available")
+
+                        # ───────── Mini Tab 4: Issues (Returns + Material Details) ─────────
+                        # ───────── Mini Tab 4: Issues (Returns + Material Details) ─────────
+            with mini_tab4:
+                issues = cust_sales[returns_mask]
+
+                if not issues.empty:
+                    # Main returns summary by invoice/date
+                    st.error(f"**Returns: KD {returns_value:,.0f} ({return_rate:.2f}%)**")
+                    st.dataframe(
+                        issues[[date_col, "Billing Type", amount_col]].rename(
+                            columns={date_col: "Billing Date", amount_col: "Return Value"}
+                        ),
+                        use_container_width=True
+                    , hide_index=True)
+
+                    # ---- Return Material Details table ----
+                    st.markdown("#### Return Material Details")
+
+                    # Prefer Material Description-like columns first
+                    desc_candidates = [
+                        "Material Description",
+                        "Material Desc",
+                        "Material Description EN",
+                        "Material Description AR",
+                        "MAT Description",
+                    ]
+                    desc_col = None
+                    for c in desc_candidates:
+                        if c in issues.columns:
+                            desc_col = c
+                            break
+
+                    # Fallback: if no description column, use material_col (code)
+                    if not desc_col and material_col and material_col in issues.columns:
+                        desc_col = material_col
+
+                    if desc_col:
+                        issues_mat = issues.copy()
+                        issues_mat[amount_col] = (
+                            pd.to_numeric(issues_mat[amount_col], errors="coerce")
+                            .fillna(0.0)
+                            .abs()
+                        )
+
+                        # Group by the chosen description column
+                        mat_summary = (
+                            issues_mat
+                            .groupby(desc_col, observed=True)[amount_col]
+                            .sum()
+                            .reset_index()
+                            .rename(columns={desc_col: "Material Description", amount_col: "Return Value"})
+                            .sort_values("Return Value", ascending=False)
+                        )
+
+                        # Add Total row at end
+                        total_val = mat_summary["Return Value"].sum()
+                        total_row = {
+                            "Material Description": "Total",
+                            "Return Value": total_val
+                        }
+                        mat_summary = pd.concat(
+                            [mat_summary, pd.DataFrame([total_row])],
+                            ignore_index=True
+                        )
+
+                        st.dataframe(mat_summary, use_container_width=True, hide_index=True)
+                    else:
+                        st.info("No material description column found for returns.")
+                else:
+                    st.success("**No Returns – Perfect!**")
+
+            # ───────── Mini Tab 5: Actions ─────────
+            with mini_tab5:
+                st.markdown("#### **Smart Actions**")
+                actions = []
+                if days_since > 30:
+                    actions.append("**URGENT:** Schedule visit TODAY")
+                if return_rate > 10:
+                    actions.append("Call about quality issues")
+                if total_sales > 5000:
+                    actions.append("Offer premium products")
+                if order_count > 15:
+                    actions.append("Send loyalty reward")
+
+                for a in actions:
+                    st.markdown(f"• {a}")
+
+                note_key = f"note_{selected_cust}"
+                note = st.text_area("**Add Note**", value=st.session_state.get(note_key, ""), height=80)
+                if st.button("**Save Note**", type="primary"):
+                    st.session_state[note_key] = note
+                    st.success("Note saved!")
+
+                # Download Profile
+                profile = pd.DataFrame({
+                    "Metric": ["Customer", "Total Sales", "Orders", "Last Visit", "Days Since", "Return Rate %", "Note"],
+                    "Value": [
+                        selected_cust,
+                        total_sales,
+                        order_count,
+                        last_visit.strftime("%Y-%m-%d") if pd.notna(last_visit) else "N/A",
+                        days_since,
+                        return_rate,
+                        note
+                    ]
+                })
+                lazy_download_button(
+                    "**Download Profile (Excel)**",
+                    lambda df=profile: to_excel_bytes(df),
+                    file_name=f"{selected_cust.replace(' ', '_')}_360.xlsx",
+                    mime=XLSX_MIME
+                )
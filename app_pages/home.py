@@ -0,0 +1,18 @@
+# ================= HOME PAGE =================
+
+import streamlit as st
+
+from app_pages.context import DataContext
+
+
+def render(ctx: DataContext):
+    lang, texts = ctx.lang, ctx.texts
+
+    st.title(texts[lang]["home_title"])
+    with st.container():
+        st.markdown(
+            texts[lang]["home_welcome"],
+            unsafe_allow_html=True
+        )
+    if "data_loaded" in st.session_state: st.success(texts[lang]["data_loaded_msg"])
+    else: st.info(texts[lang]["upload_prompt"])
@@ -0,0 +1,871 @@
+# ================= PROFIT & MARGIN PAGE =================
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from app_pages.common import XLSX_MIME, lazy_download_button, to_excel_bytes
+from app_pages.context import DataContext
+from costing import get_price_index, line_cost
+
+
+def render(ctx: DataContext):
+
+    st.title("💰 Profit & Margin Analysis")
+
+    # ─── Helper: fuzzy column finder ──────────────────────────────────────
+    def find_column(df, possible_names):
+        if df.empty:
+            return None
+        possible = [str(n).lower().replace(" ", "").replace("_", "") for n in possible_names]
+        for col in df.columns:
+            clean = str(col).lower().replace(" ", "").replace("_", "")
+            if clean in possible or any(p in clean for p in possible):
+                return col
+        return None
+
+    def fmt_num(v):
+        try:
+            return f"{float(v):,.0f}"
+        except Exception:
+            return "0"
+
+    def fmt_pct(v):
+        try:
+            return f"{float(v):.0f}%"
+        except Exception:
+            return "0%"
+
+    def format_df_decimals(df, num_cols=None, pct_cols=None, decimals=0):
+        """
+        Format dataframe as strings without Pandas Styler.
+        decimals can be 0 / 2 / 3
+        """
+        out = df.copy()
+        num_cols = num_cols or []
+        pct_cols = pct_cols or []
+
+        num_fmt = f"{{:,.{decimals}f}}"
+        pct_fmt = f"{{:.{decimals}f}}%"
+
+        for c in num_cols:
+            if c in out.columns:
+                out[c] = pd.to_numeric(out[c], errors="coerce").map(
+                    lambda x: num_fmt.format(x) if pd.notna(x) else ""
+                )
+
+        for c in pct_cols:
+            if c in out.columns:
+                out[c] = pd.to_numeric(out[c], errors="coerce").map(
+                    lambda x: pct_fmt.format(x) if pd.notna(x) else ""
+                )
+
+        return out
+
+    # ─── Price list status ─────────────────────────────────────────────────
+    price_df = st.session_state.get("price_df", pd.DataFrame())
+    if price_df.empty:
+        st.info("Price list sheet ('price list') not found → cost & discount will show as missing.")
+    else:
+        st.success(f"Price list loaded ({len(price_df):,} rows)")
+        with st.expander("Price List Preview (first 8 rows)", expanded=False):
+            st.dataframe(price_df.head(8), use_container_width=True, hide_index=True)
+
+    # ─── Data source selection ─────────────────────────────────────────────
+    data_source = st.radio(
+        "Analyze which data?",
+        ["Current Month only (sales data sheet)", "Full Year / Historical (YTD sheet)"],
+        index=0
+    )
+
+    if data_source == "Current Month only (sales data sheet)":
+        if "sales_df" not in st.session_state or st.session_state["sales_df"].empty:
+            st.warning("No current month sales data loaded.")
+            st.stop()
+        base_df = st.session_state["sales_df"].copy()
+    else:
+        if "ytd_df" not in st.session_state or st.session_state["ytd_df"].empty:
+            st.warning("No YTD data → falling back to current month sales.")
+            if "sales_df" not in st.session_state or st.session_state["sales_df"].empty:
+                st.stop()
+            base_df = st.session_state["sales_df"].copy()
+        else:
+            base_df = st.session_state["ytd_df"].copy()
+
+    # ─── Column discovery ──────────────────────────────────────────────────
+    MATERIAL_COL = find_column(base_df, ["Material Description", "Mat Description", "Description", "Item Description"])
+    QTY_COL      = find_column(base_df, ["Quantity", "Qty", "Sales Qty"])
+    UOM_COL      = find_column(base_df, ["UOM", "Unit of Measure", "Unit"])
+    NET_COL      = find_column(base_df, ["Net Value", "Net Amount", "Net Sales", "Amount"])
+    DATE_COL     = find_column(base_df, ["Billing Date", "Date"])
+    CUSTOMER_COL = find_column(base_df, ["PY Name 1", "Customer", "Customer Name"])
+    DRIVER_COL   = find_column(base_df, ["Driver Name EN", "Salesman"])
+
+    PRICE_MAT_COL = find_column(price_df, ["Material Description", "Mat Description", "Description"])
+    COST_COL      = find_column(price_df, ["Cost Price", "Cost", "Unit Cost"])
+    PACK_COL      = find_column(price_df, ["Pack Size", "Pack", "Pack Qty"])
+    CATEGORY_COL  = find_column(price_df, [
+        "Category", "Item Category", "Sales Category", "Material Category",
+        "Type", "Group", "Product Category", "Exchange Category",
+        "Transaction Type", "Doc Type", "Bill Type", "Sale Type", "Doc Category"
+    ])
+
+    missing = []
+    if MATERIAL_COL is None: missing.append("Material Description (main data)")
+    if QTY_COL      is None: missing.append("Quantity")
+    if NET_COL      is None: missing.append("Net Value / Net Amount")
+    if DATE_COL     is None: missing.append("Billing Date")
+    if not price_df.empty:
+        if PRICE_MAT_COL is None: missing.append("Material Description (price list)")
+        if COST_COL      is None: missing.append("Cost Price")
+
+    if missing:
+        st.error("Cannot calculate Profit & Margin — missing critical columns:\n• " + "\n• ".join(missing))
+        st.stop()
+
+    # ─── Date range filter ─────────────────────────────────────────────────
+    base_df[DATE_COL] = pd.to_datetime(base_df[DATE_COL], errors="coerce")
+    base_df = base_df.dropna(subset=[DATE_COL])
+
+    col1, col2 = st.columns(2)
+    with col1:
+        min_date = base_df[DATE_COL].min().date()
+        start_date = st.date_input("Start Date", value=min_date)
+    with col2:
+        max_date = base_df[DATE_COL].max().date()
+        end_date = st.date_input("End Date", value=max_date)
+
+    start_dt = pd.to_datetime(start_date)
+    end_dt   = pd.to_datetime(end_date) + pd.Timedelta(days=1)
+
+    df_pm = base_df[
+        (base_df[DATE_COL] >= start_dt) &
+        (base_df[DATE_COL] < end_dt)
+    ].copy()
+
+    if df_pm.empty:
+        st.warning("No records found in selected date range.")
+        st.stop()
+
+    # ─── Prepare normalized matching ───────────────────────────────────────
+    df_val = df_pm.copy()
+    df_val["_mat_norm"] = df_val[MATERIAL_COL].astype(str).str.strip().str.upper()
+
+    df_val["Cost Price"] = pd.NA
+    df_val["Pack Size"] = pd.NA
+    df_val["Category"] = pd.NA
+
+    if CUSTOMER_COL and CUSTOMER_COL in df_val.columns:
+        df_val["_py_name_norm"] = (
+            df_val[CUSTOMER_COL]
+            .astype(str)
+            .str.strip()
+            .str.upper()
+        )
+    else:
+        df_val["_py_name_norm"] = ""
+
+    # ─── Price list mapping ────────────────────────────────────────────────
+    if not price_df.empty and PRICE_MAT_COL:
+        # Exact match first, fuzzy fallback for unmatched descriptions (cached per price-list version)
+        price_index = get_price_index(price_df, PRICE_MAT_COL)
+        matched = price_index.lookup(df_val[MATERIAL_COL], [COST_COL, PACK_COL, CATEGORY_COL])
+
+        if COST_COL in matched.columns:
+            df_val["Cost Price"] = matched[COST_COL]
+
+        if PACK_COL and PACK_COL in matched.columns:
+            df_val["Pack Size"] = matched[PACK_COL]
+
+        if CATEGORY_COL and CATEGORY_COL in matched.columns:
+            df_val["Category"] = matched[CATEGORY_COL]
+
+    df_val["Category"] = df_val["Category"].fillna("Unmapped")
+
+    # ─── Cost calculation ──────────────────────────────────────────────────
+    df_val[QTY_COL] = pd.to_numeric(df_val[QTY_COL], errors="coerce").fillna(0)
+    df_val[NET_COL] = pd.to_numeric(df_val[NET_COL], errors="coerce").fillna(0)
+    df_val["Cost Price"] = pd.to_numeric(df_val["Cost Price"], errors="coerce")
+    df_val["Pack Size"] = pd.to_numeric(df_val["Pack Size"], errors="coerce")
+
+    df_val["Total Cost"] = line_cost(
+        df_val[QTY_COL],
+        df_val["Cost Price"],
+        df_val[UOM_COL] if UOM_COL else None,
+        df_val["Pack Size"],
+    )
+
+    # If return/cancel rows are negative, reverse cost also
+    df_val.loc[
+        (df_val[NET_COL] < 0) &
+        (df_val["Total Cost"].notna()) &
+        (df_val["Total Cost"] > 0),
+        "Total Cost"
+    ] *= -1
+
+    # ─── Discount calculation ──────────────────────────────────────────────
+    df_val["Discount Value"] = df_val[NET_COL] - df_val["Total Cost"].fillna(0)
+
+    cost_safe = df_val["Total Cost"].abs().replace(0, np.nan)
+    df_val["Discount %"] = np.where(
+        df_val[NET_COL] >= 0,
+        (df_val["Discount Value"].abs() / cost_safe * 100),
+        0
+    )
+    df_val["Discount %"] = pd.to_numeric(df_val["Discount %"], errors="coerce").fillna(0)
+
+    df_val["⚠ Cost Missing"] = df_val["Cost Price"].isna()
+
+    if UOM_COL and UOM_COL in df_val.columns:
+        df_val["⚠ Pack Missing (KAR)"] = (
+            df_val[UOM_COL].astype(str).str.upper().eq("KAR")
+        ) & df_val["Pack Size"].isna()
+    else:
+        df_val["⚠ Pack Missing (KAR)"] = False
+
+    # ============================================================
+    # R&R (Rebate % + Display Rental value)
+    # ============================================================
+    rr_df = st.session_state.get("rr_df", pd.DataFrame())
+
+    RR_CUST_COL = find_column(rr_df, ["PY Name 1", "Customer", "Customer Name"])
+    REBATE_COL  = find_column(rr_df, ["Rebate %", "Rebate", "Rebate Percent", "Rebate%"])
+    RENTAL_COL  = find_column(rr_df, ["Display Rental value", "Display Rental", "Rental", "Annual Rental", "Rental Value"])
+
+    df_val["Rebate %"] = 0.0
+    df_val["Display Rental value"] = 0.0
+
+    if not rr_df.empty and RR_CUST_COL and CUSTOMER_COL:
+        rr_tmp = rr_df.copy()
+        rr_tmp["_py_name_norm"] = rr_tmp[RR_CUST_COL].astype(str).str.strip().str.upper()
+
+        if REBATE_COL:
+            rr_tmp["Rebate %"] = pd.to_numeric(rr_tmp[REBATE_COL], errors="coerce").fillna(0)
+        else:
+            rr_tmp["Rebate %"] = 0.0
+
+        if RENTAL_COL:
+            rr_tmp["Display Rental value"] = pd.to_numeric(rr_tmp[RENTAL_COL], errors="coerce").fillna(0)
+        else:
+            rr_tmp["Display Rental value"] = 0.0
+
+        rr_tmp = rr_tmp.drop_duplicates("_py_name_norm", keep="first")
+        rr_map = rr_tmp.set_index("_py_name_norm")[["Rebate %", "Display Rental value"]]
+
+        df_val["Rebate %"] = df_val["_py_name_norm"].map(rr_map["Rebate %"]).fillna(0.0)
+        df_val["Display Rental value"] = df_val["_py_name_norm"].map(rr_map["Display Rental value"]).fillna(0.0)
+
+    # ============================================================
+    # REBATE LOGIC — CUSTOMER NET SALES BASIS
+    # ============================================================
+    cust_net_sales = (
+        df_val.groupby("_py_name_norm", observed=True)[NET_COL]
+        .sum()
+    )
+
+    cust_rebate_pct = (
+        df_val.groupby("_py_name_norm", observed=True)["Rebate %"]
+        .first()
+        .fillna(0)
+    )
+
+    # safer: rebate never below zero
+    cust_rebate_value = ((cust_net_sales.clip(lower=0)) * (cust_rebate_pct / 100.0)).fillna(0.0)
+
+    df_val["_cust_rebate_total"] = df_val["_py_name_norm"].map(cust_rebate_value).fillna(0.0)
+
+    cust_pos_sales_for_rebate = (
+        df_val[df_val[NET_COL] > 0]
+        .groupby("_py_name_norm", observed=True)[NET_COL]
+        .sum()
+    )
+
+    df_val["_cust_pos_sales_for_rebate"] = df_val["_py_name_norm"].map(cust_pos_sales_for_rebate).fillna(0.0)
+
+    df_val["_rebate_share"] = np.where(
+        (df_val[NET_COL] > 0) & (df_val["_cust_pos_sales_for_rebate"] > 0),
+        df_val[NET_COL] / df_val["_cust_pos_sales_for_rebate"],
+        0.0
+    )
+
+    df_val["Rebate Value"] = (
+        df_val["_cust_rebate_total"] * df_val["_rebate_share"]
+    ).fillna(0.0)
+
+    df_val["Rebate Applied"] = df_val["Rebate Value"] != 0
+
+    # ============================================================
+    # Rental allocation
+    # annual rental -> selected period rental -> distribute by positive sales share
+    # ============================================================
+    period_days = max((pd.to_datetime(end_date) - pd.to_datetime(start_date)).days + 1, 1)
+    year_factor = period_days / 365.0
+
+    cust_pos_sales = (
+        df_val[df_val[NET_COL] > 0]
+        .groupby("_py_name_norm", observed=True)[NET_COL]
+        .sum()
+    )
+
+    df_val["_cust_pos_sales"] = df_val["_py_name_norm"].map(cust_pos_sales).fillna(0)
+    df_val["_period_rental"] = df_val["Display Rental value"] * year_factor
+
+    df_val["_sales_share"] = np.where(
+        (df_val[NET_COL] > 0) & (df_val["_cust_pos_sales"] > 0),
+        df_val[NET_COL] / df_val["_cust_pos_sales"],
+        0.0
+    )
+
+    df_val["Allocated Rental"] = (
+        df_val["_period_rental"] * df_val["_sales_share"]
+    ).fillna(0.0)
+
+    # ─── Profit metrics ────────────────────────────────────────────────────
+    df_val["Gross Profit"] = df_val[NET_COL] - df_val["Total Cost"].fillna(0)
+
+    df_val["Margin %"] = np.where(
+        df_val[NET_COL] != 0,
+        (df_val["Gross Profit"] / df_val[NET_COL]) * 100,
+        0.0
+    )
+
+    df_val["Effective Profit"] = (
+        df_val[NET_COL]
+        - df_val["Total Cost"].fillna(0)
+        - df_val["Rebate Value"].fillna(0)
+        - df_val["Allocated Rental"].fillna(0)
+    )
+
+    # Margin on sales
+    df_val["Effective Margin %"] = np.where(
+        df_val[NET_COL] != 0,
+        (df_val["Effective Profit"] / df_val[NET_COL]) * 100,
+        0.0
+    )
+
+    # Optional extra view: return on cost
+    df_val["Return on Cost %"] = np.where(
+        df_val["Total Cost"].abs() != 0,
+        (df_val["Effective Profit"] / df_val["Total Cost"].abs()) * 100,
+        0.0
+    )
+
+    # ─── Category logic ────────────────────────────────────────────────────
+    sales_category_value = 0.0
+    return_category_value = 0.0
+
+    has_category = "Category" in df_val.columns and df_val["Category"].notna().any()
+
+    if has_category:
+        cat_clean = df_val["Category"].astype(str).str.lower().str.strip()
+        pos_mask = cat_clean.str.contains(
+            r"sale|revenue|positive|income|normal|inv|bill|pos|good|regular",
+            na=False, regex=True
+        )
+        ret_mask = cat_clean.str.contains(
+            r"return|ret|refund|negative|adjustment|cr|debit|reverse|cancel|cn|zre|ykre|credit|deduction",
+            na=False, regex=True
+        )
+        sales_category_value = df_val[pos_mask][NET_COL].sum()
+        return_category_value = df_val[ret_mask][NET_COL].sum()
+    else:
+        sales_category_value = df_val[df_val[NET_COL] >= 0][NET_COL].sum()
+        return_category_value = df_val[df_val[NET_COL] < 0][NET_COL].sum()
+
+    # ─── Executive KPIs ────────────────────────────────────────────────────
+    st.markdown("## 📌 Executive Summary")
+
+    total_net = df_val[NET_COL].sum()
+    total_cost = df_val["Total Cost"].sum(min_count=1)
+    total_discount = df_val["Discount Value"].sum(min_count=1)
+
+    overall_disc_pct = (
+        abs(total_discount) / abs(total_cost) * 100
+        if pd.notna(total_cost) and total_cost != 0 else 0
+    )
+
+    cols = st.columns(7)
+    cols[0].metric("Total Net", fmt_num(total_net))
+    cols[1].metric("Total Cost", fmt_num(total_cost))
+    cols[2].metric("Discount Value", fmt_num(total_discount))
+    cols[3].metric("Discount %", fmt_pct(overall_disc_pct))
+    cols[4].metric("Cost Missing Rows", f"{int(df_val['⚠ Cost Missing'].sum()):,}")
+    cols[5].metric("Positive / Sales Val", fmt_num(sales_category_value))
+    cols[6].metric("Returns / Negative", fmt_num(return_category_value))
+
+    # ✅ R&R Executive Add-on
+    st.markdown("## 🧾 Contract (R&R) Impact")
+
+    total_rebate = df_val["Rebate Value"].sum(min_count=1)
+    total_rental = df_val["Allocated Rental"].sum(min_count=1)
+
+    total_eff_profit = (
+        df_val[NET_COL].sum()
+        - df_val["Total Cost"].fillna(0).sum()
+        - df_val["Rebate Value"].fillna(0).sum()
+        - df_val["Allocated Rental"].fillna(0).sum()
+    )
+
+    cA, cB, cC, cD = st.columns(4)
+    cA.metric("Rebate Value", fmt_num(total_rebate))
+    cB.metric("Allocated Rental (Period)", fmt_num(total_rental))
+    cC.metric("Effective Profit (after R&R)", fmt_num(total_eff_profit))
+
+    sales_only_net = df_val[df_val[NET_COL] > 0][NET_COL].sum()
+    sales_only_eff_profit = df_val[df_val[NET_COL] > 0]["Effective Profit"].sum()
+    eff_margin_pct = (sales_only_eff_profit / sales_only_net * 100) if sales_only_net else 0
+    cD.metric("Effective Margin % (Sales)", fmt_pct(eff_margin_pct))
+
+    # ============================================================
+    # Category Performance
+    # ============================================================
+    st.markdown("## 📊 Executive Summary – Category Performance")
+
+    if "Category" not in df_val.columns or df_val["Category"].isna().all():
+        st.warning("⚠️ Category not mapped — check price list material matching")
+    else:
+        category_summary = (
+            df_val
+            .groupby("Category", dropna=False, observed=True)[NET_COL]
+            .sum()
+            .reset_index()
+            .rename(columns={NET_COL: "Net Value"})
+            .sort_values("Net Value", ascending=False)
+        )
+
+        st.markdown("### 🧾 Category-wise Net Value")
+
+        kpi_per_row = 4
+        data = category_summary.to_dict("records")
+
+        for i in range(0, len(data), kpi_per_row):
+            cols_cat = st.columns(len(data[i:i + kpi_per_row]))
+            for col, row in zip(cols_cat, data[i:i + kpi_per_row]):
+                with col:
+                    st.metric(
+                        label=str(row["Category"]),
+                        value=f"KD {row['Net Value']:,.0f}"
+                    )
+
+        st.markdown("### 📌 Category Contribution")
+
+        category_contribution = (
+            df_val
+            .groupby("Category", dropna=False, observed=True)[NET_COL]
+            .sum()
+            .reset_index()
+            .rename(columns={NET_COL: "Net Value"})
+        )
+
+        total_net_value = category_contribution["Net Value"].sum()
+
+        category_contribution["Contribution %"] = np.where(
+            total_net_value != 0,
+            category_contribution["Net Value"] / total_net_value * 100,
+            0
+        ).round(0)
+
+        insight_lines = [
+            f"• **{row['Category']}** → {row['Contribution %']:.0f}%"
+            for _, row in category_contribution.sort_values("Contribution %", ascending=False).iterrows()
+        ]
+
+        st.markdown("  \n".join(insight_lines))
+
+    # ─── Data Quality ──────────────────────────────────────────────────────
+    st.markdown("### 🧪 Data Quality")
+    dq1, dq2, dq3 = st.columns(3)
+    dq1.metric("Cost Mapped %", f"{100 - df_val['⚠ Cost Missing'].mean()*100:.0f}%")
+    dq2.metric("KAR Pack Mapped %", f"{100 - df_val['⚠ Pack Missing (KAR)'].mean()*100:.0f}%")
+    dq3.metric("Negative Discount Rows", f"{int((df_val['Discount Value'] < 0).sum()):,}")
+
+    # ─── Material level summary ────────────────────────────────────────────
+    st.markdown("### 🔍 Material Discount Hotspots")
+
+    material_summary = (
+        df_val.groupby(MATERIAL_COL, dropna=True, observed=True)
+              .agg(
+                  Net_Value=(NET_COL, "sum"),
+                  Discount_Value=("Discount Value", "sum"),
+                  Total_Cost=("Total Cost", "sum"),
+                  Rebate_Value=("Rebate Value", "sum"),
+                  Rental_Allocated=("Allocated Rental", "sum"),
+                  Effective_Profit=("Effective Profit", "sum"),
+              )
+              .reset_index()
+    )
+
+    material_summary["Weighted_Discount_Pct"] = np.where(
+        material_summary["Total_Cost"].abs() != 0,
+        (material_summary["Discount_Value"].abs() / material_summary["Total_Cost"].abs()) * 100,
+        0
+    )
+
+    material_summary["Effective Margin %"] = np.where(
+        material_summary["Net_Value"] != 0,
+        (material_summary["Effective_Profit"] / material_summary["Net_Value"]) * 100,
+        0
+    )
+
+    material_summary["Return on Cost %"] = np.where(
+        material_summary["Total_Cost"].abs() != 0,
+        (material_summary["Effective_Profit"] / material_summary["Total_Cost"].abs()) * 100,
+        0
+    )
+
+    st.caption("🔴 Top biggest discount / loss makers")
+
+    material_hotspots = material_summary.sort_values("Discount_Value").head(12).copy()
+
+    st.dataframe(
+        material_hotspots.style.format({
+            "Net_Value": "{:,.0f}",
+            "Weighted_Discount_Pct": "{:.0f}%",
+            "Discount_Value": "{:,.0f}",
+            "Total_Cost": "{:,.0f}",
+            "Rebate_Value": "{:,.0f}",
+            "Rental_Allocated": "{:,.0f}",
+            "Effective_Profit": "{:,.0f}",
+            "Effective Margin %": "{:.0f}%",
+            "Return on Cost %": "{:.0f}%"
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+
+    # ─── Quick Filters ─────────────────────────────────────────────────────
+    st.markdown("### 🎯 Quick Filters")
+    f1, f2, f3 = st.columns(3)
+    show_negative = f1.checkbox("Only negative discount", key="pm_neg")
+    show_cost_missing = f2.checkbox("Only cost missing", key="pm_cost")
+    show_kar_issues = f3.checkbox("Only KAR pack issues", key="pm_kar")
+
+    display_df = df_val.copy()
+    if show_negative:
+        display_df = display_df[display_df["Discount Value"] < 0]
+    if show_cost_missing:
+        display_df = display_df[display_df["⚠ Cost Missing"]]
+    if show_kar_issues:
+        display_df = display_df[display_df["⚠ Pack Missing (KAR)"]]
+
+    # ─── Final table ───────────────────────────────────────────────────────
+    st.subheader(f"Result: {len(display_df):,} rows  •  {start_date} → {end_date}")
+
+    final_cols = [
+        DATE_COL, DRIVER_COL, CUSTOMER_COL,
+        MATERIAL_COL, QTY_COL, UOM_COL,
+        "Cost Price", "Pack Size", "Total Cost",
+        NET_COL, "Discount Value", "Discount %",
+        "Rebate %", "Rebate Value", "Display Rental value", "Allocated Rental",
+        "Gross Profit", "Margin %",
+        "Effective Profit", "Effective Margin %",
+        "Return on Cost %",
+        "Category",
+        "⚠ Cost Missing", "⚠ Pack Missing (KAR)"
+    ]
+    avail_cols = [c for c in final_cols if c and c in display_df.columns]
+
+    preview_rows = st.selectbox(
+        "Preview rows",
+        [100, 500, 1000, 5000, 10000],
+        index=2,
+        key="pm_preview_rows"
+    )
+
+    display_show = display_df[avail_cols].sort_values(DATE_COL, ascending=False).copy()
+    display_show = format_df_decimals(
+        display_show,
+        num_cols=[
+            "Cost Price", "Pack Size", "Total Cost", NET_COL,
+            "Discount Value", "Rebate Value", "Display Rental value",
+            "Allocated Rental", "Gross Profit", "Effective Profit"
+        ],
+        pct_cols=[
+            "Discount %", "Rebate %", "Margin %",
+            "Effective Margin %", "Return on Cost %"
+        ],
+        decimals=2
+    )
+
+    st.dataframe(
+        display_show.head(preview_rows),
+        use_container_width=True,
+        hide_index=True
+    )
+    st.caption(f"Showing {min(preview_rows, len(display_show)):,} of {len(display_show):,} rows")
+
+    # ✅ Customer contract compliance summary
+    st.markdown("## 📜 Customer Contract Compliance (Discount + Rebate + Rental)")
+
+    if CUSTOMER_COL and CUSTOMER_COL in df_val.columns:
+        cust_sum = (
+            df_val.groupby(CUSTOMER_COL, observed=True)
+                  .agg(
+                      Net_Sales=(NET_COL, "sum"),
+                      Total_Cost=("Total Cost", "sum"),
+                      Discount_Value=("Discount Value", "sum"),
+                      Rebate_Value=("Rebate Value", "sum"),
+                      Rental_Allocated=("Allocated Rental", "sum"),
+                      Effective_Profit=("Effective Profit", "sum"),
+                  )
+                  .reset_index()
+        )
+
+        cust_pos_sales = df_val[df_val[NET_COL] > 0].groupby(CUSTOMER_COL, observed=True)[NET_COL].sum()
+        cust_sum["_pos_sales"] = cust_pos_sales.reindex(cust_sum[CUSTOMER_COL]).fillna(0).to_numpy()
+
+        cust_sum["Total Leakage"] = (
+            cust_sum["Discount_Value"].abs()
+            + cust_sum["Rebate_Value"].abs()
+            + cust_sum["Rental_Allocated"].abs()
+        )
+
+        cust_sum["Leakage % (on Sales)"] = np.where(
+            cust_sum["_pos_sales"] != 0,
+            (cust_sum["Total Leakage"] / cust_sum["_pos_sales"]) * 100,
+            0
+        )
+
+        cust_sum["Effective Margin %"] = np.where(
+            cust_sum["Net_Sales"] != 0,
+            (cust_sum["Effective_Profit"] / cust_sum["Net_Sales"]) * 100,
+            0
+        )
+
+        cust_sum["Return on Cost %"] = np.where(
+            cust_sum["Total_Cost"].abs() != 0,
+            (cust_sum["Effective_Profit"] / cust_sum["Total_Cost"].abs()) * 100,
+            0
+        )
+
+        total_row_cust = pd.DataFrame([{
+            CUSTOMER_COL: "Total",
+            "Net_Sales": cust_sum["Net_Sales"].sum(),
+            "Total_Cost": cust_sum["Total_Cost"].sum(),
+            "Discount_Value": cust_sum["Discount_Value"].sum(),
+            "Rebate_Value": cust_sum["Rebate_Value"].sum(),
+            "Rental_Allocated": cust_sum["Rental_Allocated"].sum(),
+            "Total Leakage": cust_sum["Total Leakage"].sum(),
+            "_pos_sales": cust_sum["_pos_sales"].sum(),
+            "Effective_Profit": cust_sum["Effective_Profit"].sum(),
+        }])
+
+        total_row_cust["Leakage % (on Sales)"] = np.where(
+            total_row_cust["_pos_sales"] != 0,
+            (total_row_cust["Total Leakage"] / total_row_cust["_pos_sales"]) * 100,
+            0
+        )
+        total_row_cust["Effective Margin %"] = np.where(
+            total_row_cust["Net_Sales"] != 0,
+            (total_row_cust["Effective_Profit"] / total_row_cust["Net_Sales"]) * 100,
+            0
+        )
+        total_row_cust["Return on Cost %"] = np.where(
+            total_row_cust["Total_Cost"].abs() != 0,
+            (total_row_cust["Effective_Profit"] / total_row_cust["Total_Cost"].abs()) * 100,
+            0
+        )
+
+        cust_detail = cust_sum.sort_values("Leakage % (on Sales)", ascending=False).copy()
+        cust_final = pd.concat([cust_detail, total_row_cust], ignore_index=True)
+
+        show_cols = [
+            CUSTOMER_COL, "Net_Sales", "Total_Cost",
+            "Discount_Value", "Rebate_Value", "Rental_Allocated",
+            "Total Leakage", "Leakage % (on Sales)",
+            "Effective_Profit", "Effective Margin %", "Return on Cost %"
+        ]
+
+        cust_show = format_df_decimals(
+            cust_final[show_cols],
+            num_cols=[
+                "Net_Sales", "Total_Cost", "Discount_Value", "Rebate_Value",
+                "Rental_Allocated", "Total Leakage", "Effective_Profit"
+            ],
+            pct_cols=[
+                "Leakage % (on Sales)", "Effective Margin %", "Return on Cost %"
+            ],
+            decimals=3
+        )
+
+        st.dataframe(
+            cust_show,
+            use_container_width=True,
+            hide_index=True
+        )
+    else:
+        st.info("Customer column not found for contract summary.")
+
+    # ============================================================
+    # Category Contribution
+    # ============================================================
+    st.markdown("### 📊 Category Contribution")
+
+    category_contribution = (
+        df_val
+        .groupby("Category", observed=True)[NET_COL]
+        .sum()
+        .reset_index()
+        .rename(columns={NET_COL: "Net Value"})
+    )
+
+    total_net_value = category_contribution["Net Value"].sum()
+
+    for _, row in category_contribution.sort_values("Net Value", ascending=False).iterrows():
+        pct = (row["Net Value"] / total_net_value * 100) if total_net_value else 0
+        st.markdown(f"• **{row['Category']}** → {pct:.0f}%")
+
+    # ============================================================
+    # Profit View – Margin by Category
+    # ============================================================
+    st.markdown("## 💰 Profit View – Margin by Category")
+
+    margin_by_category = (
+        df_val
+        .groupby("Category", dropna=False, observed=True)
+        .agg(
+            Net_Value=(NET_COL, "sum"),
+            Total_Cost=("Total Cost", "sum"),
+            Discount_Value=("Discount Value", "sum"),
+            Rebate_Value=("Rebate Value", "sum"),
+            Rental_Allocated=("Allocated Rental", "sum"),
+            Effective_Profit=("Effective Profit", "sum"),
+        )
+        .reset_index()
+    )
+
+    margin_by_category["Gross Profit"] = (
+        margin_by_category["Net_Value"] - margin_by_category["Total_Cost"]
+    )
+
+    margin_by_category["Discount %"] = np.where(
+        margin_by_category["Total_Cost"].abs() != 0,
+        (margin_by_category["Discount_Value"].abs() / margin_by_category["Total_Cost"].abs()) * 100,
+        0
+    )
+
+    margin_by_category["Margin %"] = np.where(
+        margin_by_category["Net_Value"] != 0,
+        (margin_by_category["Gross Profit"] / margin_by_category["Net_Value"]) * 100,
+        0
+    )
+
+    margin_by_category["Effective Margin %"] = np.where(
+        margin_by_category["Net_Value"] != 0,
+        (margin_by_category["Effective_Profit"] / margin_by_category["Net_Value"]) * 100,
+        0
+    )
+
+    margin_by_category["Return on Cost %"] = np.where(
+        margin_by_category["Total_Cost"].abs() != 0,
+        (margin_by_category["Effective_Profit"] / margin_by_category["Total_Cost"].abs()) * 100,
+        0
+    )
+
+    total_row = pd.DataFrame([{
+        "Category": "Total",
+        "Net_Value": margin_by_category["Net_Value"].sum(),
+        "Total_Cost": margin_by_category["Total_Cost"].sum(),
+        "Discount_Value": margin_by_category["Discount_Value"].sum(),
+        "Rebate_Value": margin_by_category["Rebate_Value"].sum(),
+        "Rental_Allocated": margin_by_category["Rental_Allocated"].sum(),
+        "Effective_Profit": margin_by_category["Effective_Profit"].sum(),
+    }])
+
+    total_row["Gross Profit"] = total_row["Net_Value"] - total_row["Total_Cost"]
+    total_row["Discount %"] = np.where(
+        total_row["Total_Cost"].abs() != 0,
+        (total_row["Discount_Value"].abs() / total_row["Total_Cost"].abs()) * 100,
+        0
+    )
+    total_row["Margin %"] = np.where(
+        total_row["Net_Value"] != 0,
+        (total_row["Gross Profit"] / total_row["Net_Value"]) * 100,
+        0
+    )
+    total_row["Effective Margin %"] = np.where(
+        total_row["Net_Value"] != 0,
+        (total_row["Effective_Profit"] / total_row["Net_Value"]) * 100,
+        0
+    )
+    total_row["Return on Cost %"] = np.where(
+        total_row["Total_Cost"].abs() != 0,
+        (total_row["Effective_Profit"] / total_row["Total_Cost"].abs()) * 100,
+        0
+    )
+
+    margin_by_category = pd.concat(
+        [margin_by_category.sort_values("Net_Value", ascending=False), total_row],
+        ignore_index=True
+    )
+
+    def highlight_total_row(row):
+        if str(row["Category"]).strip().upper() == "TOTAL":
+            return ['background-color: #BFDBFE; color: #1E3A8A; font-weight: 900'] * len(row)
+        return [''] * len(row)
+
+    st.dataframe(
+        margin_by_category.style
+        .apply(highlight_total_row, axis=1)
+        .format({
+            "Net_Value": "{:,.0f}",
+            "Total_Cost": "{:,.0f}",
+            "Discount_Value": "{:,.0f}",
+            "Discount %": "{:.0f}%",
+            "Rebate_Value": "{:,.0f}",
+            "Rental_Allocated": "{:,.0f}",
+            "Gross Profit": "{:,.0f}",
+            "Margin %": "{:.0f}%",
+            "Effective_Profit": "{:,.0f}",
+            "Effective Margin %": "{:.0f}%",
+            "Return on Cost %": "{:.0f}%"
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+
+    # ============================================================
+    # Customer × Category Sales Matrix
+    # ============================================================
+    st.markdown("## 🏬 Customer-wise Sales by Category")
+
+    if CUSTOMER_COL and CUSTOMER_COL in df_val.columns:
+        customer_category = (
+            df_val
+            .pivot_table(
+                index=CUSTOMER_COL,
+                columns="Category",
+                values=NET_COL,
+                aggfunc="sum",
+                fill_value=0, observed=True
+            )
+        )
+
+        customer_category["Total"] = customer_category.sum(axis=1)
+        customer_category = customer_category.sort_values("Total", ascending=False)
+
+        total_row = customer_category.sum().to_frame().T
+        total_row.index = ["TOTAL"]
+
+        customer_category_final = pd.concat([customer_category, total_row])
+
+        st.dataframe(
+            customer_category_final.style.format("{:,.0f}"),
+            use_container_width=True
+        )
+    else:
+        st.info("Customer column not found for category matrix.")
+
+    # ─── Downloads ─────────────────────────────────────────────────────────
+    st.markdown("### ⬇️ Export")
+    c1, c2 = st.columns(2)
+    with c1:
+        csv = display_df.to_csv(index=False).encode("utf-8-sig")
+        st.download_button("⬇️ CSV", csv, f"profit_margin_{start_date}_to_{end_date}.csv", "text/csv")
+    with c2:
+        lazy_download_button(
+            "⬇️ Excel",
+            lambda df=display_df: to_excel_bytes(df, sheet_name="Profit_Margin", index=False),
+            file_name=f"profit_margin_{start_date}_to_{end_date}.xlsx",
+            mime=XLSX_MIME
+        )
@@ -0,0 +1,1546 @@
+# ================= SALES TRACKING PAGE =================
+
+import io
+import zipfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from app_pages.common import (
+    apply_header_renames,
+    create_pptx,
+    create_progress_bar_html,
+    rename_col_key,
+    render_table,
+    XLSX_MIME,
+    export_payload,
+    fill_when_done,
+    lazy_download_button,
+    to_excel_bytes,
+    to_multi_sheet_excel_bytes,
+)
+from app_pages.context import DataContext
+from costing import get_price_index
+from forecasting import get_forecast_service
+from lazy_imports import lazy_module
+from report_bundle import build_bundle, tracking_artifacts
+from tracking import TrackingFilters, get_tracking, tracking_index
+
+px = lazy_module("plotly.express")
+go = lazy_module("plotly.graph_objects")
+
+
+def render(ctx: DataContext):
+    lang, texts, username, sales_df, target_df, channels_df, cube_df = ctx.lang, ctx.texts, ctx.username, ctx.sales_df, ctx.target_df, ctx.channels_df, ctx.cube_df
+
+    st.title(texts[lang]["sales_tracking_title"])
+    if "data_loaded" not in st.session_state:
+        st.warning(texts[lang]["no_data_warning"])
+    else:
+        # Filters (options come from the per-upload filter index)
+        filter_index = tracking_index(ctx.data_version, sales_df)
+        st.sidebar.subheader(texts[lang]["filters_header"])
+        st.sidebar.markdown(f'<div class="tooltip">ℹ️<span class="tooltiptext">{texts[lang]["filters_tooltip"]}</span></div>', unsafe_allow_html=True)
+        salesmen = st.sidebar.multiselect(
+            texts[lang]["select_salesmen"],
+            options=filter_index.options("Driver Name EN"),
+            default=filter_index.options("Driver Name EN"),
+            key="st_salesmen"
+        )
+        billing_types = st.sidebar.multiselect(
+            texts[lang]["select_billing_types"],
+            options=filter_index.options("Billing Type"),
+            default=filter_index.options("Billing Type"),
+            key="st_billing_types"
+        )
+        py_filter = st.sidebar.multiselect(
+            texts[lang]["select_py"],
+            options=filter_index.options("PY Name 1"),
+            default=filter_index.options("PY Name 1"),
+            key="st_py_filter"
+        )
+        sp_filter = st.sidebar.multiselect(
+            texts[lang]["select_sp"],
+            options=filter_index.options("SP Name1"),
+            default=filter_index.options("SP Name1"),
+            key="st_sp_filter"
+        )
+
+        preset = st.sidebar.radio(texts[lang]["date_presets"], texts[lang]["date_presets_options"], key="st_preset")
+        today = pd.Timestamp.today().normalize()
+        if preset == texts[lang]["date_presets_options"][1]:  # Last 7 Days
+            date_range = [today - pd.Timedelta(days=7), today]
+        elif preset == texts[lang]["date_presets_options"][2]:  # This Month
+            month_start = today.replace(day=1)
+            month_end = month_start + pd.offsets.MonthEnd(0)
+            date_range = [month_start, month_end]
+        elif preset == texts[lang]["date_presets_options"][3]:  # YTD
+            date_range = [today.replace(month=1, day=1), today]
+        else:
+            date_range = st.sidebar.date_input(
+                texts[lang]["select_date_range"],
+                [sales_df["Billing Date"].min(), sales_df["Billing Date"].max()],
+                key="st_date_range"
+            )
+            if isinstance(date_range, tuple) and len(date_range) == 2:
+                date_range = [pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])]
+            else:
+                date_range = [sales_df["Billing Date"].min(), sales_df["Billing Date"].max()]
+
+        if date_range[0] > date_range[1]:
+            st.error(texts[lang]["date_error"])
+        else:
+            top_n = st.sidebar.slider(
+                texts[lang]["top_n_salesmen"],
+                min_value=1,
+                max_value=max(1, len(filter_index.options("Driver Name EN"))),
+                value=min(5, max(1, len(filter_index.options("Driver Name EN")))),
+                key="st_topn"
+            )
+
+            # One memoized pipeline per filter state; every tab reads the same result
+            filters = TrackingFilters(
+                salesmen=tuple(salesmen), billing_types=tuple(billing_types),
+                py=tuple(py_filter), sp=tuple(sp_filter),
+                start=pd.Timestamp(date_range[0]), end=pd.Timestamp(date_range[1]),
+            )
+            tracking = get_tracking(ctx.data_version, sales_df, cube_df, target_df, channels_df, filters, today)
+            df_filtered, cube_filtered = tracking.df_filtered, tracking.cube_filtered
+
+            if df_filtered.empty:
+                st.warning(texts[lang]["no_match_warning"])
+            else:
+                days_finish = tracking.days_finish
+                total_sales, talabat_sales = tracking.total_sales, tracking.talabat_sales
+                talabat_gap = tracking.talabat_gap
+
+                total_ka_target_all = tracking.total_ka_target_all
+                total_tal_target_all = tracking.total_tal_target_all
+                per_day_ka_target = tracking.per_day_ka_target
+                current_sales_per_day = tracking.current_sales_per_day
+                forecast_month_end_ka = tracking.forecast_month_end_ka
+
+                total_retail_sales, total_ecom_sales = tracking.total_retail_sales, tracking.total_ecom_sales
+                retail_sales_pct, ecom_sales_pct = tracking.retail_sales_pct, tracking.ecom_sales_pct
+                ka_other_ecom_sales, ka_other_ecom_pct = tracking.ka_other_ecom_sales, tracking.ka_other_ecom_pct
+
+                # --- KPI Data for PPTX ---
+                kpi_data = tracking.kpi_data(texts[lang])
+
+                tabs = st.tabs([texts[lang]["kpis_tab"], texts[lang]["tables_tab"], texts[lang]["charts_tab"], texts[lang]["downloads_tab"]])
+
+ # --- KPIs with progress bars ---
+                with tabs[0]:
+                    st.subheader(texts[lang]["key_metrics_sub"])
+
+                    # ROW 1: Big KPI (Full width)
+                    r1c1 = st.columns(1)[0]
+
+                    with r1c1:
+                        DATE_COL = "Billing Date"
+                        _d = df_filtered.copy()
+                        _d[DATE_COL] = pd.to_datetime(_d[DATE_COL], errors="coerce")
+
+                        from_dt = _d[DATE_COL].min()
+                        to_dt   = _d[DATE_COL].max()
+
+                        from_txt = from_dt.strftime("%d %b %Y") if pd.notna(from_dt) else "-"
+                        to_txt   = to_dt.strftime("%d %b %Y") if pd.notna(to_dt) else "-"
+
+                        ka_sales_value = float(total_sales.sum()) if total_sales is not None else 0.0
+
+                      
+                        # --- Total KA Sales card (FULL width + date inside) ---
+                        st.markdown(
+                            """
+                            <style>
+                            /* Force full width */
+                            .metric-card {width:100% !important; max-width:100% !important; display:block !important; box-sizing:border-box;}
+                            </style>
+                            """,
+                            unsafe_allow_html=True
+                        )
+
+                        card_html = (
+                            f'<div style="'
+                            f'border:2px solid #38BDF8;'
+                            f'border-radius:18px;'
+                            f'padding:12px 16px;'
+                            f'background: linear-gradient(180deg, #FFFFFF, #F0F9FF);'
+                            f'box-shadow:0 10px 22px rgba(56,189,248,0.25);'
+                            f'width:100%;'
+                            f'box-sizing:border-box;'
+                            f'">'
+                            f'<div style="font-size:18px;font-weight:700;color:#0F172A;margin-bottom:8px;">{texts[lang]["total_ka_sales"]}</div>'
+                            f'<div style="font-size:44px;font-weight:900;color:#111827;line-height:1.1;margin-bottom:14px;">KD {ka_sales_value:,.0f}</div>'
+                            f'<div style="display:flex;justify-content:space-between;font-size:13px;color:#334155;opacity:0.9;">'
+                            f'<span><b>From:</b> {from_txt}</span>'
+                            f'<span><b>To:</b> {to_txt}</span>'
+                            f'</div>'
+                            f'</div>'
+                        )
+
+                        st.markdown(card_html, unsafe_allow_html=True)
+
+                        # Progress bar (will now visually match because card is full width)
+                        progress_pct_ka = (ka_sales_value / total_ka_target_all * 100) if total_ka_target_all > 0 else 0
+                        st.markdown(create_progress_bar_html(progress_pct_ka), unsafe_allow_html=True)
+                        st.markdown(
+                            f'<div class="green-caption">{texts[lang]["of_ka_target"].format(progress_pct_ka)}</div>',
+                            unsafe_allow_html=True
+                        )
+
+                    # ROW 2: Two KPIs (Side by side)  ✅ MUST be outside r1c1
+                    r2c1, r2c2 = st.columns(2)
+
+                    with r2c1:
+                        st.metric(texts[lang]["ka_other_ecom"], f"KD {ka_other_ecom_sales:,.0f}")
+                        st.markdown(create_progress_bar_html(ka_other_ecom_pct), unsafe_allow_html=True)
+                        st.markdown(
+                            f'<div class="green-caption">{texts[lang]["of_ka_target_pct"].format(ka_other_ecom_pct)}</div>',
+                            unsafe_allow_html=True
+                        )
+
+                    with r2c2:
+                        st.metric(texts[lang]["talabat_sales"], f"KD {talabat_sales.sum():,.0f}")
+                        progress_pct_talabat = (talabat_sales.sum() / total_tal_target_all * 100) if total_tal_target_all > 0 else 0
+                        st.markdown(create_progress_bar_html(progress_pct_talabat), unsafe_allow_html=True)
+                        st.markdown(
+                            f'<div class="green-caption">{texts[lang]["of_talabat_target"].format(progress_pct_talabat)}</div>',
+                            unsafe_allow_html=True
+                        )
+
+                    # ---- Rest stays same (Target Overview etc.) ----
+                    st.subheader(texts[lang]["target_overview_sub"])
+                    r3c1, r3c2, r3c3, r3c4 = st.columns(4)
+                    r3c1.metric(texts[lang]["ka_target"], f"KD {total_ka_target_all:,.0f}")
+                    r3c2.metric(texts[lang]["talabat_target"], f"KD {total_tal_target_all:,.0f}")
+                    r3c3.metric(texts[lang]["ka_gap"], f"KD {(total_ka_target_all - total_sales.sum()):,.0f}")
+                    r3c4.metric(texts[lang]["talabat_gap"], f"KD {talabat_gap.sum():,.0f}")
+
+                    st.subheader(texts[lang]["channel_sales_sub"])
+                    r4c1, r4c2 = st.columns(2)
+                    with r4c1:
+                        st.metric(texts[lang]["retail_sales"], f"KD {total_retail_sales:,.0f}")
+                        retail_contribution_pct = (total_retail_sales / total_sales.sum() * 100) if total_sales.sum() > 0 else 0
+                        st.caption(texts[lang]["of_total_ka"].format(retail_contribution_pct))
+                    with r4c2:
+                        st.metric(texts[lang]["ecom_sales"], f"KD {total_ecom_sales:,.0f}")
+                        ecom_contribution_pct = (total_ecom_sales / total_sales.sum() * 100) if total_sales.sum() > 0 else 0
+                        st.caption(texts[lang]["of_total_ka"].format(ecom_contribution_pct))
+
+                    st.subheader(texts[lang]["performance_metrics_sub"])
+                    r5c1, r5c2, r5c3 = st.columns(3)
+                    r5c1.metric(texts[lang]["days_finished"], days_finish)
+                    r5c2.metric(texts[lang]["current_sales_per_day"], f"KD {current_sales_per_day:,.0f}")
+                    r5c3.metric(texts[lang]["forecast_month_end"], f"KD {forecast_month_end_ka:,.0f}")
+                    
+                    
+                    # --- TABLES ---
+                    with tabs[1]:
+
+                        st.subheader(texts[lang]["sales_targets_summary_sub"])
+
+                        # Salesman x (Total / Market / E-Com) target summary, Total row last
+                        report_df = tracking.report_df
+
+                        # ================= STYLING =================
+                        def row_style(row):
+                            if row["Salesman Name"] == "Total":
+                                return ["background-color:#BFDBFE; color:#1E3A8A; font-weight:900"] * len(row)
+                            return ["background-color:#F9FAFB" if row.name % 2 == 0 else ""] * len(row)
+
+                        def pct_color(v):
+                            if v >= 100:
+                                return "color:#166534; font-weight:700"
+                            elif v >= 80:
+                                return "color:#92400E; font-weight:600"
+                            return "color:#991B1B; font-weight:700"
+
+                        # Apply display header renames ONLY for showing the table (no logic change)
+                        report_df_disp = apply_header_renames(report_df)
+
+                        num_cols = [
+                            "Total Target","Total Sales","Total Balance",
+                            "Market Target","Market Sales","Market Balance",
+                            "E-Com Target","E-Com Sales","E-Com Balance"
+                        ]
+                        pct_cols = ["Total % Achieved","Market % Achieved","E-Com % Achieved"]
+
+                        styled = (
+                            report_df_disp.style
+                            .apply(row_style, axis=1)
+                            .format("{:,.0f}", subset=[rename_col_key(c) for c in num_cols])
+                            .format("{:.0f}%", subset=[rename_col_key(c) for c in pct_cols])
+                            .applymap(pct_color, subset=[rename_col_key(c) for c in pct_cols])
+                        )
+
+                        st.dataframe(styled, use_container_width=True, hide_index=True)
+
+                        # --- Sales by Billing Type per Salesman ---
+                        st.subheader(texts[lang]["sales_by_billing_sub"])
+                        billing_df = tracking.billing_df
+                        # --- Styling + Display (fixed Total row color & header) ---
+                        billing_df_show = billing_df.reset_index()  # brings 'Salesman' as a real column
+                        render_table(
+                            billing_df_show,
+                            hide_index=True,
+                            total_row_match=lambda r: str(r.get("Salesman", "")).strip() == "Total",
+                            formats={
+                                "Presales": "{:,.0f}", "HHT": "{:,.0f}", "Sales Total": "{:,.0f}",
+                                "YKS1": "{:,.0f}", "YKS2": "{:,.0f}", "ZCAN": "{:,.0f}", "Cancel Total": "{:,.0f}",
+                                "YKRE": "{:,.0f}", "ZRE": "{:,.0f}", "Return": "{:,.0f}", "Return %": "{:.0f}%"
+                            }
+                        )
+
+                        billing_token = (tracking.state_key, "billing")
+                        if lazy_download_button(
+                            texts[lang]["download_billing"],
+                            lambda df=billing_df: to_excel_bytes(df.reset_index(), sheet_name="Billing_Types", index=False,
+                                                                 token=billing_token),
+                            token=billing_token, prefetch=True,
+                            file_name=f"Billing_Types_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx",
+                            mime=XLSX_MIME
+                        ):
+                            st.session_state["audit_log"].append({
+                                "user": username,
+                                "action": "download",
+                                "details": "Billing Type Table Excel",
+                                "timestamp": datetime.now()
+                            })
+
+
+                        # --- Sales Summary By Customer – Value ---
+                        st.subheader("📌 Sales Summary By Customer – Value")
+
+                        py_table_with_total = tracking.py_table_with_total
+
+                        # Styling function
+                        # --- Styling + Display (fixed Total row color & header) ---
+                        py_show = py_table_with_total.reset_index()  # brings 'Customer Name' as a real column
+                        # Ensure the first column is clearly named
+                        if py_show.columns[0] == "":
+                            py_show = py_show.rename(columns={py_show.columns[0]: "Customer Name"})
+                        render_table(
+                            py_show,
+                            hide_index=True,
+                            total_row_match=lambda r: str(r.get("Customer Name", "")).strip() == "Total",
+                            formats={
+                                "Sales": "{:,.0f}",
+                                "Returns": "{:,.0f}",
+                                "Return %": "{:.1f}%",
+                                "Contribution %": "{:.1f}%"
+                            }
+                        )
+
+                        # Download Button
+                        customers_token = (tracking.state_key, "customers")
+                        if lazy_download_button(
+                            "⬇️ Download Customer Summary (Excel)",
+                            lambda df=py_table_with_total: to_excel_bytes(df.reset_index(), sheet_name="Sales_by_Customer", index=False,
+                                                                          token=customers_token),
+                            token=customers_token, prefetch=True,
+                            file_name=f"Sales_by_Customer_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx",
+                            mime=XLSX_MIME
+                        ):
+                            st.session_state["audit_log"].append({
+                                "user": username,
+                                "action": "download",
+                                "details": "Customer Summary Excel",
+                                "timestamp": datetime.now()
+                            })
+
+
+                        # --- Return by SP Name1 ---
+                        st.subheader("🔄 Sales Vs Return's Summary By Branch-Value")
+                        sp_billing = tracking.sp_billing
+                        # --- Styling + Display (fixed missing header & Total row color) ---
+                        sp_billing_show = sp_billing.reset_index().rename(columns={"SP Name1": "Branch Name"})
+                        render_table(
+                            sp_billing_show,
+                            hide_index=True,
+                            total_row_match=lambda r: str(r.get("Branch Name", r.get("SP Name1", r.get("Branch", "")))).strip() == "Total",
+                            formats={
+                                "Presales": "{:,.0f}", "HHT": "{:,.0f}", "Sales Total": "{:,.0f}",
+                                "YKS1": "{:,.0f}", "YKS2": "{:,.0f}", "ZCAN": "{:,.0f}", "Cancel Total": "{:,.0f}",
+                                "YKRE": "{:,.0f}", "ZRE": "{:,.0f}", "Return": "{:,.0f}", "Return %": "{:.0f}%"
+                            }
+                        )                        # --- Return by Material Description ---
+                        st.subheader("🔄 Return Summary By SKU")
+                        if "Material Description" in cube_filtered.columns:
+                            material_billing = cube_filtered.pivot_table(
+                                index="Material Description",
+                                columns="Billing Type",
+                                values="Net Value",
+                                aggfunc="sum",
+                                fill_value=0, observed=True
+                            )
+
+                            material_cols_raw = ["ZFR", "YKF2", "YKRE", "YKS1", "YKS2", "ZCAN", "ZRE"]
+                            material_billing = material_billing.reindex(columns=material_cols_raw, fill_value=0)
+                            material_billing["Sales Total"] = material_billing.sum(axis=1)
+                            material_billing["Return"] = material_billing["YKRE"] + material_billing["ZRE"]
+                            material_billing["Cancel Total"] = material_billing[["YKS1", "YKS2", "ZCAN"]].sum(axis=1)
+                            material_billing = material_billing.rename(columns={"ZFR": "Presales", "YKF2": "HHT"})
+                            material_billing["Return %"] = np.where(
+                                material_billing["Sales Total"] != 0,
+                                (material_billing["Return"] / material_billing["Sales Total"] * 100).round(0),
+                                0
+                            )
+
+                            ordered_cols_material = [
+                                "Presales", "HHT", "Sales Total",
+                                "YKS1", "YKS2", "ZCAN",
+                                "Cancel Total", "YKRE", "ZRE",
+                                "Return", "Return %"
+                            ]
+                            material_billing = material_billing.reindex(columns=ordered_cols_material, fill_value=0)
+
+                            total_row = pd.DataFrame(material_billing.sum(numeric_only=True)).T
+                            total_row.index = ["Total"]
+                            total_row["Return %"] = round(
+                                (total_row["Return"] / total_row["Sales Total"] * 100), 0
+                            ) if total_row["Sales Total"].iloc[0] != 0 else 0
+                            material_billing = pd.concat([material_billing, total_row])
+
+                            # ✅ Display-only header renames (no logic change)
+                            material_show = apply_header_renames(material_billing)
+
+                            def highlight_total_row_material(row):
+                                if str(row.name).strip() == "Total":
+                                    return ['background-color: #BFDBFE; color: #1E3A8A; font-weight: 900'] * len(row)
+                                return ['' for _ in row]
+
+                            styled_material = (
+                                material_show.style
+                                .set_table_styles([
+                                    {'selector': 'th', 'props': [('background', '#1E3A8A'), ('color', 'white'),
+                                                                 ('font-weight', '800'), ('height', '40px'),
+                                                                 ('line-height', '40px'), ('border', '1px solid #E5E7EB')]}
+                                ])
+                                .apply(highlight_total_row_material, axis=1)
+                                .format({
+                                    "Presales": "{:,.0f}", "HHT": "{:,.0f}", "Sales Total": "{:,.0f}",
+                                    "HHTCancel": "{:,.0f}", "WH1 Cancel": "{:,.0f}", "WH2 Cancel": "{:,.0f}", "Total Cancel": "{:,.0f}",
+                                    "Salesman Return": "{:,.0f}", "Presales Return": "{:,.0f}",
+                                    "Return": "{:,.0f}", "Return %": "{:.0f}%"
+                                })
+                            )
+                            st.dataframe(styled_material, use_container_width=True, hide_index=False)
+
+                            material_token = (tracking.state_key, "return_by_material")
+                            if lazy_download_button(
+                                texts[lang].get("download_material", "Download Return by Material Description"),
+                                lambda df=material_billing: to_excel_bytes(df.reset_index(), sheet_name="Return_by_Material", index=False,
+                                                                           token=material_token),
+                                token=material_token,
+                                file_name=f"Return_by_Material_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx",
+                                mime=XLSX_MIME
+                            ):
+                                st.session_state["audit_log"].append({
+                                    "user": username,
+                                    "action": "download",
+                                    "details": "Return by Material Description Excel",
+                                    "timestamp": datetime.now()
+                                })
+                        else:
+                            st.info("No 'Material Description' column found in data — skipping Material Description table.")
+
+                        # --- Return by SP Name1 + Material Description ---
+                        st.subheader("🔄 Return Summary By Branch & Product ")
+                        required_cols = {"SP Name1", "Material Description", "Billing Type", "Net Value"}
+                        if required_cols.issubset(cube_filtered.columns):
+                            # Pivot table
+                            sp_mat_table = pd.pivot_table(
+                                cube_filtered,
+                                index=["SP Name1", "Material Description"],
+                                columns="Billing Type",
+                                values="Net Value",
+                                aggfunc="sum",
+                                fill_value=0, observed=True
+                            )
+
+                            # Ensure all billing columns exist
+                            billing_cols = ["ZFR", "YKF2", "YKRE", "YKS1", "YKS2", "ZCAN", "ZRE"]
+                            for col in billing_cols:
+                                if col not in sp_mat_table.columns:
+                                    sp_mat_table[col] = 0
+
+                            # Rename sales columns only (keep raw codes for logic)
+                            sp_mat_table = sp_mat_table.rename(columns={"ZFR": "Presales", "YKF2": "HHT"})
+
+                            # Calculate totals (logic unchanged)
+                            sp_mat_table["Sales Total"] = sp_mat_table.sum(axis=1, numeric_only=True)
+                            sp_mat_table["Return"] = sp_mat_table["YKRE"] + sp_mat_table["ZRE"]
+                            sp_mat_table["Cancel Total"] = sp_mat_table[["YKS1", "YKS2", "ZCAN"]].sum(axis=1)
+                            sp_mat_table["Return %"] = np.where(
+                                sp_mat_table["Sales Total"] != 0,
+                                (sp_mat_table["Return"] / sp_mat_table["Sales Total"] * 100).round(0),
+                                0
+                            )
+
+                            # Reorder columns (raw names)
+                            ordered_cols_spm = [
+                                "Presales", "HHT", "Sales Total",
+                                "YKS1", "YKS2", "ZCAN",
+                                "Cancel Total", "YKRE", "ZRE",
+                                "Return", "Return %"
+                            ]
+                            sp_mat_table = sp_mat_table.reindex(columns=ordered_cols_spm, fill_value=0)
+
+                            # Add total row
+                            total_row = pd.DataFrame(sp_mat_table.sum(numeric_only=True)).T
+                            total_row.index = [("Total", "")]
+                            total_row["Return %"] = round(
+                                (total_row["Return"] / total_row["Sales Total"] * 100), 0
+                            ) if total_row["Sales Total"].iloc[0] != 0 else 0
+                            sp_mat_table = pd.concat([sp_mat_table, total_row])
+
+                            # ✅ Display-only header renames (no logic change)
+                            sp_mat_show = apply_header_renames(sp_mat_table)
+
+                            def highlight_sp_mat(row):
+                                styles = []
+                                for col in row.index:
+                                    if row.name == ("Total", ""):
+                                        styles.append('background-color: #BFDBFE; color: #1E3A8A; font-weight: 900')
+                                    elif col == "Return" and row.get(col, 0) != 0:
+                                        styles.append('background-color: #FECACA; color: #991B1B; font-weight: 700')
+                                    elif col == "Total Cancel" and row.get(col, 0) != 0:
+                                        styles.append('background-color: #FDE68A; color: #92400E; font-weight: 700')
+                                    elif col == "Sales Total" and row.get(col, 0) != 0:
+                                        styles.append('background-color: #D1FAE5; color: #065F46; font-weight: 700')
+                                    else:
+                                        styles.append('')
+                                return styles
+
+                            styled_sp_mat = (
+                                sp_mat_show.style
+                                .set_table_styles([
+                                    {'selector': 'th', 'props': [('background', '#1E3A8A'), ('color', 'white'),
+                                                                 ('font-weight', '800'), ('height', '40px'),
+                                                                 ('line-height', '40px'), ('border', '1px solid #E5E7EB')]}
+                                ])
+                                .apply(highlight_sp_mat, axis=1)
+                                .format({
+                                    "Presales": "{:,.0f}", "HHT": "{:,.0f}", "Sales Total": "{:,.0f}",
+                                    "HHTCancel": "{:,.0f}", "WH1 Cancel": "{:,.0f}", "WH2 Cancel": "{:,.0f}", "Total Cancel": "{:,.0f}",
+                                    "Salesman Return": "{:,.0f}", "Presales Return": "{:,.0f}",
+                                    "Return": "{:,.0f}", "Return %": "{:.0f}%"
+                                })
+                            )
+
+                            st.dataframe(styled_sp_mat, use_container_width=True, hide_index=True)
+
+                            sp_material_token = (tracking.state_key, "return_by_sp_material")
+                            if lazy_download_button(
+                                texts[lang].get("download_sp_material", "Download Return by SP+Material"),
+                                lambda df=sp_mat_table: to_excel_bytes(df.reset_index(), sheet_name="Return_by_SP_Material", index=False,
+                                                                       token=sp_material_token),
+                                token=sp_material_token,
+                                file_name=f"Return_by_SP_Material_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx",
+                                mime=XLSX_MIME
+                            ):
+                                st.session_state["audit_log"].append({
+                                    "user": username,
+                                    "action": "download",
+                                    "details": "Return by SP+Material Excel",
+                                    "timestamp": datetime.now()
+                                })
+                        else:
+                            st.info("Required columns are missing in your data for SP+Material table.")
+
+                            
+                            
+
+
+                        # ------------------------------------------------
+                        # 🛵 Talabat – MTD details (Billing split / Customers / Daily trend + Excel)
+                        # ------------------------------------------------
+                        talabat_billing_split = tracking.talabat_billing_split
+                        talabat_customer_table = tracking.talabat_customer_table
+                        talabat_daily_trend = tracking.talabat_daily_trend
+
+
+                        # ------------------------------------------------
+                        # 🛵 Talabat – DISPLAY (your same style)
+                        # ------------------------------------------------
+                        st.markdown("---")
+                        st.subheader("🛵 Talabat -( Sales  / Returns / Cancellation  )- ( By Billing Type )")
+
+                        if isinstance(talabat_billing_split, pd.DataFrame) and (not talabat_billing_split.empty):
+                            st.dataframe(
+                                talabat_billing_split.style.format({
+                                    "ZFR": "{:,.0f}",
+                                    "HHT": "{:,.0f}",
+                                    "Returns": "{:,.0f}",
+                                    "Other": "{:,.0f}",
+                                    "Total": "{:,.0f}",
+                                }),
+                                use_container_width=True,
+                                hide_index=True
+                            )
+                        else:
+                            st.info("No Talabat data found in the selected filters.")
+
+                        st.subheader("🛵 Talabat – Customer / Outlet Summary")
+                        if isinstance(talabat_customer_table, pd.DataFrame) and (not talabat_customer_table.empty):
+                            st.dataframe(
+                                talabat_customer_table.style.format({
+                                    "Talabat Sales": "{:,.0f}",
+                                    "Orders": "{:,.0f}",
+                                }),
+                                use_container_width=True,
+                                hide_index=True
+                            )
+                        else:
+                            st.info("No Talabat customer-level data available (missing customer/outlet columns or no rows).")
+
+                        st.subheader("🛵 Talabat – Daily Trend (MTD)")
+                        if isinstance(talabat_daily_trend, pd.DataFrame) and (not talabat_daily_trend.empty):
+                            st.dataframe(
+                                talabat_daily_trend.style.format({
+                                    "ZFR": "{:,.0f}",
+                                    "HHT": "{:,.0f}",
+                                    "Returns": "{:,.0f}",
+                                    "Other": "{:,.0f}",
+                                    "Total": "{:,.0f}",
+                                }),
+                                use_container_width=True,
+                                hide_index=True
+                            )
+
+                            # Simple line chart (Total)
+                            try:
+                                fig_tal_daily = px.line(
+                                    talabat_daily_trend,
+                                    x="Date",
+                                    y="Total",
+                                    markers=True,
+                                    title="Talabat Daily Sales (Total)"
+                                )
+                                st.plotly_chart(fig_tal_daily, use_container_width=True)
+                            except Exception:
+                                pass
+                        else:
+                            st.info("No Talabat daily trend data available.")
+
+
+                        # ------------------------------------------------
+                        # ⬇️ Talabat Excel Download (3 sheets)
+                        # Uses your helper: to_multi_sheet_excel_bytes(dfs, sheet_names)
+                        # ------------------------------------------------
+                        if (isinstance(talabat_billing_split, pd.DataFrame) and not talabat_billing_split.empty) or \
+                        (isinstance(talabat_customer_table, pd.DataFrame) and not talabat_customer_table.empty) or \
+                        (isinstance(talabat_daily_trend, pd.DataFrame) and not talabat_daily_trend.empty):
+
+                            dfs = [
+                                talabat_billing_split.set_index("Salesman") if (not talabat_billing_split.empty and "Salesman" in talabat_billing_split.columns) else pd.DataFrame(),
+                                talabat_customer_table.set_index("Customer") if (not talabat_customer_table.empty and "Customer" in talabat_customer_table.columns) else pd.DataFrame(),
+                                talabat_daily_trend.set_index("Date") if (not talabat_daily_trend.empty and "Date" in talabat_daily_trend.columns) else pd.DataFrame(),
+                            ]
+                            sheet_names = ["Talabat_Billing_Split", "Talabat_Customers", "Talabat_Daily_Trend"]
+
+                            talabat_indexed_token = (tracking.state_key, "talabat_indexed")
+                            lazy_download_button(
+                                "⬇️ Download Talabat Details (Excel)",
+                                lambda dfs=dfs, sheet_names=sheet_names: to_multi_sheet_excel_bytes(dfs, sheet_names, token=talabat_indexed_token),
+                                token=talabat_indexed_token,
+                                file_name=f"Talabat_MTD_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx",
+                                mime=XLSX_MIME
+                            )
+
+
+                        # Download Talabat Excel (3 sheets)
+                        talabat_token = (tracking.state_key, "talabat")
+                        def talabat_xlsx(dfs=(talabat_billing_split, talabat_customer_table, talabat_daily_trend)):
+                            return to_multi_sheet_excel_bytes(
+                                dfs=dfs,
+                                sheet_names=[
+                                    "Talabat_Billing_Split",
+                                    "Talabat_Customers",
+                                    "Talabat_Daily_Trend",
+                                ],
+                                token=talabat_token,
+                            )
+
+                        if lazy_download_button(
+                            "⬇️ Download Talabat Details (Excel)",
+                            talabat_xlsx,
+                            token=talabat_token,
+                            file_name=f"Talabat_MTD_Details_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx",
+                            mime=XLSX_MIME
+                        ):
+                            st.session_state["audit_log"].append({
+                                "user": username,
+                                "action": "download",
+                                "details": "Talabat MTD Details (Excel)",
+                                "timestamp": datetime.now()
+                            })
+                            
+                            
+                        # ================================ 
+                        # 📊 CHARTS TAB 
+                        # ================================    
+                        with tabs[2]:
+
+                            from calendar import monthrange
+
+                            st.subheader("📈 Sales Trends & Channel Performance – Management Command Center")
+                            st.caption("Analytical view: Toggle period • Forecast • Run-rate • Channel • Salesman • Drivers")
+
+                            if df_filtered is None or df_filtered.empty:
+                                st.info("No data available for charts.")
+                                st.stop()
+
+                            if "Billing Date" not in df_filtered.columns:
+                                st.error("⚠️ 'Billing Date' column not found!")
+                                st.stop()
+
+                            df = cube_filtered.copy()   # daily cube rows (same sums, far fewer rows)
+                            df["Billing Date"] = pd.to_datetime(df["Billing Date"], errors="coerce").dt.normalize()
+                            df["Net Value"] = pd.to_numeric(df.get("Net Value", 0), errors="coerce").fillna(0.0)
+                            df = df.dropna(subset=["Billing Date"])
+
+                            if df.empty:
+                                st.info("No valid Billing Date rows to plot.")
+                                st.stop()
+
+                            # ---------------------------------------------------
+                            # 0️⃣ Period Toggle
+                            # ---------------------------------------------------
+                            gran = st.radio("View", ["Daily", "Weekly", "Monthly"], horizontal=True, index=0)
+                            freq_map = {"Daily": "D", "Weekly": "W-MON", "Monthly": "MS"}
+                            freq = freq_map[gran]
+
+                            # ---------------------------------------------------
+                            # 1️⃣ Forecast / run rate
+                            # ---------------------------------------------------
+                            as_of = df["Billing Date"].max()
+                            cm, cy = int(as_of.month), int(as_of.year)
+                            total_days_month = monthrange(cy, cm)[1]
+
+                            month_start = as_of.replace(day=1)
+                            df_cm = df[(df["Billing Date"] >= month_start) & (df["Billing Date"] <= as_of)]
+
+                            mtd_sales = float(df_cm["Net Value"].sum())
+                            days_passed = int(df_cm["Billing Date"].dt.date.nunique())
+                            remaining_days = max(total_days_month - days_passed, 0)
+
+                            avg_per_day = (mtd_sales / days_passed) if days_passed > 0 else 0.0
+                            month_end_forecast = mtd_sales + (avg_per_day * remaining_days)
+
+                            per_day_target = float(per_day_ka_target) if "per_day_ka_target" in locals() else 0.0
+                            monthly_target = per_day_target * total_days_month
+                            remaining_target = monthly_target - mtd_sales
+                            required_run_rate = (remaining_target / remaining_days) if remaining_days > 0 else 0.0
+                            achievement_mtd = (mtd_sales / monthly_target * 100) if monthly_target > 0 else 0.0
+
+                            # ---------------------------------------------------
+                            # 2️⃣ Channel totals
+                            # ---------------------------------------------------
+                            # Channel per cube row comes from the pipeline (anything not e-com counts as retail)
+                            is_ecom = tracking.is_ecom.loc[df.index].to_numpy()
+                            total_ecom = float(df.loc[is_ecom, "Net Value"].sum())
+                            total_retail = float(df.loc[~is_ecom, "Net Value"].sum())
+                            total_all = total_retail + total_ecom
+
+                            ecom_share = (total_ecom / total_all * 100) if total_all > 0 else 0.0
+                            retail_share = (total_retail / total_all * 100) if total_all > 0 else 0.0
+
+                            # ---------------------------------------------------
+                            # 3️⃣ KPI Strip
+                            # ---------------------------------------------------
+                            active_days = int(df["Billing Date"].dt.date.nunique())
+
+                            k1, k2, k3, k4, k5, k6 = st.columns(6)
+                            k1.metric("Total Sales", f"KD {total_all:,.0f}")
+                            k2.metric("Retail", f"KD {total_retail:,.0f}", f"{retail_share:.1f}%")
+                            k3.metric("E-com", f"KD {total_ecom:,.0f}", f"{ecom_share:.1f}%")
+                            k4.metric("MTD Sales", f"KD {mtd_sales:,.0f}", f"{achievement_mtd:.1f}%")
+                            k5.metric("Month-End Forecast", f"KD {month_end_forecast:,.0f}")
+                            k6.metric("Required / Day", f"KD {required_run_rate:,.0f}")
+
+                            st.caption(f"📅 As-of Date (from data): {as_of.date()} | Active Days in Filter: {active_days:,}")
+                            st.markdown("---")
+
+                            # ---------------------------------------------------
+                            # 4️⃣ Trend + Summary Table
+                            # ---------------------------------------------------
+                            trend_col, summary_col = st.columns([0.68, 0.32], gap="large")
+
+                            df_period = (
+                                df.groupby(pd.Grouper(key="Billing Date", freq=freq), observed=True)["Net Value"]
+                                .sum()
+                                .reset_index()
+                                .rename(columns={"Billing Date": "Period", "Net Value": "Sales"})
+                            )
+
+                            days_in_period = (
+                                df.assign(_date_only=df["Billing Date"].dt.date)
+                                .groupby(pd.Grouper(key="Billing Date", freq=freq), observed=True)["_date_only"]
+                                .nunique()
+                                .reset_index(name="Days")
+                                .rename(columns={"Billing Date": "Period"})
+                            )
+
+                            df_period = df_period.merge(days_in_period, on="Period", how="left")
+                            df_period["Days"] = pd.to_numeric(df_period["Days"], errors="coerce").fillna(1)
+                            df_period["Target"] = df_period["Days"] * per_day_target
+                            df_period = df_period.sort_values("Period")
+                            df_period["Ach%"] = np.where(df_period["Target"] > 0, (df_period["Sales"] / df_period["Target"]) * 100, 0.0)
+                            df_period["Gap"] = df_period["Sales"] - df_period["Target"]
+
+                            with trend_col:
+                                st.markdown(f"### 📌 {gran} Trend (Actual vs Target) + Month-End Forecast")
+
+                                fig_trend = go.Figure()
+
+                                fig_trend.add_trace(go.Scatter(
+                                    x=df_period["Period"],
+                                    y=df_period["Target"],
+                                    mode="lines",
+                                    name="Target",
+                                    line=dict(width=3, dash="dot", color="#F59E0B")
+                                ))
+
+                                fig_trend.add_trace(go.Scatter(
+                                    x=df_period["Period"],
+                                    y=df_period["Sales"],
+                                    mode="lines",
+                                    line=dict(width=0),
+                                    fill="tozeroy",
+                                    fillcolor="rgba(37,99,235,0.12)",
+                                    showlegend=False,
+                                    hoverinfo="skip"
+                                ))
+
+                                fig_trend.add_trace(go.Scatter(
+                                    x=df_period["Period"],
+                                    y=df_period["Sales"],
+                                    mode="lines+markers",
+                                    name="Actual Sales",
+                                    line=dict(width=4, color="#2563EB"),
+                                    marker=dict(size=8, color="#2563EB")
+                                ))
+
+                                fig_trend.add_hline(
+                                    y=month_end_forecast,
+                                    line_dash="dash",
+                                    line_color="#10B981",
+                                    annotation_text=f"Forecast: KD {month_end_forecast:,.0f}",
+                                    annotation_position="top right"
+                                )
+
+                                fig_trend.update_layout(
+                                    height=460,
+                                    template="plotly_white",
+                                    margin=dict(l=12, r=12, t=40, b=12),
+                                    paper_bgcolor="white",
+                                    plot_bgcolor="#F8FAFC",
+                                    font=dict(family="Segoe UI, Arial, sans-serif", size=13),
+                                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+                                    hovermode="x unified"
+                                )
+                                fig_trend.update_xaxes(type="date", tickformat="%d-%b")
+                                fig_trend.update_yaxes(title="Net Value (KD)", gridcolor="rgba(148,163,184,0.18)")
+                                st.plotly_chart(fig_trend, use_container_width=True)
+
+                            with summary_col:
+                                st.markdown("### 📋 Trend Summary Table")
+                                st.dataframe(
+                                    df_period[["Period", "Sales", "Target", "Ach%", "Gap"]].style.format({
+                                        "Sales": "{:,.0f}",
+                                        "Target": "{:,.0f}",
+                                        "Ach%": "{:.1f}%",
+                                        "Gap": "{:,.0f}",
+                                    }),
+                                    use_container_width=True,
+                                    hide_index=True
+                                )
+
+                            st.markdown("---")
+
+                            # ---------------------------------------------------
+                            # 4️⃣b Daily Trend, Anomalies & 30-Day Forecast
+                            # ---------------------------------------------------
+                            st.markdown("### 🔮 Daily Sales Trend, Anomalies & 30-Day Forecast")
+                            df_time = tracking.daily_sales.copy()
+
+                            if len(df_time) > 2:
+                                # Prophet is fitted in the background worker pool (cached by ds/y + horizon)
+                                forecast_job = get_forecast_service().submit(df_time[["ds", "y"]], model="prophet", horizon=30)
+
+                                # Anomalies: outside rolling 7-day mean ± 2 std
+                                df_time["y_mean"] = df_time["y"].rolling(window=7).mean()
+                                df_time["y_std"] = df_time["y"].rolling(window=7).std()
+                                df_time["upper"] = df_time["y_mean"] + 2 * df_time["y_std"]
+                                df_time["lower"] = df_time["y_mean"] - 2 * df_time["y_std"]
+                                df_time["anomaly"] = np.where(
+                                    (df_time["y"] > df_time["upper"]) | (df_time["y"] < df_time["lower"]),
+                                    df_time["y"], np.nan
+                                )
+
+                                fig_forecast = go.Figure()
+                                fig_forecast.add_trace(go.Scatter(
+                                    x=df_time["ds"], y=df_time["y"],
+                                    mode="lines+markers",
+                                    name="Actual Sales",
+                                    line=dict(color="#0052CC", width=3)
+                                ))
+                                fig_forecast.add_trace(go.Scatter(
+                                    x=df_time["ds"], y=df_time["anomaly"],
+                                    mode="markers",
+                                    name="Anomaly",
+                                    marker=dict(color="red", size=12, symbol="x")
+                                ))
+                                fig_forecast.update_layout(
+                                    xaxis_title="Date",
+                                    yaxis_title="Net Value (KD)",
+                                    hovermode="x unified",
+                                    template="plotly_white"
+                                )
+                                # Actuals render now; the forecast line is filled in when the job finishes
+                                def draw_forecast(job=forecast_job, fig=fig_forecast):
+                                    fig = go.Figure(fig)
+                                    try:
+                                        forecast = job.result()
+                                        fig.add_trace(go.Scatter(
+                                            x=forecast["ds"], y=forecast["yhat"],
+                                            mode="lines",
+                                            name="Sales Forecast",
+                                            line=dict(color="#22C55E", width=2, dash="dash")
+                                        ))
+                                    except Exception as e:
+                                        st.warning(f"⚠️ Forecast unavailable: {e}")
+                                    st.plotly_chart(fig, use_container_width=True)
+
+                                def forecast_pending(fig=fig_forecast):
+                                    st.plotly_chart(fig, use_container_width=True)
+                                    st.caption("⏳ Forecast is being computed in the background…")
+
+                                fill_when_done(forecast_job, draw_forecast, pending=forecast_pending)
+                            else:
+                                st.info("Not enough trend data")
+
+                            st.markdown("---")
+
+                            # ---------------------------------------------------
+                            # 5️⃣ Channel Split + Category Split
+                            # ---------------------------------------------------
+                            split_col1, split_col2 = st.columns(2, gap="large")
+
+                            with split_col1:
+                                st.markdown("### 🍕 Channel Split (Retail vs E-com)")
+
+                                fig_pizza = go.Figure(go.Pie(
+                                    labels=["Retail", "E-com"],
+                                    values=[total_retail, total_ecom],
+                                    hole=0.68,
+                                    sort=False,
+                                    direction="clockwise",
+                                    rotation=220,
+                                    pull=[0.03, 0.08],
+                                    textinfo="percent+label",
+                                    textposition="outside",
+                                    marker=dict(
+                                        colors=["#3B82F6", "#10B981"],
+                                        line=dict(color="white", width=4)
+                                    )
+                                ))
+
+                                fig_pizza.update_layout(
+                                    height=360,
+                                    template="plotly_white",
+                                    margin=dict(l=10, r=10, t=40, b=10),
+                                    paper_bgcolor="white",
+                                    plot_bgcolor="white",
+                                    showlegend=False,
+                                    font=dict(family="Segoe UI, Arial, sans-serif"),
+                                    annotations=[dict(
+                                        text=f"Total<br><b>KD {total_all:,.0f}</b>",
+                                        x=0.5, y=0.5,
+                                        showarrow=False,
+                                        font=dict(size=18, color="#0F172A")
+                                    )]
+                                )
+                                st.plotly_chart(fig_pizza, use_container_width=True)
+
+                                ch_tbl = pd.DataFrame({
+                                    "Channel": ["Retail", "E-com", "TOTAL"],
+                                    "Sales (KD)": [total_retail, total_ecom, total_all],
+                                    "Share %": [retail_share, ecom_share, 100.0 if total_all > 0 else 0.0]
+                                })
+                                st.dataframe(
+                                    ch_tbl.style.format({
+                                        "Sales (KD)": "{:,.0f}",
+                                        "Share %": "{:.1f}%"
+                                    }),
+                                    use_container_width=True,
+                                    hide_index=True
+                                )
+
+                            with split_col2:
+                                st.markdown("### 🧩 Category Split (Chilled / Frozen / Grocery)")
+
+                                cat_df = df.copy()
+                                price_df = st.session_state.get("price_df", pd.DataFrame()).copy()
+
+                                if "Material Description" not in cat_df.columns:
+                                    st.warning("⚠️ 'Material Description' column not found in current MTD data.")
+                                elif price_df.empty:
+                                    st.warning("⚠️ Price list sheet is empty or not loaded.")
+                                elif "Material Description" not in price_df.columns:
+                                    st.warning("⚠️ 'Material Description' column not found in price list sheet.")
+                                else:
+                                    category_col = None
+                                    for c in ["Category", "CATEGORY", "Material Category", "Group", "Division"]:
+                                        if c in price_df.columns:
+                                            category_col = c
+                                            break
+
+                                    if category_col is None:
+                                        st.warning("⚠️ Category column not found in price list sheet.")
+                                    else:
+                                        price_index = get_price_index(price_df)
+                                        cat_df["Category"] = (
+                                            price_index.lookup(cat_df["Material Description"], [category_col])[category_col]
+                                            .fillna("Unmapped")
+                                        )
+
+                                        cat_sales = (
+                                            cat_df[cat_df["Category"].isin(["Chilled", "Frozen", "Grocery"])]
+                                            .groupby("Category", dropna=False, observed=True)["Net Value"]
+                                            .sum()
+                                            .reindex(["Chilled", "Frozen", "Grocery"], fill_value=0.0)
+                                            .reset_index()
+                                            .rename(columns={"Net Value": "Sales"})
+                                        )
+
+                                        total_cat = float(cat_sales["Sales"].sum())
+                                        cat_sales["Share %"] = np.where(
+                                            total_cat > 0,
+                                            (cat_sales["Sales"] / total_cat * 100),
+                                            0.0
+                                        )
+
+                                        fig_cat = go.Figure(go.Pie(
+                                            labels=cat_sales["Category"],
+                                            values=cat_sales["Sales"],
+                                            hole=0.68,
+                                            sort=False,
+                                            direction="clockwise",
+                                            rotation=220,
+                                            pull=[0.04, 0.04, 0.04],
+                                            textinfo="percent+label",
+                                            textposition="outside",
+                                            marker=dict(
+                                                colors=["#3B82F6", "#F97316", "#10B981"],
+                                                line=dict(color="white", width=4)
+                                            )
+                                        ))
+
+                                        fig_cat.update_layout(
+                                            height=360,
+                                            template="plotly_white",
+                                            margin=dict(l=10, r=10, t=40, b=10),
+                                            paper_bgcolor="white",
+                                            plot_bgcolor="white",
+                                            showlegend=False,
+                                            font=dict(family="Segoe UI, Arial, sans-serif"),
+                                            annotations=[dict(
+                                                text=f"Total<br><b>KD {total_cat:,.0f}</b>",
+                                                x=0.5, y=0.5,
+                                                showarrow=False,
+                                                font=dict(size=18, color="#0F172A")
+                                            )]
+                                        )
+                                        st.plotly_chart(fig_cat, use_container_width=True)
+
+                                        cat_tbl = pd.DataFrame({
+                                            "Category": ["Chilled", "Frozen", "Grocery", "TOTAL"],
+                                            "Sales (KD)": [
+                                                float(cat_sales.loc[cat_sales["Category"] == "Chilled", "Sales"].sum()),
+                                                float(cat_sales.loc[cat_sales["Category"] == "Frozen", "Sales"].sum()),
+                                                float(cat_sales.loc[cat_sales["Category"] == "Grocery", "Sales"].sum()),
+                                                total_cat
+                                            ],
+                                            "Share %": [
+                                                float(cat_sales.loc[cat_sales["Category"] == "Chilled", "Share %"].sum()),
+                                                float(cat_sales.loc[cat_sales["Category"] == "Frozen", "Share %"].sum()),
+                                                float(cat_sales.loc[cat_sales["Category"] == "Grocery", "Share %"].sum()),
+                                                100.0 if total_cat > 0 else 0.0
+                                            ]
+                                        })
+
+                                        st.dataframe(
+                                            cat_tbl.style.format({
+                                                "Sales (KD)": "{:,.0f}",
+                                                "Share %": "{:.1f}%"
+                                            }),
+                                            use_container_width=True,
+                                            hide_index=True
+                                        )
+
+                            st.markdown("---")
+
+                            # ---------------------------------------------------
+                            # 6️⃣ Channel Trend
+                            # ---------------------------------------------------
+                            st.markdown(f"### 📊 {gran} Channel Trend (Retail vs E-com)")
+
+                            tx = df.assign(Ch2=np.where(is_ecom, "E-com", "Retail"))
+
+                            ch_period = (
+                                tx.groupby([pd.Grouper(key="Billing Date", freq=freq), "Ch2"], observed=True)["Net Value"]
+                                .sum()
+                                .reset_index()
+                                .rename(columns={"Billing Date": "Period"})
+                            )
+
+                            pivot = ch_period.pivot(index="Period", columns="Ch2", values="Net Value").fillna(0.0)
+                            for col in ["Retail", "E-com"]:
+                                if col not in pivot.columns:
+                                    pivot[col] = 0.0
+                            pivot = pivot[["Retail", "E-com"]].reset_index().sort_values("Period")
+
+                            fig_area = go.Figure()
+                            fig_area.add_trace(go.Scatter(
+                                x=pivot["Period"],
+                                y=pivot["Retail"],
+                                mode="lines",
+                                name="Retail",
+                                line=dict(width=3, color="#3B82F6"),
+                                stackgroup="one"
+                            ))
+                            fig_area.add_trace(go.Scatter(
+                                x=pivot["Period"],
+                                y=pivot["E-com"],
+                                mode="lines",
+                                name="E-com",
+                                line=dict(width=3, color="#10B981"),
+                                stackgroup="one"
+                            ))
+
+                            fig_area.update_layout(
+                                height=440,
+                                template="plotly_white",
+                                margin=dict(l=12, r=12, t=40, b=12),
+                                paper_bgcolor="white",
+                                plot_bgcolor="#F8FAFC",
+                                font=dict(family="Segoe UI, Arial, sans-serif", size=13),
+                                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+                            )
+                            fig_area.update_xaxes(type="date", tickformat="%d-%b")
+                            fig_area.update_yaxes(title="Net Value (KD)", gridcolor="rgba(148,163,184,0.18)")
+                            st.plotly_chart(fig_area, use_container_width=True)
+
+                            st.markdown("---")
+
+                            # ---------------------------------------------------
+                            # 7️⃣ Salesman Performance
+                            # ---------------------------------------------------
+                            st.markdown("### 💪 Salesman Performance (Analytical)")
+
+                            salesman_col = None
+                            for c in ["Driver Name EN", "Salesman", "Sales Rep", "Salesperson"]:
+                                if c in df.columns:
+                                    salesman_col = c
+                                    break
+
+                            if salesman_col is None:
+                                st.info("Salesman column not found, skipping salesman charts.")
+                            else:
+                                sales_by_sm = df.groupby(salesman_col, observed=True)["Net Value"].sum().sort_values(ascending=False)
+
+                                if (target_df is not None) and (salesman_col in target_df.columns) and ("KA Target" in target_df.columns):
+                                    tgt = target_df[[salesman_col, "KA Target"]].copy()
+                                    tgt["KA Target"] = pd.to_numeric(tgt["KA Target"], errors="coerce").fillna(0.0)
+
+                                    sm = (
+                                        sales_by_sm.reset_index()
+                                        .rename(columns={salesman_col: "Salesman", "Net Value": "Sales"})
+                                        .merge(tgt.rename(columns={salesman_col: "Salesman"}), on="Salesman", how="left")
+                                        .fillna({"KA Target": 0.0})
+                                    )
+                                else:
+                                    sm = sales_by_sm.reset_index()
+                                    sm.columns = ["Salesman", "Sales"]
+                                    sm["KA Target"] = 0.0
+
+                                sm["Achievement %"] = np.where(sm["KA Target"] > 0, (sm["Sales"] / sm["KA Target"]) * 100, 0.0)
+                                sm["Gap"] = sm["Sales"] - sm["KA Target"]
+                                total_sm_sales = float(sm["Sales"].sum()) if float(sm["Sales"].sum()) != 0 else 1.0
+                                sm["Contribution %"] = (sm["Sales"] / total_sm_sales) * 100
+
+                                sm_view = sm.sort_values("Sales", ascending=False).head(20)
+
+                                cc1, cc2 = st.columns([0.55, 0.45], gap="large")
+
+                                with cc1:
+                                    st.markdown("#### 🎯 Achievement % (Top 20)")
+                                    fig_ach = go.Figure(go.Bar(
+                                        x=sm_view["Salesman"],
+                                        y=sm_view["Achievement %"],
+                                        text=[f"{v:.1f}%" for v in sm_view["Achievement %"]],
+                                        textposition="outside",
+                                        name="Achievement %",
+                                        marker=dict(
+                                            color=sm_view["Achievement %"],
+                                            colorscale="Blues",
+                                            line=dict(color="rgba(255,255,255,0.85)", width=1.5)
+                                        )
+                                    ))
+                                    fig_ach.update_layout(
+                                        height=440,
+                                        template="plotly_white",
+                                        margin=dict(l=12, r=12, t=40, b=12),
+                                        paper_bgcolor="white",
+                                        plot_bgcolor="#F8FAFC",
+                                        font=dict(family="Segoe UI, Arial, sans-serif", size=13)
+                                    )
+                                    fig_ach.update_yaxes(title="Achievement %", gridcolor="rgba(148,163,184,0.18)")
+                                    fig_ach.update_xaxes(title="Salesman")
+                                    st.plotly_chart(fig_ach, use_container_width=True)
+
+                                with cc2:
+                                    st.markdown("#### 📌 Top 3 / Bottom 3 Quick View")
+                                    top3 = sm.sort_values("Sales", ascending=False).head(3)[["Salesman", "Sales", "Achievement %"]]
+                                    bot3 = sm.sort_values("Sales", ascending=True).head(3)[["Salesman", "Sales", "Achievement %"]]
+
+                                    st.write("✅ Top 3")
+                                    st.dataframe(top3, use_container_width=True, hide_index=True)
+                                    st.write("⚠️ Bottom 3")
+                                    st.dataframe(bot3, use_container_width=True, hide_index=True)
+
+                                with st.expander("📋 Salesman Detail Table (All)", expanded=False):
+                                    sm_tbl = sm.sort_values("Sales", ascending=False)[
+                                        ["Salesman", "Sales", "KA Target", "Achievement %", "Gap", "Contribution %"]
+                                    ]
+                                    st.dataframe(sm_tbl, use_container_width=True, hide_index=True)
+
+                            st.markdown("---")
+
+                            # ---------------------------------------------------
+                            # 8️⃣ Key Drivers
+                            # ---------------------------------------------------
+                            st.markdown("### 🏆 Key Drivers")
+
+                            d1, d2 = st.columns(2, gap="large")
+
+                            with d1:
+                                st.markdown("#### 👤 Top 10 Customers by Sales")
+                                if "PY Name 1" not in df.columns:
+                                    st.error("⚠️ 'PY Name 1' column not found!")
+                                else:
+                                    top10_c = (
+                                        df.groupby("PY Name 1", observed=True)["Net Value"]
+                                        .sum().sort_values(ascending=False).head(10)
+                                        .reset_index()
+                                        .rename(columns={"PY Name 1": "Customer", "Net Value": "Sales"})
+                                    )
+                                    top10_c = top10_c.sort_values("Sales", ascending=True)
+
+                                    fig_top10c = go.Figure(go.Bar(
+                                        x=top10_c["Sales"],
+                                        y=top10_c["Customer"],
+                                        orientation="h",
+                                        text=[f"KD {v:,.0f}" for v in top10_c["Sales"]],
+                                        textposition="outside",
+                                        marker=dict(
+                                            color=top10_c["Sales"],
+                                            colorscale="Blues",
+                                            line=dict(color="rgba(255,255,255,0.85)", width=1.5)
+                                        )
+                                    ))
+                                    fig_top10c.update_layout(
+                                        height=520,
+                                        template="plotly_white",
+                                        margin=dict(l=12, r=12, t=40, b=12),
+                                        paper_bgcolor="white",
+                                        plot_bgcolor="#F8FAFC",
+                                        font=dict(family="Segoe UI, Arial, sans-serif", size=13)
+                                    )
+                                    fig_top10c.update_xaxes(title="Net Value (KD)", gridcolor="rgba(148,163,184,0.18)")
+                                    fig_top10c.update_yaxes(title="")
+                                    st.plotly_chart(fig_top10c, use_container_width=True)
+
+                            with d2:
+                                st.markdown("#### 🧾 Top 10 SKU by Sales")
+                                sku_col = None
+                                for c in ["Material Description", "Material", "SKU", "Material Code"]:
+                                    if c in df.columns:
+                                        sku_col = c
+                                        break
+
+                                if sku_col is None:
+                                    st.info("SKU column not found (Material Description / Material / SKU).")
+                                else:
+                                    top10_sku = (
+                                        df.groupby(sku_col, observed=True)["Net Value"]
+                                        .sum().sort_values(ascending=False).head(10)
+                                        .reset_index()
+                                        .rename(columns={sku_col: "SKU", "Net Value": "Sales"})
+                                    )
+                                    top10_sku = top10_sku.sort_values("Sales", ascending=True)
+
+                                    fig_top10s = go.Figure(go.Bar(
+                                        x=top10_sku["Sales"],
+                                        y=top10_sku["SKU"],
+                                        orientation="h",
+                                        text=[f"KD {v:,.0f}" for v in top10_sku["Sales"]],
+                                        textposition="outside",
+                                        marker=dict(
+                                            color=top10_sku["Sales"],
+                                            colorscale="Greens",
+                                            line=dict(color="rgba(255,255,255,0.85)", width=1.5)
+                                        )
+                                    ))
+                                    fig_top10s.update_layout(
+                                        height=520,
+                                        template="plotly_white",
+                                        margin=dict(l=12, r=12, t=40, b=12),
+                                        paper_bgcolor="white",
+                                        plot_bgcolor="#F8FAFC",
+                                        font=dict(family="Segoe UI, Arial, sans-serif", size=13)
+                                    )
+                                    fig_top10s.update_xaxes(title="Net Value (KD)", gridcolor="rgba(148,163,184,0.18)")
+                                    fig_top10s.update_yaxes(title="")
+                                    st.plotly_chart(fig_top10s, use_container_width=True)
+
+            
+            
+            # --- DOWNLOADS ---
+                    with tabs[3]:
+                        st.subheader(texts[lang]["download_reports_sub"])
+                        col1, col2 = st.columns(2)
+
+                        # --------------------------
+                        # COL 1: PPTX DOWNLOAD HUB + MANAGEMENT PACK
+                        # --------------------------
+                        with col1:
+                            st.markdown("### 📊 Management PPT Download Hub")
+
+                            SLIDE_CATALOG = [
+                                ("TITLE", "01) Title"),
+                                ("KPI", "02) KPI Summary"),
+                                ("TREND", "03) Daily Sales Trend"),
+                                ("CHANNEL", "04) Retail vs E-com"),
+                                ("CHANNEL_TREND", "05) Channel Trend Over Time"),
+                                ("SALESMAN", "06) Salesman Performance"),
+                                ("CUSTOMERS", "07) Top 10 Customers"),
+                                ("SKUS", "08) Top 10 SKU"),
+                                ("TALABAT", "09) Talabat Summary"),
+                                ("INSIGHTS", "10) Executive Insights"),
+                                ("APPENDIX", "11) Appendix Tables"),
+                            ]
+
+                            AUTO_10 = ["TITLE","KPI","TREND","CHANNEL","CHANNEL_TREND","SALESMAN","CUSTOMERS","SKUS","TALABAT","INSIGHTS"]
+
+                            ppt_mode = st.radio(
+                                "PPT Mode",
+                                ["Auto (10 Slides)", "Custom (Select up to 10 Slides)"],
+                                horizontal=True,
+                                key="ppt_mode_download_hub"
+                            )
+
+                            if ppt_mode == "Auto (10 Slides)":
+                                selected_slide_keys = AUTO_10
+                                st.caption("✅ Auto mode: Generates full 10-slide management pack.")
+                            else:
+                                labels = [lbl for _, lbl in SLIDE_CATALOG]
+                                chosen_labels = st.multiselect("Select slides (max 10)", labels, key="ppt_custom_slide_select")
+                                label_to_key = {lbl: key for key, lbl in SLIDE_CATALOG}
+                                selected_slide_keys = [label_to_key[l] for l in chosen_labels]
+                                if len(selected_slide_keys) > 10:
+                                    st.error("⚠️ Max 10 slides only. Please remove extra slides.")
+                                    selected_slide_keys = selected_slide_keys[:10]
+
+                            st.info(f"Slides selected: {len(selected_slide_keys)}")
+                            native_charts = st.checkbox(
+                                "Editable PowerPoint charts (smaller deck; unsupported charts stay images)",
+                                value=True,
+                                key="ppt_native_charts"
+                            )
+
+                            # Build figures from current chart scope
+                            figs_dict = {}
+                            if 'fig_trend' in locals() and fig_trend is not None:
+                                figs_dict['TREND'] = fig_trend
+                            if 'fig_pizza' in locals() and fig_pizza is not None:
+                                figs_dict['CHANNEL'] = fig_pizza
+                            elif 'fig_bar' in locals() and fig_bar is not None:
+                                figs_dict['CHANNEL'] = fig_bar
+                            if 'fig_area' in locals() and fig_area is not None:
+                                figs_dict['CHANNEL_TREND'] = fig_area
+                            if 'fig_ach' in locals() and fig_ach is not None:
+                                figs_dict['SALESMAN'] = fig_ach
+                            if 'fig_top10c' in locals() and fig_top10c is not None:
+                                figs_dict['CUSTOMERS'] = fig_top10c
+                            if 'fig_top10s' in locals() and fig_top10s is not None:
+                                figs_dict['SKUS'] = fig_top10s
+
+                            talabat_ppt_tables = {
+                                'billing_split': talabat_billing_split if 'talabat_billing_split' in locals() else pd.DataFrame(),
+                                'customers': talabat_customer_table.head(25) if ('talabat_customer_table' in locals() and isinstance(talabat_customer_table, pd.DataFrame)) else pd.DataFrame(),
+                            }
+
+                            report_df_safe = report_df_with_total if 'report_df_with_total' in locals() else pd.DataFrame()
+                            billing_df_safe = billing_df if 'billing_df' in locals() else pd.DataFrame()
+                            py_table_safe = py_table_with_total if 'py_table_with_total' in locals() else pd.DataFrame()
+                            kpi_data_safe = kpi_data if 'kpi_data' in locals() else {}
+
+                            top_customer_share = 0.0
+                            try:
+                                if not py_table_safe.empty and 'Sales' in py_table_safe.columns:
+                                    _sales = pd.to_numeric(py_table_safe['Sales'], errors='coerce').fillna(0)
+                                    _total = float(_sales.sum())
+                                    top_customer_share = float(_sales.head(5).sum() / _total * 100) if _total > 0 else 0.0
+                            except Exception:
+                                pass
+
+                            top_sku_share = 0.0
+                            try:
+                                if 'top10_sku' in locals() and isinstance(top10_sku, pd.DataFrame) and not top10_sku.empty:
+                                    _sku_sales = pd.to_numeric(top10_sku['Sales'], errors='coerce').fillna(0)
+                                    _grand = float(pd.to_numeric(df_filtered['Net Value'], errors='coerce').fillna(0).sum()) if 'df_filtered' in locals() else 0.0
+                                    top_sku_share = float(_sku_sales.head(5).sum() / _grand * 100) if _grand > 0 else 0.0
+                            except Exception:
+                                pass
+
+                            extra_context = {
+                                'prepared_by': st.session_state.get('name', 'Mohamed Haneef'),
+                                'report_title': 'Khazan Sales Dashboard – MTD Management Report',
+                                'period_text': f"Period: {date_range[0].strftime('%d %b %Y')} to {date_range[1].strftime('%d %b %Y')}" if 'date_range' in locals() else datetime.now().strftime('%d %b %Y'),
+                                'top_customer_share': top_customer_share,
+                                'top_sku_share': top_sku_share,
+                                'retail_share': retail_sales_pct if 'retail_sales_pct' in locals() else 0.0,
+                                'ecom_share': ecom_sales_pct if 'ecom_sales_pct' in locals() else 0.0,
+                                'mtd_achievement': achievement_mtd if 'achievement_mtd' in locals() else 0.0,
+                            }
+
+                            # Deck and pack are built when their button is clicked (not on every rerun)
+                            def build_pptx():
+                                return create_pptx(
+                                    report_df_safe,
+                                    billing_df_safe,
+                                    py_table_safe,
+                                    figs_dict,
+                                    kpi_data_safe,
+                                    talabat_tables=talabat_ppt_tables,
+                                    selected_slide_keys=selected_slide_keys,
+                                    slide_catalog=SLIDE_CATALOG,
+                                    extra_context=extra_context,
+                                    lang=lang,
+                                    chart_mode="native" if native_charts else "image",
+                                    show_spinner=False,
+                                )
+
+                            # the figures follow the filters, Top N and the trend granularity
+                            pptx_token = (
+                                tracking.state_key, "pptx", top_n, gran if 'gran' in locals() else None, lang,
+                                tuple(selected_slide_keys), native_charts, extra_context['prepared_by'],
+                            )
+                            lazy_download_button(
+                                '⬇️ Download PPTX',
+                                build_pptx,
+                                token=pptx_token,
+                                file_name=f"sales_report_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.pptx",
+                                mime='application/vnd.openxmlformats-officedocument.presentationml.presentation',
+                                use_container_width=True,
+                                key='download_pptx_hub_btn'
+                            )
+
+                            # Optional: one-click management pack zip
+                            try:
+                                raw_df_safe = df_filtered if 'df_filtered' in locals() else pd.DataFrame()
+                            except Exception:
+                                raw_df_safe = pd.DataFrame()
+
+                            def build_pack():
+                                pack_buffer = io.BytesIO()
+                                with zipfile.ZipFile(pack_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+                                    zf.writestr(f"sales_report_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.pptx", export_payload(build_pptx, pptx_token))
+                                    if not report_df_safe.empty:
+                                        zf.writestr('mtd_summary.xlsx', to_excel_bytes(report_df_safe, sheet_name='MTD_Summary', index=False))
+                                    if not billing_df_safe.empty:
+                                        zf.writestr('billing_summary.xlsx', to_excel_bytes(billing_df_safe.reset_index(), sheet_name='Billing', index=False,
+                                                                                        token=(tracking.state_key, 'pack_billing')))
+                                    if not py_table_safe.empty:
+                                        zf.writestr('customer_summary.xlsx', to_excel_bytes(py_table_safe.reset_index(), sheet_name='Customers', index=False,
+                                                                                         token=(tracking.state_key, 'pack_customers')))
+                                    if not raw_df_safe.empty:
+                                        zf.writestr('raw_filtered_data.xlsx', to_excel_bytes(raw_df_safe, sheet_name='Raw_Data', index=False,
+                                                                                           token=(tracking.state_key, 'pack_raw')))
+                                return pack_buffer.getvalue()
+
+                            lazy_download_button(
+                                '⬇️ Download Management Pack (.zip)',
+                                build_pack,
+                                token=(*pptx_token, "pack"),
+                                file_name=f"management_pack_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.zip",
+                                mime='application/zip',
+                                use_container_width=True,
+                                key='download_management_pack_zip'
+                            )
+
+                            # Morning bundle: summary / billing / customers / Talabat / KA daily + deck, one pass
+                            def build_daily_bundle():
+                                artifacts = tracking_artifacts(tracking)
+                                artifacts[f"sales_report_{datetime.now().strftime('%Y-%m-%d')}.pptx"] = (
+                                    lambda: export_payload(build_pptx, pptx_token)
+                                )
+                                return build_bundle(artifacts)
+
+                            lazy_download_button(
+                                '⬇️ Download Daily Report Bundle (.zip)',
+                                build_daily_bundle,
+                                token=(*pptx_token, "bundle"),
+                                file_name=f"daily_report_bundle_{datetime.now().strftime('%Y-%m-%d')}.zip",
+                                mime='application/zip',
+                                use_container_width=True,
+                                key='download_daily_bundle_zip'
+                            )
+
+                            if 'audit_log' in st.session_state:
+                                st.session_state['audit_log'].append({
+                                    'user': username,
+                                    'action': 'download',
+                                    'details': f'PPTX / Pack ({ppt_mode})',
+                                    'timestamp': datetime.now()
+                                })
+
+                        # --------------------------
+                        # COL 2: EXCEL DOWNLOADS
+                        # --------------------------
+                        with col2:
+                            # ==============================
+                            # 🎯 KA Target Daily Sheet (Full Month) - DOWNLOAD
+                            # ==============================
+                            st.markdown("### 🎯 KA Target – Daily Sheet (Full Month)")
+
+                            # Safety checks (avoid crash if variables missing)
+                            if "df_filtered" not in locals() or not isinstance(df_filtered, pd.DataFrame) or df_filtered.empty:
+                                st.info("No data available to generate KA Target Daily file.")
+                            else:
+                                # HHT / PRESALES / Sales Total / Talabat rows per salesman, one column per day
+                                ka_daily_df = tracking.ka_daily_df
+
+                                ka_daily_token = (tracking.state_key, "ka_daily")
+                                if lazy_download_button(
+                                    "⬇️ Download KA Target Daily (Excel)",
+                                    lambda df=ka_daily_df: to_excel_bytes(df, sheet_name="KA_Target_Daily", index=False,
+                                                                          token=ka_daily_token),
+                                    token=ka_daily_token, prefetch=True,
+                                    file_name=f"KA_Target_Daily_{datetime.now().strftime('%Y-%m')}.xlsx",
+                                    mime=XLSX_MIME
+                                ):
+                                    if "audit_log" in st.session_state:
+                                        st.session_state["audit_log"].append({
+                                            "user": username,
+                                            "action": "download",
+                                            "details": "KA Target Daily (Excel)",
+                                            "timestamp": datetime.now()
+                                        })
@@ -0,0 +1,187 @@
+# ================= SP/PY TARGET ALLOCATION PAGE =================
+
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from app_pages.common import XLSX_MIME, lazy_download_button, to_excel_bytes
+from app_pages.context import DataContext
+from date_index import date_slice
+
+
+def render(ctx: DataContext):
+    username = ctx.username
+
+    st.title("🎯 By Customer & By Branch Target Allocation")
+    if "data_loaded" not in st.session_state:
+        st.warning("⚠️ Please upload the Excel file from the sidebar first.")
+        st.stop()
+
+    sales_df = st.session_state["sales_df"]
+    ytd_df = st.session_state["ytd_df"]
+    target_df = st.session_state.get("target_df", pd.DataFrame())
+
+    st.subheader("Configuration")
+    st.markdown('<div class="tooltip">ℹ️<span class="tooltiptext">Allocate targets by branch or customer based on historical sales.</span></div>', unsafe_allow_html=True)
+        # Target allocation grouping choice
+    allocation_type = st.radio(
+        "Select Target Allocation Type",
+        ["By Branch", "By Customer"]
+    )
+
+    # Map choice to actual column
+    group_col = "SP Name1" if allocation_type == "By Branch" else "PY Name 1"
+
+    target_option = st.radio("Select Target Input Option", ["Manual", "Auto (from 'Target' sheet)"])
+
+    total_target = 0
+    if target_option == "Manual":
+        total_target = st.number_input("Enter the Total Target to be Allocated for this Month (KD)", min_value=0, value=1000000, step=1000)
+    else:
+        if target_df.empty or "KA Target" not in target_df.columns:
+            st.error("❌ 'Target' sheet or 'KA Target' column not found. Please upload a file with this sheet for 'Auto' mode.")
+            st.stop()
+        total_target = target_df["KA Target"].sum()
+        st.info(f"Using Total Target from 'Target' sheet: KD {total_target:,.0f}")
+
+    if total_target <= 0:
+        st.warning("Please ensure the total target is greater than 0.")
+        st.stop()
+
+    st.subheader("Historical Data Period")
+    today = pd.Timestamp.today().normalize()
+    data_period_option = st.radio("Select Historical Data Period", ["Last 6 Months", "Manual Days"], index=1)
+
+    if data_period_option == "Last 6 Months":
+        lookback_period = pd.DateOffset(months=6)
+        days_label = "6 Months"; months_count = 6
+        end_date_selected = today; start_date_selected = today - lookback_period
+    else:
+        start_date_manual = today - pd.DateOffset(days=180)
+        selected_dates = st.date_input("Select date range", value=(start_date_manual, today))
+        if len(selected_dates) == 2:
+            start_date_selected, end_date_selected = selected_dates
+            lookback_period = end_date_selected - start_date_selected
+            days_label = f"From {start_date_selected.strftime('%Y-%m-%d')} to {end_date_selected.strftime('%Y-%m-%d')}"
+            months_count = lookback_period.days / 30
+        else:
+            st.warning("Please select both a start and an end date.")
+            st.stop()
+
+    historical_df = date_slice(ytd_df, pd.Timestamp(start_date_selected), pd.Timestamp(end_date_selected), ctx.data_version, "session:ytd")
+    if historical_df.empty:
+        st.warning(f"⚠️ No sales data available in 'YTD' for {days_label}.")
+        st.stop()
+
+    historical_sales = historical_df.groupby(group_col, observed=True)["Net Value"].sum()
+    total_historical_sales_value = historical_sales.sum()
+    month_start = today.replace(day=1)
+    current_month_sales_df = date_slice(sales_df, month_start, month_start + pd.offsets.MonthBegin(1) - pd.Timedelta(1, "ns"),
+                                        ctx.data_version, "session:sales")
+    current_month_sales = current_month_sales_df.groupby(group_col, observed=True)["Net Value"].sum()
+    total_current_month_sales = current_month_sales.sum()
+
+    target_balance = total_target - total_current_month_sales
+
+    if total_target > 0:
+        average_historical_sales = total_historical_sales_value / months_count
+        st.subheader("🎯 Target Analysis")
+        col1, col2, col3 = st.columns(3)
+        col4, col5 = st.columns(2)
+        with col1: st.metric("Historical Sales Total", f"KD {total_historical_sales_value:,.0f}")
+        with col2: st.metric("Allocated Target Total", f"KD {total_target:,.0f}")
+        with col3:
+            if average_historical_sales > 0:
+                percentage_increase_needed = ((total_target - average_historical_sales) / average_historical_sales) * 100
+                delta_value = total_target - average_historical_sales
+                st.metric("Increase Needed vs Avg Sales", f"{percentage_increase_needed:.0f}%", delta=f"KD {delta_value:,.0f}")
+            else:
+                st.metric("Increase Needed vs Avg Sales", "N/A", delta="Historical = 0")
+        st.markdown("---")
+        with col4: st.metric("Current Month Sales", f"KD {total_current_month_sales:,.0f}")
+        with col5: st.metric("Target Balance", f"KD {target_balance:,.0f}")
+
+    allocation_table = pd.DataFrame(index=historical_sales.index.union(current_month_sales.index).unique())
+    allocation_table.index.name = "Name"
+    allocation_table[f"Last {days_label} Total Sales"] = historical_sales.reindex(allocation_table.index, fill_value=0)
+    allocation_table[f"Last {days_label} Average Sales"] = allocation_table[f"Last {days_label} Total Sales"] / months_count
+    if total_historical_sales_value > 0:
+        allocation_table["This Month Auto-Allocated Target"] = allocation_table[f"Last {days_label} Total Sales"] / total_historical_sales_value * total_target
+    else:
+        allocation_table["This Month Auto-Allocated Target"] = 0
+    allocation_table["Current Month Sales"] = current_month_sales.reindex(allocation_table.index, fill_value=0)
+    allocation_table["Target Balance"] = allocation_table["This Month Auto-Allocated Target"] - allocation_table["Current Month Sales"]
+
+    total_row = allocation_table.sum().to_frame().T
+    total_row.index = ["Total"]
+    total_row["Target Balance"] = total_target - total_current_month_sales
+    allocation_table_with_total = pd.concat([allocation_table, total_row])
+
+    def color_target_balance(val):
+        if isinstance(val, (int, float)):
+            color = 'red' if val > 0 else 'green'
+            return f'color: {color}'
+        return ''
+
+    st.subheader(f"📊 Auto-Allocated Targets Based on {days_label}")
+
+    # Show the first column (Branch/Customer) with a proper header
+    name_col = "Branch" if allocation_type == "By Branch" else "Customer"
+
+    allocation_display = allocation_table_with_total.reset_index()
+    first_col = allocation_display.columns[0]
+    allocation_display = allocation_display.rename(columns={first_col: name_col})
+
+    numeric_cols = [c for c in allocation_display.columns if c != name_col]
+    for c in numeric_cols:
+        allocation_display[c] = (
+            pd.to_numeric(allocation_display[c], errors="coerce")
+            .fillna(0)
+            .round(0)
+            .astype(int)
+        )
+
+    styled_allocation = (
+        allocation_display.style
+        .set_table_styles([
+            {'selector': 'th', 'props': [
+                ('background', '#1E3A8A'),
+                ('color', 'white'),
+                ('font-weight', '800'),
+                ('height', '40px'),
+                ('line-height', '40px'),
+                ('border', '1px solid #E5E7EB')
+            ]}
+        ])
+        .apply(
+            lambda r: ['background-color: #BFDBFE; color: #1E3A8A; font-weight: 900' if str(r.get(name_col)) == 'Total' else '' for _ in r],
+            axis=1
+        )
+        .format({c: '{:,.0f}' for c in numeric_cols})
+    )
+    st.dataframe(styled_allocation, use_container_width=True, hide_index=True)
+
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    if lazy_download_button(
+        "💾 Download Target Allocation Table",
+        lambda df=allocation_table: to_excel_bytes(df, sheet_name="Allocated_Targets"),
+        file_name=f"target_allocation_{allocation_type.replace(' ', '_')}_{timestamp}.xlsx",
+        mime=XLSX_MIME
+    ):
+        st.session_state["audit_log"].append({
+            "user": username,
+            "action": "download",
+            "details": f"target_allocation_{allocation_type.replace(' ', '_')}_{timestamp}.xlsx",
+            "timestamp": datetime.now()
+        })
+
+# --- AI Insights Page (GM Executive View - Reset) ---
+    def gm_tag(return_pct, cancel_pct):
+        if return_pct >= 4:
+            return "🔴 High Return"
+        if cancel_pct >= 4:
+            return "🟠 High Cancel"
+        if return_pct >= 2 or cancel_pct >= 2:
+            return "🟡 Watch"
+        return "🟢 Normal"
@@ -0,0 +1,373 @@
+# ================= UI TEXTS =================
+# Menu labels and page strings per language (texts[lang][key]).
+
+texts = {
+    "en": {
+        "page_title": "📊 Khazan Dashboard",
+        "layout": "wide",
+        "page_icon": "📈",
+        "welcome": "Welcome {0} 👋",
+        "logout": "Logout",
+        "incorrect_login": "❌ Username/password is incorrect",
+        "no_login": "⚠️ Please enter your username and password",
+        "dark_mode": "🌙 Dark Mode",
+        "upload_header": "📂 Upload Excel (one-time)",
+        "upload_tooltip": "Upload an Excel file with sheets: sales data, Target, sales channels, and optionally YTD.",
+        "clear_data": "🔁 Clear data",
+        "file_loaded": "✅ File loaded — now use the menu to go to any page.",
+        "delta_upload": "📅 Daily append (new lines only)",
+        "applying_delta": "⏳ Appending daily lines...",
+        "delta_applied": "✅ {0:,} new lines added ({1:,} already loaded) across {2} day(s).",
+        "delta_error": "❌ Could not append the daily file: {0}",
+        "menu_title": "🧭 Menu",
+        "navigate": "Navigate",
+        "home": "Home",
+        "sales_tracking": "Sales Tracking",
+        "ytd_comparison": "Year to Date Comparison",
+        "custom_analysis": "Custom Analysis",
+        "target_allocation": "SP/PY Target Allocation",
+        "ai_insights": "AI Insights",
+        "customer_insights": "Customer Insights",
+        "customer_insights_title": "Customer Insights Dashboard",
+        "material_forecast": "Material Forecast",
+        "material_forecast_title": "📈 Material Forecast",
+        "rfm_analysis_sub": "RFM Analysis",
+        "rfm_table_sub": "RFM Table",
+        "rfm_chart_sub": "RFM Visualization",
+        "rfm_no_data": "No data available for RFM analysis.",
+        "rfm_download": "Download RFM Report",
+        "rfm_cohort_sub": "RFM Cohort Analysis",
+        "rfm_cohort_info": "Analyzes how RFM scores evolve over time for customer acquisition cohorts (grouped by first purchase month).",
+        "rfm_cohort_table_sub": "Cohort Summary Table",
+        "rfm_cohort_insights_sub": "Key Insights",
+        "rfm_cohort_download": "Download Cohort Report (Excel)",
+        "rfm_cohort_no_data": "Insufficient data for cohort analysis.",
+        "product_availability_checker": "Product Availability Checker",
+        "home_title": "🏠 Khazan Dashboard",
+        "home_welcome": "**Welcome to your Sales Analytical Hub!**\n- 📈 Track Sales&Targets By Salesman, By Customer, By Branch Name\n- 📅 Sales Comparision\n- 📊 Visualize Trends With Interactive Charts (With Forecaste)\n- 🎯 Allocate Customer Monthly Target \n- 💾 Download reports in PPT & Excel",
+        "data_loaded_msg": "Data is loaded — choose a page from the menu.",
+        "upload_prompt": "Please upload your Excel file in the sidebar to start.",
+        "sales_tracking_title": "📊 MTD Tracking",
+        "no_data_warning": "⚠️ Please upload the Excel file in the sidebar (one-time).",
+        "filters_header": "🔍 Filters (Sales Tracking)",
+        "filters_tooltip": "Filter data by salesmen, billing types, PY, SP, and date range.",
+        "select_salesmen": "👥 Select Salesmen",
+        "select_billing_types": "📋 Select Billing Types",
+        "select_py": "🏬 Select PY Name",
+        "select_sp": "🏷️ Select SP Name1",
+        "date_presets": "📅 Quick Date Presets",
+        "date_presets_options": ["Custom Range", "Last 7 Days", "This Month", "YTD"],
+        "select_date_range": "📆 Select Date Range",
+        "date_error": "❌ Start date must be before end date.",
+        "top_n_salesmen": "🏆 Show Top N Salesmen",
+        "no_match_warning": "⚠️ No data matches the selected filters.",
+        "kpis_tab": "📈 KPIs",
+        "tables_tab": "📋 Tables",
+        "charts_tab": "📊 Charts",
+        "downloads_tab": "💾 Downloads",
+        "key_metrics_sub": "🏆 Key Metrics",
+        "total_ka_sales": "Total KA Sales",
+        "of_ka_target": "{0:.0f}% of KA Target Achieved",
+        "ka_other_ecom": "KA & Other E-com",
+        "of_ka_target_pct": "{0:.0f}% of KA Target",
+        "talabat_sales": "Talabat Sales",
+        "of_talabat_target": "{0:.0f}% of Talabat Target Achieved",
+        "target_overview_sub": "🎯 Target Overview",
+        "ka_target": "KA Target",
+        "talabat_target": "Talabat Target",
+        "ka_gap": "KA Gap",
+        "talabat_gap": "Talabat Gap",
+        "channel_sales_sub": "📊 Channel Sales",
+        "retail_sales": "Retail Sales",
+        "of_total_ka": "{0:.0f}% of Sales",
+        "ecom_sales": "E-com Sales",
+        "performance_metrics_sub": "📈 Performance Metrics",
+        "days_finished": "Days Elapsed",
+        "current_sales_per_day": "Current Sales Per Day",
+        "forecast_month_end": "Forecasted Month-End KA Sales",
+        "sales_targets_summary_sub": "📋 Sales & Targets Summary-Value",
+        "download_sales_targets": "⬇️ Download Sales & Targets Summary (Excel)",
+        "sales_by_billing_sub": "📊 Billing Type - Sales - Cancellation And Return ( KWD )",
+        "download_billing": "⬇️ Download Billing Type Table (Excel)",
+        "sales_by_py_sub": "🏬 Sales Summary By Customer-Value",
+        "download_py": "⬇️ Download PY Name Table (Excel)",
+        "daily_sales_trend_sub": "📊 Daily Sales Trend And Forecast",
+        "daily_sales_title": "Daily Sales Trend And Forecast",
+        "not_enough_data": "Not enough data to perform a time-series forecast.",
+        "market_vs_ecom_sub": "📊 Market vs E-com Sales",
+        "market_vs_ecom_title": "Market vs E-com Sales Distribution",
+        "daily_ka_target_sub": "📊 Daily KA Target vs Actual Sales",
+        "daily_ka_title": "Daily KA Target vs Actual Sales",
+        "salesman_ka_sub": "📊 Salesman KA Target vs Actual",
+        "salesman_ka_title": "KA Target vs Actual Sales by Salesman",
+        "top10_py_sub": "📊 Top 10 Customers",
+        "top10_py_title": "Top 10 Customer 1 by Sales",
+        "download_reports_sub": "💾 Download Reports",
+        "generate_pptx": "📑 Generate PPTX Report",
+        "download_pptx": "⬇️ Download PPTX Report",
+        "ytd_title": "📊 Year to Date Comparison",
+        "ytd_filters_header": "🔍 Filters (YTD)",
+        "ytd_filters_tooltip": "Filter data by salesmen, billing types, PY, SP, and date range.",
+        "ytd_select_group": "Group By",
+        "ytd_select_value": "Value Column",
+        "ytd_period1": "Select Period 1",
+        "ytd_period2": "Select Period 2",
+        "ytd_no_data": "⚠️ No data matches the filters.",
+        "ytd_comparison_sub": "📋 YTD Comparison Table",
+        "ytd_download": "⬇️ Download YTD Comparison (Excel)",
+        "ytd_chart_title": "YTD Comparison Chart",
+        "custom_title": "📊 Custom Analysis",
+        "custom_upload": "Upload Additional Sheet (optional)",
+        "custom_extra_loaded": "✅ Extra sheet loaded.",
+        "custom_select_sheet": "📑 Select Sheet for Analysis",
+        "custom_sheet_empty": "⚠️ The sheet '{0}' is empty or not available in your file.",
+        "custom_explore": "💡 Explore your data by multiple columns & compare two periods.",
+        "custom_group_cols": "Group by columns",
+        "custom_value_col": "Value to analyze",
+        "custom_periods_sub": "📆 Select Two Periods",
+        "custom_period1": "Period 1",
+        "custom_period2": "Period 2",
+        "custom_select_p1": "Select Period 1",
+        "custom_select_p2": "Select Period 2",
+        "custom_select_prompt": "👉 Please select at least one group column, one value column, and valid date ranges.",
+        "custom_comparison_sub": "📋 Comparison of {0} by {1}",
+        "custom_download": "⬇️ Download Comparison (Excel)",
+        "target_alloc_title": "🎯 SP/PY Target Allocation",
+        "target_config_sub": "Configuration",
+        "target_alloc_tooltip": "Allocate targets by branch or customer based on historical sales.",
+        "target_alloc_type": "Select Target Allocation Type",
+        "target_alloc_options": ["By Branch", "By Customer"],
+        "target_input_option": "Select Target Input Option",
+        "target_input_options": ["Manual", "Auto (from 'Target' sheet)"],
+        "target_enter_total": "Enter the Total Target to be Allocated for this Month (KD)",
+        "target_auto_info": "Using Total Target from 'Target' sheet: KD {0:,.0f}",
+        "target_zero_warning": "Please ensure the total target is greater than 0.",
+        "target_hist_sub": "Historical Data Period",
+        "target_hist_option": "Select Historical Data Period",
+        "target_hist_options": ["Last 6 Months", "Manual Days"],
+        "target_select_range": "Select date range",
+        "target_date_warning": "Please select both a start and an end date.",
+        "target_no_hist": "⚠️ No sales data available in 'YTD' for {0}.",
+        "target_analysis_sub": "🎯 Target Analysis",
+        "hist_sales_total": "Historical Sales Total",
+        "alloc_target_total": "Allocated Target Total",
+        "increase_needed": "Increase Needed vs Avg Sales",
+        "current_month_sales": "Current Month Sales",
+        "target_balance": "Target Balance",
+        "alloc_targets_sub": "📊 Auto-Allocated Targets Based on {0}",
+        "download_alloc": "💾 Download Target Allocation Table",
+        "ai_title": "🤖 AI Insights",
+        "ai_scope_sub": "Scope and filters",
+        "ai_select_period": "Select period for insights",
+        "ai_top_n": "Top-N salesmen spotlight",
+        "ai_no_data": "No data in the selected period. Try expanding the date range.",
+        "ai_exec_sub": "📜 Executive summary",
+        "ai_prescript_sub": "🛠️ Prescriptive Recommendations",
+        "ai_visual_sub": "📊 AI-Generated Visuals",
+        "ai_section_sub": "🧭 Section insights",
+        "ai_download_sub": "📥 Download executive summary",
+        "ai_download_button": "💾 Download AI executive summary (TXT)",
+        "ai_ask_sub": "💬 Ask a question about your data",
+        "ai_ask_prompt": "Type a question (e.g., 'Which salesman is growing fastest?', 'Where are returns highest?', 'Correlation between targets and sales?')",
+        "admin_tools": "Admin Tools",
+        "view_logs": "View Audit Logs",
+        "audit_title": "📋 Audit Logs",
+        "download_logs": "⬇️ Download Audit Logs (Excel)",
+        "sheet_missing": "❌ Excel file must contain sheets: {0}. Missing: {1}",
+        "cols_missing": "❌ Missing required columns: {0}",
+        "load_error": "❌ Error loading Excel file: {0}",
+        "pptx_title": "Sales & Targets Report",
+        "pptx_generated": "Generated on {0}",
+        "pptx_kpi_title": "📈 Key Performance Indicators",
+        "pptx_summary_title": "📋 Sales & Targets Summary",
+        "pptx_billing_title": "📊 Sales by Billing Type per Salesman",
+        "pptx_py_title": "🏬 Sales by PY Name 1",
+        "pptx_embed_error": "Chart cannot be embedded: {0}. Install kaleido if missing.",
+        "generating_pptx": "⏳ Generating PPTX report...",
+        "loading_data": "⏳ Loading Excel data...",
+    },
+    "ar": {
+        "page_title": "📊 لوحة تحكم بيانات حنيف",
+        "layout": "wide",
+        "page_icon": "📈",
+        "welcome": "مرحبا {0} 👋",
+        "logout": "تسجيل الخروج",
+        "incorrect_login": "❌ اسم المستخدم/كلمة المرور غير صحيحة",
+        "no_login": "⚠️ يرجى إدخال اسم المستخدم وكلمة المرور",
+        "dark_mode": "🌙 الوضع الداكن",
+        "upload_header": "📂 تحميل إكسل (مرة واحدة)",
+        "upload_tooltip": "تحميل ملف إكسل يحتوي على أوراق: بيانات المبيعات، الهدف، قنوات المبيعات، واختيارياً YTD.",
+        "clear_data": "🔁 مسح البيانات",
+        "file_loaded": "✅ تم تحميل الملف — استخدم القائمة الآن للذهاب إلى أي صفحة.",
+        "delta_upload": "📅 إضافة يومية (السطور الجديدة فقط)",
+        "applying_delta": "⏳ جاري إضافة السطور اليومية...",
+        "delta_applied": "✅ تمت إضافة {0:,} سطر جديد ({1:,} محملة مسبقاً) في {2} يوم.",
+        "delta_error": "❌ تعذر إضافة الملف اليومي: {0}",
+        "menu_title": "🧭 القائمة",
+        "navigate": "التنقل",
+        "home": "الرئيسية",
+        "sales_tracking": "تتبع المبيعات",
+        "ytd_comparison": "مقارنة من بداية السنة",
+        "custom_analysis": "تحليل مخصص",
+        "target_allocation": "تخصيص أهداف SP/PY",
+        "ai_insights": "رؤى الذكاء الاصطناعي",
+        "customer_insights": "رؤى العملاء",
+        "customer_insights_title": "لوحة رؤى العملاء",
+        "material_forecast": "توقعات المواد",
+        "material_forecast_title": "📈 توقعات المواد",
+        "rfm_analysis_sub": "تحليل RFM",
+        "rfm_table_sub": "جدول RFM",
+        "rfm_chart_sub": "تصور RFM",
+        "rfm_no_data": "لا توجد بيانات متاحة لتحليل RFM.",
+        "rfm_download": "تنزيل تقرير RFM",
+        "rfm_cohort_sub": "تحليل الأتراب RFM",
+        "rfm_cohort_info": "يحلل كيفية تطور درجات RFM بمرور الوقت لأتراب اكتساب العملاء (مجمعة حسب شهر الشراء الأول).",
+        "rfm_cohort_table_sub": "جدول ملخص الأتراب",
+        "rfm_cohort_insights_sub": "الرؤى الرئيسية",
+        "rfm_cohort_download": "تنزيل تقرير الأتراب (إكسل)",
+        "rfm_cohort_no_data": "بيانات غير كافية لتحليل الأتراب.",
+        "product_availability_checker": "مدقق توفر المنتج",
+        "home_title": "🏠 لوحة تحكم بيانات حنيف",
+        "home_welcome": "**مرحبا بك في مركز تحليلات المبيعات!**\n- 📈 تتبع المبيعات والأهداف حسب البائع، اسم العميل، اسم الفرع\n- 📊 تصور الاتجاهات مع رسوم بيانية تفاعلية (الآن مع تنبؤ متقدم)\n- 💾 تنزيل التقارير في PPTX و Excel\n- 📅 مقارنة المبيعات عبر فترات مخصصة\n- 🎯 تخصيص أهداف SP/PY بناءً على الأداء الأخير\nاستخدم الشريط الجانبي للتنقل وتحميل البيانات مرة واحدة.",
+        "data_loaded_msg": "تم تحميل البيانات — اختر صفحة من القائمة.",
+        "upload_prompt": "يرجى تحميل ملف الإكسل في الشريط الجانبي للبدء.",
+        "sales_tracking_title": "📊 تتبع MTD",
+        "no_data_warning": "⚠️ يرجى تحميل ملف الإكسل في الشريط الجانبي (مرة واحدة).",
+        "filters_header": "🔍 فلاتر (تتبع المبيعات)",
+        "filters_tooltip": "تصفية البيانات حسب البائعين، أنواع الفواتير، PY، SP، ونطاق التاريخ.",
+        "select_salesmen": "👥 اختر البائعين",
+        "select_billing_types": "📋 اختر أنواع الفواتير",
+        "select_py": "🏬 اختر اسم PY",
+        "select_sp": "🏷️ اختر اسم SP1",
+        "date_presets": "📅 إعدادات تاريخ سريعة",
+        "date_presets_options": ["نطاق مخصص", "آخر 7 أيام", "هذا الشهر", "من بداية السنة"],
+        "select_date_range": "📆 اختر نطاق التاريخ",
+        "date_error": "❌ تاريخ البداية يجب أن يكون قبل تاريخ النهاية.",
+        "top_n_salesmen": "🏆 عرض أفضل N بائعين",
+        "no_match_warning": "⚠️ لا توجد بيانات تطابق الفلاتر المختارة.",
+        "kpis_tab": "📈 المؤشرات الرئيسية",
+        "tables_tab": "📋 الجداول",
+        "charts_tab": "📊 الرسوم البيانية",
+        "downloads_tab": "💾 التنزيلات",
+        "key_matrix_sub": "🏆 المقاييس الرئيسية",
+        "total_ka_sales": "إجمالي مبيعات KA",
+        "of_ka_target": "{0:.0f}% من هدف KA المحقق",
+        "ka_other_ecom": "KA و E-com أخرى",
+        "of_ka_target_pct": "{0:.0f}% من هدف KA",
+        "talabat_sales": "مبيعات طلبات",
+        "of_talabat_target": "{0:.0f}% من هدف طلبات المحقق",
+        "target_overview_sub": "🎯 نظرة عامة على الأهداف",
+        "ka_target": "هدف KA",
+        "talabat_target": "هدف طلبات",
+        "ka_gap": "فجوة KA",
+        "talabat_gap": "فجوة طلبات",
+        "channel_sales_sub": "📊 مبيعات القنوات",
+        "retail_sales": "مبيعات التجزئة",
+        "of_total_ka": "{0:.0f}% من إجمالي مبيعات KA",
+        "ecom_sales": "مبيعات E-com",
+        "performance_metrics_sub": "📈 مقاييس الأداء",
+        "days_finished": "الأيام المكتملة (العملية)",
+        "current_sales_per_day": "المبيعات الحالية لكل يوم",
+        "forecast_month_end": "مبيعات KA المتوقعة في نهاية الشهر",
+        "sales_targets_summary_sub": "📋 ملخص المبيعات والأهداف",
+        "download_sales_targets": "⬇️ تنزيل ملخص المبيعات والأهداف (إكسل)",
+        "sales_by_billing_sub": "📊 المبيعات حسب نوع الفاتورة لكل بائع",
+        "download_billing": "⬇️ تنزيل جدول أنواع الفواتير (إكسل)",
+        "sales_by_py_sub": "🏬 المبيعات حسب اسم PY 1",
+        "download_py": "⬇️ تنزيل جدول اسم PY (إكسل)",
+        "daily_sales_trend_sub": "📊 اتجاه المبيعات اليومي مع تنبؤ Prophet",
+        "daily_sales_title": "اتجاه المبيعات اليومي، تنبؤ Prophet والشذوذات",
+        "not_enough_data": "لا توجد بيانات كافية لإجراء تنبؤ زمني.",
+        "market_vs_ecom_sub": "📊 السوق مقابل مبيعات E-com",
+        "market_vs_ecom_title": "توزيع مبيعات السوق مقابل E-com",
+        "daily_ka_target_sub": "📊 هدف KA اليومي مقابل المبيعات الفعلية",
+        "daily_ka_title": "هدف KA اليومي مقابل المبيعات الفعلية",
+        "salesman_ka_sub": "📊 هدف KA للبائع مقابل الفعلي",
+        "salesman_ka_title": "هدف KA مقابل المبيعات الفعلية حسب البائع",
+        "top10_py_sub": "📊 أفضل 10 أسماء PY 1 حسب المبيعات",
+        "top10_py_title": "أفضل 10 أسماء PY 1 حسب المبيعات",
+        "download_reports_sub": "💾 تنزيل التقارير",
+        "generate_pptx": "📑 توليد تقرير PPTX",
+        "download_pptx": "⬇️ تنزيل تقرير PPTX",
+        "ytd_title": "📊 مقارنة من بداية السنة",
+        "ytd_filters_header": "🔍 فلاتر (YTD)",
+        "ytd_filters_tooltip": "تصفية البيانات حسب البائعين، أنواع الفواتير، PY، SP، ونطاق التاريخ.",
+        "ytd_select_group": "التجميع حسب",
+        "ytd_select_value": "عمود القيمة",
+        "ytd_period1": "اختر الفترة 1",
+        "ytd_period2": "اختر الفترة 2",
+        "ytd_no_data": "⚠️ لا توجد بيانات تطابق الفلاتر.",
+        "ytd_comparison_sub": "📋 جدول مقارنة YTD",
+        "ytd_download": "⬇️ تنزيل مقارنة YTD (إكسل)",
+        "ytd_chart_title": "رسم بياني لمقارنة YTD",
+        "custom_title": "📊 تحليل مخصص",
+        "custom_upload": "تحميل ورقة إضافية (اختياري)",
+        "custom_extra_loaded": "✅ تم تحميل الورقة الإضافية.",
+        "custom_select_sheet": "📑 اختر الورقة للتحليل",
+        "custom_sheet_empty": "⚠️ الورقة '{0}' فارغة أو غير متوفرة في ملفك.",
+        "custom_explore": "💡 استكشف بياناتك حسب أعمدة متعددة وقارن فترتين.",
+        "custom_group_cols": "التجميع حسب الأعمدة",
+        "custom_value_col": "القيمة للتحليل",
+        "custom_periods_sub": "📆 اختر فترتين",
+        "custom_period1": "الفترة 1",
+        "custom_period2": "الفترة 2",
+        "custom_select_p1": "اختر الفترة 1",
+        "custom_select_p2": "اختر الفترة 2",
+        "custom_select_prompt": "👉 يرجى اختيار عمود تجميع واحد على الأقل، عمود قيمة واحد، ونطاقات تاريخ صالحة.",
+        "custom_comparison_sub": "📋 مقارنة {0} حسب {1}",
+        "custom_download": "⬇️ تنزيل المقارنة (إكسل)",
+        "target_alloc_title": "🎯 تخصيص أهداف SP/PY",
+        "target_config_sub": "التكوين",
+        "target_alloc_tooltip": "تخصيص الأهداف حسب الفرع أو العميل بناءً على المبيعات التاريخية.",
+        "target_alloc_type": "اختر نوع تخصيص الهدف",
+        "target_alloc_options": ["حسب الفرع", "حسب العميل"],
+        "target_input_option": "اختر خيار إدخال الهدف",
+        "target_input_options": ["يدوي", "تلقائي (من ورقة 'Target')"],
+        "target_enter_total": "أدخل إجمالي الهدف للتخصيص لهذا الشهر (د.ك)",
+        "target_auto_info": "استخدام إجمالي الهدف من ورقة 'Target': د.ك {0:,.0f}",
+        "target_zero_warning": "يرجى التأكد من أن إجمالي الهدف أكبر من 0.",
+        "target_hist_sub": "فترة البيانات التاريخية",
+        "target_hist_option": "اختر فترة البيانات التاريخية",
+        "target_hist_options": ["آخر 6 أشهر", "أيام يدوية"],
+        "target_select_range": "اختر نطاق التاريخ",
+        "target_date_warning": "يرجى اختيار تاريخ بداية ونهاية.",
+        "target_no_hist": "⚠️ لا توجد بيانات مبيعات متوفرة في 'YTD' لـ {0}.",
+        "target_analysis_sub": "🎯 تحليل الهدف",
+        "hist_sales_total": "إجمالي المبيعات التاريخية",
+        "alloc_target_total": "إجمالي الهدف المخصص",
+        "increase_needed": "الزيادة المطلوبة مقابل متوسط المبيعات",
+        "current_month_sales": "مبيعات الشهر الحالي",
+        "target_balance": "رصيد الهدف",
+        "alloc_targets_sub": "📊 الأهداف المخصصة تلقائياً بناءً على {0}",
+        "download_alloc": "💾 تنزيل جدول تخصيص الهدف",
+        "ai_title": "🤖 رؤى الذكاء الاصطناعي",
+        "ai_scope_sub": "النطاق والفلاتر",
+        "ai_select_period": "اختر الفترة للرؤى",
+        "ai_top_n": "أبرز أفضل N بائعين",
+        "ai_no_data": "لا توجد بيانات في الفترة المختارة. جرب توسيع نطاق التاريخ.",
+        "ai_exec_sub": "📜 ملخص تنفيذي",
+        "ai_prescript_sub": "🛠️ توصيات إرشادية",
+        "ai_visual_sub": "📊 رسوم بيانية مولدة بالذكاء الاصطناعي",
+        "ai_section_sub": "🧭 رؤى حسب القسم",
+        "ai_download_sub": "📥 تنزيل الملخص التنفيذي",
+        "ai_download_button": "💾 تنزيل ملخص تنفيذي AI (TXT)",
+        "ai_ask_sub": "💬 اسأل سؤالاً عن بياناتك",
+        "ai_ask_prompt": "اكتب سؤالاً (مثل 'أي بائع ينمو أسرع؟'، 'أين المرتجعات أعلى؟'، 'الارتباط بين الأهداف والمبيعات؟')",
+        "admin_tools": "أدوات الإدارة",
+        "view_logs": "عرض سجلات التدقيق",
+        "audit_title": "📋 سجلات التدقيق",
+        "download_logs": "⬇️ تنزيل سجلات التدقيق (إكسل)",
+        "sheet_missing": "❌ ملف الإكسل يجب أن يحتوي على أوراق: {0}. المفقودة: {1}",
+        "cols_missing": "❌ أعمدة مطلوبة مفقودة: {0}",
+        "load_error": "❌ خطأ في تحميل ملف الإكسل: {0}",
+        "pptx_title": "تقرير المبيعات والأهداف",
+        "pptx_generated": "تم توليده في {0}",
+        "pptx_kpi_title": "📈 مؤشرات الأداء الرئيسية",
+        "pptx_summary_title": "📋 ملخص المبيعات والأهداف",
+        "pptx_billing_title": "📊 المبيعات حسب نوع الفاتورة لكل بائع",
+        "pptx_py_title": "🏬 المبيعات حسب اسم PY 1",
+        "pptx_embed_error": "لا يمكن تضمين الرسم البياني: {0}. قم بتثبيت kaleido إذا كان مفقوداً.",
+        "generating_pptx": "⏳ جاري توليد تقرير PPTX...",
+        "loading_data": "⏳ جاري تحميل بيانات الإكسل...",
+    }
+}
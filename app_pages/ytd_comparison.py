@@ -0,0 +1,401 @@
+# ================= YTD COMPARISON PAGE =================
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from app_pages.common import XLSX_MIME, fillna_keep_categories, lazy_download_button, to_excel_bytes
+from app_pages.context import DataContext
+from date_index import date_slice
+from lazy_imports import lazy_module
+
+px = lazy_module("plotly.express")
+
+
+def render(ctx: DataContext):
+
+    if "ytd_df" in st.session_state and not st.session_state["ytd_df"].empty:
+        ytd_df = st.session_state["ytd_df"]
+
+        if "Billing Date" not in ytd_df.columns:
+            st.error("❌ 'Billing Date' column not found in YTD sheet.")
+            st.stop()
+
+        # Loaded sheets already hold parsed dates (date-sorted, NaT last): use them in place
+        if not np.issubdtype(ytd_df["Billing Date"].dtype, np.datetime64) or ytd_df["Billing Date"].hasnans:
+            ytd_df = ytd_df.copy()
+            ytd_df["Billing Date"] = pd.to_datetime(ytd_df["Billing Date"], errors="coerce")
+            ytd_df = ytd_df.dropna(subset=["Billing Date"])
+
+        if "Net Value" not in ytd_df.columns:
+            st.error("❌ 'Net Value' column not found in YTD sheet.")
+            st.stop()
+
+        st.title("📅 Year to Date Comparison")
+        st.markdown(
+            '<div class="tooltip">ℹ️<span class="tooltiptext">Compare sales across two periods by a selected dimension.</span></div>',
+            unsafe_allow_html=True
+        )
+
+        # --- Select Dimension ---
+        st.subheader("📊 Choose Dimension")
+
+        # Map friendly labels to actual column names (added By Material)
+        dim_options = {
+            "By Customer": "PY Name 1",          # Customer Name column
+            "By Salesman": "Driver Name EN",     # Salesman Name
+            "By Branch": "SP Name1",             # Branch Name column
+            "By Material": "Material Description"  # 👈 NEW: Material Description
+        }
+
+        # Filter only dimensions where the column actually exists
+        dim_options_available = {
+            label: col for label, col in dim_options.items() if col in ytd_df.columns
+        }
+
+        if not dim_options_available:
+            st.error("❌ None of the expected dimension columns (Customer, Salesman, Branch, Material) are present.")
+            st.stop()
+
+        # User sees friendly names; program uses real column names
+        dim_label = st.selectbox(
+            "Choose dimension",
+            list(dim_options_available.keys()),
+            index=0
+        )
+        dimension = dim_options_available[dim_label]
+
+        # --- Select Two Periods ---
+        st.subheader("📆 Select Two Periods")
+        col1, col2 = st.columns(2)
+
+        min_date = ytd_df["Billing Date"].min().date()
+        max_date = ytd_df["Billing Date"].max().date()
+
+        with col1:
+            st.write("Period 1")
+            period1_range = st.date_input(
+                "Select Date Range ( Click Twice Start & End Date)",
+                value=(min_date, max_date),
+                key="ytd_p1_range"
+            )
+        with col2:
+            st.write("Period 2")
+            period2_range = st.date_input(
+                "Select Date Range ( Click Twice Start & End Date)",
+                value=(min_date, max_date),
+                key="ytd_p2_range"
+            )
+
+        if period1_range and period2_range and len(period1_range) == 2 and len(period2_range) == 2:
+            period1_start, period1_end = period1_range
+            period2_start, period2_end = period2_range
+
+            df_p1 = date_slice(ytd_df, pd.to_datetime(period1_start), pd.to_datetime(period1_end), ctx.data_version, "session:ytd")
+            df_p2 = date_slice(ytd_df, pd.to_datetime(period2_start), pd.to_datetime(period2_end), ctx.data_version, "session:ytd")
+
+            if df_p1.empty or df_p2.empty:
+                st.warning("⚠️ One of the selected periods has no data.")
+            else:
+                # --- YTD Comparison Table ---
+                col_p1_name = f"{period1_start.strftime('%Y-%m-%d')} to {period1_end.strftime('%Y-%m-%d')} Sales"
+                col_p2_name = f"{period2_start.strftime('%Y-%m-%d')} to {period2_end.strftime('%Y-%m-%d')} Sales"
+
+                summary_p1 = (
+                    df_p1.groupby(dimension, observed=True)["Net Value"]
+                    .sum()
+                    .reset_index()
+                    .rename(columns={"Net Value": col_p1_name})
+                )
+                summary_p2 = (
+                    df_p2.groupby(dimension, observed=True)["Net Value"]
+                    .sum()
+                    .reset_index()
+                    .rename(columns={"Net Value": col_p2_name})
+                )
+
+                ytd_comparison = pd.merge(summary_p1, summary_p2, on=dimension, how="outer")
+
+                # 🔒 Safety: ensure both period columns exist (avoid KeyError)
+                if col_p1_name not in ytd_comparison.columns:
+                    ytd_comparison[col_p1_name] = 0
+                if col_p2_name not in ytd_comparison.columns:
+                    ytd_comparison[col_p2_name] = 0
+
+                ytd_comparison = fillna_keep_categories(ytd_comparison, 0)
+
+                # Difference = Period2 - Period1
+                ytd_comparison["Difference"] = ytd_comparison[col_p2_name] - ytd_comparison[col_p1_name]
+
+                # Rename dimension column to generic "Name"
+                ytd_comparison.rename(columns={dimension: "Name"}, inplace=True)
+
+                # Total row
+                total_row = {
+                    "Name": "Total",
+                    col_p1_name: ytd_comparison[col_p1_name].sum(),
+                    col_p2_name: ytd_comparison[col_p2_name].sum(),
+                    "Difference": ytd_comparison["Difference"].sum()
+                }
+                ytd_comparison = pd.concat(
+                    [ytd_comparison, pd.DataFrame([total_row])],
+                    ignore_index=True
+                )
+
+                # Use friendly label in the heading
+                st.subheader(f"📋 Comparison by {dim_label}")
+
+                styled_ytd = (
+                    ytd_comparison.style
+                    .set_table_styles([
+                        {
+                            'selector': 'th',
+                            'props': [
+                                ('background', '#1E3A8A'),
+                                ('color', 'white'),
+                                ('font-weight', '800'),
+                                ('height', '40px'),
+                                ('line-height', '40px'),
+                                ('border', '1px solid #E5E7EB')
+                            ]
+                        }
+                    ])
+                    .apply(
+                        lambda x: [
+                            'background-color: #BFDBFE; color: #1E3A8A; font-weight: 900'
+                            if x.name == len(x) - 1 else ''  # last row = Total
+                            for _ in x
+                        ],
+                        axis=1
+                    )
+                    .format(
+                        {
+                            col_p1_name: "{:,.0f}",
+                            col_p2_name: "{:,.0f}",
+                            'Difference': "{:,.0f}"
+                        }
+                    )
+                )
+                st.dataframe(styled_ytd, use_container_width=True, hide_index=False)
+
+                lazy_download_button(
+                    "⬇️ Download YTD Comparison (Excel)",
+                    lambda df=ytd_comparison: to_excel_bytes(df, sheet_name="YTD_Comparison", index=False),
+                    token=(ctx.data_version, dimension, tuple(period1_range), tuple(period2_range), "ytd_comparison"),
+                    file_name=f"YTD_Comparison_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx",
+                    mime=XLSX_MIME
+                )
+
+                # --- NEW: Sales by Month (YTD) ---
+                st.subheader("📈 Sales by Month (YTD)")
+                monthly = ytd_df.copy()
+                monthly["YearMonth"] = monthly["Billing Date"].dt.to_period("M").astype(str)
+
+                monthly_sales = (
+                    monthly.groupby("YearMonth", observed=True)["Net Value"]
+                    .sum()
+                    .reset_index()
+                    .sort_values("YearMonth")
+                )
+
+                if not monthly_sales.empty:
+                    fig_month = px.bar(
+                        monthly_sales,
+                        x="YearMonth",
+                        y="Net Value",
+                        title="Sales by Month (YTD)",
+                        labels={"YearMonth": "Year-Month", "Net Value": "Net Value (KD)"}
+                    )
+                    fig_month.update_layout(height=400)
+                    st.plotly_chart(fig_month, use_container_width=True)
+                else:
+                    st.info("No monthly data available in YTD sheet.")
+
+                # --- Top 10 Customers: Last Year vs Current Year ---
+                st.subheader("🏆 Top 10 Customers – Last Year vs Current Year")
+
+                years = ytd_df["Billing Date"].dt.year.rename("Year")
+                available_years = sorted(years.dropna().unique().tolist())
+                if not available_years:
+                    st.info("⚠️ No valid years found in YTD data.")
+                    st.stop()
+                default_year = max(available_years)
+                selected_current_year = st.selectbox("Select Current Year:", available_years, index=available_years.index(default_year))
+                current_year = int(selected_current_year)
+                last_year = current_year - 1
+
+                # Aggregate sales by Customer + Year
+                cust_sales = (
+                    ytd_df.loc[years.isin([last_year, current_year]), ["PY Name 1", "Net Value"]]
+                    .groupby(["PY Name 1", years], observed=True)["Net Value"]
+                    .sum()
+                    .reset_index()
+                )
+
+                if cust_sales.empty:
+                    st.info("⚠️ No customer sales found for last year or current year.")
+                else:
+                    cust_pivot = cust_sales.pivot(
+                        index="PY Name 1",
+                        columns="Year",
+                        values="Net Value"
+                    ).fillna(0)
+
+                    # Use only year columns that actually exist (avoid KeyError)
+                    year_cols = [y for y in [last_year, current_year] if y in cust_pivot.columns]
+
+                    if not year_cols:
+                        st.info("⚠️ No valid year columns found to build Top 10 customers chart.")
+                    else:
+                        cust_pivot["Total"] = cust_pivot[year_cols].sum(axis=1)
+                        top10_cust = cust_pivot.sort_values("Total", ascending=False).head(10).reset_index()
+
+                        # Melt for plotting
+                        top10_melt = top10_cust.melt(
+                            id_vars="PY Name 1",
+                            value_vars=year_cols,
+                            var_name="Year",
+                            value_name="Sales",
+                        )
+
+                        # Merge back the wide data for status calculation
+                        merge_cols = ["PY Name 1"] + year_cols
+                        top10_melt = top10_melt.merge(
+                            top10_cust[merge_cols],
+                            on="PY Name 1",
+                            how="left",
+                        )
+
+                        def classify_status(row):
+                            # Both last_year & current_year exist → Achieved vs Not Achieved
+                            if (last_year in year_cols) and (current_year in year_cols) and row["Year"] == current_year:
+                                return "Achieved" if row.get(current_year, 0) >= row.get(last_year, 0) else "Not Achieved"
+                            # Only current year data exists
+                            if row["Year"] == current_year:
+                                return "Current"
+                            # Only previous year / others
+                            return "Previous"
+
+                        top10_melt["Status"] = top10_melt.apply(classify_status, axis=1)
+
+                        color_map = {
+                            "Achieved": "green",
+                            "Not Achieved": "red",
+                            "Previous": "gray",
+                            "Current": "blue",
+                        }
+
+                        fig_top10 = px.bar(
+                            top10_melt,
+                            x="PY Name 1",
+                            y="Sales",
+                            color="Status",
+                            color_discrete_map=color_map,
+                            barmode="group",
+                            text=top10_melt["Sales"].apply(lambda x: f"{x:,.0f}"),
+                        )
+                        fig_top10.update_traces(
+                            textposition="inside",
+                            insidetextanchor="middle",
+                            textfont=dict(color="white", size=12),
+                        )
+                        fig_top10.update_layout(
+                            title=f"Top 10 Customers: {last_year} vs {current_year}",
+                            xaxis_title="Customer",
+                            yaxis_title="Sales (KD)",
+                            font=dict(family="Roboto", size=12),
+                            plot_bgcolor="#F3F4F6",
+                            paper_bgcolor="#F3F4F6",
+                        )
+                        st.plotly_chart(fig_top10, use_container_width=True)
+
+                # --- Return by SP Name1 + Material Description (YTD) ---
+                st.subheader("🔄 Return By Branch + Material Description (YTD)")
+                required_cols = {"SP Name1", "Material Description", "Billing Type", "Net Value"}
+                if required_cols.issubset(ytd_df.columns):
+                    sp_mat_ytd = pd.pivot_table(
+                        ytd_df,
+                        index=["SP Name1", "Material Description"],
+                        columns="Billing Type",
+                        values="Net Value",
+                        aggfunc="sum",
+                        fill_value=0, observed=True
+                    )
+                    billing_cols = ["ZFR", "YKF2", "YKRE", "YKS1", "YKS2", "ZCAN", "ZRE"]
+                    for col in billing_cols:
+                        if col not in sp_mat_ytd.columns:
+                            sp_mat_ytd[col] = 0
+                    sp_mat_ytd = sp_mat_ytd.rename(columns={"ZFR": "Presales", "YKF2": "HHT"})
+                    sp_mat_ytd["Sales Total"] = sp_mat_ytd.sum(axis=1, numeric_only=True)
+                    sp_mat_ytd["Return"] = sp_mat_ytd["YKRE"] + sp_mat_ytd["ZRE"]
+                    sp_mat_ytd["Cancel Total"] = sp_mat_ytd[["YKS1", "YKS2", "ZCAN"]].sum(axis=1)
+                    sp_mat_ytd["Return %"] = np.where(
+                        sp_mat_ytd["Sales Total"] != 0,
+                        (sp_mat_ytd["Return"] / sp_mat_ytd["Sales Total"] * 100).round(0),
+                        0
+                    )
+                    ordered_cols = [
+                        "Presales", "HHT", "Sales Total", "YKS1", "YKS2", "ZCAN",
+                        "Cancel Total", "YKRE", "ZRE", "Return", "Return %"
+                    ]
+                    sp_mat_ytd = sp_mat_ytd.reindex(columns=ordered_cols, fill_value=0)
+                    total_row = pd.DataFrame(sp_mat_ytd.sum(numeric_only=True)).T
+                    total_row.index = [("Total", "")]
+                    total_row["Return %"] = (
+                        round((total_row["Return"] / total_row["Sales Total"] * 100), 0)
+                        if total_row["Sales Total"].iloc[0] != 0 else 0
+                    )
+                    sp_mat_ytd = pd.concat([sp_mat_ytd, total_row])
+
+                    # Conditional highlights for easy read
+                    def highlight_sp_mat(row):
+                        styles = []
+                        for col in row.index:
+                            if row.name == ("Total", ""):
+                                styles.append('background-color: #BFDBFE; color: #1E3A8A; font-weight: 900')
+                            elif col == "Return" and row[col] > 0:
+                                styles.append('background-color: #FECACA; color: #991B1B; font-weight: 700')
+                            elif col == "Cancel Total" and row[col] > 0:
+                                styles.append('background-color: #FDE68A; color: #92400E; font-weight: 700')
+                            elif col == "Sales Total" and row[col] > 0:
+                                styles.append('background-color: #D1FAE5; color: #065F46; font-weight: 700')
+                            else:
+                                styles.append('')
+                        return styles
+
+                    styled_sp_mat = (
+                        sp_mat_ytd.style
+                        .set_table_styles([
+                            {
+                                'selector': 'th',
+                                'props': [
+                                    ('background', '#1E3A8A'),
+                                    ('color', 'white'),
+                                    ('font-weight', '800'),
+                                    ('height', '40px'),
+                                    ('line-height', '40px'),
+                                    ('border', '1px solid #E5E7EB')
+                                ]
+                            }
+                        ])
+                        .apply(highlight_sp_mat, axis=1)
+                        .format({
+                            "Presales": "{:,.0f}", "HHT": "{:,.0f}", "Sales Total": "{:,.0f}",
+                            "YKS1": "{:,.0f}", "YKS2": "{:,.0f}", "ZCAN": "{:,.0f}", "Cancel Total": "{:,.0f}",
+                            "YKRE": "{:,.0f}", "ZRE": "{:,.0f}", "Return": "{:,.0f}", "Return %": "{:.0f}%"
+                        })
+                    )
+                    st.dataframe(styled_sp_mat, use_container_width=True, hide_index=True)
+                    lazy_download_button(
+                        "⬇️ Download Return by SP+Material (YTD)",
+                        lambda df=sp_mat_ytd: to_excel_bytes(df.reset_index(), sheet_name="Return_by_SP_Material_YTD", index=False),
+                        token=(ctx.data_version, "ytd_return_by_sp_material"),
+                        file_name=f"Return_by_SP_Material_YTD_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx",
+                        mime=XLSX_MIME
+                    )
+                else:
+                    st.info("Required columns for SP+Material YTD table are missing.")
+    else:
+        st.warning("⚠️ Please ensure the 'YTD' sheet is present in your uploaded file.")
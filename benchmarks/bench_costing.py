@@ -0,0 +1,127 @@
+"""Parity check + benchmark: vectorized costing engine vs the old row-wise versions.
+
+Usage:
+    python benchmarks/bench_costing.py [--rows 300000]
+
+The row-wise functions below are verbatim copies of the pre-vectorization
+calculate_cost_profit()._cost and Profit & Margin calculate_line_cost.
+Exits non-zero if any line's cost differs.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from costing import add_profit_columns, line_cost  # noqa: E402
+
+QTY_COL, UOM_COL = "Quantity", "UOM"
+
+
+# ---------------- legacy (row-wise) ----------------
+def legacy_cost_profit(df):
+    def _cost(row):
+        if pd.isna(row["Cost Price"]):
+            return None
+        if row["UOM"] == "KAR":
+            return row["Quantity"] * row["Pack Size"] * row["Cost Price"]
+        return row["Quantity"] * row["Cost Price"]
+
+    df = df.copy()
+    df["Calculated Cost"] = df.apply(_cost, axis=1)
+    df["Gross Profit"] = df["Net Value"] - df["Calculated Cost"]
+    df["Margin %"] = (df["Gross Profit"] / df["Net Value"]) * 100
+    return df
+
+
+def legacy_line_cost(row):
+    if pd.isna(row["Cost Price"]):
+        return np.nan
+
+    qty = pd.to_numeric(row.get(QTY_COL), errors="coerce")
+    qty = 0 if pd.isna(qty) else qty
+    cost = pd.to_numeric(row["Cost Price"], errors="coerce")
+    uom = str(row.get(UOM_COL, "")).strip().upper() if UOM_COL else ""
+    pack = pd.to_numeric(row.get("Pack Size"), errors="coerce")
+
+    if pd.isna(cost):
+        return np.nan
+
+    if uom == "KAR":
+        if pd.isna(pack) or pack <= 0:
+            return np.nan
+        return qty * pack * cost
+
+    return qty * cost
+
+
+# ---------------- data ----------------
+def synthetic_lines(n: int, seed: int = 11) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    cost = rng.uniform(0.1, 5, n).round(3)
+    cost[rng.random(n) < 0.1] = np.nan                      # unmapped materials
+    pack = rng.choice([6.0, 12.0, 24.0, 48.0], n)
+    pack[rng.random(n) < 0.05] = np.nan                     # missing pack size
+    pack[rng.random(n) < 0.01] = 0.0                        # invalid pack size
+    qty = rng.integers(-5, 60, n).astype("float64")
+    net = (qty * rng.uniform(0.5, 8, n)).round(3)
+    qty[rng.random(n) < 0.02] = np.nan                      # missing quantity
+    uom = rng.choice(["KAR", "PC", "EA", " kar ", "kar", "KAR "], n, p=[0.55, 0.3, 0.09, 0.02, 0.02, 0.02])
+    uom = pd.Series(uom, dtype=object)
+    uom[rng.random(n) < 0.01] = None                        # missing UOM
+    return pd.DataFrame({
+        "Quantity": qty,
+        "UOM": uom,
+        "Cost Price": cost,
+        "Pack Size": pack,
+        "Net Value": net,
+    })
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=300_000)
+    args = parser.parse_args()
+
+    df = synthetic_lines(args.rows)
+    print(f"{len(df):,} lines")
+    ok = True
+
+    # calculate_cost_profit
+    old, t_old = timed(lambda: legacy_cost_profit(df))
+    new, t_new = timed(lambda: add_profit_columns(
+        df.assign(**{"Calculated Cost": line_cost(df["Quantity"], df["Cost Price"], df["UOM"], df["Pack Size"],
+                                                  require_positive_pack=False, missing_qty_as_zero=False,
+                                                  exact_uom=True)}),
+        "Calculated Cost"))
+    for col in ("Calculated Cost", "Gross Profit", "Margin %"):
+        same = np.allclose(old[col].astype("float64"), new[col], equal_nan=True)
+        ok &= same
+        print(f"  calculate_cost_profit[{col}]: {'OK' if same else 'MISMATCH'}")
+    print(f"calculate_cost_profit: row-wise {t_old:7.2f}s  vectorized {t_new:6.3f}s  ({t_old / t_new:,.0f}x)")
+
+    # Profit & Margin calculate_line_cost
+    old_cost, t_old = timed(lambda: df.apply(legacy_line_cost, axis=1))
+    new_cost, t_new = timed(lambda: line_cost(df[QTY_COL], df["Cost Price"], df[UOM_COL], df["Pack Size"]))
+    same = np.allclose(old_cost.astype("float64"), new_cost, equal_nan=True)
+    ok &= same
+    print(f"  calculate_line_cost[Total Cost]: {'OK' if same else 'MISMATCH'}")
+    print(f"calculate_line_cost:   row-wise {t_old:7.2f}s  vectorized {t_new:6.3f}s  ({t_old / t_new:,.0f}x)")
+
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Benchmark: period filters as boolean masks vs date-sorted row-offset slices.
+
+Usage:
+    python benchmarks/bench_date_index.py [--rows 2000000] [--years 2]
+
+Builds a synthetic YTD sheet (random billing dates over --years, stored
+date-sorted the way ingestion.prepare_bundle leaves it) and times, for a few
+typical periods, the old `df[(d >= start) & (d <= end)]` mask against
+date_index.date_slice() (two searchsorted calls on the day array + iloc
+slice). Both paths must return the same rows.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from date_index import DATE_COL, DateIndex, date_slice, sort_by_date  # noqa: E402
+
+
+def synthetic_ytd(rows: int, years: int, rng) -> pd.DataFrame:
+    end = pd.Timestamp.today().normalize()
+    start = end - pd.DateOffset(years=years)
+    days = (end - start).days + 1
+    df = pd.DataFrame({
+        DATE_COL: start + pd.to_timedelta(rng.integers(0, days, rows), unit="D"),
+        "PY Name 1": pd.Categorical.from_codes(rng.integers(0, 3000, rows), [f"CUSTOMER {i:04d}" for i in range(3000)]),
+        "Net Value": rng.uniform(-50, 500, rows).round(3),
+    })
+    return sort_by_date(df)
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--years", type=int, default=2)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    t0 = time.perf_counter()
+    ytd = synthetic_ytd(args.rows, args.years, rng)
+    print(f"{len(ytd):,} rows, built + date-sorted in {time.perf_counter() - t0:.2f}s")
+
+    build, index = timed(lambda: DateIndex.build(ytd), repeat=3)
+    print(f"day index build      {build * 1000:8.1f}ms  ({len(index.days):,} days, once per upload)\n")
+
+    today = ytd[DATE_COL].max()
+    periods = {
+        "month to date": (today.replace(day=1), today),
+        "last 30 days": (today - pd.Timedelta(days=30), today),
+        "same month LY": (today.replace(day=1) - pd.DateOffset(years=1), today - pd.DateOffset(years=1)),
+        "last 6 months": (today - pd.DateOffset(months=6), today),
+        "full range": (ytd[DATE_COL].min(), today),
+    }
+    d = ytd[DATE_COL]
+    print(f"{'period':<16}{'rows':>11}{'mask':>11}{'slice':>11}{'+ sum':>11}{'mask + sum':>13}")
+    for label, (start, end) in periods.items():
+        t_mask, masked = timed(lambda: ytd[(d >= start) & (d <= end)])
+        t_slice, sliced = timed(lambda: date_slice(ytd, start, end, "bench", "ytd"))
+        t_sum, _ = timed(lambda: date_slice(ytd, start, end, "bench", "ytd")["Net Value"].sum())
+        t_mask_sum, _ = timed(lambda: ytd[(d >= start) & (d <= end)]["Net Value"].sum())
+        assert masked.index.equals(sliced.index), label
+        print(f"{label:<16}{len(sliced):>11,}{t_mask * 1000:>9.2f}ms{t_slice * 1000:>9.3f}ms"
+              f"{t_sum * 1000:>9.2f}ms{t_mask_sum * 1000:>11.2f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Benchmark: DataFrame.to_excel vs the streaming constant_memory exporter.
+
+Usage:
+    python benchmarks/bench_excel_export.py [--rows 200000]
+
+Writes the same synthetic sales-lines frame through pandas' ExcelWriter (the
+old to_excel_bytes) and through excel_export.excel_bytes, and reports wall
+time and peak Python memory (tracemalloc) for each, then the cost of a
+repeated export served from the token-keyed ExportStore. Both workbooks must
+read back to the same frame.
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from excel_export import ExportStore, excel_bytes, export_token  # noqa: E402
+
+
+def synthetic_lines(rows: int, rng) -> pd.DataFrame:
+    return pd.DataFrame({
+        "Billing Date": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D"),
+        "Driver Name EN": pd.Categorical.from_codes(rng.integers(0, 40, rows), [f"DRIVER {i:02d}" for i in range(40)]),
+        "PY Name 1": pd.Categorical.from_codes(rng.integers(0, 3000, rows), [f"CUSTOMER {i:04d}" for i in range(3000)]),
+        "Billing Type": pd.Categorical.from_codes(rng.integers(0, 6, rows), ["ZFR", "YKF2", "YKS1", "YKS2", "YKRE", "ZRE"]),
+        "Quantity": rng.integers(1, 50, rows),
+        "Net Value": np.where(rng.random(rows) < 0.02, np.nan, rng.uniform(-50, 500, rows).round(3)),
+    })
+
+
+def pandas_bytes(df: pd.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
+        df.to_excel(writer, sheet_name="Raw_Data", index=False)
+    return buffer.getvalue()
+
+
+def measured(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    df = synthetic_lines(args.rows, np.random.default_rng(0))
+    t_pd, m_pd, a = measured(lambda: pandas_bytes(df))
+    t_st, m_st, b = measured(lambda: excel_bytes([("Raw_Data", df, False)]))
+    pd.testing.assert_frame_equal(pd.read_excel(io.BytesIO(a)), pd.read_excel(io.BytesIO(b)))
+    print(f"{len(df):,} rows x {df.shape[1]} cols")
+    print(f"{'to_excel':<22}{t_pd:>7.2f}s  peak {m_pd / 2**20:>7.0f} MB  {len(a) / 2**20:.1f} MB file")
+    print(f"{'streaming':<22}{t_st:>7.2f}s  peak {m_st / 2**20:>7.0f} MB  {len(b) / 2**20:.1f} MB file")
+
+    store = ExportStore(cache_dir=tempfile.mkdtemp(prefix="bench_exports_"))
+    token = export_token(("dataset", "filters"), "raw")
+    store.open(token, lambda: [("Raw_Data", df, False)]).close()
+    t0 = time.perf_counter()
+    store.open(token, lambda: [("Raw_Data", df, False)]).close()
+    print(f"{'same token again':<22}{time.perf_counter() - t0:>7.3f}s  (no DataFrame hashing)")
+    store.clear()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
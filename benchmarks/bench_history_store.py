@@ -0,0 +1,103 @@
+"""Benchmark: whole YTD cache read vs month-partitioned history reads.
+
+Usage:
+    python benchmarks/bench_history_store.py [--rows 3000000] [--years 5]
+
+Builds a synthetic multi-year YTD sheet, stores it both as one parquet file
+(the old cache layout) and as month partitions (history_store.write_history),
+then times typical period queries: read everything + filter vs
+read_history(), which only opens the months whose min/max dates overlap the
+period. Also shows how many files a second save of the same history (next
+month's workbook, one new month) actually writes. Both paths must return the
+same rows.
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from date_index import DATE_COL, date_slice, sort_by_date  # noqa: E402
+from history_store import read_history, write_history  # noqa: E402
+
+
+def synthetic_ytd(rows: int, years: int, rng) -> pd.DataFrame:
+    end = pd.Timestamp.today().normalize()
+    start = end - pd.DateOffset(years=years)
+    days = (end - start).days + 1
+    df = pd.DataFrame({
+        DATE_COL: start + pd.to_timedelta(rng.integers(0, days, rows), unit="D"),
+        "PY Name 1": pd.Categorical.from_codes(rng.integers(0, 3000, rows), [f"CUSTOMER {i:04d}" for i in range(3000)]),
+        "Driver Name EN": pd.Categorical.from_codes(rng.integers(0, 40, rows), [f"DRIVER {i:02d}" for i in range(40)]),
+        "Material Description": pd.Categorical.from_codes(rng.integers(0, 800, rows), [f"SKU {i:03d}" for i in range(800)]),
+        "Quantity": rng.integers(1, 50, rows).astype("float32"),
+        "Net Value": rng.uniform(-50, 500, rows).round(3),
+    })
+    return sort_by_date(df)
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--years", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    ytd = synthetic_ytd(args.rows, args.years, rng)
+    work = tempfile.mkdtemp(prefix="bench_history_")
+    try:
+        whole = os.path.join(work, "ytd.parquet")
+        history = os.path.join(work, "history")
+        t_whole, _ = timed(lambda: ytd.to_parquet(whole), repeat=1)
+        t_parts, entries = timed(lambda: write_history(ytd, history), repeat=1)
+        print(f"{len(ytd):,} rows over {args.years} years: one file {t_whole:.2f}s, "
+              f"{len(entries)} month files {t_parts:.2f}s")
+
+        # next month's workbook: same history + one new month -> only that month is written
+        nxt = ytd[DATE_COL].max() + pd.Timedelta(days=31)
+        grown = pd.concat([ytd, ytd.tail(50_000).assign(**{DATE_COL: nxt})], ignore_index=True)
+        before = len(glob.glob(os.path.join(history, "*.parquet")))
+        t_grown, _ = timed(lambda: write_history(grown, history), repeat=1)
+        written = len(glob.glob(os.path.join(history, "*.parquet"))) - before
+        print(f"re-save with one more month: {written} new file(s), {t_grown:.2f}s\n")
+
+        today = ytd[DATE_COL].max()
+        periods = {
+            "month to date": (today.replace(day=1), today),
+            "same month LY": (today.replace(day=1) - pd.DateOffset(years=1), today - pd.DateOffset(years=1)),
+            "last 3 months": (today - pd.DateOffset(months=3), today),
+            "last 6 months": (today - pd.DateOffset(months=6), today),
+            "last 2 years": (today - pd.DateOffset(years=2), today),
+        }
+        cols = ["PY Name 1", "Net Value"]
+        print(f"{'period':<16}{'rows':>11}{'read all':>11}{'months':>11}{'months, 2 cols':>16}")
+        for label, (start, end) in periods.items():
+            t_all, full = timed(lambda: date_slice(pd.read_parquet(whole), start, end))
+            t_part, part = timed(lambda: read_history(entries, history, start, end))
+            t_proj, _ = timed(lambda: read_history(entries, history, start, end, columns=cols))
+            assert len(full) == len(part) and full["Net Value"].sum() == part["Net Value"].sum(), label
+            print(f"{label:<16}{len(part):>11,}{t_all * 1000:>9.0f}ms{t_part * 1000:>9.0f}ms{t_proj * 1000:>14.0f}ms")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Benchmark: batch per-material forecast (Material Forecast page engine).
+
+Usage:
+    python benchmarks/bench_material_forecast.py [--skus 500] [--months 36] [--horizon 6] [--workers 4]
+
+Builds a synthetic sales-line frame (trend + 12-month season + noise per SKU,
+with a share of short-history SKUs), then times forecast_materials() on a
+pool the first visit has to spawn (reported only), on the first visit after
+the app's data-load warm-up, and warm. Target: 500 SKUs under 10 s on 4
+cores for both the first visit and the warm run.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import wait
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from forecasting import ForecastCache, ForecastService, forecast_materials  # noqa: E402
+
+TARGET_SECONDS = 10.0
+
+
+def synthetic_sales(n_skus: int, n_months: int, lines_per_month: int = 4, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    months = pd.period_range(end=pd.Timestamp.today().to_period("M") - 1, periods=n_months, freq="M")
+    rows = []
+    for s in range(n_skus):
+        start = 0 if s % 5 else rng.integers(n_months - 8, n_months - 2)   # 20% short histories
+        level, trend = rng.uniform(50, 500), rng.uniform(-1, 3)
+        season = rng.uniform(0, 0.3) * level * np.sin(2 * np.pi * np.arange(n_months) / 12)
+        qty = np.maximum(level + trend * np.arange(n_months) + season + rng.normal(0, 0.1 * level, n_months), 0)
+        for m in range(start, n_months):
+            day = months[m].to_timestamp()
+            for _ in range(lines_per_month):
+                rows.append((day + pd.Timedelta(days=int(rng.integers(0, 28))), f"SKU {s:04d}", qty[m] / lines_per_month))
+    return pd.DataFrame(rows, columns=["Billing Date", "Material Description", "Quantity"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--skus", type=int, default=500)
+    parser.add_argument("--months", type=int, default=36)
+    parser.add_argument("--horizon", type=int, default=6)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    df = synthetic_sales(args.skus, args.months)
+    print(f"{len(df):,} lines · {args.skus} SKUs · {args.months} months · {args.workers} workers · cpu_count={os.cpu_count()}")
+
+    def fresh_service():
+        return ForecastService(max_workers=args.workers, cache=ForecastCache(cache_dir=tempfile.mkdtemp(prefix="bench_forecast_")))
+
+    # what the app avoids: the first visit spawning the pool itself
+    service = fresh_service()
+    try:
+        t0 = time.perf_counter()
+        forecast_materials(df, horizon=args.horizon, service=service, use_cache=False)
+        unwarmed = time.perf_counter() - t0
+    finally:
+        service.shutdown()
+    print(f"unwarmed: {unwarmed:6.2f}s  (pool spawned by the first visit; the app warms it at data load)")
+
+    service = fresh_service()
+    try:
+        t0 = time.perf_counter()
+        wait(service.warm())   # sales.py: once data is loaded, before any page renders
+        print(f"warm-up: {time.perf_counter() - t0:6.2f}s  (in the background at data load)")
+        timings = {}
+        for label in ("first visit", "warm"):
+            t0 = time.perf_counter()
+            result = forecast_materials(df, horizon=args.horizon, service=service, use_cache=False)
+            timings[label] = time.perf_counter() - t0
+            print(f"{label:>11}: {timings[label]:6.2f}s  ({len(result):,} rows)")
+
+        t0 = time.perf_counter()
+        forecast_materials(df, horizon=args.horizon, service=service)
+        forecast_materials(df, horizon=args.horizon, service=service)
+        print(f"cache: {time.perf_counter() - t0:6.2f}s  (fit + cached repeat)")
+
+        print(result.drop_duplicates("Material Description")["Method"].value_counts().to_string())
+        ok = all(t < TARGET_SECONDS for t in timings.values())
+        print(f"{'PASS' if ok else 'FAIL'}: first visit {timings['first visit']:.2f}s, warm {timings['warm']:.2f}s "
+              f"vs target {TARGET_SECONDS:.0f}s (both must be under)")
+        return 0 if ok else 1
+    finally:
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Benchmark: price-list material resolution (exact + blocked fuzzy fallback).
+
+Usage:
+    python benchmarks/bench_price_index.py [--skus 5000] [--price-rows 10000]
+
+Sales descriptions are a mix of exact price-list names and perturbed ones
+(typos, swapped word order, spacing). Reports build/resolve time, the
+cached re-resolve time and how many perturbed names were recovered.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from costing import PriceListIndex, normalize_material  # noqa: E402
+
+BRANDS = ["ALMARAI", "KDD", "NADA", "AL RAWABI", "PUCK", "KRAFT", "NESTLE", "LURPAK", "PRESIDENT", "SADIA",
+          "AMERICANA", "KITCO", "BAYARA", "TIFFANY", "ULKER", "GALAXY", "LAVAZZA", "HEINZ", "FREEDOM", "MAZOLA"]
+PRODUCTS = ["FRESH MILK", "LABAN", "YOGHURT", "CHEDDAR CHEESE", "CREAM CHEESE", "BUTTER", "ORANGE JUICE",
+            "MANGO JUICE", "CHICKEN BREAST", "CHICKEN NUGGETS", "BEEF BURGER", "FRENCH FRIES", "MIXED VEG",
+            "TOMATO KETCHUP", "MAYONNAISE", "BASMATI RICE", "SUNFLOWER OIL", "CORN OIL", "BISCUITS", "WAFER",
+            "CHOCOLATE BAR", "COFFEE BEANS", "INSTANT COFFEE", "GREEN TEA", "PASTA", "TUNA CHUNKS", "HUMMUS",
+            "LABNEH", "FETA CHEESE", "ICE CREAM"]
+VARIANTS = ["", "FULL FAT", "LOW FAT", "LIGHT", "PLAIN", "SPICY", "CLASSIC", "ORIGINAL", "ZERO", "FAMILY"]
+SIZES = ["100G", "200G", "250G", "400G", "500G", "1KG", "2KG", "180ML", "250ML", "1L", "2L", "12X1L", "24X200ML"]
+
+
+def synthetic_price_list(n: int, rng) -> pd.DataFrame:
+    names = set()
+    while len(names) < n:
+        parts = [rng.choice(BRANDS), rng.choice(PRODUCTS), rng.choice(VARIANTS), rng.choice(SIZES), f"V{rng.integers(0, 40)}"]
+        names.add(" ".join(p for p in parts if p))
+    names = sorted(names)
+    return pd.DataFrame({"Material Description": names, "Cost Price": rng.uniform(0.2, 9, n).round(3),
+                         "Pack Size": rng.choice([6, 12, 24, 48], n)})
+
+
+def perturb(name: str, rng) -> str:
+    words = name.split()
+    kind = rng.integers(0, 3)
+    if kind == 0 and len(words) > 2:                       # swapped word order
+        i = rng.integers(0, len(words) - 2)
+        words[i], words[i + 1] = words[i + 1], words[i]
+    elif kind == 1:                                       # single-letter typo in a long word
+        long_words = [i for i, w in enumerate(words) if len(w) > 5 and w.isalpha()]
+        if long_words:
+            i = rng.choice(long_words)
+            j = rng.integers(1, len(words[i]) - 1)
+            words[i] = words[i][:j] + words[i][j + 1:]
+    return "  ".join(words).lower() if kind == 2 else " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--skus", type=int, default=5000)
+    parser.add_argument("--price-rows", type=int, default=10_000)
+    parser.add_argument("--fuzzy-share", type=float, default=0.4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(3)
+    price_df = synthetic_price_list(args.price_rows, rng)
+    picks = rng.choice(price_df["Material Description"].to_numpy(), args.skus, replace=False)
+    fuzzy = rng.random(args.skus) < args.fuzzy_share
+    queries = [perturb(p, rng) if f else p for p, f in zip(picks, fuzzy)]
+    sales = pd.Series(np.repeat(queries, 20))               # ~20 lines per SKU
+
+    t0 = time.perf_counter()
+    index = PriceListIndex(price_df)
+    t_build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    keys = index.resolve(sales)
+    t_resolve = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    index.resolve(sales)
+    t_cached = time.perf_counter() - t0
+
+    distinct = pd.Series(queries)
+    resolved = index.resolve(distinct)
+    expected = normalize_material(pd.Series(picks))
+    exact_hits = (~fuzzy).sum()
+    recovered = int((resolved[fuzzy].to_numpy() == expected[fuzzy].to_numpy()).sum())
+    wrong = int((resolved.notna() & (resolved.to_numpy() != expected.to_numpy())).sum())
+
+    print(f"{args.skus:,} distinct SKUs ({len(sales):,} lines) vs {len(price_df):,} price-list rows")
+    print(f"build {t_build:.2f}s · first resolve {t_resolve:.2f}s · cached resolve {t_cached:.3f}s")
+    print(f"exact {exact_hits:,} · fuzzy recovered {recovered:,}/{int(fuzzy.sum()):,} · wrong matches {wrong:,} · "
+          f"unmatched lines {int(keys.isna().sum()):,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Benchmark: cold start (import-to-first-render) per menu page.
+
+Usage:
+    python benchmarks/bench_startup.py [--workbook data.xlsx] [--pages N] [--user admin]
+    python benchmarks/bench_startup.py --imports
+
+Default mode runs every menu page in a *fresh* interpreter through Streamlit's
+AppTest harness: process start -> sales.py imports -> first render of the
+Home page -> first render of the selected page. With --workbook the parsed
+bundle is put into session state first so data pages render fully.
+The page module import (app_pages registry) and the lazy modules each page
+pulled in (and their import cost) are listed.
+
+--imports times a cold import of each heavy library on its own, i.e. what a
+page pays the first time it needs one of them.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+HEAVY_MODULES = [
+    "plotly.express", "plotly.graph_objects", "pptx", "prophet",
+    "statsmodels.tsa.holtwinters", "sklearn.linear_model", "fuzzywuzzy.fuzz", "kaleido",
+]
+
+
+def _child(page, workbook, user) -> dict:
+    t_start = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "sales.py"), default_timeout=300)
+    at.session_state["authentication_status"] = True
+    at.session_state["username"] = user
+    at.session_state["name"] = user
+    if workbook:
+        from ingestion import content_hash, load_bundle
+
+        with open(workbook, "rb") as f:
+            data = f.read()
+        bundle = load_bundle(data, content_hash(data))
+        for key, value in {
+            "sales_df": bundle.sales_df, "target_df": bundle.target_df, "ytd_df": bundle.ytd_df,
+            "channels_df": bundle.channels_df, "rr_df": bundle.rr_df, "price_df": bundle.price_df,
+            "Extra_sheet_df": bundle.extra_df, "cube_df": bundle.cube_df, "data_loaded": True,
+        }.items():
+            at.session_state[key] = value
+    t_ready = time.perf_counter()
+
+    at.run()
+    t_home = time.perf_counter()
+    nav = next(sb for sb in at.sidebar.selectbox if len(sb.options) > 2)   # [0] is the language picker
+    menu = nav.options
+    if page is None:
+        return {"pages": menu}
+
+    nav.select(menu[page]).run()
+    t_page = time.perf_counter()
+
+    lazy = sys.modules.get("lazy_imports")
+    registry = sys.modules.get("app_pages")
+    return {
+        "page": menu[page],
+        "setup": t_ready - t_start,
+        "home": t_home - t_ready,
+        "page_render": t_page - t_home,
+        "total": t_page - t_start,
+        "errors": [str(e.value)[:120] for e in at.exception],
+        "lazy_imports": lazy.import_timings() if lazy else {},
+        "page_modules": registry.page_timings() if registry else {},
+    }
+
+
+def _run_child(args_list) -> dict:
+    out = subprocess.run([sys.executable, __file__, "--child", *args_list], capture_output=True, text=True, cwd=ROOT)
+    for line in reversed(out.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(out.stderr[-2000:])
+
+
+def bench_pages(workbook, limit, user):
+    extra = (["--workbook", workbook] if workbook else []) + ["--user", user]
+    pages = _run_child(extra)["pages"]
+    print(f"{'page':<40} {'home':>7} {'page':>7} {'module':>7} {'total':>7}  lazy imports")
+    for i, _ in enumerate(pages[:limit] if limit else pages):
+        r = _run_child(["--page", str(i), *extra])
+        lazy = ", ".join(f"{m} {s:.2f}s" for m, s in r["lazy_imports"].items()) or "-"
+        err = f"  [error: {r['errors'][0]}]" if r["errors"] else ""
+        module = sum(v["import"] for k, v in r["page_modules"].items() if k != "home")
+        print(f"{r['page'][:40]:<40} {r['home']:6.2f}s {r['page_render']:6.2f}s {module:6.2f}s {r['total']:6.2f}s  {lazy}{err}")
+
+
+def bench_imports():
+    print(f"{'module':<32} {'cold import':>12}")
+    for name in HEAVY_MODULES:
+        code = f"import time; t=time.perf_counter(); import {name}; print(time.perf_counter()-t)"
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        cell = f"{float(out.stdout):.2f}s" if out.returncode == 0 else "not installed"
+        print(f"{name:<32} {cell:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workbook")
+    parser.add_argument("--pages", type=int, default=0, help="only the first N menu pages")
+    parser.add_argument("--user", default="admin")
+    parser.add_argument("--imports", action="store_true")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--page", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args.page, args.workbook, args.user)))
+    elif args.imports:
+        bench_imports()
+    else:
+        bench_pages(args.workbook, args.pages, args.user)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
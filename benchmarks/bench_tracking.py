@@ -0,0 +1,130 @@
+"""Benchmark: Sales Tracking pipeline (one pass per filter state, memoized).
+
+Usage:
+    python benchmarks/bench_tracking.py [--rows 500000] [--salesmen 40] [--customers 2000]
+
+Builds a synthetic month of sales lines plus the daily cube, then times
+compute_tracking() (everything the four tabs read) and a memoized rerun with
+the same filters, i.e. what a tab switch / chart toggle / download click
+costs now. The line filter alone is timed as the old six-way isin mask vs
+the filter index (all selected, and one salesman picked).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from cube import build_daily_cube  # noqa: E402
+from ingestion import normalize_series  # noqa: E402
+from filter_index import FilterIndex  # noqa: E402
+from tracking import TALABAT_PY, TRACKING_DIMS, TrackingFilters, compute_tracking, get_tracking  # noqa: E402
+
+BILLING_TYPES = ["ZFR", "YKF2", "ZRE", "YKRE", "YKS1", "YKS2", "ZCAN"]
+
+
+def synthetic_month(rows: int, salesmen: int, customers: int, rng):
+    today = pd.Timestamp.today().normalize()
+    start = today.replace(day=1) - pd.Timedelta(days=30)
+    drivers = [f"SALESMAN {i:02d}" for i in range(salesmen)]
+    custs = [f"CUSTOMER {i:04d}" for i in range(customers - 1)] + [TALABAT_PY]
+    bt = rng.choice(BILLING_TYPES, rows, p=[.6, .2, .07, .05, .03, .02, .03])
+    qty = rng.integers(1, 50, rows).astype(float)
+    nv = qty * rng.uniform(0.5, 5, rows)
+    nv[np.isin(bt, ["ZRE", "YKRE", "YKS1", "YKS2", "ZCAN"])] *= -1
+    sales = pd.DataFrame({
+        "Billing Date": start + pd.to_timedelta(rng.integers(0, (today - start).days + 1, rows), unit="D"),
+        "Billing Document": rng.integers(9e7, 1e8, rows),
+        "Billing Type": bt,
+        "Driver Name EN": rng.choice(drivers, rows),
+        "PY Name 1": rng.choice(custs, rows),
+        "SP Name1": rng.choice(custs, rows),
+        "Material Description": [f"PRODUCT {i}" for i in rng.integers(0, 500, rows)],
+        "Quantity": qty,
+        "Net Value": nv.round(3),
+    })
+    for col in ["Billing Type", "Driver Name EN", "PY Name 1", "SP Name1", "Material Description"]:
+        sales[col] = sales[col].astype("category")
+    sales["_py_name_norm"] = normalize_series(sales["PY Name 1"]).astype("category")
+
+    targets = pd.DataFrame({"Driver Name EN": drivers, "KA Target": rng.uniform(2e4, 8e4, salesmen).round(),
+                            "Talabat Target": rng.uniform(1e3, 5e3, salesmen).round()})
+    channels = pd.DataFrame({"PY Name 1": custs, "Channels": rng.choice(["Market", "E-com"], len(custs), p=[.8, .2])})
+    channels["_py_name_norm"] = normalize_series(channels["PY Name 1"])
+    return sales, build_daily_cube(sales), targets, channels, today
+
+
+def isin_mask(sales, filters):
+    return sales[
+        (sales["Driver Name EN"].isin(filters.salesmen))
+        & (sales["Billing Type"].isin(filters.billing_types))
+        & (sales["Billing Date"] >= filters.start)
+        & (sales["Billing Date"] <= filters.end)
+        & (sales["PY Name 1"].isin(filters.py))
+        & (sales["SP Name1"].isin(filters.sp))
+    ].copy()
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--salesmen", type=int, default=40)
+    parser.add_argument("--customers", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    sales, cube, targets, channels, today = synthetic_month(args.rows, args.salesmen, args.customers, rng)
+    print(f"{len(sales):,} lines -> {len(cube):,} cube rows")
+
+    filters = TrackingFilters(
+        salesmen=tuple(sales["Driver Name EN"].cat.categories),
+        billing_types=tuple(sales["Billing Type"].cat.categories),
+        py=tuple(sales["PY Name 1"].cat.categories),
+        sp=tuple(sales["SP Name1"].cat.categories),
+        start=today.replace(day=1), end=today,
+    )
+
+    t0 = time.perf_counter()
+    result = compute_tracking(sales, cube, targets, channels, filters, today)
+    cold = time.perf_counter() - t0
+
+    get_tracking("bench", sales, cube, targets, channels, filters, today)
+    t0 = time.perf_counter()
+    cached = get_tracking("bench", sales, cube, targets, channels, filters, today)
+    warm = time.perf_counter() - t0
+
+    print(f"filtered lines       {len(result.df_filtered):>10,}")
+    print(f"pipeline (cold)      {cold:>9.3f}s")
+    print(f"memoized rerun       {warm * 1000:>9.3f}ms  (same object: {cached is get_tracking('bench', sales, cube, targets, channels, filters, today)})")
+    print(f"KA daily sheet rows  {len(result.ka_daily_df):>10,}")
+
+    t0 = time.perf_counter()
+    index = FilterIndex(sales, TRACKING_DIMS, "Billing Date")
+    build = time.perf_counter() - t0
+    one = TrackingFilters(filters.salesmen[:1], filters.billing_types, filters.py, filters.sp, filters.start, filters.end)
+    print(f"filter index build   {build:>9.3f}s  (once per upload)")
+    for label, f in [("all selected", filters), ("one salesman", one)]:
+        mask = timed(lambda: isin_mask(sales, f))
+        cold = timed(lambda: FilterIndex._resolve(index, *index.normalize(f.selections(), f.start, f.end)))
+        take = timed(lambda: index.select(sales, f.selections(), f.start, f.end))
+        print(f"{label:<14} isin mask {mask * 1000:8.1f}ms | index resolve {cold * 1000:7.1f}ms"
+              f" | memoized select {take * 1000:7.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
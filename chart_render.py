@@ -0,0 +1,228 @@
+# ================= CHART RASTERIZATION =================
+# PNG export of plotly figures for the PPTX deck. Figures are rasterized
+# concurrently in a process pool of kaleido workers that is started on the
+# first export and kept warm for the life of the app (each worker imports
+# plotly once and, with kaleido >= 1, keeps its headless Chrome running), so
+# a deck costs roughly one chart's render time instead of one per slide.
+# Images are cached by a hash of the figure spec + export size -- in memory
+# and on disk -- so regenerating the deck with unchanged data re-uses them.
+# "spawn" workers: the Streamlit server is multi-threaded, forking it is unsafe.
+# NOTE: No Streamlit calls in here (safe to use from worker processes).
+
+import atexit
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from ingestion import CACHE_DIR
+
+
+CHART_CACHE_DIR = os.environ.get("DAILY_TRACKING_CHART_CACHE_DIR", os.path.join(CACHE_DIR, "charts"))
+CHART_CACHE_SIZE = 64          # images kept in memory
+CHART_DISK_CACHE_SIZE = 256    # images kept on disk (oldest access evicted)
+CHART_WORKERS = int(os.environ.get("DAILY_TRACKING_CHART_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+INLINE_RENDER_LIMIT = 1        # with the pool not started yet, this many images render in-process
+
+
+def figure_spec(fig) -> str:
+    """Plotly JSON of a figure (what is hashed and shipped to the workers)."""
+    return fig.to_json()
+
+
+def image_fingerprint(spec: str, fmt: str, width: int, height: int, scale: float) -> str:
+    h = hashlib.sha256(f"{fmt}|{width}|{height}|{scale}|".encode())
+    h.update(spec.encode("utf-8"))
+    return h.hexdigest()
+
+
+def rasterize(spec: str, fmt: str = "png", width: int = 1200, height: int = 700, scale: float = 2) -> bytes:
+    """Render one figure spec through kaleido (module level so worker processes can pickle it)."""
+    import plotly.io as pio
+
+    return pio.to_image(json.loads(spec), format=fmt, width=width, height=height, scale=scale, validate=False)
+
+
+def _warm_worker():
+    """Pool initializer: keep kaleido's browser running between jobs, then render a blank figure."""
+    try:
+        import kaleido
+
+        start = getattr(kaleido, "start_sync_server", None)   # kaleido >= 1 only
+        if start is not None:
+            start()
+        # imports plotly and starts kaleido < 1's Chromium, so the first real job doesn't pay for either
+        rasterize('{"data": [], "layout": {}}', width=16, height=16, scale=1)
+    except Exception:
+        pass
+
+
+class ChartRenderer:
+    """Cached, pooled figure -> image bytes."""
+
+    def __init__(self, max_workers=CHART_WORKERS, cache_dir=CHART_CACHE_DIR,
+                 max_entries=CHART_CACHE_SIZE, max_disk_entries=CHART_DISK_CACHE_SIZE):
+        self.max_workers = max_workers
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._items = OrderedDict()
+        self._inflight = {}
+        self._executor = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ----- cache -----
+    def _path(self, key, fmt):
+        return os.path.join(self.cache_dir, f"{key}.{fmt}")
+
+    def _remember(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def _read_disk(self, key, fmt):
+        path = self._path(key, fmt)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+            os.utime(path)   # touch -> LRU order on disk
+            return value
+        except OSError:
+            return None
+
+    def _write_disk(self, key, fmt, value):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = self._path(key, fmt) + f".{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(value)
+            os.replace(tmp, self._path(key, fmt))
+            files = [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir) if not f.endswith(".tmp")]
+            if len(files) > self.max_disk_entries:
+                files.sort(key=os.path.getmtime)
+                for path in files[: len(files) - self.max_disk_entries]:
+                    os.remove(path)
+        except OSError:
+            pass
+
+    def cached(self, key, fmt):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        value = self._read_disk(key, fmt)
+        if value is not None:
+            with self._lock:
+                self._remember(key, value)
+        return value
+
+    def _store(self, key, fmt, value):
+        with self._lock:
+            self._remember(key, value)
+        self._write_disk(key, fmt, value)
+
+    # ----- rendering -----
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+            )
+        return self._executor
+
+    def _finish(self, key, fmt, fut):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if not fut.cancelled() and fut.exception() is None:
+            self._store(key, fmt, fut.result())
+
+    def _submit(self, key, spec, fmt, width, height, scale) -> Future:
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                return fut
+            fut = self._pool().submit(rasterize, spec, fmt, width, height, scale)
+            self._inflight[key] = fut
+        # outside the lock: a future that is already done runs the callback (which locks) right here
+        fut.add_done_callback(lambda f, k=key: self._finish(k, fmt, f))
+        return fut
+
+    def render_many(self, figs: dict, fmt: str = "png", width: int = 1200, height: int = 700,
+                    scale: float = 2) -> dict:
+        """{name: image bytes, or the Exception that rendering raised} for {name: plotly figure}.
+
+        Cache hits return at once; the rest render concurrently (one job per
+        distinct figure, shared with any identical job already in flight).
+        """
+        results, todo = {}, {}
+        for name, fig in figs.items():
+            try:
+                spec = figure_spec(fig)
+            except Exception as e:
+                results[name] = e
+                continue
+            key = image_fingerprint(spec, fmt, width, height, scale)
+            image = self.cached(key, fmt)
+            with self._lock:
+                if image is not None:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            if image is not None:
+                results[name] = image
+            else:
+                todo[name] = (key, spec)
+
+        if self._executor is None and len({k for k, _ in todo.values()}) <= INLINE_RENDER_LIMIT:
+            for name, (key, spec) in todo.items():
+                try:
+                    results[name] = rasterize(spec, fmt, width, height, scale)
+                    self._store(key, fmt, results[name])
+                except Exception as e:
+                    results[name] = e
+            return results
+
+        futures = {name: self._submit(key, spec, fmt, width, height, scale) for name, (key, spec) in todo.items()}
+        for name, fut in futures.items():
+            try:
+                results[name] = fut.result()
+            except Exception as e:
+                results[name] = e
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._items),
+                "workers": self.max_workers if self._executor is not None else 0,
+                "hit_rate": (self.hits / total * 100) if total else 0.0,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+_chart_renderer = None
+_chart_renderer_lock = threading.Lock()
+
+
+def get_chart_renderer() -> ChartRenderer:
+    """Process-wide chart renderer (worker pool started on the first multi-chart export)."""
+    global _chart_renderer
+    with _chart_renderer_lock:
+        if _chart_renderer is None:
+            _chart_renderer = ChartRenderer()
+            atexit.register(_chart_renderer.shutdown)
+        return _chart_renderer
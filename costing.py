@@ -0,0 +1,187 @@
+# ================= COSTING ENGINE =================
+# Vectorized line cost / profit shared by calculate_cost_profit() and the
+# Profit & Margin page. Column-at-a-time numpy, no per-row apply.
+#   cost = Quantity × Cost Price                 (any UOM)
+#   cost = Quantity × Pack Size × Cost Price     (UOM == "KAR")
+# Missing cost (or a missing / invalid KAR pack size) propagates as NaN; how a
+# missing quantity and the UOM spelling are treated differs per caller (see line_cost).
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+
+import numpy as np
+import pandas as pd
+
+
+KAR_UOM = "KAR"
+
+
+def normalize_material(values: pd.Series) -> pd.Series:
+    """Material Description join key (strip + upper)."""
+    return values.astype(str).str.strip().str.upper()
+
+
+def _numeric(values, index) -> np.ndarray:
+    if values is None:
+        return np.full(len(index), np.nan)
+    return pd.to_numeric(pd.Series(values, index=index), errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+
+def line_cost(quantity: pd.Series, cost_price: pd.Series, uom: pd.Series | None = None,
+              pack_size: pd.Series | None = None, require_positive_pack: bool = True,
+              missing_qty_as_zero: bool = True, exact_uom: bool = False) -> pd.Series:
+    """Cost per line; NaN where cost price (or a KAR line's pack size) is missing.
+
+    The defaults follow the Profit & Margin page (missing quantity costs 0,
+    UOM compared stripped / upper-cased, pack size must be > 0);
+    calculate_cost_profit() keeps its own rules: missing quantity -> NaN,
+    UOM must be exactly "KAR", any pack size.
+    """
+    index = quantity.index
+    qty = _numeric(quantity, index)
+    if missing_qty_as_zero:
+        qty = np.nan_to_num(qty, nan=0.0)
+    cost = _numeric(cost_price, index)
+    pack = _numeric(pack_size, index)
+
+    if uom is None:
+        is_kar = np.zeros(len(index), dtype=bool)
+    elif exact_uom:
+        is_kar = pd.Series(uom, index=index).eq(KAR_UOM).fillna(False).to_numpy(dtype=bool)
+    else:
+        is_kar = pd.Series(uom, index=index).astype(str).str.strip().str.upper().eq(KAR_UOM).to_numpy()
+
+    if require_positive_pack:
+        pack = np.where(pack > 0, pack, np.nan)
+    multiplier = np.where(is_kar, pack, 1.0)
+    return pd.Series(qty * multiplier * cost, index=index, name="Total Cost")
+
+
+def add_profit_columns(df: pd.DataFrame, cost_col: str, net_col: str = "Net Value") -> pd.DataFrame:
+    """Gross Profit / Margin % from a cost column (in place, returns df)."""
+    df["Gross Profit"] = df[net_col] - df[cost_col]
+    df["Margin %"] = (df["Gross Profit"] / df[net_col]) * 100
+    return df
+
+
+# ================= PRICE-LIST INDEX =================
+# Material Description -> price-list row, resolved per *distinct* description:
+#   1. exact hash match on the normalized key
+#   2. blocked fuzzy match for the leftovers: candidates share one of the
+#      query's rarest word tokens and have the same size/number tokens
+#      (so "MILK 1L" never picks up "MILK 2L" costs), best score >= threshold
+# Built once per price-list version and kept in a small process-wide cache.
+FUZZY_MATCH_THRESHOLD = 90
+FUZZY_BLOCK_TOKENS = 2        # rarest query tokens used to pick candidates
+PRICE_INDEX_CACHE_SIZE = 4
+
+_TOKEN_RE = re.compile(r"[A-Z0-9]+(?:\.[0-9]+)?")
+
+
+def _fuzzy_scorer():
+    try:
+        from fuzzywuzzy import fuzz
+        return fuzz.token_sort_ratio
+    except ImportError:
+        return lambda a, b: round(100 * SequenceMatcher(None, " ".join(sorted(a.split())), " ".join(sorted(b.split()))).ratio())
+
+
+def _tokens(key: str):
+    tokens = [t for t in _TOKEN_RE.findall(key) if len(t) > 1 or t.isdigit()]
+    words = {t for t in tokens if not any(ch.isdigit() for ch in t)}
+    numbers = frozenset(t for t in tokens if any(ch.isdigit() for ch in t))
+    return words, numbers
+
+
+def price_list_version(price_df: pd.DataFrame, mat_col: str = "Material Description") -> str:
+    """Content hash of a price list (new upload / edited sheet -> new version)."""
+    h = hashlib.sha256(mat_col.encode())
+    h.update(",".join(map(str, price_df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(price_df.astype(str), index=False).values.tobytes())
+    return h.hexdigest()
+
+
+class PriceListIndex:
+    """Exact + blocked-fuzzy Material Description resolver over one price-list version."""
+
+    def __init__(self, price_df: pd.DataFrame, mat_col: str = "Material Description",
+                 threshold: int = FUZZY_MATCH_THRESHOLD, version: str | None = None):
+        self.mat_col = mat_col
+        self.threshold = threshold
+        self.version = version or price_list_version(price_df, mat_col)
+
+        table = price_df.copy()
+        table["_mat_norm"] = normalize_material(table[mat_col])
+        self.table = table.drop_duplicates("_mat_norm", keep="first").set_index("_mat_norm")
+        self.keys = self.table.index.tolist()
+
+        self._key_numbers = []
+        self._postings = {}
+        for i, key in enumerate(self.keys):
+            words, numbers = _tokens(key)
+            self._key_numbers.append(numbers)
+            for w in words:
+                self._postings.setdefault(w, []).append(i)
+
+        self._lock = threading.Lock()
+        self._resolved = {k: k for k in self.keys}     # query key -> price key (None = no match)
+        self.fuzzy_matches = 0
+
+    def _fuzzy_match(self, query: str, score):
+        words, numbers = _tokens(query)
+        blocks = sorted((w for w in words if w in self._postings), key=lambda w: len(self._postings[w]))
+        candidates = {i for w in blocks[:FUZZY_BLOCK_TOKENS] for i in self._postings[w]}
+        best, best_score = None, self.threshold - 1
+        for i in candidates:
+            if self._key_numbers[i] != numbers:
+                continue
+            s = score(query, self.keys[i])
+            if s > best_score:
+                best, best_score = self.keys[i], s
+        return best
+
+    def resolve(self, materials: pd.Series) -> pd.Series:
+        """Price-list key per line (NaN when neither exact nor fuzzy match)."""
+        norm = normalize_material(materials)
+        distinct = pd.unique(norm)
+        with self._lock:
+            pending = [q for q in distinct if q not in self._resolved]
+            if pending:
+                score = _fuzzy_scorer()
+                for q in pending:
+                    match = self._fuzzy_match(q, score)
+                    self._resolved[q] = match
+                    self.fuzzy_matches += match is not None
+            mapping = {q: self._resolved[q] for q in distinct}
+        return norm.map(mapping)
+
+    def lookup(self, materials: pd.Series, columns) -> pd.DataFrame:
+        """Price-list columns aligned to `materials` (one resolve for all columns)."""
+        keys = self.resolve(materials)
+        cols = [c for c in columns if c and c in self.table.columns]
+        out = self.table[cols].reindex(keys.to_numpy())
+        out.index = materials.index
+        return out
+
+
+_price_index_cache = OrderedDict()
+_price_index_lock = threading.Lock()
+
+
+def get_price_index(price_df: pd.DataFrame, mat_col: str = "Material Description") -> PriceListIndex:
+    """PriceListIndex for this price-list version (built once, resolved mapping reused)."""
+    version = price_list_version(price_df, mat_col)
+    with _price_index_lock:
+        index = _price_index_cache.get(version)
+        if index is not None:
+            _price_index_cache.move_to_end(version)
+            return index
+    index = PriceListIndex(price_df, mat_col, version=version)
+    with _price_index_lock:
+        _price_index_cache[version] = index
+        while len(_price_index_cache) > PRICE_INDEX_CACHE_SIZE:
+            _price_index_cache.popitem(last=False)
+    return index
@@ -0,0 +1,212 @@
+# ================= CREDENTIAL STORE =================
+# Login users for streamlit_authenticator, kept in a local SQLite file.
+# Passwords are bcrypt-hashed once when a user is provisioned (CLI below);
+# the app only reads the stored hashes through a process-wide cache that is
+# refreshed when the file changes — no hashing on reruns.
+#
+# CLI:
+#   python credentials_store.py add alice --name "Alice" --role salesman --salesman-name "Alice A"
+#   python credentials_store.py list
+#   python credentials_store.py passwd alice
+#   python credentials_store.py remove alice
+
+import argparse
+import copy
+import getpass
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import closing, contextmanager
+
+
+CREDENTIALS_DB = os.environ.get(
+    "DAILY_TRACKING_CREDENTIALS_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "credentials.db"),
+)
+ROLES = ("admin", "salesman")
+
+# Accounts the app shipped with; provisioned once into an empty store so
+# existing logins keep working after the upgrade (change these passwords!).
+DEFAULT_USERS = [
+    {"username": "admin", "name": "Admin User", "email": "admin@example.com",
+     "password": "admin123", "role": "admin", "salesman_name": None},
+    {"username": "salesman1", "name": "Salesman One", "email": "sales1@example.com",
+     "password": "salesman1", "role": "salesman", "salesman_name": "Salesman One"},
+    {"username": "salesman2", "name": "Salesman Two", "email": "sales2@example.com",
+     "password": "salesman2", "role": "salesman", "salesman_name": "Salesman Two"},
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username      TEXT PRIMARY KEY,
+    name          TEXT NOT NULL,
+    email         TEXT NOT NULL DEFAULT '',
+    password_hash TEXT NOT NULL,
+    role          TEXT NOT NULL CHECK (role IN ('admin', 'salesman')),
+    salesman_name TEXT
+)
+"""
+
+
+def hash_password(password: str) -> str:
+    """bcrypt hash in the format streamlit_authenticator verifies."""
+    import bcrypt
+
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+
+
+def _connect(path: str = CREDENTIALS_DB) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute(_SCHEMA)
+    return conn
+
+
+@contextmanager
+def _connection(path: str = CREDENTIALS_DB):
+    """Connection that commits on success, rolls back on error and is always closed."""
+    with closing(_connect(path)) as conn, conn:
+        yield conn
+
+
+def add_user(username: str, name: str, password: str, role: str, email: str = "",
+             salesman_name: str | None = None, path: str = CREDENTIALS_DB, replace: bool = False):
+    """Provision a user (hashes the password once, here)."""
+    if role not in ROLES:
+        raise ValueError(f"role must be one of {ROLES}, got {role!r}")
+    if role == "salesman" and not salesman_name:
+        raise ValueError("salesman users need a salesman_name (their 'Driver Name EN' in the sales data)")
+    verb = "INSERT OR REPLACE" if replace else "INSERT"
+    with _connection(path) as conn:
+        conn.execute(
+            f"{verb} INTO users (username, name, email, password_hash, role, salesman_name) VALUES (?, ?, ?, ?, ?, ?)",
+            (username, name, email, hash_password(password), role, salesman_name if role == "salesman" else None),
+        )
+
+
+def set_password(username: str, password: str, path: str = CREDENTIALS_DB) -> bool:
+    with _connection(path) as conn:
+        cur = conn.execute("UPDATE users SET password_hash = ? WHERE username = ?", (hash_password(password), username))
+        return cur.rowcount > 0
+
+
+def remove_user(username: str, path: str = CREDENTIALS_DB) -> bool:
+    with _connection(path) as conn:
+        return conn.execute("DELETE FROM users WHERE username = ?", (username,)).rowcount > 0
+
+
+def list_users(path: str = CREDENTIALS_DB) -> list:
+    with _connection(path) as conn:
+        rows = conn.execute("SELECT username, name, email, role, salesman_name FROM users ORDER BY username").fetchall()
+    return [dict(zip(("username", "name", "email", "role", "salesman_name"), r)) for r in rows]
+
+
+def ensure_default_users(path: str = CREDENTIALS_DB) -> bool:
+    """Provision DEFAULT_USERS into an empty/missing store (True if it did)."""
+    with _connection(path) as conn:
+        if conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]:
+            return False
+    for user in DEFAULT_USERS:
+        add_user(path=path, replace=True, **user)
+    return True
+
+
+# ================= PROCESS-WIDE CACHE =================
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _read_credentials(path: str) -> dict:
+    with _connection(path) as conn:
+        rows = conn.execute("SELECT username, name, email, password_hash, role, salesman_name FROM users").fetchall()
+    users = {}
+    for username, name, email, password_hash, role, salesman_name in rows:
+        users[username] = {"email": email, "name": name, "password": password_hash, "role": role}
+        if salesman_name:
+            users[username]["salesman_name"] = salesman_name
+    return {"usernames": users}
+
+
+def load_credentials(path: str = CREDENTIALS_DB) -> dict:
+    """streamlit_authenticator credentials dict (cached; re-read only when the file changes).
+
+    A missing store, or one without users (e.g. created empty by the CLI's
+    `list`), gets DEFAULT_USERS so there is always an account to log in with.
+    """
+    with _cache_lock:
+        cached = _cache.get(path)
+        stamp = os.stat(path).st_mtime_ns if os.path.exists(path) else None
+        if cached is None or cached[0] != stamp:
+            credentials = _read_credentials(path)
+            if not credentials["usernames"] and ensure_default_users(path):
+                credentials = _read_credentials(path)
+            cached = (os.stat(path).st_mtime_ns, credentials)
+            _cache[path] = cached
+        # Authenticate mutates the dict (login state) -> hand out a copy
+        return copy.deepcopy(cached[1])
+
+
+# ================= CLI =================
+def _prompt_password(args) -> str:
+    if getattr(args, "password", None):
+        return args.password
+    password = getpass.getpass("Password: ")
+    if password != getpass.getpass("Repeat password: "):
+        sys.exit("Passwords do not match.")
+    if not password:
+        sys.exit("Empty password.")
+    return password
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Manage Daily Tracking app login users.")
+    parser.add_argument("--db", default=CREDENTIALS_DB, help=f"credential store (default: {CREDENTIALS_DB})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_add = sub.add_parser("add", help="add (or with --replace, overwrite) a user")
+    p_add.add_argument("username")
+    p_add.add_argument("--name", required=True, help="display name")
+    p_add.add_argument("--email", default="")
+    p_add.add_argument("--role", choices=ROLES, required=True)
+    p_add.add_argument("--salesman-name", help="'Driver Name EN' this salesman sees (required for salesman)")
+    p_add.add_argument("--password", help="omit to be prompted")
+    p_add.add_argument("--replace", action="store_true")
+
+    p_pw = sub.add_parser("passwd", help="change a user's password")
+    p_pw.add_argument("username")
+    p_pw.add_argument("--password", help="omit to be prompted")
+
+    p_rm = sub.add_parser("remove", help="delete a user")
+    p_rm.add_argument("username")
+
+    sub.add_parser("list", help="list users")
+    sub.add_parser("init", help="provision the default accounts into an empty store")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "add":
+        try:
+            add_user(args.username, args.name, _prompt_password(args), args.role, args.email,
+                     args.salesman_name, path=args.db, replace=args.replace)
+        except (ValueError, sqlite3.IntegrityError) as e:
+            sys.exit(f"Cannot add {args.username}: {e}")
+        print(f"Added {args.role} {args.username}")
+    elif args.command == "passwd":
+        if not set_password(args.username, _prompt_password(args), path=args.db):
+            sys.exit(f"No such user: {args.username}")
+        print(f"Password updated for {args.username}")
+    elif args.command == "remove":
+        if not remove_user(args.username, path=args.db):
+            sys.exit(f"No such user: {args.username}")
+        print(f"Removed {args.username}")
+    elif args.command == "list":
+        for u in list_users(args.db):
+            extra = f" -> {u['salesman_name']}" if u["salesman_name"] else ""
+            print(f"{u['username']:<20} {u['role']:<9} {u['name']}{extra}")
+    elif args.command == "init":
+        print("Default accounts provisioned." if ensure_default_users(args.db) else "Store already has users.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+# ================= DAILY SALES CUBE =================
+# Pre-aggregated fact table built once per upload:
+#   day × salesman × customer (PY) × branch (SP) × billing type × material
+# Measures keep the raw column names (Net Value / Quantity) so the same
+# groupby / pivot code works on the cube and on the raw lines.
+
+import pandas as pd
+
+from date_index import date_slice
+
+
+CUBE_DATE = "Billing Date"
+CUBE_DIMENSIONS = [
+    "Driver Name EN", "PY Name 1", "SP Name1", "Billing Type", "Material Description",
+    "_py_name_norm",   # functionally tied to PY Name 1 (kept for channel joins)
+]
+CUBE_MEASURES = ["Net Value", "Quantity"]
+LINE_COUNT_COL = "Lines"
+
+
+def build_daily_cube(sales_df: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate sales lines to the daily cube grain (sum Net Value / Quantity, line count)."""
+    if sales_df is None or sales_df.empty or CUBE_DATE not in sales_df.columns:
+        return pd.DataFrame()
+
+    dims = [c for c in CUBE_DIMENSIONS if c in sales_df.columns]
+    measures = [c for c in CUBE_MEASURES if c in sales_df.columns]
+
+    base = sales_df[dims + measures].copy()
+    base[CUBE_DATE] = pd.to_datetime(sales_df[CUBE_DATE], errors="coerce").dt.normalize()
+    for m in measures:
+        base[m] = pd.to_numeric(base[m], errors="coerce")
+
+    agg = {m: (m, "sum") for m in measures}
+    agg[LINE_COUNT_COL] = (CUBE_DATE, "size")
+
+    cube = (
+        base.groupby([CUBE_DATE] + dims, observed=True, dropna=False, sort=False)
+        .agg(**agg)
+        .reset_index()
+        .sort_values(CUBE_DATE, kind="stable")
+        .reset_index(drop=True)
+    )
+    return cube
+
+
+def filter_cube(cube: pd.DataFrame, start=None, end=None, dims: dict | None = None,
+                data_version: str | None = None) -> pd.DataFrame:
+    """Slice the cube by date range and {column: allowed values} (None = no filter).
+
+    The cube is built in date order, so the date range is a row slice
+    (date_index); pass data_version to reuse the day index across reruns.
+    """
+    if cube is None or cube.empty:
+        return pd.DataFrame() if cube is None else cube
+    cube = date_slice(cube, start, end, data_version, "cube", CUBE_DATE)
+    dims = {col: values for col, values in (dims or {}).items() if values is not None and col in cube.columns}
+    if not dims:
+        return cube
+    mask = pd.Series(True, index=cube.index)
+    for col, values in dims.items():
+        mask &= cube[col].isin(values)
+    return cube[mask]
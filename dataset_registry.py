@@ -0,0 +1,241 @@
+# ================= SHARED DATASET REGISTRY =================
+# One in-memory copy of each loaded dataset per process, shared by every
+# session that uploaded the same workbook (keyed by its content hash, or by the
+# appended-state hash after a daily append). Sessions hold a Lease; a dataset
+# is dropped once its last lease is released -- explicitly on clear / reload,
+# or when the session state holding the lease is garbage collected. The most
+# recently idle datasets are kept for a quick re-login; the indexes and results
+# memoized for a dataset (version_cache.py) are dropped with it.
+#
+# Frames are shared, never copied per session or per rerun: treat them as
+# read-only. Salesman row-level security uses a driver partition built once
+# per dataset: each row-secured frame's row ids grouped by Driver Name EN
+# code, with the offset where each driver's group starts. A salesman's rows
+# are then one slice of that array (ascending, so date-sorted frames stay
+# sorted); the taken frames are cached per salesman and shared by all of
+# that salesman's sessions.
+# NOTE: No Streamlit calls in here.
+
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from ingestion import WorkbookBundle
+from version_cache import forget_dataset
+
+
+IDLE_DATASETS_KEPT = 1
+SCOPE_COLUMN = "Driver Name EN"
+SCOPED_FRAMES = ("sales_df", "cube_df", "ytd_df", "target_df")
+
+
+def _scope_rows(df: pd.DataFrame, salesman: str) -> np.ndarray:
+    """Row positions of df belonging to salesman (none when the column is missing)."""
+    if df is None or df.empty or SCOPE_COLUMN not in df.columns:
+        return np.empty(0, dtype=np.intp)
+    col = df[SCOPE_COLUMN]
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        code = col.cat.categories.get_indexer([salesman])[0]
+        return np.flatnonzero(col.cat.codes.to_numpy() == code) if code >= 0 else np.empty(0, dtype=np.intp)
+    return np.flatnonzero((col == salesman).to_numpy())
+
+
+def scope_frames(frames: dict, salesman: str) -> dict:
+    """{name: salesman's rows} for the row-secured frames (row order kept, so date-sorted frames stay sorted)."""
+    scoped = {}
+    for name in SCOPED_FRAMES:
+        df = frames.get(name)
+        if df is None:
+            continue
+        scoped[name] = df.take(_scope_rows(df, salesman))
+    return scoped
+
+
+class DriverPartition:
+    """Row ids of one frame grouped by Driver Name EN (one stable argsort of the codes)."""
+
+    def __init__(self, df: pd.DataFrame | None):
+        if df is None or df.empty or SCOPE_COLUMN not in df.columns:
+            self.drivers = pd.Index([])
+            self.order = np.empty(0, dtype=np.intp)
+            self.offsets = np.zeros(1, dtype=np.intp)
+            return
+        col = df[SCOPE_COLUMN]
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            codes, drivers = col.cat.codes.to_numpy(), col.cat.categories
+        else:
+            codes, drivers = pd.factorize(col)
+        codes = codes.astype(np.intp, copy=False)
+        self.drivers = pd.Index(drivers)
+        order = np.argsort(codes, kind="stable")
+        self.order = order[int((codes < 0).sum()):]          # missing drivers belong to nobody
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.drivers))
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def rows(self, salesman: str) -> np.ndarray:
+        """Ascending row positions of salesman's lines (a view into the partition)."""
+        code = self.drivers.get_indexer([salesman])[0] if len(self.drivers) else -1
+        if code < 0:
+            return self.order[:0]
+        return self.order[self.offsets[code]:self.offsets[code + 1]]
+
+
+class Dataset:
+    """A loaded bundle plus its driver partitions and cached salesman scopes."""
+
+    def __init__(self, key: str, bundle: WorkbookBundle):
+        self.key = key
+        self.bundle = bundle
+        self.refs = 0
+        self._partitions = None
+        self._scopes = {}
+        self._lock = threading.Lock()
+
+    def frames(self) -> dict:
+        b = self.bundle
+        return {"sales_df": b.sales_df, "cube_df": b.cube_df, "ytd_df": b.ytd_df, "target_df": b.target_df}
+
+    def partitions(self) -> dict:
+        """{frame name: DriverPartition}, built on the first salesman login."""
+        with self._lock:
+            partitions = self._partitions
+        if partitions is None:
+            frames = self.frames()
+            partitions = {name: DriverPartition(frames.get(name)) for name in SCOPED_FRAMES}
+            with self._lock:
+                if self._partitions is None:
+                    self._partitions = partitions
+                partitions = self._partitions
+        return partitions
+
+    def scoped(self, salesman: str) -> dict:
+        """Row-secured frames for one salesman (taken once per dataset from the partitions)."""
+        with self._lock:
+            scoped = self._scopes.get(salesman)
+        if scoped is None:
+            frames = self.frames()
+            scoped = {
+                name: frames[name].take(part.rows(salesman))
+                for name, part in self.partitions().items() if frames.get(name) is not None
+            }
+            with self._lock:
+                scoped = self._scopes.setdefault(salesman, scoped)
+        return scoped
+
+    def memory(self) -> int:
+        return int(sum(df.memory_usage(deep=False).sum() for df in self.frames().values() if df is not None))
+
+
+class Lease:
+    """A session's hold on a shared dataset; released explicitly or when garbage collected."""
+
+    def __init__(self, registry: "DatasetRegistry", dataset: Dataset):
+        self.dataset = dataset
+        self._finalizer = weakref.finalize(self, registry._release, dataset.key)
+
+    @property
+    def key(self) -> str:
+        return self.dataset.key
+
+    @property
+    def bundle(self) -> WorkbookBundle:
+        return self.dataset.bundle
+
+    def release(self) -> None:
+        self._finalizer()   # runs at most once
+
+
+class DatasetRegistry:
+    """Process-wide, reference-counted datasets keyed by content hash."""
+
+    def __init__(self, idle_kept: int = IDLE_DATASETS_KEPT):
+        self.idle_kept = idle_kept
+        self._datasets = {}
+        self._idle = OrderedDict()        # unreferenced datasets, oldest first
+        self._loading = {}                # key -> Event set when its load ends (one parse per key, others wait)
+        self._lock = threading.Lock()
+
+    def _lease(self, dataset: Dataset) -> Lease:
+        dataset.refs += 1
+        self._idle.pop(dataset.key, None)
+        return Lease(self, dataset)
+
+    def acquire(self, key: str, loader) -> Lease | None:
+        """Lease on the dataset for key, calling loader() -> WorkbookBundle on first use.
+
+        Bundles that are not ok (missing sheets) are not registered: None is returned.
+        """
+        while True:
+            with self._lock:
+                dataset = self._datasets.get(key)
+                if dataset is not None:
+                    return self._lease(dataset)
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    break
+            loading.wait()   # then lease what it loaded, or retry the load if it failed
+        try:
+            bundle = loader()
+            if bundle is None or not bundle.ok:
+                return None
+            with self._lock:
+                dataset = self._datasets.setdefault(key, Dataset(key, bundle))
+                return self._lease(dataset)
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+            loading.set()
+
+    def adopt(self, bundle: WorkbookBundle) -> Lease:
+        """Lease on an already built bundle (e.g. after a daily append); an existing entry wins."""
+        with self._lock:
+            dataset = self._datasets.setdefault(bundle.content_hash, Dataset(bundle.content_hash, bundle))
+            return self._lease(dataset)
+
+    def get(self, key: str) -> Dataset | None:
+        with self._lock:
+            return self._datasets.get(key)
+
+    def _release(self, key: str) -> None:
+        with self._lock:
+            dataset = self._datasets.get(key)
+            if dataset is None:
+                return
+            dataset.refs -= 1
+            if dataset.refs > 0:
+                return
+            self._idle[key] = dataset
+            dropped = []
+            while len(self._idle) > self.idle_kept:
+                old_key, _ = self._idle.popitem(last=False)
+                self._datasets.pop(old_key, None)
+                dropped.append(old_key)
+        for old_key in dropped:
+            forget_dataset(old_key)   # its indexes and memoized results go with it
+
+    def stats(self) -> list:
+        """[{key, refs, rows, scopes, mb}] for the admin view."""
+        with self._lock:
+            datasets = list(self._datasets.values())
+        return [
+            {"key": d.key, "refs": d.refs, "rows": len(d.bundle.sales_df),
+             "scopes": len(d._scopes), "mb": d.memory() / 1024 ** 2}
+            for d in datasets
+        ]
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> DatasetRegistry:
+    """Process-wide dataset registry (shared by every session)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = DatasetRegistry()
+        return _registry
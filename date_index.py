@@ -0,0 +1,119 @@
+# ================= DATE INDEX =================
+# The line-item frames (sales, YTD) are stored sorted by Billing Date (stable,
+# NaT last; see ingestion.prepare_bundle) and the daily cube is built in date
+# order, so any [start, end] period is one contiguous block of rows.
+# DateIndex keeps the distinct days and the row offset where each day starts:
+# a period filter is two searchsorted calls on that day array and a
+# positional slice of the frame (no boolean mask over every row, no copy).
+# Frames that are not date-sorted fall back to the mask.
+
+import numpy as np
+import pandas as pd
+
+from version_cache import VersionCache
+
+
+DATE_COL = "Billing Date"
+
+
+def _date_values(df: pd.DataFrame, col: str):
+    """datetime64 values of col, or None when the column is missing / not naive datetimes."""
+    if df is None or col not in df.columns or not pd.api.types.is_datetime64_dtype(df[col].dtype):
+        return None
+    return df[col].to_numpy()
+
+
+def _sorted_prefix(values: np.ndarray) -> int | None:
+    """Number of non-NaT rows if values are ascending with all NaT at the end, else None."""
+    valid = ~np.isnat(values)
+    n_valid = int(valid.sum())
+    if not valid[:n_valid].all():
+        return None
+    head = values[:n_valid]
+    if n_valid > 1 and not (head[1:] >= head[:-1]).all():
+        return None
+    return n_valid
+
+
+def sort_by_date(df: pd.DataFrame, col: str = DATE_COL) -> pd.DataFrame:
+    """df in stable date order (NaT last, fresh RangeIndex); returned as-is if already sorted."""
+    values = _date_values(df, col)
+    if values is None or len(values) == 0 or _sorted_prefix(values) is not None:
+        return df
+    return df.sort_values(col, kind="stable", na_position="last").reset_index(drop=True)
+
+
+class DateIndex:
+    """Day -> row-offset index over a date-sorted column."""
+
+    def __init__(self, values: np.ndarray, n_valid: int):
+        self.n_rows = len(values)
+        self.n_valid = n_valid                       # rows [n_valid:] are NaT
+        dates = values[:n_valid]
+        day_values = dates.astype("datetime64[D]")
+        starts = np.flatnonzero(day_values[1:] != day_values[:-1]) + 1 if n_valid else np.empty(0, dtype=np.intp)
+        self.days = day_values[np.concatenate(([0], starts))] if n_valid else day_values
+        self.offsets = np.concatenate(([0], starts, [n_valid])) if n_valid else np.zeros(1, dtype=np.intp)
+        # Billing dates normally carry no time of day: then the day array alone answers
+        # every bound; otherwise bounds are searched in the full column.
+        self._dates = None if (dates == day_values).all() else dates
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, col: str = DATE_COL):
+        """DateIndex for df[col], or None when the frame is not date-sorted."""
+        values = _date_values(df, col)
+        if values is None:
+            return None
+        n_valid = _sorted_prefix(values)
+        return None if n_valid is None else cls(values, n_valid)
+
+    def bounds(self, start=None, end=None) -> tuple:
+        """(lo, hi) so that rows lo:hi are exactly the rows with start <= date <= end."""
+        lo, hi = 0, self.n_valid
+        if self._dates is None:
+            if start is not None:
+                lo = int(self.offsets[np.searchsorted(self.days, pd.Timestamp(start).to_datetime64(), "left")])
+            if end is not None:
+                hi = int(self.offsets[np.searchsorted(self.days, pd.Timestamp(end).to_datetime64(), "right")])
+        else:
+            if start is not None:
+                lo = int(np.searchsorted(self._dates, pd.Timestamp(start).to_datetime64(), "left"))
+            if end is not None:
+                hi = int(np.searchsorted(self._dates, pd.Timestamp(end).to_datetime64(), "right"))
+        return lo, max(lo, hi)
+
+    def slice(self, df: pd.DataFrame, start=None, end=None) -> pd.DataFrame:
+        """Rows of df (the frame this index was built on) within [start, end]."""
+        lo, hi = self.bounds(start, end)
+        return df.iloc[lo:hi]
+
+
+_index_cache = VersionCache()   # per data version: one entry per (frame name, column)
+_MISSING = object()
+
+
+def get_date_index(data_version: str | None, name: str, df: pd.DataFrame, col: str = DATE_COL) -> DateIndex | None:
+    """DateIndex for df, built once per (dataset version, name); None if df is not date-sorted."""
+    if data_version is None:
+        return DateIndex.build(df, col)
+    index = _index_cache.get(data_version, (name, col), _MISSING)
+    if index is not _MISSING and (index is None or index.n_rows == len(df)):
+        return index
+    return _index_cache.put(data_version, (name, col), DateIndex.build(df, col))
+
+
+def date_slice(df: pd.DataFrame, start=None, end=None, data_version: str | None = None,
+               name: str = "", col: str = DATE_COL) -> pd.DataFrame:
+    """Rows with start <= df[col] <= end: index slice on date-sorted frames, boolean mask otherwise.
+
+    The slice is a view of df; callers that add or overwrite columns must .copy() it.
+    """
+    index = get_date_index(data_version, name, df, col)
+    if index is not None:
+        return index.slice(df, start, end)
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= df[col] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df[col] <= pd.Timestamp(end)
+    return df[mask]
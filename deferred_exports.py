@@ -0,0 +1,122 @@
+# ================= DEFERRED EXPORTS =================
+# Download payloads (Excel workbooks, the PPTX deck, ZIP packs) are not built
+# while a page renders. Each download button registers a generator callback:
+# Streamlit calls it on its own thread when the button is clicked, and a page
+# may also queue it for background generation once the script run has
+# finished, so a likely download is ready before the click. Results are kept
+# in memory (byte budget, LRU) per token -- dataset version + filter state +
+# artifact -- so reruns, other sessions and the click after a prefetch share
+# one build, and a build already in flight is waited on instead of repeated.
+# NOTE: No Streamlit calls in here (generators run off the script thread).
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+EXPORT_MEMORY_BUDGET = 128 * 2**20   # bytes of finished payloads kept per process
+PREFETCH_WORKERS = int(os.environ.get("DAILY_TRACKING_PREFETCH_WORKERS", "2"))
+
+
+class DeferredExports:
+    """token -> payload bytes, built at most once at a time, LRU under a byte budget."""
+
+    def __init__(self, max_bytes=EXPORT_MEMORY_BUDGET, workers=PREFETCH_WORKERS):
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self._items = OrderedDict()
+        self._size = 0
+        self._inflight = {}
+        self._executor = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+        self.prefetched = 0
+
+    def _remember(self, token, payload):
+        if token in self._items:
+            self._size -= len(self._items.pop(token))
+        if len(payload) > self.max_bytes:
+            return
+        self._items[token] = payload
+        self._size += len(payload)
+        while self._size > self.max_bytes:
+            _, old = self._items.popitem(last=False)
+            self._size -= len(old)
+
+    def _claim(self, token):
+        """(cached payload, None, False) | (None, future, False): wait on it | (None, future, True): caller builds."""
+        with self._lock:
+            if token in self._items:
+                self._items.move_to_end(token)
+                self.hits += 1
+                return self._items[token], None, False
+            fut = self._inflight.get(token)
+            if fut is not None:
+                self.hits += 1
+                return None, fut, False
+            fut = self._inflight[token] = Future()
+            self.builds += 1
+            return None, fut, True
+
+    def _build(self, token, generate, fut) -> bytes:
+        try:
+            payload = generate()
+            if hasattr(payload, "getvalue"):
+                payload = payload.getvalue()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(token, None)
+            fut.set_exception(e)
+            raise
+        with self._lock:
+            self._remember(token, payload)
+            self._inflight.pop(token, None)
+        fut.set_result(payload)
+        return payload
+
+    def get(self, token: str, generate) -> bytes:
+        """Payload for token; generate() (-> bytes or a BytesIO) runs only if it is neither cached nor in flight."""
+        payload, fut, mine = self._claim(token)
+        if payload is not None:
+            return payload
+        if not mine:
+            return fut.result()
+        return self._build(token, generate, fut)
+
+    def prefetch(self, token: str, generate):
+        """Build token's payload on a background thread (no-op when cached or already building)."""
+        payload, fut, mine = self._claim(token)
+        if not mine:
+            return
+        with self._lock:
+            self.prefetched += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="export-prefetch")
+            executor = self._executor
+        executor.submit(self._quiet_build, token, generate, fut)
+
+    def _quiet_build(self, token, generate, fut):
+        try:
+            self._build(token, generate, fut)
+        except Exception:
+            pass   # the click runs generate() again and surfaces the error
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "builds": self.builds, "prefetched": self.prefetched,
+                    "entries": len(self._items), "mb": self._size / 2**20}
+
+
+_deferred_exports = None
+_deferred_exports_lock = threading.Lock()
+
+
+def get_deferred_exports() -> DeferredExports:
+    """Process-wide deferred export cache (shared by every session)."""
+    global _deferred_exports
+    with _deferred_exports_lock:
+        if _deferred_exports is None:
+            _deferred_exports = DeferredExports()
+        return _deferred_exports
@@ -0,0 +1,302 @@
+# ================= EXCEL EXPORT =================
+# Download workbooks written with xlsxwriter's constant_memory mode: each
+# sheet is streamed row by row from per-column value lists (built once per
+# column with vectorized conversions), so neither pandas' per-cell
+# ExcelFormatter objects nor a whole-sheet cell table are held in memory.
+# Finished workbooks are kept on disk under <cache dir>/exports, keyed by a
+# cheap token the caller already has -- dataset version + filter state +
+# table name -- instead of st.cache_data hashing every DataFrame on every
+# rerun. Without a token the workbook is simply written (never hashed).
+# Stored workbooks are handed out as open files (export_excel_file) so the ZIP
+# bundle copies them in chunks instead of loading each one whole.
+# Output mirrors DataFrame.to_excel: bold bordered header, index columns
+# first when index=True, NaN as empty cells, dates as Excel dates.
+# NOTE: No Streamlit calls in here.
+
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from ingestion import CACHE_DIR
+
+
+EXPORT_CACHE_DIR = os.environ.get("DAILY_TRACKING_EXPORT_CACHE_DIR", os.path.join(CACHE_DIR, "exports"))
+EXPORT_CACHE_SIZE = 32                  # workbooks kept in the cache dir
+STALE_TMP_SECONDS = 3600                # half-written .tmp_ files older than this are debris
+DATETIME_FORMAT = "yyyy-mm-dd hh:mm:ss"  # pandas' to_excel defaults
+DATE_FORMAT = "yyyy-mm-dd"
+
+
+def _canonical(part):
+    """Sets sorted (their repr order is not stable), containers walked; everything else as is."""
+    if isinstance(part, (set, frozenset)):
+        return ("set", sorted(repr(_canonical(p)) for p in part))
+    if isinstance(part, (tuple, list)):
+        return tuple(_canonical(p) for p in part)
+    if isinstance(part, dict):
+        return ("dict", sorted((repr(k), repr(_canonical(v))) for k, v in part.items()))
+    return part
+
+
+def export_token(*parts) -> str | None:
+    """Cache token from already-cheap parts (dataset version, normalized filter state, table name).
+
+    None when any part is None (e.g. no dataset version): the export is not cached.
+    """
+    if any(p is None for p in parts):
+        return None
+    return hashlib.sha1(repr(_canonical(parts)).encode("utf-8")).hexdigest()
+
+
+def _column_cells(s: pd.Series) -> tuple:
+    """(cell values for one column, 'datetime' / 'date' / None) -- NaN / NaT become empty cells."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        categories = np.asarray(s.cat.categories, dtype=object)
+        codes = s.cat.codes.to_numpy()
+        values = np.where(codes >= 0, categories[np.maximum(codes, 0)] if len(categories) else None, None)
+        return _column_cells(pd.Series(values, dtype=object))
+    if pd.api.types.is_datetime64_any_dtype(s.dtype):
+        if getattr(s.dt, "tz", None) is not None:
+            s = s.dt.tz_localize(None)
+        has_time = bool((s.dropna() != s.dropna().dt.normalize()).any())
+        values = [None if pd.isna(v) else v for v in s.array.to_pydatetime()]
+        return values, "datetime" if has_time else "date"
+    if pd.api.types.is_bool_dtype(s.dtype):
+        return [None if pd.isna(v) else bool(v) for v in s.tolist()], None
+    if pd.api.types.is_numeric_dtype(s.dtype):
+        arr = s.to_numpy(dtype="float64", na_value=np.nan)
+        if pd.api.types.is_integer_dtype(s.dtype) and not np.isnan(arr).any():
+            return s.to_numpy().tolist(), None
+        out = arr.astype(object)
+        out[np.isnan(arr)] = None
+        out[np.isposinf(arr)] = "inf"
+        out[np.isneginf(arr)] = "-inf"
+        return out.tolist(), None
+    values = []
+    for v in s.tolist():
+        if v is None or (isinstance(v, float) and np.isnan(v)) or v is pd.NaT or v is pd.NA:
+            values.append(None)
+        elif isinstance(v, (str, int, float, bool)):
+            values.append(v)
+        elif isinstance(v, pd.Timestamp):
+            values.append(v.to_pydatetime())
+        else:
+            values.append(str(v))
+    return values, None
+
+
+def _sheet_columns(df: pd.DataFrame, index: bool) -> tuple:
+    """(header labels, [(values, kind)], number of index columns)."""
+    headers, columns, n_index = [], [], 0
+    if index:
+        idx = df.index
+        levels = [idx.get_level_values(i) for i in range(idx.nlevels)]
+        for name, level in zip(idx.names, levels):
+            headers.append("" if name is None else name)
+            columns.append(_column_cells(pd.Series(level, copy=False)))
+        n_index = len(levels)
+    for j, col in enumerate(df.columns):
+        headers.append(col)
+        columns.append(_column_cells(df.iloc[:, j]))
+    return headers, columns, n_index
+
+
+def write_workbook(sheets, target) -> None:
+    """Write [(sheet_name, df, index)] to target (path or binary file object), streaming rows.
+
+    Frames with MultiIndex columns (merged header rows) go through pandas'
+    writer instead; that workbook is then not written in constant_memory mode.
+    """
+    if any(isinstance(df.columns, pd.MultiIndex) for _, df, _ in sheets):
+        with pd.ExcelWriter(target, engine="xlsxwriter") as writer:
+            for name, df, index in sheets:
+                df.to_excel(writer, sheet_name=name, index=index)
+        return
+
+    import xlsxwriter
+
+    wb = xlsxwriter.Workbook(target, {"constant_memory": True, "nan_inf_to_errors": True})
+    header_fmt = wb.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+    kind_fmts = {"datetime": wb.add_format({"num_format": DATETIME_FORMAT}),
+                 "date": wb.add_format({"num_format": DATE_FORMAT})}
+    try:
+        for name, df, index in sheets:
+            ws = wb.add_worksheet(name)
+            headers, columns, n_index = _sheet_columns(df, index)
+            for j, (_, kind) in enumerate(columns):
+                if kind and j >= n_index:
+                    ws.set_column(j, j, 20 if kind == "datetime" else 12, kind_fmts[kind])
+            for j, label in enumerate(headers):
+                ws.write(0, j, label if isinstance(label, (str, int, float)) else str(label), header_fmt)
+            values = [v for v, _ in columns]
+            for r, row in enumerate(zip(*values), start=1):
+                if n_index:
+                    for j in range(n_index):
+                        ws.write(r, j, row[j], kind_fmts.get(columns[j][1], header_fmt))
+                    ws.write_row(r, n_index, row[n_index:])
+                else:
+                    ws.write_row(r, 0, row)
+    finally:
+        wb.close()
+
+
+def excel_bytes(sheets) -> bytes:
+    """Workbook bytes for [(sheet_name, df, index)] (rows streamed, not cached)."""
+    buffer = io.BytesIO()
+    write_workbook(sheets, buffer)
+    return buffer.getvalue()
+
+
+class ExportStore:
+    """Finished workbooks on disk, LRU by token (only paths are held in memory).
+
+    The LRU order is the files' mtime (touched on every hit), so it survives
+    restarts and is shared by processes using the same cache dir: the index is
+    seeded from the directory on init and re-read after each write.
+    """
+
+    def __init__(self, cache_dir=EXPORT_CACHE_DIR, max_entries=EXPORT_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._paths = OrderedDict()
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        with self._lock:
+            self._prune_disk()
+
+    def _path(self, token):
+        return os.path.join(self.cache_dir, f"{token}.xlsx")
+
+    def _prune_disk(self):
+        """Drop stale temp files and the oldest workbooks past max_entries; rebuild _paths by mtime (holds _lock)."""
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            self._paths.clear()
+            return
+        now = time.time()
+        entries = []
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            try:
+                mtime = os.path.getmtime(path)
+                if name.startswith(".tmp_"):
+                    if now - mtime > STALE_TMP_SECONDS:   # a younger one may still be being written
+                        os.remove(path)
+                elif name.endswith(".xlsx"):
+                    entries.append((mtime, name[: -len(".xlsx")], path))
+            except OSError:
+                pass
+        entries.sort()
+        for _, _, path in entries[: max(0, len(entries) - self.max_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._paths = OrderedDict((token, path) for _, token, path in entries[-self.max_entries:] if self.max_entries)
+
+    def _hit(self, token):
+        """Cached path for token (marked most recently used), or None (holds _lock)."""
+        path = self._paths.get(token)
+        if path is None:
+            return None
+        try:
+            os.utime(path)
+        except OSError:   # evicted by another process
+            self._paths.pop(token, None)
+            return None
+        self._paths.move_to_end(token)
+        self.hits += 1
+        return path
+
+    def path(self, token: str, build_sheets) -> str:
+        """Path of the workbook for token; build_sheets() -> [(sheet_name, df, index)] runs on a miss."""
+        with self._lock:
+            path = self._hit(token)
+            if path is not None:
+                return path
+            token_lock = self._locks.setdefault(token, threading.Lock())
+        try:
+            with token_lock:   # concurrent sessions asking for the same export write it once
+                with self._lock:
+                    path = self._hit(token)
+                    if path is not None:
+                        return path
+                    self.misses += 1
+                os.makedirs(self.cache_dir, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(prefix=".tmp_", suffix=".xlsx", dir=self.cache_dir)
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        write_workbook(build_sheets(), f)
+                    os.replace(tmp, self._path(token))
+                finally:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+                with self._lock:
+                    self._prune_disk()
+                    self._paths[token] = self._path(token)   # just written: newest mtime, never pruned
+                    self._paths.move_to_end(token)
+                    return self._paths[token]
+        finally:
+            with self._lock:   # also when build_sheets() raised; a newer lock for the token is left alone
+                if self._locks.get(token) is token_lock:
+                    del self._locks[token]
+
+    def open(self, token: str, build_sheets):
+        """The workbook for token as an open binary file (read by the caller in chunks, not loaded here)."""
+        try:
+            return open(self.path(token, build_sheets), "rb")
+        except FileNotFoundError:   # evicted by another process in between: write it again
+            with self._lock:
+                self._paths.pop(token, None)
+            return open(self.path(token, build_sheets), "rb")
+
+    def clear(self):
+        with self._lock:
+            self._paths.clear()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._paths)}
+
+
+_export_store = None
+_export_store_lock = threading.Lock()
+
+
+def get_export_store() -> ExportStore:
+    """Process-wide export store (shared by every session)."""
+    global _export_store
+    with _export_store_lock:
+        if _export_store is None:
+            _export_store = ExportStore()
+        return _export_store
+
+
+def export_excel_file(sheets_or_builder, token: str | None = None):
+    """Workbook as a binary file object: the export store's file when a token is given, else a BytesIO.
+
+    sheets_or_builder is [(sheet_name, df, index)] or a callable returning it
+    (so a cache hit skips building the frames too). The caller closes it.
+    """
+    build = sheets_or_builder if callable(sheets_or_builder) else (lambda: sheets_or_builder)
+    if token is None:
+        return io.BytesIO(excel_bytes(build()))
+    return get_export_store().open(token, build)
+
+
+def export_excel(sheets_or_builder, token: str | None = None) -> bytes:
+    """Workbook bytes (for download buttons); see export_excel_file()."""
+    with export_excel_file(sheets_or_builder, token) as f:
+        return f.read()
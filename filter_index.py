@@ -0,0 +1,196 @@
+# ================= FILTER INDEX =================
+# Integer-code indexes for the sidebar multiselect dimensions, built once per
+# uploaded dataset. Each dimension keeps its category codes, per-code row
+# counts and code-sorted row ids (posting lists). A selection is normalized
+# to frozensets of codes -- a dimension where every present value is
+# selected drops out entirely -- and resolved by starting from the most
+# selective dimension's row ids and checking the remaining dimensions on
+# those candidates only. On date-sorted frames the date range is a row-offset
+# range from date_index.DateIndex, and a result that is one contiguous block
+# is returned as a slice. Resolved row ids are memoized per normalized state,
+# so an unchanged filter costs one dict lookup.
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from date_index import DateIndex
+from version_cache import VersionCache
+
+
+SELECTION_CACHE_SIZE = 32   # resolved row-id arrays kept per index (i.e. per dataset scope)
+STATE_CACHE_SIZE = 256      # raw selection -> normalized state lookups kept per index
+POSTINGS_MAX_SHARE = 0.25   # above this share of rows, a code mask beats gathering posting lists
+
+
+class _DimIndex:
+    """Codes, counts and posting lists for one column (code -1 = missing)."""
+
+    def __init__(self, s: pd.Series):
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            codes = s.cat.codes.to_numpy()
+            categories = s.cat.categories
+        else:
+            codes, categories = pd.factorize(s, sort=True)
+        self.categories = pd.Index(categories)
+        self.codes = codes.astype(np.intp, copy=False)
+        valid = self.codes >= 0
+        self.has_na = not bool(valid.all())
+        self.counts = np.bincount(self.codes[valid], minlength=len(self.categories))
+        self.present = np.flatnonzero(self.counts)
+        order = np.argsort(self.codes, kind="stable")
+        self.order = order[len(order) - int(valid.sum()):]   # row ids grouped by code (missing dropped)
+        self.offsets = np.concatenate(([0], np.cumsum(self.counts)))
+        self._options = None
+
+    def options(self) -> list:
+        if self._options is None:
+            values = list(self.categories[self.present])
+            try:
+                self._options = sorted(values)
+            except TypeError:
+                self._options = sorted(values, key=str)
+        return self._options
+
+    def normalize(self, values) -> frozenset | None:
+        """Selected codes present in the data; None when the selection keeps every row."""
+        codes = self.categories.get_indexer(pd.Index(list(values), dtype=object))
+        codes = frozenset(int(c) for c in codes if c >= 0 and self.counts[c])
+        if not self.has_na and len(codes) == len(self.present):
+            return None
+        return codes
+
+    def row_count(self, codes: frozenset) -> int:
+        return int(self.counts[list(codes)].sum()) if codes else 0
+
+    def rows(self, codes: frozenset) -> np.ndarray:
+        """Sorted row ids holding any of the codes."""
+        if not codes:
+            return np.empty(0, dtype=np.intp)
+        if len(codes) == 1:
+            c = next(iter(codes))
+            return self.order[self.offsets[c]:self.offsets[c + 1]]   # stable sort: already ascending
+        return np.flatnonzero(self.lookup(codes)[self.codes])
+
+    def lookup(self, codes: frozenset) -> np.ndarray:
+        """Boolean table over codes; the extra last slot answers code -1 (missing -> False)."""
+        table = np.zeros(len(self.categories) + 1, dtype=bool)
+        table[list(codes)] = True
+        return table
+
+
+class FilterIndex:
+    """Per-dataset index over `dims` (+ optional date column) of one frame."""
+
+    def __init__(self, df: pd.DataFrame, dims, date_col: str | None = None):
+        self.n_rows = len(df)
+        self.dims = {col: _DimIndex(df[col]) for col in dims if col in df.columns}
+        self.date_col = date_col
+        self.date_index = DateIndex.build(df, date_col) if date_col else None
+        self.dates = None
+        if self.date_index is None and date_col and date_col in df.columns:
+            self.dates = df[date_col].to_numpy()   # not date-sorted: mask the candidates
+        self._memo = OrderedDict()         # normalized state -> row ids
+        self._normalized = OrderedDict()   # raw selections -> normalized state
+        self._lock = threading.Lock()
+
+    def options(self, col: str) -> list:
+        """Sorted non-missing values of `col` (what the multiselects offer)."""
+        return self.dims[col].options()
+
+    def normalize(self, selections: dict, start=None, end=None) -> tuple:
+        """Hashable filter state: (dim, codes) for dimensions that actually filter, plus the date bounds."""
+        raw = (tuple((col, None if v is None else tuple(v)) for col, v in selections.items()), start, end)
+        with self._lock:
+            state = self._normalized.get(raw)
+        if state is None:
+            state = self._normalize(selections, start, end)
+            with self._lock:
+                self._normalized[raw] = state
+                while len(self._normalized) > STATE_CACHE_SIZE:
+                    self._normalized.popitem(last=False)
+        return state
+
+    def _normalize(self, selections: dict, start, end) -> tuple:
+        state = []
+        for col, values in selections.items():
+            if values is None or col not in self.dims:
+                continue
+            codes = self.dims[col].normalize(values)
+            if codes is not None:
+                state.append((col, codes))
+        start = None if start is None else pd.Timestamp(start)
+        end = None if end is None else pd.Timestamp(end)
+        return tuple(sorted(state, key=lambda kv: kv[0])), start, end
+
+    def rows(self, selections: dict, start=None, end=None) -> np.ndarray:
+        """Ascending row positions matching every selection and start <= date <= end."""
+        key = self.normalize(selections, start, end)
+        with self._lock:
+            rows = self._memo.get(key)
+            if rows is not None:
+                self._memo.move_to_end(key)
+                return rows
+        rows = self._resolve(*key)
+        rows.flags.writeable = False
+        with self._lock:
+            self._memo[key] = rows
+            while len(self._memo) > SELECTION_CACHE_SIZE:
+                self._memo.popitem(last=False)
+        return rows
+
+    def select(self, df: pd.DataFrame, selections: dict, start=None, end=None) -> pd.DataFrame:
+        """df rows matching the filter (df must be the frame this index was built on).
+
+        A contiguous result (e.g. only the date range filters) is a slice
+        view of df; treat it as read-only.
+        """
+        rows = self.rows(selections, start, end)
+        if len(rows) == 0 or rows[-1] - rows[0] + 1 == len(rows):
+            return df.iloc[rows[0]:rows[-1] + 1] if len(rows) else df.iloc[0:0]
+        return df.take(rows)
+
+    def _resolve(self, state, start, end) -> np.ndarray:
+        active = sorted(state, key=lambda kv: self.dims[kv[0]].row_count(kv[1]))
+        lo, hi = self.date_index.bounds(start, end) if self.date_index is not None else (0, self.n_rows)
+        if not active:
+            rows = np.arange(lo, hi)
+        else:
+            col, codes = active[0]
+            dim = self.dims[col]
+            if hi - lo <= dim.row_count(codes):
+                # the date block is the smallest candidate set
+                rows, check = np.arange(lo, hi), active
+            elif dim.row_count(codes) <= POSTINGS_MAX_SHARE * self.n_rows:
+                rows, check = dim.rows(codes), active[1:]
+            else:
+                rows, check = np.flatnonzero(dim.lookup(codes)[dim.codes]), active[1:]
+            for col, codes in check:
+                dim = self.dims[col]
+                rows = rows[dim.lookup(codes)[dim.codes[rows]]]
+            if (lo, hi) != (0, self.n_rows):
+                rows = rows[np.searchsorted(rows, lo):np.searchsorted(rows, hi)]
+        if self.dates is not None and (start is not None or end is not None):
+            d = self.dates[rows]
+            keep = np.ones(len(rows), dtype=bool)
+            if start is not None:
+                keep &= d >= start.to_datetime64()
+            if end is not None:
+                keep &= d <= end.to_datetime64()
+            rows = rows[keep]
+        return rows
+
+
+_index_cache = VersionCache()   # per data version: one FilterIndex per frame name
+
+
+def get_filter_index(data_version: str | None, name: str, df: pd.DataFrame, dims, date_col: str | None = None) -> FilterIndex:
+    """FilterIndex for df, built once per (dataset version, name); not cached without a version."""
+    if data_version is None:
+        return FilterIndex(df, dims, date_col)
+    index = _index_cache.get(data_version, name)
+    if index is not None and index.n_rows == len(df):
+        return index
+    return _index_cache.put(data_version, name, FilterIndex(df, dims, date_col))
@@ -0,0 +1,517 @@
+# ================= FORECASTING =================
+# Forecast helpers shared by the dashboard pages.
+# NOTE: No Streamlit calls in here (safe to use from worker processes).
+
+import atexit
+import hashlib
+import importlib
+import multiprocessing
+import os
+import pickle
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ingestion import CACHE_DIR
+
+
+# ================= FORECAST CACHE =================
+# Fitted forecasts keyed by a fingerprint of the input series + model + horizon.
+# In-memory LRU (process-wide) backed by pickles on disk, so identical filter
+# selections never refit Prophet — across reruns, sessions and restarts.
+FORECAST_CACHE_DIR = os.environ.get("DAILY_TRACKING_FORECAST_CACHE_DIR", os.path.join(CACHE_DIR, "forecasts"))
+FORECAST_CACHE_SIZE = 64          # entries kept in memory
+FORECAST_DISK_CACHE_SIZE = 512    # entries kept on disk (oldest access evicted)
+
+
+def series_fingerprint(series_df: pd.DataFrame, horizon: int, model: str = "prophet") -> str:
+    """Stable hash of a ds/y frame + model + horizon."""
+    h = hashlib.sha256(f"{model}|{int(horizon)}|".encode())
+    frame = series_df[["ds", "y"]].reset_index(drop=True)
+    h.update(pd.util.hash_pandas_object(frame, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+class ForecastCache:
+    """Thread-safe LRU of forecast frames with disk persistence and hit/miss counters."""
+
+    def __init__(self, cache_dir=FORECAST_CACHE_DIR, max_entries=FORECAST_CACHE_SIZE,
+                 max_disk_entries=FORECAST_DISK_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _remember(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def _read_disk(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)   # touch -> LRU order on disk
+            return value
+        except Exception:
+            return None
+
+    def _write_disk(self, key, value):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = self._path(key) + f".{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+            self._prune_disk()
+        except Exception:
+            pass
+
+    def _prune_disk(self):
+        files = [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir) if f.endswith(".pkl")]
+        if len(files) <= self.max_disk_entries:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[: len(files) - self.max_disk_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self.hits += 1
+                self._items.move_to_end(key)
+                return self._items[key]
+        value = self._read_disk(key)
+        with self._lock:
+            if value is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                self._remember(key, value)
+            else:
+                self.misses += 1
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+        self._write_disk(key, value)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._items),
+                "hit_rate": (self.hits / total * 100) if total else 0.0,
+            }
+
+
+_forecast_cache = None
+_forecast_cache_lock = threading.Lock()
+
+
+def get_forecast_cache() -> ForecastCache:
+    """Process-wide forecast cache (shared by every session)."""
+    global _forecast_cache
+    with _forecast_cache_lock:
+        if _forecast_cache is None:
+            _forecast_cache = ForecastCache()
+        return _forecast_cache
+
+
+# ================= PROPHET =================
+def fit_prophet_forecast(series_df: pd.DataFrame, horizon: int = 30) -> pd.DataFrame:
+    """Fit Prophet on a ds/y frame and predict `horizon` days ahead (uncached)."""
+    from prophet import Prophet
+
+    m = Prophet()
+    m.fit(series_df[["ds", "y"]])
+    future = m.make_future_dataframe(periods=horizon)
+    return m.predict(future)
+
+
+def prophet_forecast(series_df: pd.DataFrame, horizon: int = 30) -> pd.DataFrame:
+    """Cached Prophet forecast (same ds/y + horizon -> same frame, no refit)."""
+    key = series_fingerprint(series_df, horizon, model="prophet")
+    return get_forecast_cache().get_or_compute(key, lambda: fit_prophet_forecast(series_df, horizon))
+
+
+# ================= OTHER MODELS =================
+FORECAST_MODELS = ("prophet", "holt_winters", "linear")
+INTERVAL_Z = 1.96   # ~95% band from residual std
+# SLSQP without the brute-force start grid: ~5x faster than the default with equal in-sample error
+HW_FIT_OPTIONS = {"use_brute": False, "method": "SLSQP"}
+
+
+def _with_interval(ds, yhat, resid_std) -> pd.DataFrame:
+    band = INTERVAL_Z * (resid_std if np.isfinite(resid_std) else 0.0)
+    yhat = np.asarray(yhat, dtype="float64")
+    return pd.DataFrame({"ds": ds, "yhat": yhat, "yhat_lower": yhat - band, "yhat_upper": yhat + band})
+
+
+def _future_dates(series_df: pd.DataFrame, horizon: int) -> pd.DatetimeIndex:
+    last = pd.Timestamp(series_df["ds"].max())
+    return pd.date_range(last + pd.Timedelta(days=1), periods=horizon, freq="D")
+
+
+def fit_holt_winters_forecast(series_df: pd.DataFrame, horizon: int = 30) -> pd.DataFrame:
+    """Holt-Winters on a daily ds/y frame (weekly season when there are 2+ weeks)."""
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+    y = series_df["y"].astype("float64").to_numpy()
+    seasonal = "add" if len(y) >= 14 else None
+    model = ExponentialSmoothing(
+        y, trend="add", seasonal=seasonal, seasonal_periods=7 if seasonal else None,
+        initialization_method="estimated",
+    ).fit(**HW_FIT_OPTIONS)
+    fitted = model.fittedvalues
+    ds = pd.concat([pd.Series(pd.to_datetime(series_df["ds"]).to_numpy()),
+                    pd.Series(_future_dates(series_df, horizon))], ignore_index=True)
+    return _with_interval(ds, np.concatenate([fitted, model.forecast(horizon)]), np.std(y - fitted))
+
+
+def fit_linear_forecast(series_df: pd.DataFrame, horizon: int = 30) -> pd.DataFrame:
+    """Straight-line trend (LinearRegression on the day number)."""
+    from sklearn.linear_model import LinearRegression
+
+    y = series_df["y"].astype("float64").to_numpy()
+    x = np.arange(len(y) + horizon, dtype="float64").reshape(-1, 1)
+    model = LinearRegression().fit(x[: len(y)], y)
+    yhat = model.predict(x)
+    ds = pd.concat([pd.Series(pd.to_datetime(series_df["ds"]).to_numpy()),
+                    pd.Series(_future_dates(series_df, horizon))], ignore_index=True)
+    return _with_interval(ds, yhat, np.std(y - yhat[: len(y)]))
+
+
+def run_forecast(series_df: pd.DataFrame, model: str = "prophet", horizon: int = 30) -> pd.DataFrame:
+    """Uncached forecast dispatch (module level so worker processes can pickle it)."""
+    if model == "prophet":
+        return fit_prophet_forecast(series_df, horizon)
+    if model == "holt_winters":
+        return fit_holt_winters_forecast(series_df, horizon)
+    if model == "linear":
+        return fit_linear_forecast(series_df, horizon)
+    raise ValueError(f"Unknown forecast model: {model}")
+
+
+# ================= BACKGROUND FORECAST SERVICE =================
+# Fits run in a process pool so the Streamlit script thread only submits jobs
+# and renders a placeholder; results land in the forecast cache when done.
+# "spawn" workers: the Streamlit server is multi-threaded, forking it is unsafe.
+FORECAST_WORKERS = int(os.environ.get("DAILY_TRACKING_FORECAST_WORKERS", "0")) or (os.cpu_count() or 1)
+
+
+def _warm_worker():
+    """Pool initializer: import the model library once per worker, not inside its first job."""
+    try:
+        importlib.import_module("statsmodels.tsa.holtwinters")
+    except Exception:
+        pass
+
+
+def _ready() -> bool:
+    return True
+
+
+def _completed_future(value) -> Future:
+    fut = Future()
+    fut.set_result(value)
+    return fut
+
+
+class ForecastService:
+    """Submit forecast jobs (series, model, horizon) to a process pool and get futures back."""
+
+    def __init__(self, max_workers=FORECAST_WORKERS, cache: ForecastCache | None = None):
+        self.max_workers = max_workers
+        self.cache = cache or get_forecast_cache()
+        self._executor = None
+        self._inflight = {}
+        self._warm = []
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+            )
+        return self._executor
+
+    def warm(self) -> list:
+        """Spawn every worker now, in the background, so the first forecast does not pay for it.
+
+        Called once data is loaded; returns the warm-up futures (later calls return the same ones).
+        """
+        with self._lock:
+            if not self._warm:
+                pool = self._pool()
+                self._warm = [pool.submit(_ready) for _ in range(self.max_workers)]
+            return self._warm
+
+    def _finish(self, key, fut):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if not fut.cancelled() and fut.exception() is None:
+            self.cache.put(key, fut.result())
+
+    def submit(self, series_df: pd.DataFrame, model: str = "prophet", horizon: int = 30) -> Future:
+        """Future for one forecast frame (cache hit -> already resolved, same job in flight -> shared)."""
+        series_df = series_df[["ds", "y"]].reset_index(drop=True)
+        key = series_fingerprint(series_df, horizon, model=model)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return _completed_future(cached)
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                return fut
+            fut = self._pool().submit(run_forecast, series_df, model, horizon)
+            self._inflight[key] = fut
+        # outside the lock: a future that is already done runs the callback (which locks) right here
+        fut.add_done_callback(lambda f, k=key: self._finish(k, f))
+        return fut
+
+    def submit_call(self, fn, *args) -> Future:
+        """Run any picklable module-level function in the pool (batch engines)."""
+        return self._pool().submit(fn, *args)
+
+    def submit_many(self, fn, batches) -> list:
+        """Fan fn(*args) for each args tuple in batches out across all workers -> [future] (no waiting)."""
+        pool = self._pool()
+        return [pool.submit(fn, *args) for args in batches]
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self._warm = []
+
+
+_forecast_service = None
+
+
+def get_forecast_service() -> ForecastService:
+    """Process-wide forecast service (pool started on first submit)."""
+    global _forecast_service
+    cache = get_forecast_cache()
+    with _forecast_cache_lock:
+        if _forecast_service is None:
+            _forecast_service = ForecastService(cache=cache)
+            atexit.register(_forecast_service.shutdown)
+        return _forecast_service
+
+
+# ================= BATCH MATERIAL FORECAST =================
+# One model per material on monthly totals, fanned out across the worker pool:
+#   >= 2 seasons of history -> Holt-Winters (additive damped trend + 12-month season)
+#   >= MIN_HOLT_MONTHS      -> Holt (damped trend, no season)
+#   shorter / failed fits   -> seasonal-naive, vectorized over all such materials at once
+# submit_materials() only submits the fits and returns a MaterialForecastJob, so
+# the page can render and fill the forecast in when job.done().
+SEASON_MONTHS = 12
+MIN_HOLT_MONTHS = 6
+INLINE_FIT_LIMIT = 16        # below this many fits the pool start-up is not worth it
+CHUNKS_PER_WORKER = 4
+
+
+def monthly_matrix(df: pd.DataFrame, item_col: str, value_col: str, date_col: str = "Billing Date",
+                   complete_months_only: bool = True) -> pd.DataFrame:
+    """Items × months wide frame (NaN before an item's first month, 0 for gaps after it)."""
+    dates = pd.to_datetime(df[date_col], errors="coerce")
+    base = pd.DataFrame({
+        "item": df[item_col].astype(str).to_numpy(),
+        "month": dates.dt.to_period("M").to_numpy(),
+        "value": pd.to_numeric(df[value_col], errors="coerce").fillna(0).to_numpy(),
+    }).dropna(subset=["month"])
+    if base.empty:
+        return pd.DataFrame()
+
+    last_month = base["month"].max()
+    if complete_months_only and dates.max() < last_month.end_time.normalize() and base["month"].nunique() > 1:
+        base = base[base["month"] < last_month]    # drop the running (partial) month
+        last_month = base["month"].max()
+
+    wide = base.groupby(["item", "month"], observed=True)["value"].sum().unstack("month").rename_axis(item_col)
+    wide = wide.reindex(columns=pd.period_range(base["month"].min(), last_month, freq="M"))
+    started = wide.notna().cumsum(axis=1) > 0
+    return wide.fillna(0).where(started)
+
+
+def seasonal_naive_forecast(values: np.ndarray, horizon: int, season: int = SEASON_MONTHS):
+    """Vectorized seasonal-naive over rows of a right-aligned matrix -> (yhat, sigma)."""
+    n_items, n_periods = values.shape
+    lengths = np.sum(~np.isnan(values), axis=1)
+    last = values[:, -1]
+    yhat = np.repeat(last[:, None], horizon, axis=1)
+    if n_periods >= season:
+        idx = n_periods - season + (np.arange(horizon) % season)
+        seasonal = values[:, idx]
+        yhat = np.where((lengths >= season)[:, None] & ~np.isnan(seasonal), seasonal, yhat)
+
+    step_diff = np.diff(values, axis=1)
+    season_diff = values[:, season:] - values[:, :-season] if n_periods > season else np.full((n_items, 0), np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        sigma_step = np.nanstd(step_diff, axis=1) if step_diff.size else np.full(n_items, np.nan)
+        sigma_season = np.nanstd(season_diff, axis=1) if season_diff.size else np.full(n_items, np.nan)
+    sigma = np.where((lengths > season) & ~np.isnan(sigma_season), sigma_season, sigma_step)
+    return yhat, np.nan_to_num(sigma)
+
+
+def _fit_exponential_smoothing(y: np.ndarray, horizon: int, season: int = SEASON_MONTHS):
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+    seasonal = len(y) >= 2 * season
+    model = ExponentialSmoothing(
+        y, trend="add", damped_trend=True,
+        seasonal="add" if seasonal else None, seasonal_periods=season if seasonal else None,
+        initialization_method="estimated",
+    ).fit(**HW_FIT_OPTIONS)
+    return model.forecast(horizon), float(np.std(y - model.fittedvalues)), ("holt_winters" if seasonal else "holt")
+
+
+def fit_material_chunk(names: list, series: list, horizon: int, season: int = SEASON_MONTHS) -> list:
+    """Worker: fit each series in a chunk -> [(name, yhat | None, sigma, method)]."""
+    out = []
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for name, y in zip(names, series):
+            try:
+                yhat, sigma, method = _fit_exponential_smoothing(np.asarray(y, dtype="float64"), horizon, season)
+                if not np.all(np.isfinite(yhat)):
+                    raise ValueError("non-finite forecast")
+                out.append((name, np.asarray(yhat, dtype="float64"), sigma, method))
+            except Exception:
+                out.append((name, None, 0.0, "failed"))
+    return out
+
+
+class MaterialForecastJob:
+    """A batch material forecast in flight: poll done(), then result() assembles the frame."""
+
+    def __init__(self, item_col: str, horizon: int, wide: pd.DataFrame | None = None, key: str | None = None,
+                 cache: ForecastCache | None = None, result: pd.DataFrame | None = None):
+        self.item_col = item_col
+        self.horizon = horizon
+        self.wide = wide
+        self.key = key
+        self.cache = cache
+        self.futures = []
+        self.inline = []     # fits done in-process (too few for the pool)
+        self.row_of = {}
+        self._result = result
+        self._lock = threading.Lock()
+
+    def done(self) -> bool:
+        return self._result is not None or all(fut.done() for fut in self.futures)
+
+    def result(self) -> pd.DataFrame:
+        """Forecast frame (waits for outstanding fits if called before done())."""
+        with self._lock:
+            if self._result is None:
+                results = self.inline + [r for fut in self.futures for r in fut.result()]
+                self._result = self._assemble(results)
+                self.wide = self.futures = self.inline = None
+                if self.key is not None:
+                    self.cache.put(self.key, self._result)
+            return self._result
+
+    def _assemble(self, results: list) -> pd.DataFrame:
+        wide, horizon = self.wide, self.horizon
+        values = wide.to_numpy(dtype="float64")
+        names = wide.index.tolist()
+        # Vectorized baseline for every item; model fits overwrite it where they succeed
+        yhat, sigma = seasonal_naive_forecast(values, horizon)
+        method = np.array(["seasonal_naive"] * len(names), dtype=object)
+        for name, fc, sd, how in results:
+            if fc is not None:
+                i = self.row_of[name]
+                yhat[i], sigma[i], method[i] = fc, sd, how
+
+        band = INTERVAL_Z * sigma[:, None] * np.sqrt(np.arange(1, horizon + 1))[None, :]
+        lower, upper = yhat - band, yhat + band
+        non_negative = (np.nanmin(values, axis=1) >= 0)[:, None]   # no returns-driven history -> floor at 0
+        yhat, lower, upper = (np.where(non_negative, np.maximum(a, 0), a) for a in (yhat, lower, upper))
+        months = pd.period_range(wide.columns[-1] + 1, periods=horizon, freq="M").to_timestamp()
+        n = len(names)
+        return pd.DataFrame({
+            self.item_col: np.repeat(names, horizon),
+            "Month": np.tile(months, n),
+            "Forecast": yhat.ravel(),
+            "Lower": lower.ravel(),
+            "Upper": upper.ravel(),
+            "Method": np.repeat(method, horizon),
+        })
+
+
+def submit_materials(df: pd.DataFrame, item_col: str = "Material Description", value_col: str = "Quantity",
+                     horizon: int = 6, date_col: str = "Billing Date", service=None,
+                     use_cache: bool = True) -> MaterialForecastJob:
+    """Start the next-`horizon`-month forecast per item: chunks of fits go to the pool, nothing waits on them."""
+    wide = monthly_matrix(df, item_col, value_col, date_col)
+    if wide.empty:
+        columns = [item_col, "Month", "Forecast", "Lower", "Upper", "Method"]
+        return MaterialForecastJob(item_col, horizon, result=pd.DataFrame(columns=columns))
+
+    service = service or get_forecast_service()
+    key = None
+    if use_cache:
+        h = hashlib.sha256(f"materials|{value_col}|{int(horizon)}|{wide.columns[-1]}|".encode())
+        h.update(pd.util.hash_pandas_object(wide.reset_index(), index=False).values.tobytes())
+        key = h.hexdigest()
+        cached = service.cache.get(key)
+        if cached is not None:
+            return MaterialForecastJob(item_col, horizon, result=cached)
+
+    job = MaterialForecastJob(item_col, horizon, wide, key, service.cache)
+    values = wide.to_numpy(dtype="float64")
+    names = wide.index.tolist()
+    lengths = np.sum(~np.isnan(values), axis=1)
+    fit_rows = np.flatnonzero(lengths >= MIN_HOLT_MONTHS)
+    if len(fit_rows):
+        job.row_of = {names[i]: i for i in fit_rows}
+        fit_names = [names[i] for i in fit_rows]
+        fit_series = [values[i, -lengths[i]:] for i in fit_rows]
+        if len(fit_rows) <= INLINE_FIT_LIMIT:
+            job.inline = fit_material_chunk(fit_names, fit_series, horizon)
+        else:
+            n_chunks = min(len(fit_rows), max(1, service.max_workers) * CHUNKS_PER_WORKER)
+            job.futures = service.submit_many(fit_material_chunk, [
+                ([fit_names[j] for j in part], [fit_series[j] for j in part], horizon)
+                for part in np.array_split(np.arange(len(fit_rows)), n_chunks)
+            ])
+    return job
+
+
+def forecast_materials(df: pd.DataFrame, item_col: str = "Material Description", value_col: str = "Quantity",
+                       horizon: int = 6, date_col: str = "Billing Date", service=None,
+                       use_cache: bool = True) -> pd.DataFrame:
+    """Next-`horizon`-month forecast per item with ~95% intervals (long frame, one row per item × month); blocking."""
+    return submit_materials(df, item_col, value_col, horizon, date_col, service, use_cache).result()
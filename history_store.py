@@ -0,0 +1,142 @@
+# ================= YTD HISTORY STORE =================
+# The YTD sheet is the multi-year billing history; it only grows at the end
+# (new months) while older months rarely change. In the disk cache it is kept
+# as one parquet file per billing month (plus one for undated rows), listed in
+# the bundle manifest with its row count and min / max billing date.
+# Month files are content-addressed under <cache dir>/history/, so the next
+# workbook that carries the same older months re-uses their files and only
+# new or restated months are written; ingestion.prune_cache() deletes the
+# files no cached manifest lists any more. read_history() prunes on the min / max
+# metadata and reads just the months a period touches (optionally only some
+# columns), so a one-month or same-period-last-year query does not read five
+# years of history.
+# In memory the loaded YTD frame is date-sorted, so the same months are
+# contiguous row ranges (month_partitions) and period filters are
+# date_index.date_slice() views.
+# NOTE: No Streamlit calls in here.
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from date_index import DATE_COL, DateIndex, date_slice
+
+
+HISTORY_DIR = "history"
+UNDATED = "undated"
+
+
+def month_partitions(df: pd.DataFrame, col: str = DATE_COL) -> list | None:
+    """[{month, lo, hi, rows, min, max}] row ranges of a date-sorted frame; None if it is not date-sorted."""
+    index = DateIndex.build(df, col)
+    if index is None:
+        return None
+    values = df[col].to_numpy()
+    months = index.days.astype("datetime64[M]")
+    starts = np.flatnonzero(months[1:] != months[:-1]) + 1 if len(months) else np.empty(0, dtype=np.intp)
+    day_bounds = np.concatenate(([0], starts, [len(months)])) if len(months) else np.empty(0, dtype=np.intp)
+    partitions = []
+    for a, b in zip(day_bounds[:-1], day_bounds[1:]):
+        lo, hi = int(index.offsets[a]), int(index.offsets[b])
+        partitions.append({
+            "month": str(months[a]), "lo": lo, "hi": hi, "rows": hi - lo,
+            "min": pd.Timestamp(values[lo]).isoformat(), "max": pd.Timestamp(values[hi - 1]).isoformat(),
+        })
+    if index.n_valid < index.n_rows:
+        partitions.append({"month": UNDATED, "lo": index.n_valid, "hi": index.n_rows,
+                           "rows": index.n_rows - index.n_valid, "min": None, "max": None})
+    return partitions
+
+
+def _partition_digest(part: pd.DataFrame) -> str:
+    """Content address of one month: row values + column names / dtypes."""
+    h = hashlib.sha256()
+    h.update(json.dumps([[str(c), str(t)] for c, t in part.dtypes.items()]).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def write_history(df: pd.DataFrame, history_dir: str, col: str = DATE_COL) -> list | None:
+    """Store df as month files in history_dir; the manifest entries, or None if df is empty / not date-sorted.
+
+    Months already stored (same content) are not rewritten. Raises when Arrow
+    cannot type the frame -- callers fall back to a single-file cache entry.
+    """
+    if not all(isinstance(c, str) for c in df.columns):
+        raise TypeError("non-string headers do not round-trip through parquet")
+    partitions = month_partitions(df, col)
+    if not partitions:
+        return None
+    os.makedirs(history_dir, exist_ok=True)
+    entries = []
+    for p in partitions:
+        part = df.iloc[p["lo"]:p["hi"]]
+        digest = _partition_digest(part)
+        path = os.path.join(history_dir, digest + ".parquet")
+        if not os.path.exists(path):
+            fd, tmp = tempfile.mkstemp(prefix=".tmp_", suffix=".parquet", dir=history_dir)
+            os.close(fd)
+            try:
+                part.to_parquet(tmp, index=False)
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        entries.append({"month": p["month"], "file": digest, "rows": p["rows"], "min": p["min"], "max": p["max"]})
+    return entries
+
+
+def select_partitions(entries: list, start=None, end=None) -> list:
+    """Manifest entries whose [min, max] overlaps [start, end] (undated rows only without bounds)."""
+    if start is None and end is None:
+        return list(entries)
+    start = None if start is None else pd.Timestamp(start)
+    end = None if end is None else pd.Timestamp(end)
+    chosen = []
+    for e in entries:
+        if e["month"] == UNDATED:
+            continue
+        if start is not None and pd.Timestamp(e["max"]) < start:
+            continue
+        if end is not None and pd.Timestamp(e["min"]) > end:
+            continue
+        chosen.append(e)
+    return chosen
+
+
+def _empty_history(entries: list, history_dir: str, columns) -> pd.DataFrame:
+    """Zero-row frame with the stored schema (read from a parquet footer, no row data)."""
+    if not entries:
+        return pd.DataFrame(columns=columns or [])
+    import pyarrow.parquet as pq
+
+    schema = pq.read_schema(os.path.join(history_dir, entries[0]["file"] + ".parquet"))
+    df = schema.empty_table().to_pandas()
+    return df if columns is None else df[columns]
+
+
+def read_history(entries: list, history_dir: str, start=None, end=None, columns=None,
+                 col: str = DATE_COL) -> pd.DataFrame:
+    """Rows with start <= date <= end, reading only the month files the period touches.
+
+    columns restricts the columns read (the date column is always read for
+    the bounds). The result is date-sorted.
+    """
+    read_cols = None if columns is None else list(dict.fromkeys([*columns, col]))
+    chosen = select_partitions(entries, start, end)
+    if not chosen:
+        return _empty_history(entries, history_dir, read_cols)
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tables = [pq.read_table(os.path.join(history_dir, e["file"] + ".parquet"), columns=read_cols) for e in chosen]
+    df = pa.concat_tables(tables).to_pandas()
+    if start is not None or end is not None:
+        df = date_slice(df, start, end, col=col)
+    if columns is not None and col not in columns:
+        df = df[list(columns)]
+    return df
@@ -0,0 +1,288 @@
+# ================= INCREMENTAL DAILY APPEND =================
+# Morning refresh without re-uploading the month: a delta workbook carries only
+# the new "sales data" lines (a full re-upload works too -- lines already
+# loaded are dropped). New lines are deduplicated on billing document + line,
+# aligned to the loaded compact schema, appended to the date-sorted sales
+# frame, and only the affected days of the daily cube are re-aggregated.
+#
+# Persistence: each append is stored in the disk cache as a small delta record
+# (the new lines only) chained to the previous state; the root workbook's
+# directory keeps a head pointer, so re-uploading the same month workbook
+# later resumes from the latest appended state. Chains are compacted to a full
+# snapshot every MAX_DELTA_CHAIN appends.
+# NOTE: No Streamlit calls in here -- sales.py owns the UI.
+
+import io
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass, replace
+
+import pandas as pd
+
+from cube import CUBE_DATE, CUBE_MEASURES, LINE_COUNT_COL, build_daily_cube
+from date_index import date_slice, sort_by_date
+from ingestion import (
+    CACHE_DIR, CACHE_FORMAT_VERSION, SALES_SHEET, STREAMED_SHEETS, WorkbookBundle,
+    _bundle_cache_path, _read_frame, _write_frame, content_hash, load_bundle,
+    load_cached_bundle, normalize_series, prune_cache, read_sheet_streaming, save_bundle,
+    touch_bundle,
+)
+
+
+LINE_DOC_COL = "Billing Document"
+LINE_ITEM_CANDIDATES = ["Billing Item", "Item", "Line Item", "Line", "Item No", "Posnr"]
+MAX_DELTA_CHAIN = 7
+HEAD_FILE = "head.json"
+
+
+@dataclass
+class AppendReport:
+    """What one delta did to the loaded data."""
+    delta_rows: int = 0
+    new_rows: int = 0
+    duplicate_rows: int = 0
+    days: tuple = ()          # billing days that received new lines
+    key: tuple = ()           # columns used to recognise a line
+
+
+# ================= DELTA PARSING =================
+def read_delta_lines(data: bytes) -> pd.DataFrame:
+    """The "sales data" sheet of a delta workbook, normalized like a full load."""
+    xls = pd.ExcelFile(io.BytesIO(data))
+    if SALES_SHEET not in xls.sheet_names:
+        raise ValueError(f"'{SALES_SHEET}' sheet not found")
+    if xls.engine == "openpyxl":
+        df = read_sheet_streaming(xls.book[SALES_SHEET], STREAMED_SHEETS[SALES_SHEET])
+    else:
+        df = pd.read_excel(xls, sheet_name=SALES_SHEET)
+    if "Billing Date" not in df.columns:
+        raise ValueError("'Billing Date' column not found")
+    df["Billing Date"] = pd.to_datetime(df["Billing Date"], errors="coerce")
+    if "PY Name 1" in df.columns:
+        df["_py_name_norm"] = normalize_series(df["PY Name 1"])
+    return df
+
+
+def line_key_columns(df: pd.DataFrame) -> list:
+    """Billing document + line item; without a line column every column identifies a line."""
+    if LINE_DOC_COL in df.columns:
+        item = next((c for c in LINE_ITEM_CANDIDATES if c in df.columns), None)
+        if item is not None:
+            return [LINE_DOC_COL, item]
+    return list(df.columns)
+
+
+# ================= SCHEMA ALIGNMENT =================
+def _grown_dtypes(frames, delta: pd.DataFrame) -> dict:
+    """{column: categorical dtype extended with the delta's unseen values} for the shared dims."""
+    dtypes = {}
+    for col in delta.columns:
+        dtype = next((df[col].dtype for df in frames if col in df.columns
+                      and isinstance(df[col].dtype, pd.CategoricalDtype)), None)
+        if dtype is None:
+            continue
+        unseen = pd.Index(pd.unique(delta[col].dropna())).difference(dtype.categories)
+        # appended (not re-sorted): existing codes stay valid, no rewrite of loaded rows
+        dtypes[col] = pd.CategoricalDtype(dtype.categories.append(unseen)) if len(unseen) else dtype
+    return dtypes
+
+
+def _with_dtypes(df: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    changed = {c: t for c, t in dtypes.items() if c in df.columns and df[c].dtype != t}
+    if not changed:
+        return df
+    df = df.copy(deep=False)
+    for col, dtype in changed.items():
+        df[col] = df[col].cat.set_categories(dtype.categories) if isinstance(df[col].dtype, pd.CategoricalDtype) \
+            else df[col].astype(dtype)
+    return df
+
+
+def align_delta(sales_df: pd.DataFrame, delta: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    """Delta lines in the loaded sales frame's columns and dtypes."""
+    delta = delta.reindex(columns=sales_df.columns)
+    for col in sales_df.columns:
+        target = dtypes.get(col, sales_df[col].dtype)
+        if delta[col].dtype == target:
+            continue
+        try:
+            delta[col] = delta[col].astype(target)
+        except (TypeError, ValueError):
+            pass   # e.g. an int column with blanks: concat upcasts
+    return delta
+
+
+# ================= APPEND =================
+def _fresh_lines(sales_df: pd.DataFrame, delta: pd.DataFrame, key: list) -> pd.DataFrame:
+    """Delta lines not already loaded (duplicates are looked up within the delta's date span only)."""
+    delta = delta.drop_duplicates(subset=key, keep="first")
+    dates = delta["Billing Date"].dropna()
+    if sales_df.empty or dates.empty:
+        return delta
+    known = date_slice(sales_df, dates.min(), dates.max())
+    undated = sales_df["Billing Date"].isna().to_numpy()
+    if undated.any():
+        known = pd.concat([known, sales_df[undated]])
+    if known.empty:
+        return delta
+    seen = pd.MultiIndex.from_frame(known[key].astype(object))
+    return delta[~pd.MultiIndex.from_frame(delta[key].astype(object)).isin(seen)]
+
+
+def update_cube(cube_df: pd.DataFrame, fresh: pd.DataFrame) -> pd.DataFrame:
+    """Daily cube with the fresh lines folded in (only the touched days are re-aggregated)."""
+    delta_cube = build_daily_cube(fresh)
+    if cube_df is None or cube_df.empty:
+        return delta_cube
+    if delta_cube.empty:
+        return cube_df
+    cube_days, delta_days = cube_df[CUBE_DATE], delta_cube[CUBE_DATE]
+    if delta_days.notna().all() and pd.notna(cube_days.iloc[-1]) and delta_days.min() > cube_days.iloc[-1]:
+        return pd.concat([cube_df, delta_cube], ignore_index=True)   # usual case: a new day
+
+    measures = [c for c in CUBE_MEASURES + [LINE_COUNT_COL] if c in cube_df.columns]
+    dims = [c for c in cube_df.columns if c != CUBE_DATE and c not in measures]
+    touched = cube_days.isin(delta_days.unique()).to_numpy()
+    merged = (
+        pd.concat([cube_df[touched], delta_cube], ignore_index=True)
+        .groupby([CUBE_DATE] + dims, observed=True, dropna=False, sort=False)[measures].sum()
+        .reset_index()
+    )
+    return sort_by_date(pd.concat([cube_df[~touched], merged], ignore_index=True)[cube_df.columns])
+
+
+def append_lines(bundle: WorkbookBundle, delta: pd.DataFrame, new_hash: str) -> tuple:
+    """(bundle with the delta's new lines appended, AppendReport, new lines); the input bundle is not modified."""
+    sales_df = bundle.sales_df
+    key = line_key_columns(sales_df)
+    dtypes = _grown_dtypes([sales_df, bundle.ytd_df], delta)
+    delta = align_delta(sales_df, delta, dtypes)
+    fresh = _fresh_lines(sales_df, delta, key)
+    report = AppendReport(delta_rows=len(delta), new_rows=len(fresh),
+                          duplicate_rows=len(delta) - len(fresh), key=tuple(key))
+    if fresh.empty:
+        return bundle, report, fresh
+    report.days = tuple(sorted(pd.unique(fresh["Billing Date"].dropna().dt.normalize())))
+
+    sales_df = _with_dtypes(sales_df, dtypes)
+    last = sales_df["Billing Date"].max() if not sales_df.empty else pd.NaT
+    sales = pd.concat([sales_df, fresh], ignore_index=True)
+    if pd.notna(last) and (fresh["Billing Date"].min() < last or sales_df["Billing Date"].isna().any()):
+        sales = sort_by_date(sales)   # back-dated lines or undated rows before the tail
+    cube = update_cube(_with_dtypes(bundle.cube_df, dtypes), fresh)
+    appended = replace(bundle, content_hash=new_hash, sales_df=sales, cube_df=cube,
+                       ytd_df=_with_dtypes(bundle.ytd_df, dtypes))
+    return appended, report, fresh
+
+
+# ================= PERSISTENT STORE =================
+def chained_hash(base_hash: str, delta_hash: str) -> str:
+    """Identity of "base state + this delta"."""
+    return content_hash(f"{base_hash}+{delta_hash}".encode())
+
+
+def _read_manifest(file_hash: str, cache_dir: str | None) -> dict | None:
+    path = os.path.join(_bundle_cache_path(file_hash, cache_dir), "manifest.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == CACHE_FORMAT_VERSION else None
+
+
+def store_head(root_hash: str, cache_dir: str | None = None) -> str:
+    """Latest appended state for a root workbook (the root itself when nothing was appended)."""
+    try:
+        with open(os.path.join(_bundle_cache_path(root_hash, cache_dir), HEAD_FILE), encoding="utf-8") as f:
+            return json.load(f)["head"]
+    except (OSError, ValueError, KeyError):
+        return root_hash
+
+
+def _set_head(root_hash: str, head: str, cache_dir: str | None) -> None:
+    root_dir = _bundle_cache_path(root_hash, cache_dir)
+    if not os.path.isdir(root_dir):
+        return
+    fd, tmp = tempfile.mkstemp(prefix=".head_", dir=root_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"head": head}, f)
+    os.replace(tmp, os.path.join(root_dir, HEAD_FILE))
+
+
+def save_delta(bundle: WorkbookBundle, base_hash: str, fresh: pd.DataFrame, cache_dir: str | None = None) -> bool:
+    """Persist an appended state: the new lines chained to base_hash (full snapshot when the chain is long)."""
+    base = _read_manifest(base_hash, cache_dir) or {}
+    depth = base.get("depth", 0) + 1
+    if depth > MAX_DELTA_CHAIN:
+        return save_bundle(bundle, cache_dir)
+    final_dir = _bundle_cache_path(bundle.content_hash, cache_dir)
+    if os.path.isdir(final_dir):
+        return True
+    tmp_dir = None
+    try:
+        os.makedirs(cache_dir or CACHE_DIR, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp_", dir=cache_dir or CACHE_DIR)
+        manifest = {
+            "version": CACHE_FORMAT_VERSION,
+            "content_hash": bundle.content_hash,
+            "base": base_hash,
+            "depth": depth,
+            "lines": {"file": "sales_delta", "format": _write_frame(fresh, os.path.join(tmp_dir, "sales_delta"))},
+        }
+        with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        try:
+            os.replace(tmp_dir, final_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        prune_cache(cache_dir)
+        return True
+    except Exception:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return False
+
+
+def load_state(file_hash: str, cache_dir: str | None = None) -> WorkbookBundle | None:
+    """Bundle for a stored state: a full snapshot, or its base with the chained delta lines re-applied."""
+    manifest = _read_manifest(file_hash, cache_dir)
+    if manifest is None or "base" not in manifest:
+        return load_cached_bundle(file_hash, cache_dir)
+    base = load_state(manifest["base"], cache_dir)
+    if base is None:
+        return None
+    try:
+        meta = manifest["lines"]
+        lines = _read_frame(os.path.join(_bundle_cache_path(file_hash, cache_dir), meta["file"]), meta["format"])
+    except Exception:
+        return None
+    touch_bundle(file_hash, cache_dir)
+    return append_lines(base, lines, file_hash)[0]
+
+
+def load_latest(data: bytes, file_hash: str, cache_dir: str | None = None) -> WorkbookBundle:
+    """load_bundle() for an uploaded workbook, resumed at its latest appended state when there is one."""
+    head = store_head(file_hash, cache_dir)
+    if head != file_hash:
+        bundle = load_state(head, cache_dir)
+        if bundle is not None:
+            return bundle
+    return load_bundle(data, file_hash=file_hash, cache_dir=cache_dir)
+
+
+def append_daily_delta(bundle: WorkbookBundle, data: bytes, root_hash: str,
+                       delta_hash: str | None = None, cache_dir: str | None = None) -> tuple:
+    """Parse a delta workbook, append its new lines to bundle and persist the new state.
+
+    Returns (bundle, AppendReport); bundle is unchanged when every line was
+    already loaded. Raises ValueError for a workbook without a usable sales sheet.
+    """
+    delta = read_delta_lines(data)
+    new_hash = chained_hash(bundle.content_hash, delta_hash or content_hash(data))
+    appended, report, fresh = append_lines(bundle, delta, new_hash)
+    if not fresh.empty and save_delta(appended, bundle.content_hash, fresh, cache_dir):
+        _set_head(root_hash, new_hash, cache_dir)
+    return appended, report
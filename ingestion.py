@@ -0,0 +1,540 @@
+# ================= WORKBOOK INGESTION =================
+# Single-pass reader for the daily tracking workbook.
+# NOTE: No Streamlit calls in here — sales.py owns the UI (spinner / errors).
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from cube import build_daily_cube
+from date_index import sort_by_date
+from history_store import HISTORY_DIR, read_history, write_history
+
+
+# Sheets the app knows about (exact names as they appear in the workbook)
+SALES_SHEET = "sales data"
+TARGET_SHEET = "Target"
+CHANNELS_SHEET = "sales channels"
+RR_SHEET = "R&R"
+YTD_SHEET = "YTD"
+PRICE_SHEET = "price list"
+EXTRA_SHEET = "Extra sheet"
+
+REQUIRED_SHEETS = [SALES_SHEET, TARGET_SHEET, CHANNELS_SHEET]
+OPTIONAL_SHEETS = [RR_SHEET, YTD_SHEET, PRICE_SHEET, EXTRA_SHEET]
+KNOWN_SHEETS = REQUIRED_SHEETS + OPTIONAL_SHEETS
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 of the uploaded file bytes (identity of a workbook)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def normalize_series(s):
+    """Lower/strip text for joins ('nan' -> '')."""
+    try:
+        return s.astype(str).str.strip().str.lower().replace({'nan': ''})
+    except Exception:
+        return s
+
+
+@dataclass
+class WorkbookBundle:
+    """All known sheets of one workbook, parsed once."""
+    content_hash: str
+    sales_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+    target_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+    channels_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+    rr_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+    ytd_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+    price_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+    extra_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+    cube_df: pd.DataFrame = field(default_factory=pd.DataFrame)   # derived, not cached on disk
+    sheet_names: tuple = ()
+    missing_required: tuple = ()
+    memory_report: dict = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.missing_required
+
+    def main_frames(self):
+        """Same order load_data() always returned."""
+        return self.sales_df, self.target_df, self.ytd_df, self.channels_df, self.rr_df
+
+
+# ================= NORMALIZATION =================
+def normalize_bundle(bundle: WorkbookBundle) -> WorkbookBundle:
+    """Add join keys / parsed dates exactly like the old load_data()."""
+    rr_df = bundle.rr_df
+    if not rr_df.empty and "PY Name 1" in rr_df.columns:
+        rr_df["_py_name_norm"] = normalize_series(rr_df["PY Name 1"])
+
+        for col in ["Rebate %", "Display Rental value"]:
+            if col in rr_df.columns:
+                rr_df[col] = pd.to_numeric(rr_df[col], errors="coerce").fillna(0)
+            else:
+                rr_df[col] = 0.0
+
+    sales_df = bundle.sales_df
+    sales_df["Billing Date"] = pd.to_datetime(sales_df["Billing Date"], errors="coerce")
+    sales_df["_py_name_norm"] = normalize_series(sales_df["PY Name 1"])
+
+    channels_df = bundle.channels_df
+    channels_df["_py_name_norm"] = normalize_series(channels_df["PY Name 1"])
+    channels_df["_channels_norm"] = normalize_series(channels_df["Channels"])
+
+    ytd_df = bundle.ytd_df
+    if not ytd_df.empty and "PY Name 1" in ytd_df.columns:
+        ytd_df["_py_name_norm"] = normalize_series(ytd_df["PY Name 1"])
+
+    return bundle
+
+
+# ================= COMPACT DTYPE SCHEMA =================
+# Dimension columns become categoricals that share ONE dictionary between the
+# sales and YTD sheets (so merges / index unions between them stay aligned).
+# NOTE: Net Value stays float64 on purpose (KD amounts with 3 decimals).
+DIMENSION_COLUMNS = [
+    "Driver Name EN", "PY Name 1", "SP Name1", "Billing Type",
+    "Material Description", "UOM", "Channels",
+]
+FLOAT32_COLUMNS = ["Quantity"]
+INT32_MIN, INT32_MAX = -(2 ** 31), 2 ** 31 - 1
+
+
+def frame_memory(df: pd.DataFrame) -> int:
+    """Deep memory usage in bytes."""
+    if df is None or df.empty:
+        return 0
+    return int(df.memory_usage(deep=True).sum())
+
+
+def _shared_categories(frames, col):
+    values = set()
+    for df in frames:
+        if col in df.columns:
+            values.update(v for v in pd.unique(df[col].dropna()))
+    try:
+        return sorted(values)
+    except TypeError:
+        return sorted(values, key=str)
+
+
+def compact_frame(df: pd.DataFrame, categories: dict) -> pd.DataFrame:
+    """Apply the compact schema to one line-item frame (in place, returns df)."""
+    for col, cats in categories.items():
+        if col in df.columns:
+            df[col] = df[col].astype(cats)
+    for col in FLOAT32_COLUMNS:
+        if col in df.columns and pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].astype("float32")
+    # int64 -> int32 only (narrower ints overflow silently in arithmetic)
+    for col in df.columns:
+        s = df[col]
+        if s.dtype == "int64" and len(s) and s.min() >= INT32_MIN and s.max() <= INT32_MAX:
+            df[col] = s.astype("int32")
+    return df
+
+
+def apply_compact_schema(bundle: WorkbookBundle) -> WorkbookBundle:
+    """Compact sales + YTD frames and record before/after memory per sheet."""
+    frames = {SALES_SHEET: bundle.sales_df, YTD_SHEET: bundle.ytd_df}
+    before = {sheet: frame_memory(df) for sheet, df in frames.items()}
+
+    categories = {
+        col: pd.CategoricalDtype(_shared_categories(frames.values(), col))
+        for col in DIMENSION_COLUMNS
+        if any(col in df.columns for df in frames.values())
+    }
+    for df in frames.values():
+        if not df.empty:
+            compact_frame(df, categories)
+
+    for sheet, df in frames.items():
+        if sheet not in bundle.memory_report and before[sheet]:
+            bundle.memory_report[sheet] = {"before": before[sheet], "after": frame_memory(df)}
+    return bundle
+
+
+def prepare_bundle(bundle: WorkbookBundle) -> WorkbookBundle:
+    """Compact schema + date-sorted line frames + daily cube (after an Excel parse and after a cache read)."""
+    apply_compact_schema(bundle)
+    bundle.sales_df = sort_by_date(bundle.sales_df)
+    bundle.ytd_df = sort_by_date(bundle.ytd_df)
+    bundle.cube_df = build_daily_cube(bundle.sales_df)
+    return bundle
+
+
+# ================= STREAMING SHEET READER =================
+# Big line-item sheets are read row-by-row from the read-only openpyxl workbook
+# in fixed-size chunks instead of materializing the whole sheet at once.
+STREAM_CHUNK_ROWS = 50_000
+
+# Columns the dashboard actually uses from the multi-year YTD sheet
+YTD_COLUMNS = [
+    "Billing Date", "Net Value", "Billing Type", "PY Name 1", "SP Name1",
+    "Driver Name EN", "Material Description", "Quantity", "UOM",
+    "Material", "Billing Document",
+]
+
+# Explicit per-column types so every chunk has the same schema
+STREAM_SCHEMA = {
+    "Billing Date": "date",
+    "Net Value": "float",
+    "Quantity": "float",
+    "Billing Type": "text",
+    "PY Name 1": "text",
+    "SP Name1": "text",
+    "Driver Name EN": "text",
+    "Material Description": "text",
+    "UOM": "text",
+    "Material": "text",
+    "Billing Document": "text",
+}
+
+# sheet -> columns to keep (None = all columns)
+# NOTE: sales data keeps every column (raw line downloads / Custom Analysis show them all)
+STREAMED_SHEETS = {
+    SALES_SHEET: None,
+    YTD_SHEET: YTD_COLUMNS,
+}
+
+
+def _header_names(header_row) -> list:
+    """Header labels like pandas: blanks -> 'Unnamed: i', duplicates -> 'X.1'."""
+    names, seen = [], {}
+    for i, h in enumerate(header_row):
+        name = f"Unnamed: {i}" if h is None else h
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _type_chunk(df: pd.DataFrame, force_schema: bool = False) -> pd.DataFrame:
+    """Apply STREAM_SCHEMA to a projected chunk (full-width chunks keep pandas inference)."""
+    if not force_schema:
+        return df
+    for col in df.columns:
+        kind = STREAM_SCHEMA.get(col, "text")
+        if kind == "date":
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+        elif kind == "float":
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+        elif kind == "text":
+            df[col] = df[col].map(lambda v: v if v is None or isinstance(v, str) else str(v))
+    return df
+
+
+def iter_sheet_chunks(ws, usecols=None, chunk_rows: int = STREAM_CHUNK_ROWS, force_schema: bool = False):
+    """Yield typed DataFrame chunks from a read-only openpyxl worksheet."""
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return
+
+    names = _header_names(header)
+    keep = [i for i, n in enumerate(names) if usecols is None or n in usecols]
+    keep_names = [names[i] for i in keep]
+    if usecols is None:
+        keep = None
+
+    width = len(names)
+    buf = []
+    for row in rows:
+        if keep is not None:
+            row = tuple(row[i] if i < len(row) else None for i in keep)
+        elif len(row) != width:
+            row = (tuple(row) + (None,) * width)[:width]
+        if all(v is None for v in row):
+            continue
+        buf.append(row)
+        if len(buf) >= chunk_rows:
+            yield _type_chunk(pd.DataFrame.from_records(buf, columns=keep_names), force_schema)
+            buf = []
+    if buf:
+        yield _type_chunk(pd.DataFrame.from_records(buf, columns=keep_names), force_schema)
+
+
+def read_sheet_streaming(ws, usecols=None, chunk_rows: int = STREAM_CHUNK_ROWS) -> pd.DataFrame:
+    """Streamed sheet as one DataFrame: the typed chunks concatenated once at the end."""
+    chunks = list(iter_sheet_chunks(ws, usecols, chunk_rows, force_schema=usecols is not None))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
+
+
+# ================= READER =================
+def read_workbook(data: bytes, file_hash: str | None = None) -> WorkbookBundle:
+    """Open the workbook ONE time and parse every known sheet that exists."""
+    file_hash = file_hash or content_hash(data)
+    xls = pd.ExcelFile(io.BytesIO(data))
+    sheet_names = tuple(xls.sheet_names)
+
+    missing = tuple(s for s in REQUIRED_SHEETS if s not in sheet_names)
+    if missing:
+        return WorkbookBundle(content_hash=file_hash, sheet_names=sheet_names, missing_required=missing)
+
+    present = [s for s in KNOWN_SHEETS if s in sheet_names]
+    streamed = [s for s in STREAMED_SHEETS if s in present] if xls.engine == "openpyxl" else []
+    frames = pd.read_excel(xls, sheet_name=[s for s in present if s not in streamed])
+    for sheet in streamed:
+        frames[sheet] = read_sheet_streaming(xls.book[sheet], STREAMED_SHEETS[sheet])
+
+    bundle = WorkbookBundle(
+        content_hash=file_hash,
+        sales_df=frames[SALES_SHEET],
+        target_df=frames[TARGET_SHEET],
+        channels_df=frames[CHANNELS_SHEET],
+        rr_df=frames.get(RR_SHEET, pd.DataFrame()),
+        ytd_df=frames.get(YTD_SHEET, pd.DataFrame()),
+        price_df=frames.get(PRICE_SHEET, pd.DataFrame()),
+        extra_df=frames.get(EXTRA_SHEET, pd.DataFrame()),
+        sheet_names=sheet_names,
+    )
+    return prepare_bundle(normalize_bundle(bundle))
+
+
+# ================= COLUMNAR DISK CACHE =================
+# Parsed (already normalized) sheets are stored under <cache dir>/<sha256>/ so a
+# cold start or a re-upload of the same workbook skips openpyxl entirely.
+# The YTD sheet is stored as shared month files (see history_store.py).
+# prune_cache() runs after every write: it keeps the BUNDLE_CACHE_SIZE most
+# recently used workbook states (manifest mtime, touched on each load) plus the
+# delta chains they build on, and deletes month files no kept manifest lists.
+CACHE_DIR = os.environ.get(
+    "DAILY_TRACKING_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data_cache"),
+)
+CACHE_FORMAT_VERSION = 3
+BUNDLE_CACHE_SIZE = 16          # workbook states kept on disk
+STALE_TMP_SECONDS = 3600        # half-written .tmp_ entries older than this are debris
+
+BUNDLE_FRAMES = {
+    SALES_SHEET: "sales_df",
+    TARGET_SHEET: "target_df",
+    CHANNELS_SHEET: "channels_df",
+    RR_SHEET: "rr_df",
+    YTD_SHEET: "ytd_df",
+    PRICE_SHEET: "price_df",
+    EXTRA_SHEET: "extra_df",
+}
+
+
+def _bundle_cache_path(file_hash: str, cache_dir: str | None = None) -> str:
+    return os.path.join(cache_dir or CACHE_DIR, file_hash)
+
+
+def _write_frame(df: pd.DataFrame, path_stem: str) -> str:
+    """Parquet when Arrow can type the sheet, pickle otherwise (mixed-type Excel columns)."""
+    try:
+        if not all(isinstance(c, str) for c in df.columns):
+            raise TypeError("non-string headers do not round-trip through parquet")
+        df.to_parquet(path_stem + ".parquet", index=True)
+        return "parquet"
+    except Exception:
+        if os.path.exists(path_stem + ".parquet"):
+            os.remove(path_stem + ".parquet")
+        df.to_pickle(path_stem + ".pkl")
+        return "pickle"
+
+
+def _read_frame(path_stem: str, fmt: str) -> pd.DataFrame:
+    if fmt == "parquet":
+        return pd.read_parquet(path_stem + ".parquet", memory_map=True)
+    return pd.read_pickle(path_stem + ".pkl")
+
+
+def _history_dir(cache_dir: str | None = None) -> str:
+    return os.path.join(cache_dir or CACHE_DIR, HISTORY_DIR)
+
+
+def _write_sheet(sheet: str, df: pd.DataFrame, path_stem: str, cache_dir: str | None) -> dict:
+    """Manifest entry for one sheet: YTD as month partitions when possible, else one file."""
+    if sheet == YTD_SHEET:
+        try:
+            partitions = write_history(df, _history_dir(cache_dir))
+            if partitions is not None:
+                return {"partitions": partitions}
+        except Exception:
+            pass
+    return {"file": os.path.basename(path_stem), "format": _write_frame(df, path_stem)}
+
+
+def _read_sheet(meta: dict, bundle_dir: str, cache_dir: str | None) -> pd.DataFrame:
+    if "partitions" in meta:
+        return read_history(meta["partitions"], _history_dir(cache_dir))
+    return _read_frame(os.path.join(bundle_dir, meta["file"]), meta["format"])
+
+
+def save_bundle(bundle: WorkbookBundle, cache_dir: str | None = None) -> bool:
+    """Persist a parsed bundle (atomic: written to a temp dir, then renamed)."""
+    if not bundle.ok:
+        return False
+    final_dir = _bundle_cache_path(bundle.content_hash, cache_dir)
+    if os.path.isdir(final_dir):
+        return True
+    tmp_dir = None
+    try:
+        os.makedirs(cache_dir or CACHE_DIR, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp_", dir=cache_dir or CACHE_DIR)
+        sheets = {}
+        for i, (sheet, attr) in enumerate(BUNDLE_FRAMES.items()):
+            df = getattr(bundle, attr)
+            if df is None or (df.empty and len(df.columns) == 0):
+                continue
+            sheets[sheet] = _write_sheet(sheet, df, os.path.join(tmp_dir, f"sheet_{i}"), cache_dir)
+
+        manifest = {
+            "version": CACHE_FORMAT_VERSION,
+            "content_hash": bundle.content_hash,
+            "sheet_names": list(bundle.sheet_names),
+            "memory_report": bundle.memory_report,
+            "sheets": sheets,
+        }
+        with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+        try:
+            os.replace(tmp_dir, final_dir)
+        except OSError:
+            # another process cached the same workbook first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        prune_cache(cache_dir)
+        return True
+    except Exception:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return False
+
+
+def load_cached_bundle(file_hash: str, cache_dir: str | None = None) -> WorkbookBundle | None:
+    """Bundle from the disk cache, or None when missing / unreadable."""
+    bundle_dir = _bundle_cache_path(file_hash, cache_dir)
+    manifest_path = os.path.join(bundle_dir, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != CACHE_FORMAT_VERSION:
+            return None
+
+        bundle = WorkbookBundle(
+            content_hash=file_hash,
+            sheet_names=tuple(manifest.get("sheet_names", ())),
+            memory_report=manifest.get("memory_report", {}),
+        )
+        for sheet, meta in manifest["sheets"].items():
+            attr = BUNDLE_FRAMES.get(sheet)
+            if attr:
+                setattr(bundle, attr, _read_sheet(meta, bundle_dir, cache_dir))
+        touch_bundle(file_hash, cache_dir)
+        # parquet dictionaries are per file -> re-align the shared categories
+        return prepare_bundle(bundle)
+    except Exception:
+        return None
+
+
+def read_cached_ytd(file_hash: str, start=None, end=None, columns=None,
+                    cache_dir: str | None = None) -> pd.DataFrame | None:
+    """YTD rows of a cached workbook within [start, end], reading only the month files the period touches.
+
+    None when the workbook is not cached or its YTD sheet is not partitioned.
+    """
+    try:
+        with open(os.path.join(_bundle_cache_path(file_hash, cache_dir), "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        meta = manifest["sheets"][YTD_SHEET] if manifest.get("version") == CACHE_FORMAT_VERSION else {}
+    except (OSError, ValueError, KeyError):
+        return None
+    if "partitions" not in meta:
+        return None
+    return read_history(meta["partitions"], _history_dir(cache_dir), start, end, columns)
+
+
+def touch_bundle(file_hash: str, cache_dir: str | None = None) -> None:
+    """Mark a cached workbook state as just used (its manifest mtime is the LRU order)."""
+    try:
+        os.utime(os.path.join(_bundle_cache_path(file_hash, cache_dir), "manifest.json"))
+    except OSError:
+        pass
+
+
+def prune_cache(cache_dir: str | None = None, max_bundles: int = BUNDLE_CACHE_SIZE) -> None:
+    """Drop all but the max_bundles most recently used states, then the month files nobody references.
+
+    A kept delta state keeps the chain of states it is based on. Stale temp
+    entries go too; young ones (and young unreferenced month files) are left
+    alone because another process may be writing them right now.
+    """
+    root = cache_dir or CACHE_DIR
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return
+    now = time.time()
+    manifests = {}
+    for name in names:
+        path = os.path.join(root, name)
+        try:
+            if name.startswith(".tmp_"):
+                if now - os.path.getmtime(path) > STALE_TMP_SECONDS:
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            manifest_path = os.path.join(path, "manifest.json")
+            mtime = os.path.getmtime(manifest_path)
+            with open(manifest_path, encoding="utf-8") as f:
+                manifests[name] = (mtime, json.load(f))
+        except (OSError, ValueError):
+            continue   # history/, exports/, ... or a state being replaced
+
+    recent = sorted(manifests, key=lambda name: manifests[name][0], reverse=True)[:max(0, max_bundles)]
+    keep = set()
+    for name in recent:
+        while name in manifests and name not in keep:
+            keep.add(name)
+            name = manifests[name][1].get("base")
+    for name in manifests.keys() - keep:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+    live = set()
+    for name in keep:
+        meta = manifests[name][1].get("sheets", {}).get(YTD_SHEET, {})
+        live.update(p["file"] for p in meta.get("partitions", ()))
+    history_dir = _history_dir(cache_dir)
+    try:
+        history_names = os.listdir(history_dir)
+    except OSError:
+        return
+    for name in history_names:
+        if name.endswith(".parquet") and name[: -len(".parquet")] in live:
+            continue
+        path = os.path.join(history_dir, name)
+        try:
+            if now - os.path.getmtime(path) > STALE_TMP_SECONDS:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def load_bundle(data: bytes, file_hash: str | None = None, cache_dir: str | None = None) -> WorkbookBundle:
+    """Disk cache first, Excel parse (then cache it) on a miss."""
+    file_hash = file_hash or content_hash(data)
+    bundle = load_cached_bundle(file_hash, cache_dir)
+    if bundle is not None:
+        return bundle
+    bundle = read_workbook(data, file_hash=file_hash)
+    save_bundle(bundle, cache_dir)
+    return bundle
@@ -0,0 +1,60 @@
+# ================= LAZY IMPORTS =================
+# Heavy analytics / export libraries are bound to module proxies at startup
+# and only imported on first attribute access, i.e. when the page or export
+# that needs them actually runs. Load times are recorded for the admin view
+# and benchmarks/bench_startup.py.
+#
+#   px = lazy_module("plotly.express")
+#   px.bar(...)            # plotly.express is imported here, once per process
+
+import importlib
+import threading
+import time
+
+
+_import_timings = {}
+_import_lock = threading.RLock()
+
+
+class LazyModule:
+    """Stand-in for a module; imports the real one on first attribute access."""
+
+    def __init__(self, name: str):
+        self.__dict__["_lazy_name"] = name
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            with _import_lock:
+                module = self.__dict__["_lazy_module"]
+                if module is None:
+                    name = self.__dict__["_lazy_name"]
+                    t0 = time.perf_counter()
+                    module = importlib.import_module(name)
+                    _import_timings[name] = time.perf_counter() - t0
+                    self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "not loaded"
+        return f"<lazy module {self.__dict__['_lazy_name']!r} ({state})>"
+
+
+def lazy_module(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def import_timings() -> dict:
+    """{module: seconds} for every lazy module imported so far in this process."""
+    with _import_lock:
+        return dict(_import_timings)
@@ -0,0 +1,303 @@
+# ================= NATIVE PPTX CHARTS =================
+# Maps the plotly figures of the PPTX deck (line / area, bar, pie) onto
+# python-pptx chart objects fed with the figure's own aggregated data, so a
+# chart slide holds an editable chart (a few KB of XML, built in pure Python)
+# instead of a 2400x1400 PNG rendered by kaleido in a headless browser.
+# Figures with other trace types -- or data the mapping cannot express --
+# give None and keep the PNG path (chart_render.py).
+# NOTE: No Streamlit calls in here; python-pptx is imported on first use.
+
+import re
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_DATE_FORMAT = "%d-%b"
+_RGB_RE = re.compile(r"rgba?\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)")
+
+
+@dataclass
+class ChartSeries:
+    name: str
+    values: list
+    color: tuple | None = None          # (r, g, b)
+    point_colors: list | None = None    # per-category (r, g, b), e.g. colorscale bars / pie slices
+    dash: bool = False
+    markers: bool = False
+    labels: bool = False                # figure shows the value on each point
+
+
+@dataclass
+class NativeChart:
+    """Chart type + category data extracted from a plotly figure."""
+    kind: str                           # line | area | area_stacked | column | bar | pie | doughnut
+    categories: list
+    series: list = field(default_factory=list)
+    value_title: str = ""
+    category_title: str = ""
+    label_format: str = "#,##0"
+    legend: bool = True
+
+
+def _rgb(color) -> tuple | None:
+    if not isinstance(color, str):
+        return None
+    c = color.strip()
+    if c.startswith("#") and len(c) in (4, 7):
+        c = c[1:] if len(c) == 7 else "".join(ch * 2 for ch in c[1:])
+        try:
+            return tuple(int(c[i:i + 2], 16) for i in (0, 2, 4))
+        except ValueError:
+            return None
+    m = _RGB_RE.match(c)
+    return tuple(int(v) for v in m.groups()) if m else None
+
+
+def _values(v) -> list:
+    arr = pd.to_numeric(pd.Series(np.asarray(v, dtype=object)), errors="coerce")
+    return [None if pd.isna(x) else float(x) for x in arr]
+
+
+def _categories(x, date_format: str | None) -> list:
+    values = list(np.asarray(x, dtype=object))
+    if values and all(isinstance(v, (pd.Timestamp, np.datetime64)) or hasattr(v, "strftime") for v in values):
+        fmt = date_format if date_format and "%" in date_format else DEFAULT_DATE_FORMAT
+        return [pd.Timestamp(v).strftime(fmt) for v in values]
+    if values and all(isinstance(v, str) and len(v) >= 10 and v[4] == "-" for v in values):
+        try:   # plotly JSON round-trips dates as ISO strings
+            fmt = date_format if date_format and "%" in date_format else DEFAULT_DATE_FORMAT
+            return [pd.Timestamp(v).strftime(fmt) for v in values]
+        except ValueError:
+            pass
+    return ["" if v is None else str(v) for v in values]
+
+
+def _label_format(text) -> str:
+    sample = next((t for t in (text if isinstance(text, (list, tuple, np.ndarray)) else [text]) if isinstance(t, str)), "")
+    if sample.startswith("KD"):
+        return '"KD "#,##0'
+    if sample.endswith("%"):
+        return '0.0"%"'
+    return "#,##0"
+
+
+def _point_colors(marker_color, colorscale) -> list | None:
+    """Per-point colours: explicit colour lists, or numeric values through the colorscale."""
+    if marker_color is None or isinstance(marker_color, str):
+        return None
+    values = list(np.asarray(marker_color, dtype=object))
+    if all(isinstance(v, str) for v in values):
+        colors = [_rgb(v) for v in values]
+        return colors if all(colors) else None
+    if colorscale is None:
+        return None
+    from plotly.colors import sample_colorscale
+
+    nums = np.asarray(_values(values), dtype="float64")
+    if np.isnan(nums).all():
+        return None
+    lo, hi = np.nanmin(nums), np.nanmax(nums)
+    points = np.where(np.isnan(nums), 0.0, (nums - lo) / (hi - lo) if hi > lo else 1.0)
+    scale = colorscale if isinstance(colorscale, str) else [list(s) for s in colorscale]
+    return [_rgb(c) for c in sample_colorscale(scale, list(points))]
+
+
+def _axis_title(axis) -> str:
+    try:
+        return axis.title.text or ""
+    except AttributeError:
+        return ""
+
+
+def _same_x(traces, attr) -> bool:
+    first = list(np.asarray(getattr(traces[0], attr), dtype=object))
+    return all(list(np.asarray(getattr(t, attr), dtype=object)) == first for t in traces[1:])
+
+
+def _hlines(fig) -> list:
+    """(name, y, color) for full-width horizontal reference lines (fig.add_hline)."""
+    lines = []
+    for shape in fig.layout.shapes or ():
+        if shape.type != "line" or shape.y0 is None or shape.y0 != shape.y1:
+            continue
+        if not str(shape.xref or "").endswith(("domain", "paper")):
+            continue
+        name = next((a.text for a in fig.layout.annotations or () if a.y == shape.y0 and a.text), "Reference")
+        lines.append((re.sub(r"<[^>]+>", "", name), float(shape.y0), _rgb(shape.line.color)))
+    return lines
+
+
+def _scatter_chart(fig, traces) -> NativeChart | None:
+    # drop decorative fill-only copies (no legend, no line) -- the real series is drawn separately
+    traces = [t for t in traces if not (t.showlegend is False and t.fill and (t.line.width == 0))]
+    if not traces or not _same_x(traces, "x"):
+        return None
+    # marker-only / bubble scatters would come out as connected lines -- keep them as images
+    if not any("lines" in (t.mode or "lines") or t.fill for t in traces):
+        return None
+    if any(t.marker.size is not None and not np.isscalar(t.marker.size) for t in traces):
+        return None
+    if all(t.stackgroup for t in traces):
+        kind = "area_stacked"
+    elif all(t.fill for t in traces):
+        kind = "area"
+    else:
+        kind = "line"
+    categories = _categories(traces[0].x, fig.layout.xaxis.tickformat)
+    chart = NativeChart(kind=kind, categories=categories, value_title=_axis_title(fig.layout.yaxis),
+                        category_title=_axis_title(fig.layout.xaxis))
+    for i, t in enumerate(traces):
+        chart.series.append(ChartSeries(
+            name=t.name or f"Series {i + 1}", values=_values(t.y),
+            color=_rgb(t.line.color) or _rgb(t.marker.color) or _rgb(t.fillcolor),
+            dash=bool(t.line.dash and t.line.dash != "solid"), markers="markers" in (t.mode or ""),
+        ))
+    if kind == "line":
+        for name, y, color in _hlines(fig):
+            chart.series.append(ChartSeries(name=name, values=[y] * len(categories), color=color, dash=True))
+    chart.legend = len(chart.series) > 1
+    return chart
+
+
+def _bar_chart(fig, traces) -> NativeChart | None:
+    horizontal = {t.orientation == "h" for t in traces}
+    if len(horizontal) != 1:
+        return None
+    horizontal = horizontal.pop()
+    cat_attr, val_attr = ("y", "x") if horizontal else ("x", "y")
+    if not _same_x(traces, cat_attr):
+        return None
+    cat_axis, val_axis = (fig.layout.yaxis, fig.layout.xaxis) if horizontal else (fig.layout.xaxis, fig.layout.yaxis)
+    chart = NativeChart(kind="bar" if horizontal else "column",
+                        categories=_categories(getattr(traces[0], cat_attr), cat_axis.tickformat),
+                        value_title=_axis_title(val_axis), category_title=_axis_title(cat_axis),
+                        legend=len(traces) > 1)
+    for i, t in enumerate(traces):
+        chart.series.append(ChartSeries(
+            name=t.name or f"Series {i + 1}", values=_values(getattr(t, val_attr)),
+            color=_rgb(t.marker.color), point_colors=_point_colors(t.marker.color, t.marker.colorscale),
+            labels=t.text is not None,
+        ))
+        if t.text is not None:
+            chart.label_format = _label_format(t.text)
+    return chart
+
+
+def _pie_chart(fig, trace) -> NativeChart:
+    labels = "percent" in (trace.textinfo or "percent")
+    colors = [_rgb(c) for c in trace.marker.colors] if trace.marker.colors is not None else None
+    return NativeChart(
+        kind="doughnut" if trace.hole else "pie",
+        categories=_categories(trace.labels, None),
+        series=[ChartSeries(name=trace.name or "Share", values=_values(trace.values),
+                            point_colors=colors if colors and all(colors) else None, labels=labels)],
+        label_format="0.0%",
+    )
+
+
+def native_chart(fig) -> NativeChart | None:
+    """NativeChart for a plotly figure made of line / area, bar or pie traces; None otherwise."""
+    try:
+        traces = list(fig.data)
+        types = {t.type for t in traces}
+        if types == {"pie"} and len(traces) == 1:
+            return _pie_chart(fig, traces[0])
+        if types == {"bar"}:
+            return _bar_chart(fig, traces)
+        if types == {"scatter"}:
+            return _scatter_chart(fig, traces)
+    except Exception:
+        return None
+    return None
+
+
+def add_native_chart(slide, chart: NativeChart, x, y, cx, cy):
+    """Draw chart on slide inside the given box (EMU lengths); returns the python-pptx chart."""
+    from pptx.chart.data import CategoryChartData
+    from pptx.enum.chart import XL_CHART_TYPE
+
+    chart_types = {
+        "line": XL_CHART_TYPE.LINE_MARKERS,
+        "area": XL_CHART_TYPE.AREA,
+        "area_stacked": XL_CHART_TYPE.AREA_STACKED,
+        "column": XL_CHART_TYPE.COLUMN_CLUSTERED,
+        "bar": XL_CHART_TYPE.BAR_CLUSTERED,
+        "pie": XL_CHART_TYPE.PIE,
+        "doughnut": XL_CHART_TYPE.DOUGHNUT,
+    }
+    data = CategoryChartData()
+    data.categories = chart.categories
+    for s in chart.series:
+        data.add_series(s.name, s.values)
+    frame = slide.shapes.add_chart(chart_types[chart.kind], x, y, cx, cy, data)
+    try:
+        return _style_chart(frame.chart, chart)
+    except Exception:
+        # take the half-styled chart off the slide so a fallback draws on a clean one
+        rid = frame._element.chart_rId
+        frame._element.getparent().remove(frame._element)
+        slide.part.drop_rel(rid)
+        raise
+
+
+def _style_chart(graphic, chart: NativeChart):
+    from pptx.dml.color import RGBColor
+    from pptx.enum.chart import XL_LEGEND_POSITION, XL_MARKER_STYLE
+    from pptx.enum.dml import MSO_LINE
+    from pptx.util import Pt
+
+    graphic.font.size = Pt(11)
+    graphic.font.name = 'Roboto'
+    graphic.has_legend = chart.legend or chart.kind in ("pie", "doughnut")
+    if graphic.has_legend:
+        graphic.legend.position = XL_LEGEND_POSITION.BOTTOM
+        graphic.legend.include_in_layout = False
+
+    plot = graphic.plots[0]
+    if chart.kind in ("column", "bar"):
+        plot.gap_width = 60
+    for s, series in zip(chart.series, plot.series):
+        if chart.kind == "line":
+            series.smooth = False
+            if s.color:
+                series.format.line.color.rgb = RGBColor(*s.color)
+            series.format.line.width = Pt(2.5)
+            if s.dash:
+                series.format.line.dash_style = MSO_LINE.DASH
+            if s.markers:
+                series.marker.style = XL_MARKER_STYLE.CIRCLE
+                if s.color:
+                    series.marker.format.fill.solid()
+                    series.marker.format.fill.fore_color.rgb = RGBColor(*s.color)
+            else:
+                series.marker.style = XL_MARKER_STYLE.NONE
+        elif s.color and not s.point_colors:
+            series.format.fill.solid()
+            series.format.fill.fore_color.rgb = RGBColor(*s.color)
+        if s.point_colors:
+            for j, rgb in enumerate(s.point_colors):
+                point = series.points[j]
+                point.format.fill.solid()
+                point.format.fill.fore_color.rgb = RGBColor(*rgb)
+        if s.labels:
+            labels = series.data_labels
+            labels.number_format = chart.label_format
+            labels.number_format_is_linked = False
+            if chart.kind in ("pie", "doughnut"):
+                labels.show_percentage = True
+                labels.show_category_name = True
+            else:
+                labels.show_value = True
+
+    if chart.kind not in ("pie", "doughnut"):
+        for axis, title in ((graphic.value_axis, chart.value_title), (graphic.category_axis, chart.category_title)):
+            if title:
+                axis.has_title = True
+                axis.axis_title.text_frame.text = title
+        graphic.value_axis.has_major_gridlines = True
+        graphic.value_axis.major_gridlines.format.line.color.rgb = RGBColor(226, 232, 240)
+        graphic.value_axis.tick_labels.number_format = '#,##0'
+        graphic.value_axis.tick_labels.number_format_is_linked = False
+    return graphic
@@ -0,0 +1,84 @@
+# ================= DAILY REPORT BUNDLE =================
+# One ZIP with everything management asks for each morning: salesman
+# summary, billing table, customer (PY) table, Talabat split, KA Target daily
+# sheet and -- supplied by the page -- the PPTX deck. Every workbook comes
+# from the same TrackingResult, the single memoized aggregate pass for the
+# filter state, so nothing re-groups df_filtered per file. The artifacts are
+# built in parallel on a thread pool (the deck mostly waits on the chart
+# workers in chart_render while the workbooks are written) and stored in the
+# ZIP uncompressed: xlsx / pptx files are already deflated, deflating them a
+# second time saves ~3% for a full extra pass.
+# NOTE: No Streamlit calls in here (runs from a deferred download).
+
+import io
+import os
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from excel_export import export_excel_file, export_token
+
+
+BUNDLE_WORKERS = int(os.environ.get("DAILY_TRACKING_BUNDLE_WORKERS", "6"))   # one thread per artifact
+
+
+def _indexed(df: pd.DataFrame, col: str) -> pd.DataFrame:
+    return df.set_index(col) if not df.empty and col in df.columns else pd.DataFrame()
+
+
+def tracking_workbooks(tracking) -> dict:
+    """{file name: [(sheet_name, df, index)]} for the bundle, read off one TrackingResult."""
+    return {
+        "salesman_summary.xlsx": [("Salesman_Summary", tracking.report_df, False)],
+        "billing_types.xlsx": [("Billing_Types", tracking.billing_df.reset_index(), False)],
+        "sales_by_customer.xlsx": [("Sales_by_Customer", tracking.py_table_with_total.reset_index(), False)],
+        "talabat_split.xlsx": [
+            ("Talabat_Billing_Split", _indexed(tracking.talabat_billing_split, "Salesman"), True),
+            ("Talabat_Customers", _indexed(tracking.talabat_customer_table, "Customer"), True),
+            ("Talabat_Daily_Trend", _indexed(tracking.talabat_daily_trend, "Date"), True),
+        ],
+        "ka_target_daily.xlsx": [("KA_Target_Daily", tracking.ka_daily_df, False)],
+    }
+
+
+def tracking_artifacts(tracking) -> dict:
+    """{file name: () -> binary file} for the bundle workbooks (cached on disk per filter state via excel_export)."""
+    return {
+        name: (lambda sheets=sheets, name=name: export_excel_file(sheets, export_token(tracking.state_key, "bundle", name)))
+        for name, sheets in tracking_workbooks(tracking).items()
+    }
+
+
+def build_bundle(artifacts: dict, workers: int = BUNDLE_WORKERS) -> bytes:
+    """ZIP of {file name: () -> bytes / binary file}, artifacts generated concurrently.
+
+    Files are copied into the ZIP in chunks and closed; a failed artifact becomes <name>.error.txt.
+    """
+    def run(fn):
+        try:
+            return fn()
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(artifacts))), thread_name_prefix="bundle") as pool:
+        futures = {name: pool.submit(run, fn) for name, fn in artifacts.items()}
+        results = {name: fut.result() for name, fut in futures.items()}
+
+    buffer = io.BytesIO()
+    stamp = datetime.now().timetuple()[:6]
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as zf:
+        for name, payload in results.items():
+            if isinstance(payload, Exception):
+                zf.writestr(f"{name}.error.txt", f"{type(payload).__name__}: {payload}")
+                continue
+            info = zipfile.ZipInfo(name, date_time=stamp)
+            info.compress_type = zipfile.ZIP_STORED
+            if hasattr(payload, "read"):
+                with payload, zf.open(info, "w") as dst:
+                    shutil.copyfileobj(payload, dst)
+            else:
+                zf.writestr(info, payload)
+    return buffer.getvalue()
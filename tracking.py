@@ -0,0 +1,504 @@
+# ================= SALES TRACKING PIPELINE =================
+# Every aggregate the Sales Tracking page shows or exports (targets, gaps,
+# Talabat split, channel split, summary tables, KPI values, KA daily sheet)
+# computed in one pass per filter state. The KPIs / Tables / Charts /
+# Downloads tabs all read the same TrackingResult; results are memoized per
+# (dataset version, filters, day) so reruns that only switch tabs, toggle a
+# chart option or click a download reuse them. The memo is bucketed per
+# dataset scope (version_cache.py), so one scope's sessions never evict another's.
+
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from cube import CUBE_DATE
+from filter_index import FilterIndex, get_filter_index
+from version_cache import VersionCache
+
+
+TALABAT_PY = "STORES SERVICES KUWAIT CO."
+BILLING_COLS_RAW = ["ZFR", "YKF2", "YKRE", "YKS1", "YKS2", "ZCAN", "ZRE"]
+BILLING_COLS_ORDER = ["Presales", "HHT", "Sales Total", "YKS1", "YKS2", "ZCAN",
+                      "Cancel Total", "YKRE", "ZRE", "Return", "Return %"]
+TALABAT_GROUPS = ["ZFR", "HHT", "Returns", "Other"]
+ECOM_PATTERN = "e-com|ecom|ecommerce|online|talabat"
+TRACKING_STATES_PER_SCOPE = int(os.environ.get("DAILY_TRACKING_STATES_PER_SCOPE", "0")) or 8
+TRACKING_DIMS = ["Driver Name EN", "Billing Type", "PY Name 1", "SP Name1"]
+
+
+@dataclass(frozen=True)
+class TrackingFilters:
+    """Sidebar filter state (raw multiselect values; normalized by the filter index)."""
+
+    salesmen: tuple
+    billing_types: tuple
+    py: tuple
+    sp: tuple
+    start: pd.Timestamp
+    end: pd.Timestamp
+
+    def selections(self) -> dict:
+        return dict(zip(TRACKING_DIMS, (self.salesmen, self.billing_types, self.py, self.sp)))
+
+
+@dataclass
+class TrackingResult:
+    """All Sales Tracking aggregates for one filter state (treat as read-only)."""
+
+    df_filtered: pd.DataFrame
+    cube_filtered: pd.DataFrame
+    today: pd.Timestamp
+    current_month_start: pd.Timestamp
+    current_month_end: pd.Timestamp
+    days_finish: int = 0
+    working_days_current_month: int = 0
+
+    # per salesman (index = every salesman with sales or a target)
+    total_sales: pd.Series = field(default_factory=pd.Series)
+    talabat_sales: pd.Series = field(default_factory=pd.Series)
+    ka_targets: pd.Series = field(default_factory=pd.Series)
+    talabat_targets: pd.Series = field(default_factory=pd.Series)
+    ka_gap: pd.Series = field(default_factory=pd.Series)
+    talabat_gap: pd.Series = field(default_factory=pd.Series)
+
+    total_ka_target_all: float = 0.0
+    total_tal_target_all: float = 0.0
+    per_day_ka_target: float = 0.0
+    current_sales_per_day: float = 0.0
+    forecast_month_end_ka: float = 0.0
+
+    # channel split: cube row -> lower-cased Channels label (NaN = not in Channels sheet)
+    channel: pd.Series = field(default_factory=pd.Series)
+    total_retail_sales: float = 0.0
+    total_ecom_sales: float = 0.0
+    retail_sales_pct: float = 0.0
+    ecom_sales_pct: float = 0.0
+    ka_other_ecom_sales: float = 0.0
+    ka_other_ecom_pct: float = 0.0
+
+    # tables (Tables tab / Downloads / PPTX)
+    report_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+    billing_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+    py_table_with_total: pd.DataFrame = field(default_factory=pd.DataFrame)
+    sp_billing: pd.DataFrame = field(default_factory=pd.DataFrame)
+    talabat_billing_split: pd.DataFrame = field(default_factory=pd.DataFrame)
+    talabat_customer_table: pd.DataFrame = field(default_factory=pd.DataFrame)
+    talabat_daily_trend: pd.DataFrame = field(default_factory=pd.DataFrame)
+    daily_sales: pd.DataFrame = field(default_factory=pd.DataFrame)   # ds / y, every day in range
+    ka_daily_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+
+    # (dataset version, normalized filter state, day) when memoized -- export cache token
+    state_key: tuple | None = None
+
+    @property
+    def is_ecom(self) -> pd.Series:
+        """Cube rows whose channel is exactly 'e-com' (everything else counts as retail in charts)."""
+        return self.channel.eq("e-com")
+
+    def kpi_data(self, t: dict) -> dict:
+        """KPI label -> formatted value (labels from texts[lang]; used by the PPTX export)."""
+        sales = self.total_sales.sum()
+        tal = self.talabat_sales.sum()
+        ka_t, tal_t = self.total_ka_target_all, self.total_tal_target_all
+        return {
+            t["ka_target"]: f"KD {ka_t:,.0f}",
+            t["talabat_target"]: f"KD {tal_t:,.0f}",
+            t["ka_gap"]: f"KD {(ka_t - sales):,.0f}",
+            "Total Talabat Gap": f"KD {self.talabat_gap.sum():,.0f}",
+            t["total_ka_sales"]: f"KD {sales:,.0f} ({((sales / ka_t) * 100):.0f}%)" if ka_t else f"KD {sales:,.0f} (0%)",
+            "Total Talabat Sales": f"KD {tal:,.0f} ({((tal / tal_t) * 100):.0f}%)" if tal_t else f"KD {tal:,.0f} (0%)",
+            t["ka_other_ecom"]: f"KD {self.ka_other_ecom_sales:,.0f} ({self.ka_other_ecom_pct:.0f}%)",
+            t["retail_sales"]: f"KD {self.total_retail_sales:,.0f} ({self.retail_sales_pct:.0f}%)",
+            t["ecom_sales"]: f"KD {self.total_ecom_sales:,.0f} ({self.ecom_sales_pct:.0f}%)",
+            t["days_finished"]: f"{self.days_finish}",
+            "Per Day KA Target": f"KD {self.per_day_ka_target:,.0f}",
+            t["current_sales_per_day"]: f"KD {self.current_sales_per_day:,.0f}",
+            t["forecast_month_end"]: f"KD {self.forecast_month_end_ka:,.0f}",
+        }
+
+
+def _working_days(start, end) -> int:
+    """Days in [start, end] excluding Fridays."""
+    days = pd.date_range(start, end, freq="D")
+    return int((days.weekday != 4).sum())
+
+
+def _target_series(target_df: pd.DataFrame, col: str) -> pd.Series:
+    if col not in target_df.columns:
+        return pd.Series(dtype=float)
+    return target_df.set_index("Driver Name EN")[col]
+
+
+def _billing_table(cube: pd.DataFrame, index_col: str) -> pd.DataFrame:
+    """<index_col> x billing type with sales / cancel / return totals (no Total row)."""
+    wide = cube.pivot_table(index=index_col, columns="Billing Type", values="Net Value",
+                            aggfunc="sum", fill_value=0, observed=True)
+    return wide.reindex(columns=BILLING_COLS_RAW, fill_value=0)
+
+
+def _add_total_row(table: pd.DataFrame) -> pd.DataFrame:
+    total_row = pd.DataFrame(table.sum(numeric_only=True)).T
+    total_row.index = ["Total"]
+    total_row["Return %"] = round((total_row["Return"] / total_row["Sales Total"] * 100), 0) if total_row["Sales Total"].iloc[0] != 0 else 0
+    return pd.concat([table, total_row])
+
+
+def _pct(a, b):
+    return round(a / b * 100, 0) if b > 0 else 0
+
+
+def _report_table(r: TrackingResult, target_df: pd.DataFrame) -> pd.DataFrame:
+    """Salesman targets summary (Total / Market / E-Com), sorted by % achieved, Total last."""
+    idx = r.ka_targets.index
+    ka_target = r.ka_targets.reindex(idx, fill_value=0).astype(float)
+    ka_sales = r.total_sales.reindex(idx, fill_value=0).astype(float)
+    ka_balance = (ka_target - ka_sales).clip(lower=0)
+    ka_percent = np.where(ka_target > 0, (ka_sales / ka_target * 100).round(0), 0)
+
+    # Channels that look like e-commerce (default 'market' when unmapped)
+    labels = r.channel.fillna("").astype(str)
+    ecom_mask = labels.str.contains(ECOM_PATTERN, regex=True, na=False)
+    nv = r.cube_filtered["Net Value"]
+    drivers = r.cube_filtered["Driver Name EN"]
+    ecom_sales = nv[ecom_mask].groupby(drivers[ecom_mask], observed=True).sum().reindex(idx, fill_value=0)
+    market_sales = nv[~ecom_mask].groupby(drivers[~ecom_mask], observed=True).sum().reindex(idx, fill_value=0)
+
+    ecom_target = pd.Series(0.0, index=idx)
+    if not target_df.empty and "Driver Name EN" in target_df.columns:
+        col_map = {c.lower().strip(): c for c in target_df.columns}
+        for k in ["e-com target", "ecom target", "e-commerce target", "ecom target kd", "e-com target kd"]:
+            if k in col_map:
+                ecom_target = (
+                    target_df.set_index("Driver Name EN")[col_map[k]]
+                    .apply(pd.to_numeric, errors="coerce")
+                    .fillna(0)
+                    .reindex(idx, fill_value=0)
+                )
+                break
+
+    market_target = (ka_target - ecom_target).clip(lower=0)
+    market_balance = (market_target - market_sales).clip(lower=0)
+    market_percent = np.where(market_target > 0, (market_sales / market_target * 100).round(0), 0)
+    ecom_balance = (ecom_target - ecom_sales).clip(lower=0)
+    ecom_percent = np.where(ecom_target > 0, (ecom_sales / ecom_target * 100).round(0), 0)
+
+    report_df = pd.DataFrame({
+        "Salesman Name": idx,
+        "Total Target": ka_target.values,
+        "Total Sales": ka_sales.values,
+        "Total Balance": ka_balance.values,
+        "Total % Achieved": ka_percent,
+        "Market Target": market_target.values,
+        "Market Sales": market_sales.values,
+        "Market Balance": market_balance.values,
+        "Market % Achieved": market_percent,
+        "E-Com Target": ecom_target.values,
+        "E-Com Sales": ecom_sales.values,
+        "E-Com Balance": ecom_balance.values,
+        "E-Com % Achieved": ecom_percent,
+    })
+
+    total_row = report_df.sum(numeric_only=True).to_frame().T
+    total_row["Salesman Name"] = "Total"
+    total_row["Total % Achieved"] = _pct(total_row["Total Sales"].iloc[0], total_row["Total Target"].iloc[0])
+    total_row["Market % Achieved"] = _pct(total_row["Market Sales"].iloc[0], total_row["Market Target"].iloc[0])
+    total_row["E-Com % Achieved"] = _pct(total_row["E-Com Sales"].iloc[0], total_row["E-Com Target"].iloc[0])
+
+    data_part = report_df.sort_values("Total % Achieved", ascending=False)
+    return pd.concat([data_part, total_row], ignore_index=True)
+
+
+def _billing_by_salesman(cube: pd.DataFrame) -> pd.DataFrame:
+    billing_wide = _billing_table(cube, "Driver Name EN")
+    display_df = billing_wide.rename(columns={"ZFR": "Presales", "YKF2": "HHT"})
+    display_df["Sales Total"] = billing_wide.sum(axis=1)
+    display_df["Return"] = billing_wide["YKRE"] + billing_wide["ZRE"]
+    display_df["Return %"] = np.where(display_df["Sales Total"] != 0,
+                                      (display_df["Return"] / display_df["Sales Total"] * 100).round(0), 0)
+    display_df["Cancel Total"] = billing_wide[["YKS1", "YKS2", "ZCAN"]].sum(axis=1)
+    billing_df = _add_total_row(display_df.reindex(columns=BILLING_COLS_ORDER, fill_value=0))
+    billing_df.index.name = "Salesman"
+    return billing_df
+
+
+def _billing_by_branch(cube: pd.DataFrame) -> pd.DataFrame:
+    sp_billing = _billing_table(cube, "SP Name1")
+    sp_billing["Sales Total"] = sp_billing.sum(axis=1)
+    sp_billing["Return"] = sp_billing["YKRE"] + sp_billing["ZRE"]
+    sp_billing["Cancel Total"] = sp_billing[["YKS1", "YKS2", "ZCAN"]].sum(axis=1)
+    sp_billing = sp_billing.rename(columns={"ZFR": "Presales", "YKF2": "HHT"})
+    sp_billing["Return %"] = np.where(sp_billing["Sales Total"] != 0,
+                                      (sp_billing["Return"] / sp_billing["Sales Total"] * 100).round(0), 0)
+    return _add_total_row(sp_billing.reindex(columns=BILLING_COLS_ORDER, fill_value=0).astype(int))
+
+
+def _customer_table(cube: pd.DataFrame) -> pd.DataFrame:
+    """Sales / returns / contribution by customer (PY Name 1) with a Total row."""
+    py_table = cube.groupby("PY Name 1", observed=True)["Net Value"].sum().sort_values(ascending=False).to_frame(name="Sales")
+    returns = cube[cube["Billing Type"].isin(["YKRE", "ZRE"])].groupby("PY Name 1", observed=True)["Net Value"].sum()
+    py_table["Returns"] = returns.reindex(py_table.index, fill_value=0.0)
+    py_table["Return %"] = np.where(py_table["Sales"] > 0, (py_table["Returns"] / py_table["Sales"] * 100).round(1), 0)
+    py_table["Contribution %"] = np.where(py_table["Sales"] > 0, (py_table["Sales"] / py_table["Sales"].sum() * 100).round(1), 0)
+
+    total_row = pd.DataFrame({
+        "Sales": [py_table["Sales"].sum()],
+        "Returns": [py_table["Returns"].sum()],
+        "Return %": [(py_table["Returns"].sum() / py_table["Sales"].sum() * 100).round(1) if py_table["Sales"].sum() > 0 else 0],
+        "Contribution %": [100.0],
+    }, index=["Total"])
+    out = pd.concat([py_table, total_row])
+    out.index.name = "Customer Name"
+    return out
+
+
+def _talabat_group(billing_type: pd.Series) -> pd.Series:
+    """ZFR / HHT (YKF2) / Returns (YKRE, ZRE) / Other."""
+    bt = billing_type.astype(str).str.strip().str.upper()
+    return pd.Series(
+        np.select([bt.eq("ZFR"), bt.eq("YKF2"), bt.isin(["YKRE", "ZRE"])], ["ZFR", "HHT", "Returns"], "Other"),
+        index=billing_type.index,
+    )
+
+
+def _talabat_tables(df_filtered: pd.DataFrame):
+    """(billing split by salesman, customer / outlet summary, daily trend) for Talabat lines."""
+    talabat_only_df = df_filtered[df_filtered["PY Name 1"] == TALABAT_PY].copy()
+    billing_split = customer_table = daily_trend = pd.DataFrame()
+    if talabat_only_df.empty:
+        return billing_split, customer_table, daily_trend
+
+    talabat_only_df["_bt_group"] = _talabat_group(talabat_only_df["Billing Type"])
+
+    billing_split = (
+        talabat_only_df.groupby(["Driver Name EN", "_bt_group"], observed=True)["Net Value"]
+        .sum()
+        .unstack(fill_value=0)
+    )
+    for c in TALABAT_GROUPS:
+        if c not in billing_split.columns:
+            billing_split[c] = 0
+    billing_split = billing_split[TALABAT_GROUPS]
+    billing_split["Total"] = billing_split.sum(axis=1)
+    billing_split = billing_split.reset_index().rename(columns={"Driver Name EN": "Salesman"})
+    billing_split = pd.concat([
+        billing_split,
+        pd.DataFrame([{"Salesman": "Total", **{c: billing_split[c].sum() for c in TALABAT_GROUPS + ["Total"]}}]),
+    ], ignore_index=True)
+
+    candidate_customer_cols = [
+        "Customer", "Customer Name", "Outlet", "Outlet Name", "Branch Name",
+        "Ship-to Name", "Sold-to Name", "SP Name1", "PY Name 1",
+    ]
+    customer_col = next((c for c in candidate_customer_cols if c in talabat_only_df.columns), None)
+    candidate_order_cols = ["Billing Document", "Invoice", "Invoice No", "Sales Document", "Document No"]
+    order_col = next((c for c in candidate_order_cols if c in talabat_only_df.columns), None)
+
+    if customer_col:
+        grouped = talabat_only_df.groupby(customer_col, observed=True)
+        orders_series = grouped[order_col].nunique() if order_col else grouped.size()
+        customer_table = (
+            grouped["Net Value"].sum()
+            .to_frame("Talabat Sales")
+            .join(orders_series.to_frame("Orders"))
+            .reset_index()
+            .rename(columns={customer_col: "Customer"})
+            .sort_values("Talabat Sales", ascending=False)
+        )
+        customer_table = pd.concat([
+            customer_table,
+            pd.DataFrame([{
+                "Customer": "Total",
+                "Talabat Sales": customer_table["Talabat Sales"].sum(),
+                "Orders": customer_table["Orders"].sum(),
+            }]),
+        ], ignore_index=True)
+
+    if "Billing Date" in talabat_only_df.columns:
+        talabat_only_df["Billing Date"] = pd.to_datetime(talabat_only_df["Billing Date"], errors="coerce")
+        dated = talabat_only_df.dropna(subset=["Billing Date"])
+        daily = (
+            dated.groupby([dated["Billing Date"].dt.date, "_bt_group"], observed=True)["Net Value"]
+            .sum()
+            .unstack(fill_value=0)
+        )
+        for c in TALABAT_GROUPS:
+            if c not in daily.columns:
+                daily[c] = 0
+        daily = daily[TALABAT_GROUPS]
+        daily["Total"] = daily.sum(axis=1)
+        daily_trend = daily.reset_index().rename(columns={"Billing Date": "Date"})
+        daily_trend.columns = ["Date"] + [c for c in daily_trend.columns if c != "Date"]
+
+    return billing_split, customer_table, daily_trend
+
+
+KA_DAILY_BASE_COLS = [
+    "KA Target", "KA Target Value",
+    "Per day Target (Total target / Working days)",
+    "Achieved value", "Current Sales Per day",
+    "Salesman Name", "Sales Type", "Sales Summary", "Balance",
+]
+
+
+def _ka_daily_sheet(r: TrackingResult) -> pd.DataFrame:
+    """KA Target daily sheet for the current month: 4 rows per salesman
+    (HHT / PRESALES / Sales Total / Talabat Sales), one column per day,
+    days after today left blank."""
+    days = pd.date_range(r.current_month_start, r.current_month_end, freq="D")
+    day_cols = [f"Date {i}" for i in range(1, len(days) + 1)]
+    cutoff = min(r.today, r.current_month_end)
+
+    cube = r.cube_filtered
+    driver = cube["Driver Name EN"].astype(object)
+    date = pd.to_datetime(cube["Billing Date"], errors="coerce").dt.normalize()
+    nv = cube["Net Value"].astype(float)
+    bt = cube["Billing Type"].astype(str).str.upper()
+    hht = bt.isin(["YKF2", "HHT"]).to_numpy()
+    pre = bt.isin(["ZFR", "PRESALES"]).to_numpy()
+    tal = (cube["PY Name 1"].astype(str).str.strip().str.upper() == TALABAT_PY.upper()).to_numpy()
+
+    salesmen = sorted(driver.dropna().unique().tolist())
+    if not salesmen:
+        return pd.DataFrame(columns=KA_DAILY_BASE_COLS + day_cols)
+
+    def per_salesman(mask):
+        return nv[mask].groupby(driver[mask]).sum().reindex(salesmen, fill_value=0.0)
+
+    def per_day(mask):
+        daily = nv[mask].groupby([driver[mask], date[mask]]).sum().unstack()
+        return daily.reindex(index=salesmen, columns=days).fillna(0.0)
+
+    ka_t = r.ka_targets.reindex(salesmen).fillna(0.0).astype(float)
+    achieved_ka = per_salesman(np.ones(len(cube), dtype=bool)) - per_salesman(tal)
+    wd, df_days = r.working_days_current_month, r.days_finish
+    common = pd.DataFrame({
+        "KA Target": "KA Target",
+        "KA Target Value": ka_t.round(0),
+        "Per day Target (Total target / Working days)": (ka_t / wd if wd else ka_t * 0).round(0),
+        "Achieved value": achieved_ka.round(0),
+        "Current Sales Per day": (achieved_ka / df_days if df_days else achieved_ka * 0).round(0),
+        "Salesman Name": salesmen,
+        "Balance": (ka_t - achieved_ka).round(0),
+    }, index=salesmen)
+
+    d_hht, d_pre, d_tal = per_day(hht), per_day(pre), per_day(tal)
+    blocks = []
+    for order, (label, daily, summary) in enumerate([
+        ("HHT", d_hht, per_salesman(hht)),
+        ("PRESALES", d_pre, per_salesman(pre)),
+        ("Sales Total", d_hht + d_pre, per_salesman(hht | pre)),
+        ("Talabat Sales", d_tal, per_salesman(tal)),
+    ]):
+        vals = daily.round(0).astype(object)
+        vals.loc[:, days > cutoff] = ""
+        vals.columns = day_cols
+        block = common.assign(**{"Sales Type": label, "Sales Summary": summary.round(0)}).join(vals)
+        block["_order"] = order
+        blocks.append(block)
+
+    sheet = pd.concat(blocks)
+    sheet["_sm"] = pd.Categorical(sheet["Salesman Name"], categories=salesmen, ordered=True)
+    sheet = sheet.sort_values(["_sm", "_order"], kind="stable")
+    return sheet.reindex(columns=KA_DAILY_BASE_COLS + day_cols).reset_index(drop=True)
+
+
+def tracking_index(data_version: str | None, sales_df: pd.DataFrame) -> FilterIndex:
+    """Filter index over the sales lines (also supplies the sidebar options)."""
+    return get_filter_index(data_version, "tracking:sales", sales_df, TRACKING_DIMS, "Billing Date")
+
+
+def compute_tracking(sales_df: pd.DataFrame, cube_df: pd.DataFrame, target_df: pd.DataFrame,
+                     channels_df: pd.DataFrame, filters: TrackingFilters, today: pd.Timestamp,
+                     data_version: str | None = None) -> TrackingResult:
+    """Filter once, aggregate once."""
+    selections = filters.selections()
+    df_filtered = tracking_index(data_version, sales_df).select(sales_df, selections, filters.start, filters.end)
+    # Same filters on the daily cube (used for all Net Value aggregates)
+    cube_index = get_filter_index(data_version, "tracking:cube", cube_df, TRACKING_DIMS, CUBE_DATE)
+    cube_filtered = cube_index.select(cube_df, selections, filters.start, filters.end)
+
+    current_month_start = today.replace(day=1)
+    current_month_end = current_month_start + pd.offsets.MonthEnd(0)
+    r = TrackingResult(df_filtered=df_filtered, cube_filtered=cube_filtered, today=today,
+                       current_month_start=current_month_start, current_month_end=current_month_end)
+    if df_filtered.empty:
+        return r
+
+    r.days_finish = _working_days(df_filtered["Billing Date"].min().normalize(), df_filtered["Billing Date"].max().normalize())
+    r.working_days_current_month = _working_days(current_month_start, current_month_end)
+
+    # --- Base aggregates ---
+    total_sales = cube_filtered.groupby("Driver Name EN", observed=True)["Net Value"].sum()
+    talabat_sales = cube_filtered[cube_filtered["PY Name 1"] == TALABAT_PY].groupby("Driver Name EN", observed=True)["Net Value"].sum()
+    ka_targets = _target_series(target_df, "KA Target")
+    talabat_targets = _target_series(target_df, "Talabat Target")
+
+    all_salesmen_idx = total_sales.index.union(talabat_sales.index).union(ka_targets.index).union(talabat_targets.index)
+    r.total_sales = total_sales.reindex(all_salesmen_idx, fill_value=0).astype(float)
+    r.talabat_sales = talabat_sales.reindex(all_salesmen_idx, fill_value=0).astype(float)
+    r.ka_targets = ka_targets.reindex(all_salesmen_idx, fill_value=0).astype(float)
+    r.talabat_targets = talabat_targets.reindex(all_salesmen_idx, fill_value=0).astype(float)
+    r.ka_gap = (r.ka_targets - r.total_sales).clip(lower=0)
+    r.talabat_gap = (r.talabat_targets - r.talabat_sales).clip(lower=0)
+
+    r.total_ka_target_all = float(r.ka_targets.sum())
+    r.total_tal_target_all = float(r.talabat_targets.sum())
+    r.per_day_ka_target = (r.total_ka_target_all / r.working_days_current_month) if r.working_days_current_month > 0 else 0
+    r.current_sales_per_day = (r.total_sales.sum() / r.days_finish) if r.days_finish > 0 else 0
+    r.forecast_month_end_ka = r.current_sales_per_day * r.working_days_current_month
+
+    # --- Channels: one lookup per cube row, reused by KPIs / Tables / Charts ---
+    channel_map = (
+        channels_df.drop_duplicates("_py_name_norm", keep="first")
+        .set_index("_py_name_norm")["Channels"]
+        .astype("string").str.strip().str.lower()
+    )
+    r.channel = cube_filtered["_py_name_norm"].astype(object).map(channel_map).astype(object)
+    nv = cube_filtered["Net Value"]
+    r.total_retail_sales = float(nv[r.channel.isna() | r.channel.isin(["market", "uncategorized"])].sum())
+    r.total_ecom_sales = float(nv[r.is_ecom].sum())
+    total_channel_sales = r.total_retail_sales + r.total_ecom_sales
+    r.retail_sales_pct = (r.total_retail_sales / total_channel_sales * 100) if total_channel_sales > 0 else 0
+    r.ecom_sales_pct = (r.total_ecom_sales / total_channel_sales * 100) if total_channel_sales > 0 else 0
+
+    # --- KA & Other E-com ---
+    r.ka_other_ecom_sales = r.total_sales.sum() - r.talabat_sales.sum()
+    r.ka_other_ecom_pct = (r.ka_other_ecom_sales / r.total_ka_target_all * 100) if r.total_ka_target_all > 0 else 0
+
+    # --- Tables ---
+    r.report_df = _report_table(r, target_df)
+    r.billing_df = _billing_by_salesman(cube_filtered)
+    r.py_table_with_total = _customer_table(cube_filtered)
+    r.sp_billing = _billing_by_branch(cube_filtered)
+    r.talabat_billing_split, r.talabat_customer_table, r.talabat_daily_trend = _talabat_tables(df_filtered)
+    r.daily_sales = (
+        cube_filtered.groupby(pd.Grouper(key="Billing Date", freq="D"), observed=True)["Net Value"].sum()
+        .reset_index()
+        .rename(columns={"Billing Date": "ds", "Net Value": "y"})
+    )
+    r.ka_daily_df = _ka_daily_sheet(r)
+    return r
+
+
+_tracking_cache = VersionCache(max_per_version=TRACKING_STATES_PER_SCOPE)
+
+
+def get_tracking(data_version: str | None, sales_df: pd.DataFrame, cube_df: pd.DataFrame, target_df: pd.DataFrame,
+                 channels_df: pd.DataFrame, filters: TrackingFilters, today: pd.Timestamp) -> TrackingResult:
+    """compute_tracking() memoized per (dataset version, normalized filter state, day); no memo without a version.
+
+    The key uses the index's normalized state, so "everything selected" and
+    the same selection in another order share one entry. Each dataset scope
+    keeps its own TRACKING_STATES_PER_SCOPE most recent states.
+    """
+    if data_version is None:
+        return compute_tracking(sales_df, cube_df, target_df, channels_df, filters, today)
+    state = tracking_index(data_version, sales_df).normalize(filters.selections(), filters.start, filters.end)
+    result = _tracking_cache.get(data_version, (state, today))
+    if result is not None:
+        return result
+    result = compute_tracking(sales_df, cube_df, target_df, channels_df, filters, today, data_version)
+    result.state_key = (data_version, state, today)
+    return _tracking_cache.put(data_version, (state, today), result)
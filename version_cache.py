@@ -0,0 +1,75 @@
+# ================= PER-SCOPE MEMO CACHES =================
+# Derived structures (date / filter indexes, Sales Tracking results) are
+# memoized per data version: "<dataset key>:<row scope>", where the scope is
+# "*" or one salesman (see sales.py). Each version gets its own bucket, so a
+# session only ever competes with sessions looking at the same rows; the LRU
+# runs over versions and is sized for the number of scopes active at once
+# (DAILY_TRACKING_CACHED_SCOPES). When the dataset registry drops a dataset,
+# forget_dataset() clears every bucket of it, so the memos live exactly as
+# long as the data they were built from.
+# NOTE: No Streamlit calls in here.
+
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+
+CACHED_SCOPES = int(os.environ.get("DAILY_TRACKING_CACHED_SCOPES", "0")) or 64
+
+_caches = weakref.WeakSet()
+
+
+class VersionCache:
+    """{data version: {key: value}} with an LRU over versions (and optionally over keys within one)."""
+
+    def __init__(self, max_versions: int = CACHED_SCOPES, max_per_version: int | None = None):
+        self.max_versions = max_versions
+        self.max_per_version = max_per_version
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        _caches.add(self)
+
+    def get(self, version: str, key, default=None):
+        """Cached value (marked most recently used), or default."""
+        with self._lock:
+            bucket = self._buckets.get(version)
+            if bucket is None or key not in bucket:
+                return default
+            self._buckets.move_to_end(version)
+            bucket.move_to_end(key)
+            return bucket[key]
+
+    def put(self, version: str, key, value):
+        with self._lock:
+            bucket = self._buckets.setdefault(version, OrderedDict())
+            self._buckets.move_to_end(version)
+            bucket[key] = value
+            bucket.move_to_end(key)
+            if self.max_per_version is not None:
+                while len(bucket) > self.max_per_version:
+                    bucket.popitem(last=False)
+            while len(self._buckets) > self.max_versions:
+                self._buckets.popitem(last=False)
+        return value
+
+    def forget(self, dataset_key: str) -> None:
+        """Drop every scope of one dataset."""
+        prefix = f"{dataset_key}:"
+        with self._lock:
+            for version in [v for v in self._buckets if v == dataset_key or v.startswith(prefix)]:
+                del self._buckets[version]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._buckets)
+
+
+def forget_dataset(dataset_key: str) -> None:
+    """Drop the memos of a dataset from every VersionCache (called when the registry drops it)."""
+    for cache in list(_caches):
+        cache.forget(dataset_key)